@@ -1,7 +1,7 @@
 import axios from 'axios';
 import { notification } from 'antd';
 
-const baseURL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
+export const baseURL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
 
 export const apiClient = axios.create({
   baseURL,
@@ -1,14 +1,21 @@
 import { AxiosResponse } from 'axios';
-import apiClient from './client';
+import apiClient, { baseURL } from './client';
 import { 
   BrandsResponse, 
   ModelsResponse, 
   EstimateRequest, 
   EstimateResponse,
+  EstimateStreamEvent,
+  EstimateStreamYear,
   BreakEvenRequest,
   BreakEvenResponse,
   BreakEvenAnalysisRequest,
-  BreakEvenAnalysisResponse
+  BreakEvenAnalysisResponse,
+  CompareRequest,
+  CompareResponse,
+  CostScheduleRequest,
+  CostScheduleResponse,
+  JobStatus
 } from '../types/api';
 
 // Retry configuration
@@ -64,12 +71,96 @@ export const estimate = async (payload: EstimateRequest): Promise<EstimateRespon
   return response.data;
 };
 
+// Error shaped like an AxiosError so callers can branch on `error.response.status`
+export class EstimateStreamError extends Error {
+  response: { status: number; data: { error: string } };
+
+  constructor(status: number, detail: string) {
+    super(detail);
+    this.name = 'EstimateStreamError';
+    this.response = { status, data: { error: detail } };
+  }
+}
+
+export const estimateStream = async (
+  payload: EstimateRequest,
+  onYear: (point: EstimateStreamYear) => void,
+): Promise<EstimateResponse> => {
+  const response = await fetch(`${baseURL}/api/estimate/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(payload),
+  });
+  if (!response.ok || !response.body) {
+    const body = await response.json().catch(() => ({}));
+    throw new EstimateStreamError(response.status, body.error || body.detail || response.statusText);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffer += decoder.decode(value, { stream: !done });
+
+    let newline = buffer.indexOf('\n');
+    while (newline >= 0 || (done && buffer.trim())) {
+      const line = (newline >= 0 ? buffer.slice(0, newline) : buffer).trim();
+      buffer = newline >= 0 ? buffer.slice(newline + 1) : '';
+      newline = buffer.indexOf('\n');
+      if (!line) continue;
+
+      const event = JSON.parse(line) as EstimateStreamEvent;
+      if (event.event === 'year') {
+        onYear(event);
+      } else if (event.event === 'estimate') {
+        // eslint-disable-next-line @typescript-eslint/no-unused-vars
+        const { event: _event, ...result } = event;
+        return result;
+      } else {
+        throw new EstimateStreamError(event.status_code, event.detail);
+      }
+    }
+
+    if (done) break;
+  }
+
+  throw new EstimateStreamError(500, 'Estimate stream ended before the final result was received');
+};
+
 export const breakEven = async (payload: BreakEvenRequest): Promise<BreakEvenResponse> => {
   const response: AxiosResponse<BreakEvenResponse> = await apiClient.post('/api/break_even', payload);
   return response.data;
 };
 
+export const costSchedule = async (payload: CostScheduleRequest): Promise<CostScheduleResponse> => {
+  const response: AxiosResponse<CostScheduleResponse> = await apiClient.post('/api/schedule', payload);
+  return response.data;
+};
+
 export const breakEvenAnalysis = async (payload: BreakEvenAnalysisRequest): Promise<BreakEvenAnalysisResponse> => {
   const response: AxiosResponse<BreakEvenAnalysisResponse> = await apiClient.post('/api/break_even_analysis', payload);
   return response.data;
 };
+
+// Queues the analysis; poll getJob until it finishes, then fetch getJobResult
+export const submitBreakEvenAnalysisJob = async (payload: BreakEvenAnalysisRequest): Promise<JobStatus> => {
+  const response: AxiosResponse<JobStatus> = await apiClient.post('/api/break_even_analysis/jobs', payload);
+  return response.data;
+};
+
+export const getJob = async (jobId: string): Promise<JobStatus> => {
+  const response: AxiosResponse<JobStatus> = await apiClient.get(`/api/jobs/${jobId}`);
+  return response.data;
+};
+
+export const getJobResult = async <T>(jobId: string): Promise<T> => {
+  const response: AxiosResponse<T> = await apiClient.get(`/api/jobs/${jobId}/result`);
+  return response.data;
+};
+
+export const compare = async (payload: CompareRequest): Promise<CompareResponse> => {
+  const response: AxiosResponse<CompareResponse> = await apiClient.post('/api/compare', payload);
+  return response.data;
+};
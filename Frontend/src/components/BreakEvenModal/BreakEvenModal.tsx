@@ -1,8 +1,8 @@
-import React, { useState } from 'react';
-import { Modal, Form, InputNumber, Button, Alert, Spin, Space } from 'antd';
+import React from 'react';
+import { Modal, Form, InputNumber, Button, Alert, Spin, Space, Progress } from 'antd';
 import { CalculatorOutlined } from '@ant-design/icons';
 import { useBreakEvenAnalysis } from '../../hooks/useBreakEvenAnalysis';
-import { EstimateRequest, BreakEvenAnalysisResponse } from '../../types/api';
+import { EstimateRequest } from '../../types/api';
 import BreakEvenChart from '../Charts/BreakEvenChart';
 
 interface BreakEvenModalProps {
@@ -17,8 +17,9 @@ const BreakEvenModal: React.FC<BreakEvenModalProps> = ({
   estimateData 
 }) => {
   const [form] = Form.useForm();
-  const [results, setResults] = useState<BreakEvenAnalysisResponse | null>(null);
-  const breakEvenMutation = useBreakEvenAnalysis();
+  const breakEvenAnalysis = useBreakEvenAnalysis();
+  const results = breakEvenAnalysis.data;
+  const job = breakEvenAnalysis.job;
 
   const handleSubmit = async () => {
     try {
@@ -34,15 +35,15 @@ const BreakEvenModal: React.FC<BreakEvenModalProps> = ({
         shift_types: estimateData.shift_types
       };
       
-      const response = await breakEvenMutation.mutateAsync(payload);
-      setResults(response);
+      // queued as a background job, polled by the hook until the result is ready
+      breakEvenAnalysis.start(payload);
     } catch (error) {
       console.error('Break-even analysis failed:', error);
     }
   };
 
   const handleCancel = () => {
-    setResults(null);
+    breakEvenAnalysis.reset();
     form.resetFields();
     onCancel();
   };
@@ -60,7 +61,7 @@ const BreakEvenModal: React.FC<BreakEvenModalProps> = ({
       width={800}
       footer={null}
     >
-      <Spin spinning={breakEvenMutation.isPending}>
+      <Spin spinning={breakEvenAnalysis.isPending && !job}>
         <Form
           form={form}
           layout="vertical"
@@ -125,7 +126,7 @@ const BreakEvenModal: React.FC<BreakEvenModalProps> = ({
             <Button 
               type="primary" 
               onClick={handleSubmit}
-              loading={breakEvenMutation.isPending}
+              loading={breakEvenAnalysis.isPending}
               icon={<CalculatorOutlined />}
             >
               Analyze Break-Even Point
@@ -133,15 +134,36 @@ const BreakEvenModal: React.FC<BreakEvenModalProps> = ({
           </Space>
         </Form>
 
-        {breakEvenMutation.isError && (
+        {job && breakEvenAnalysis.isPending && (
+          <div style={{ marginTop: 16 }}>
+            <Progress
+              percent={Math.round(job.progress * 100)}
+              status="active"
+              aria-label="Break-even analysis progress"
+            />
+            {job.status === 'queued' ? 'Waiting for a free worker…' : `Fetched ${job.completed_steps} of ${job.total_steps} steps`}
+          </div>
+        )}
+
+        {breakEvenAnalysis.isError && (
           <Alert
             message="Analysis Failed"
-            description="Unable to perform break-even analysis. Please check your inputs and try again."
+            description={job?.error || 'Unable to perform break-even analysis. Please check your inputs and try again.'}
             type="error"
             style={{ marginTop: 16 }}
           />
         )}
 
+        {results?.warning && (
+          <Alert
+            message="Partial data"
+            description={results.warning}
+            type="warning"
+            showIcon
+            style={{ marginTop: 16 }}
+          />
+        )}
+
         {results && (
           <div style={{ marginTop: 24 }}>
             <BreakEvenChart
@@ -11,7 +11,7 @@ import {
   ReferenceLine,
   Legend,
 } from 'recharts';
-import { Card, Space } from 'antd';
+import { Card, Space, Spin } from 'antd';
 import { LineChartOutlined } from '@ant-design/icons';
 import { formatCurrency } from '../../utils/numbers';
 
@@ -20,6 +20,8 @@ interface CarValueChartProps {
   stdDev?: (number | undefined)[];
   registrationYear: number;
   purchaseYearIndex: number;
+  // true while yearValues is still being filled by the streaming estimate
+  streaming?: boolean;
 }
 
 const CarValueChart: React.FC<CarValueChartProps> = ({
@@ -27,6 +29,7 @@ const CarValueChart: React.FC<CarValueChartProps> = ({
   stdDev = [],
   registrationYear,
   purchaseYearIndex,
+  streaming = false,
 }) => {
   const chartData = yearValues.map((value, index) => {
     const deviation = stdDev[index];
@@ -79,6 +82,14 @@ const CarValueChart: React.FC<CarValueChartProps> = ({
           Car Value Over Time
         </Space>
       }
+      extra={
+        streaming && (
+          <Space>
+            <Spin size="small" />
+            Loading {yearValues.length} year{yearValues.length === 1 ? '' : 's'}...
+          </Space>
+        )
+      }
       style={{ marginBottom: 16 }}
     >
       <ResponsiveContainer width="100%" height={350}>
@@ -0,0 +1,120 @@
+import React, { useEffect } from 'react';
+import { Modal, Table, Alert, Spin, Tag } from 'antd';
+import { TrophyOutlined } from '@ant-design/icons';
+import { useCompare } from '../../hooks/useCompare';
+import { EstimateRequest, SavedStudy, VehicleComparison } from '../../types/api';
+import { formatCurrency } from '../../utils/numbers';
+
+interface CompareModalProps {
+  visible: boolean;
+  onCancel: () => void;
+  studies: SavedStudy[];
+  // financial parameters shared by every vehicle (the current form, or the first study)
+  parameters: EstimateRequest;
+}
+
+const MAX_VEHICLES = 8;
+
+const CompareModal: React.FC<CompareModalProps> = ({ visible, onCancel, studies, parameters }) => {
+  const compareMutation = useCompare();
+  const { mutate, reset } = compareMutation;
+
+  useEffect(() => {
+    if (!visible) {
+      reset();
+      return;
+    }
+    // eslint-disable-next-line @typescript-eslint/no-unused-vars
+    const { brand, model, details, shift_types, combine_regions, ...shared } = parameters;
+    mutate({
+      ...shared,
+      vehicles: studies.slice(0, MAX_VEHICLES).map((study) => ({
+        brand: study.data.brand,
+        model: study.data.model,
+        details: study.data.details,
+        shift_types: study.data.shift_types,
+        label: study.name,
+      })),
+    });
+    // run once per opening: `parameters` may be a new object on every parent render
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [visible]);
+
+  const columns = [
+    {
+      title: 'Rank',
+      dataIndex: 'rank',
+      key: 'rank',
+      width: 70,
+      render: (rank?: number | null) =>
+        rank === 1 ? <Tag color="gold" icon={<TrophyOutlined />}>1</Tag> : rank ?? '-',
+    },
+    { title: 'Study', dataIndex: 'label', key: 'label' },
+    {
+      title: 'Monthly cost',
+      key: 'total_monthly_cost',
+      render: (_: unknown, row: VehicleComparison) =>
+        row.estimate ? formatCurrency(row.estimate.total_monthly_cost) : <Tag color="red">{row.error}</Tag>,
+    },
+    {
+      title: 'vs best',
+      dataIndex: 'difference_to_best',
+      key: 'difference_to_best',
+      render: (difference?: number | null) =>
+        difference == null ? '-' : difference === 0 ? 'best' : `+${formatCurrency(difference)}`,
+    },
+    {
+      title: 'Purchase price',
+      key: 'purchase_price',
+      render: (_: unknown, row: VehicleComparison) =>
+        row.estimate ? formatCurrency(row.estimate.purchase_price) : '-',
+    },
+    {
+      title: 'Final value',
+      key: 'estimated_final_value',
+      render: (_: unknown, row: VehicleComparison) =>
+        row.estimate ? formatCurrency(row.estimate.estimated_final_value) : '-',
+    },
+  ];
+
+  return (
+    <Modal
+      title="Compare Saved Studies"
+      open={visible}
+      onCancel={onCancel}
+      footer={null}
+      width={800}
+      destroyOnClose
+    >
+      <Spin spinning={compareMutation.isPending}>
+        {studies.length > MAX_VEHICLES && (
+          <Alert
+            type="info"
+            message={`Only the first ${MAX_VEHICLES} studies are compared.`}
+            style={{ marginBottom: 16 }}
+          />
+        )}
+        {compareMutation.data?.warning && (
+          <Alert type="warning" message={compareMutation.data.warning} style={{ marginBottom: 16 }} />
+        )}
+        {compareMutation.isError && (
+          <Alert
+            type="error"
+            message="Comparison Failed"
+            description="Unable to compare the saved studies. Please try again later."
+            style={{ marginBottom: 16 }}
+          />
+        )}
+        <Table
+          size="small"
+          rowKey="label"
+          pagination={false}
+          columns={columns}
+          dataSource={compareMutation.data?.vehicles ?? []}
+        />
+      </Spin>
+    </Modal>
+  );
+};
+
+export default CompareModal;
@@ -1,7 +1,8 @@
 import React, { useState, useEffect } from 'react';
 import { Card, List, Button, Popconfirm, Input, Modal, message, Space, Tag } from 'antd';
-import { SaveOutlined, DeleteOutlined, DownloadOutlined, UploadOutlined } from '@ant-design/icons';
+import { SaveOutlined, DeleteOutlined, DownloadOutlined, UploadOutlined, SwapOutlined } from '@ant-design/icons';
 import { SavedStudy, EstimateRequest } from '../../types/api';
+import CompareModal from '../CompareModal/CompareModal';
 import { getSavedStudies, saveStudy, deleteStudy } from '../../utils/storage';
 import { formatDate } from '../../utils/date';
 
@@ -14,6 +15,7 @@ const SavedStudies: React.FC<SavedStudiesProps> = ({ currentData, onLoadStudy })
   const [studies, setStudies] = useState<SavedStudy[]>([]);
   const [saveModalVisible, setSaveModalVisible] = useState(false);
   const [studyName, setStudyName] = useState('');
+  const [compareVisible, setCompareVisible] = useState(false);
 
   useEffect(() => {
     loadStudies();
@@ -113,6 +115,14 @@ const SavedStudies: React.FC<SavedStudiesProps> = ({ currentData, onLoadStudy })
           >
             Save
           </Button>
+          <Button
+            icon={<SwapOutlined />}
+            size="small"
+            onClick={() => setCompareVisible(true)}
+            disabled={studies.length < 2}
+          >
+            Compare
+          </Button>
           <Button 
             icon={<DownloadOutlined />} 
             size="small"
@@ -182,6 +192,15 @@ const SavedStudies: React.FC<SavedStudiesProps> = ({ currentData, onLoadStudy })
         />
       )}
 
+      {studies.length >= 2 && (
+        <CompareModal
+          visible={compareVisible}
+          onCancel={() => setCompareVisible(false)}
+          studies={studies}
+          parameters={currentData ?? studies[0].data}
+        />
+      )}
+
       <Modal
         title="Save Current Study"
         open={saveModalVisible}
@@ -1,9 +1,52 @@
-import { useMutation } from '@tanstack/react-query';
-import { breakEvenAnalysis } from '../api/endpoints';
-import { BreakEvenAnalysisRequest, BreakEvenAnalysisResponse, ApiError } from '../types/api';
+import { useState } from 'react';
+import { useMutation, useQuery } from '@tanstack/react-query';
+import { getJob, getJobResult, submitBreakEvenAnalysisJob } from '../api/endpoints';
+import { BreakEvenAnalysisRequest, BreakEvenAnalysisResponse, ApiError, JobStatus } from '../types/api';
 
+const POLL_INTERVAL_MS = 1000;
+
+const isFinished = (job?: JobStatus) => job?.status === 'succeeded' || job?.status === 'failed';
+
+// Runs the analysis as a background job: submit, poll its progress, then fetch the result
 export const useBreakEvenAnalysis = () => {
-  return useMutation<BreakEvenAnalysisResponse, ApiError, BreakEvenAnalysisRequest>({
-    mutationFn: breakEvenAnalysis,
+  const [jobId, setJobId] = useState<string | null>(null);
+
+  const submission = useMutation<JobStatus, ApiError, BreakEvenAnalysisRequest>({
+    mutationFn: submitBreakEvenAnalysisJob,
+    onSuccess: (job) => setJobId(job.job_id),
+  });
+
+  const job = useQuery<JobStatus, ApiError>({
+    queryKey: ['job', jobId],
+    queryFn: () => getJob(jobId as string),
+    enabled: jobId !== null,
+    refetchInterval: (query) => (isFinished(query.state.data) ? false : POLL_INTERVAL_MS),
   });
+
+  const result = useQuery<BreakEvenAnalysisResponse, ApiError>({
+    queryKey: ['job-result', jobId],
+    queryFn: () => getJobResult<BreakEvenAnalysisResponse>(jobId as string),
+    enabled: jobId !== null && job.data?.status === 'succeeded',
+    staleTime: Infinity,
+  });
+
+  const start = (payload: BreakEvenAnalysisRequest) => {
+    setJobId(null);
+    submission.mutate(payload);
+  };
+
+  const reset = () => {
+    setJobId(null);
+    submission.reset();
+  };
+
+  const running = jobId !== null && !isFinished(job.data);
+  return {
+    start,
+    reset,
+    job: jobId !== null ? job.data : undefined,
+    data: result.data,
+    isPending: submission.isPending || running || result.isFetching,
+    isError: submission.isError || job.isError || result.isError || job.data?.status === 'failed',
+  };
 };
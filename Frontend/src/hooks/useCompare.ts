@@ -0,0 +1,9 @@
+import { useMutation } from '@tanstack/react-query';
+import { compare } from '../api/endpoints';
+import { CompareRequest, CompareResponse, ApiError } from '../types/api';
+
+export const useCompare = () => {
+  return useMutation<CompareResponse, ApiError, CompareRequest>({
+    mutationFn: compare,
+  });
+};
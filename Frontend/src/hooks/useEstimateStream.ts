@@ -0,0 +1,18 @@
+import { useState } from 'react';
+import { useMutation } from '@tanstack/react-query';
+import { estimateStream } from '../api/endpoints';
+import { EstimateRequest, EstimateStreamYear } from '../types/api';
+
+// Like useEstimate, but also exposes the per-year prices received so far
+export const useEstimateStream = () => {
+  const [years, setYears] = useState<EstimateStreamYear[]>([]);
+
+  const mutation = useMutation({
+    mutationFn: (payload: EstimateRequest) => {
+      setYears([]);
+      return estimateStream(payload, (point) => setYears((prev) => [...prev, point]));
+    },
+  });
+
+  return { ...mutation, years };
+};
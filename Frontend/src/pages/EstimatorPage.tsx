@@ -19,7 +19,7 @@ import ResultsCard from '../components/ResultsCard/ResultsCard';
 import CarValueChart from '../components/Charts/CarValueChart';
 import BreakEvenModal from '../components/BreakEvenModal/BreakEvenModal';
 import SavedStudies from '../components/SavedStudies/SavedStudies';
-import { useEstimate } from '../hooks/useEstimate';
+import { useEstimateStream } from '../hooks/useEstimateStream';
 import { EstimateRequest, EstimateResponse } from '../types/api';
 import { formatCurrency } from '../utils/numbers';
 
@@ -36,7 +36,8 @@ const EstimatorPage: React.FC = () => {
   const [manualPriceMode, setManualPriceMode] = useState(false);
   const [errorBanner, setErrorBanner] = useState<ErrorBanner | null>(null);
 
-  const estimateMutation = useEstimate();
+  const estimateMutation = useEstimateStream();
+  const streamedYears = estimateMutation.years.filter((point) => point.median > 0);
 
   const handleSubmit = async () => {
     try {
@@ -242,6 +243,16 @@ const EstimatorPage: React.FC = () => {
           </div>
         )}
 
+        {estimateMutation.isPending && !results && streamedYears.length > 0 && (
+          <CarValueChart
+            yearValues={streamedYears.map((point) => point.median)}
+            stdDev={streamedYears.map((point) => point.stddev)}
+            registrationYear={currentFormData.registration_year}
+            purchaseYearIndex={currentFormData.purchase_year_index}
+            streaming
+          />
+        )}
+
         {estimateMutation.isPending && results && (
           <Card style={{ textAlign: 'center', marginTop: 16 }}>
             <Spin size="large" />
@@ -53,6 +53,30 @@ export const handlers = [
     });
   }),
 
+  // POST /api/estimate/stream - Success (NDJSON)
+  http.post(`${baseUrl}/api/estimate/stream`, async ({ request }) => {
+    const body = await request.json();
+    const yearValues = [30000, 28000, 25000, 22000, 19000, 16000, 15000, 14000, 13000, 12000];
+    const events = [
+      ...yearValues.map((median, index) => ({ event: 'year', year: 2025 - index, median, stddev: 0, p10: median, p90: median, trimmed_mean: median, count: 1, outliers: 0, freshness: 'fresh' })),
+      {
+        event: 'estimate',
+        purchase_price: 30000.0,
+        estimated_final_value: 12000.0,
+        monthly_depreciation: 200.0,
+        monthly_maintenance: (body as any).monthly_maintenance || 120.0,
+        loan_monthly_payment: 95.0,
+        loan_total_interest: 700.0,
+        total_monthly_cost: 415.0,
+        year_values: yearValues
+      }
+    ];
+
+    return new HttpResponse(events.map((e) => JSON.stringify(e)).join('\n') + '\n', {
+      headers: { 'Content-Type': 'application/x-ndjson' },
+    });
+  }),
+
   // POST /api/break_even - Success
   http.post(`${baseUrl}/api/break_even`, async ({ request }) => {
     const body = await request.json();
@@ -84,7 +108,7 @@ export const errorHandlers = {
     );
   }),
 
-  estimate422: http.post(`${baseUrl}/api/estimate`, () => {
+  estimate422: http.post(new RegExp(`${baseUrl}/api/estimate(/stream)?$`), () => {
     return HttpResponse.json(
       {
         error: 'Validation failed',
@@ -97,7 +121,7 @@ export const errorHandlers = {
     );
   }),
 
-  estimate503: http.post(`${baseUrl}/api/estimate`, () => {
+  estimate503: http.post(new RegExp(`${baseUrl}/api/estimate(/stream)?$`), () => {
     return HttpResponse.json(
       { error: 'Service temporarily unavailable' },
       { status: 503 }
@@ -24,6 +24,42 @@ export interface EstimateRequest {
   bank_rate_percent: number;
   loan_years: number;
   shift_types: string[];
+  fill_missing_years?: boolean;
+  sparse_anchor_years?: number;
+  adaptive_probing?: boolean;
+  // several regions, fetched concurrently; overrides zip_code
+  zip_codes?: string[];
+  combine_regions?: 'pooled' | 'per_region';
+}
+
+export interface RegionSeries {
+  zip_code: string;
+  latitude: number;
+  longitude: number;
+  years: number[];
+  year_values: number[];
+  price_stddev: number[];
+  listing_counts: number[];
+}
+
+export interface RegionPrice {
+  zip_code: string;
+  median: number;
+  stddev: number;
+  count: number;
+}
+
+// Listing price distribution of one fetched year (mis-parsed outliers excluded)
+export interface YearStats {
+  year: number;
+  median: number;
+  stddev: number;
+  p10: number;
+  p90: number;
+  trimmed_mean: number;
+  count: number;
+  outliers: number;
+  freshness: 'fresh' | 'stale' | 'unavailable';
 }
 
 export interface EstimateResponse {
@@ -38,8 +74,32 @@ export interface EstimateResponse {
   warning?: string;
   price_stddev?: number[];
   adjusted_number_of_years?: number;
+  year_sources?: ('observed' | 'fitted')[];
+  regions?: RegionSeries[];
+  year_stats?: YearStats[];
 }
 
+// Events emitted by /api/estimate/stream (one JSON object per line)
+export interface EstimateStreamYear {
+  event: 'year';
+  year: number;
+  median: number;
+  stddev: number;
+  p10: number;
+  p90: number;
+  trimmed_mean: number;
+  count: number;
+  outliers: number;
+  // 'stale': served from an expired cache entry, 'unavailable': skipped (upstream down)
+  freshness: 'fresh' | 'stale' | 'unavailable';
+  regions?: RegionPrice[];
+}
+
+export type EstimateStreamEvent =
+  | EstimateStreamYear
+  | ({ event: 'estimate' } & EstimateResponse)
+  | { event: 'error'; status_code: number; detail: string; retry_after?: number };
+
 export interface BreakEvenRequest {
   estimate: EstimateRequest;
   rent_monthly_cost: number;
@@ -53,11 +113,82 @@ export interface BreakEvenResponse {
   message: string | null;
 }
 
+export interface ExtraPayment {
+  month: number;
+  amount: number;
+}
+
+export interface CostScheduleRequest {
+  estimate: EstimateRequest;
+  extra_monthly_payment?: number;
+  extra_payments?: ExtraPayment[];
+  payoff_month?: number | null;
+  rent_monthly_cost?: number | null;
+  max_points?: number;
+}
+
+// one entry per sampled month (month 0 is the purchase)
+export interface CostScheduleResponse {
+  month: number[];
+  payment: number[];
+  interest: number[];
+  principal: number[];
+  balance: number[];
+  interest_paid: number[];
+  car_value: number[];
+  equity: number[];
+  cumulative_cost: number[];
+  cumulative_rent?: number[] | null;
+  total_months: number;
+  payoff_month?: number | null;
+  total_interest: number;
+  interest_saved: number;
+  months_to_break_even?: number | null;
+  warning?: string | null;
+}
+
 export interface ApiError {
   error: string;
   details?: Record<string, string[]>;
 }
 
+export interface VehicleSelection {
+  brand: string;
+  model: string;
+  details?: string;
+  shift_types?: string[];
+  label?: string;
+}
+
+export type CompareRankBy = 'total_monthly_cost' | 'monthly_depreciation' | 'purchase_price';
+
+// Shared financial parameters are the EstimateRequest ones without the selection
+export interface CompareRequest
+  extends Partial<Omit<EstimateRequest, 'brand' | 'model' | 'details' | 'shift_types' | 'combine_regions'>> {
+  vehicles: VehicleSelection[];
+  rank_by?: CompareRankBy;
+}
+
+export interface VehicleComparison {
+  label: string;
+  brand: string;
+  model: string;
+  details?: string;
+  rank?: number | null;
+  difference_to_best?: number | null;
+  estimate?: EstimateResponse | null;
+  status_code?: number | null;
+  error?: string | null;
+}
+
+export interface CompareResponse {
+  rank_by: CompareRankBy;
+  vehicles: VehicleComparison[];
+  ranking: string[];
+  horizon_years?: number | null;
+  warning?: string | null;
+}
+
 export interface SavedStudy {
   id: string;
   name: string;
@@ -75,12 +206,17 @@ export interface BreakEvenAnalysisRequest {
   rent_monthly_cost: number;
   max_years: number;
   shift_types?: string[];
+  fill_missing_years?: boolean;
+  sparse_anchor_years?: number;
+  adaptive_probing?: boolean;
+  zip_codes?: string[];
 }
 
 export interface DataPoint {
   years_owned: number;
   overall_cost: number;
   monthly_cost: number;
+  fitted?: boolean;
 }
 
 export interface PurchaseYearSeries {
@@ -91,4 +227,22 @@ export interface PurchaseYearSeries {
 export interface BreakEvenAnalysisResponse {
   rental_series: DataPoint[];
   purchase_series: PurchaseYearSeries[];
+  year_values?: number[];
+  year_sources?: ('observed' | 'fitted')[];
+  warning?: string;
+}
+
+// Background job (e.g. a queued break-even analysis), polled until finished
+export interface JobStatus {
+  job_id: string;
+  kind: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  progress: number;
+  completed_steps: number;
+  total_steps: number;
+  created_at: number;
+  started_at?: number | null;
+  finished_at?: number | null;
+  status_code?: number | null;
+  error?: string | null;
 }
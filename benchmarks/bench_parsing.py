@@ -0,0 +1,69 @@
+"""
+Benchmark: listing-page parsing throughput from concurrent request threads.
+
+Parses the same synthetic listing pages (the load-test stand-in's, padded with a footer
+like the real site's) from `--threads` threads, first in the threads themselves, where
+the GIL serializes the parses, then through `parse_pool.ParseExecutor` with 1 worker
+process and with `--workers` (default: one per core), and reports pages per second.
+
+Run from the repository root:
+    python benchmarks/bench_parsing.py [--pages N] [--threads N] [--workers N]
+Exits with status 1 if the pool's results differ from the in-thread parses.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loadtest.upstream import CURRENT_YEAR, listing_page  # noqa: E402
+from src.parse_pool import ParseConfig, ParseExecutor  # noqa: E402
+from src.parsing import parse_listing_prices  # noqa: E402
+
+
+def _pages(count: int, listings: int, footer_kb: int):
+    return [listing_page(f"/lst/fiat/model-{n}", f"fregfrom={CURRENT_YEAR - n % 10}", listings, CURRENT_YEAR - 15,
+                         footer_kb * 1024).encode("utf-8") for n in range(count)]
+
+
+def _run(executor: ParseExecutor, pages, threads: int):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(lambda page: executor.run(parse_listing_prices, page), pages))
+    return len(pages) / (time.perf_counter() - start), results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--listings", type=int, default=20)
+    parser.add_argument("--footer-kb", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    pages = _pages(args.pages, args.listings, args.footer_kb)
+    baseline, expected = _run(ParseExecutor(), pages, args.threads)
+    print(f"{'parser':>12} {'pages/s':>9} {'speed-up':>9}")
+    print(f"{'threads':>12} {baseline:>9.1f} {1.0:>8.1f}x")
+    ok = True
+    for workers in sorted({1, args.workers}):
+        executor = ParseExecutor(ParseConfig(workers=workers, max_queue=2 * workers))
+        if not executor.start():
+            print(f"{workers} workers: pool failed to start")
+            return 1
+        try:
+            _run(executor, pages[:workers], args.threads)  # warm-up
+            rate, results = _run(executor, pages, args.threads)
+        finally:
+            executor.close()
+        ok = ok and results == expected
+        print(f"{f'{workers} workers':>12} {rate:>9.1f} {rate / baseline:>8.1f}x")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Benchmark: cold import time of the API module.
+
+Imports `main` in fresh interpreters (the cost every autoscaled worker and test run pays
+before serving its first request), reports the median wall time and checks that the
+scraping dependencies (bs4, yaml, requests) and the upstream transport were not loaded.
+
+Run from the repository root:
+    python benchmarks/bench_startup.py [--repeat N] [--budget-ms MS]
+Exits with status 1 if the median exceeds the budget or a heavy dependency is imported eagerly.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ("bs4", "yaml", "requests", "urllib3", "uvicorn")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+import src.fetcher
+print(json.dumps({
+    "ms": elapsed * 1000.0,
+    "loaded": [m for m in %r if m in sys.modules],
+    "transport": src.fetcher._transport is not None,
+}))
+""" % (LAZY_MODULES,)
+
+
+def measure_once() -> dict:
+    """Import `main` in a fresh interpreter and return {"ms", "loaded", "transport"}."""
+    out = subprocess.run([sys.executable, "-c", _PROBE], cwd=ROOT, check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.getenv("CARCALC_STARTUP_BUDGET_MS", 1500)))
+    args = parser.parse_args(argv)
+
+    runs = [measure_once() for _ in range(args.repeat)]
+    timings = sorted(run["ms"] for run in runs)
+    median = statistics.median(timings)
+    loaded = sorted({m for run in runs for m in run["loaded"]})
+    transport = any(run["transport"] for run in runs)
+
+    print(f"import main: median {median:.1f} ms, min {timings[0]:.1f} ms, max {timings[-1]:.1f} ms "
+          f"(budget {args.budget_ms:.0f} ms)")
+    print(f"eagerly imported heavy modules: {', '.join(loaded) or 'none'}; transport built: {transport}")
+    return 0 if median <= args.budget_ms and not loaded and not transport else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4 @@
+"""
+Load-testing harness: `loadtest.run` drives the API with a configurable endpoint mix and
+arrival rate and checks SLOs; `loadtest.upstream` is the local stand-in for the listing site.
+"""
@@ -0,0 +1,359 @@
+"""
+Load generator for the API with SLO reporting.
+
+Sends an open-loop stream of requests (Poisson arrivals at `--rate` per second for
+`--duration` seconds) to /api/estimate, /api/break_even and /api/break_even_analysis in
+the proportions given by `--mix`. Latency is measured from each request's scheduled
+start, so time spent queued behind slow requests counts (no coordinated omission).
+Reports per endpoint: throughput, latency percentiles, error rate and, when the app
+scrapes the stand-in upstream, the upstream listing fetches it caused.
+
+Against a running app whose CARCALC_UPSTREAM_URL points at `python -m loadtest.upstream`:
+    python -m loadtest.run --target http://127.0.0.1:8000 --upstream http://127.0.0.1:8900 \\
+        --rate 20 --duration 60 --mix estimate=6,break_even=3,break_even_analysis=1 \\
+        --slo p99_ms=2000 --slo error_rate=0.01 --slo estimate.throughput=10
+Self-contained (starts the stand-in and `uvicorn main:app` on free ports):
+    python -m loadtest.run --spawn --workers 2 --rate 20 --duration 30 --slo p99_ms=2000
+
+SLOs are `[endpoint.]metric=value`; metrics are p50_ms, p90_ms, p95_ms, p99_ms, max_ms and
+error_rate (ceilings) and throughput (a floor, completed requests per second).
+Exits 1 when an SLO is breached, 2 when the target cannot be reached.
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .upstream import MAKES, MODELS, build_parser as upstream_parser, start_upstream
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = {
+    "estimate": "/api/estimate",
+    "break_even": "/api/break_even",
+    "break_even_analysis": "/api/break_even_analysis",
+}
+# `details` value of each endpoint's vehicles, so upstream fetches can be attributed
+TAGS = {"estimate": "lt-estimate", "break_even": "lt-break-even", "break_even_analysis": "lt-analysis"}
+CEILINGS = ("p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms", "error_rate")
+FLOORS = ("throughput",)
+
+
+class Slo(NamedTuple):
+    endpoint: Optional[str]  # None: every endpoint (and the total)
+    metric: str
+    limit: float
+
+    @classmethod
+    def parse(cls, text: str) -> "Slo":
+        name, _, value = text.partition("=")
+        endpoint, _, metric = name.strip().rpartition(".")
+        if metric not in CEILINGS + FLOORS or (endpoint and endpoint not in ENDPOINTS) or not value:
+            raise argparse.ArgumentTypeError(f"invalid SLO {text!r}")
+        return cls(endpoint or None, metric, float(value))
+
+
+class Sample(NamedTuple):
+    endpoint: str
+    latency_ms: float
+    status: int  # 0 when no HTTP response was received
+
+
+# Workload
+
+def vehicle_pool(size: int, seed: int) -> List[Tuple[str, str]]:
+    """`size` (brand, model) pairs from the stand-in catalog; fewer vehicles mean more cache hits."""
+    everything = [(make.lower(), model.lower().replace(" ", "-"))
+                  for make, make_id in MAKES.items() for model in MODELS[make_id]]
+    random.Random(seed).shuffle(everything)
+    return everything[:max(1, min(size, len(everything)))]
+
+
+def build_payload(endpoint: str, vehicle: Tuple[str, str], args: argparse.Namespace) -> Dict[str, Any]:
+    brand, model = vehicle
+    selection = {"brand": brand, "model": model, "details": TAGS[endpoint], "zip_code": args.zip_code}
+    if endpoint == "estimate":
+        return {**selection, "number_of_years": args.years, "purchase_year_index": 3}
+    if endpoint == "break_even":
+        return {"estimate": {**selection, "number_of_years": args.years, "purchase_year_index": 3},
+                "rent_monthly_cost": 450.0, "years": 5}
+    return {**selection, "max_years": args.years, "rent_monthly_cost": 450.0}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r} in --mix")
+        mix[name] = float(weight or 1)
+    if not any(w > 0 for w in mix.values()):
+        raise argparse.ArgumentTypeError("--mix needs a positive weight")
+    return mix
+
+
+# HTTP
+
+class Client:
+    """One keep-alive connection per thread to the target."""
+
+    def __init__(self, base_url: str, timeout: float):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Tuple[int, bytes]:
+        for attempt in (1, 2):
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                data = None if body is None else json.dumps(body).encode()
+                conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                return response.status, response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                self._local.conn = None
+                if attempt == 2:
+                    raise
+            except Exception:
+                conn.close()
+                self._local.conn = None
+                raise
+
+
+def _json(client: Client, method: str, path: str) -> Optional[Dict[str, Any]]:
+    try:
+        status, body = client.request(method, path)
+        return json.loads(body) if status == 200 else None
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+
+
+# Load generation
+
+def run_load(args: argparse.Namespace, client: Client) -> Tuple[List[Sample], float]:
+    """Fire the request stream; returns the samples and the wall time until the last response."""
+    rng = random.Random(args.seed)
+    names = list(args.mix)
+    weights = [args.mix[n] for n in names]
+    vehicles = vehicle_pool(args.vehicles, args.seed)
+    samples: List[Sample] = []
+    lock = threading.Lock()
+
+    def fire(endpoint: str, payload: Dict[str, Any], scheduled: float) -> None:
+        try:
+            status, _ = client.request("POST", ENDPOINTS[endpoint], payload)
+        except (OSError, http.client.HTTPException):
+            status = 0
+        sample = Sample(endpoint, (time.perf_counter() - scheduled) * 1000.0, status)
+        with lock:
+            samples.append(sample)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.max_in_flight, thread_name_prefix="load") as pool:
+        scheduled = start
+        while True:
+            scheduled += rng.expovariate(args.rate) if args.arrival == "poisson" else 1.0 / args.rate
+            if scheduled - start >= args.duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            endpoint = rng.choices(names, weights)[0]
+            pool.submit(fire, endpoint, build_payload(endpoint, rng.choice(vehicles), args), scheduled)
+    return samples, time.perf_counter() - start
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict[str, Dict[str, Any]]:
+    """Per-endpoint statistics, plus "total" over every request."""
+    groups: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        groups.setdefault(sample.endpoint, []).append(sample)
+    groups["total"] = list(samples)
+
+    report = {}
+    for name, group in groups.items():
+        latencies = sorted(s.latency_ms for s in group)
+        errors = [s for s in group if s.status == 0 or s.status >= 400]
+        statuses: Dict[str, int] = {}
+        for s in group:
+            statuses[str(s.status)] = statuses.get(str(s.status), 0) + 1
+        report[name] = {
+            "requests": len(group),
+            "throughput": round(len(group) / elapsed, 3) if elapsed > 0 else 0.0,
+            "error_rate": round(len(errors) / len(group), 4) if group else 0.0,
+            "statuses": statuses,
+            **{f"p{q}_ms": round(percentile(latencies, q), 1) for q in (50, 90, 95, 99)},
+            "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+        }
+    return report
+
+
+def attribute_upstream(report: Dict[str, Dict[str, Any]], stats: Optional[Dict[str, Any]]) -> None:
+    """Add the stand-in's listing fetches per endpoint (by vehicle tag) and its totals to `report`."""
+    if not stats:
+        return
+    by_tag = stats.get("listings_by_tag", {})
+    for endpoint, tag in TAGS.items():
+        if endpoint in report:
+            report[endpoint]["upstream_listing_calls"] = by_tag.get(tag, 0)
+    report["total"]["upstream_calls"] = stats.get("total", 0)
+    report["total"]["upstream_by_kind"] = stats.get("by_kind", {})
+
+
+def evaluate_slos(report: Dict[str, Dict[str, Any]], slos: List[Slo]) -> List[str]:
+    """Descriptions of the breached SLOs (empty when all are met)."""
+    breaches = []
+    for slo in slos:
+        targets = [slo.endpoint] if slo.endpoint else [name for name in report]
+        for name in targets:
+            stats = report.get(name)
+            if not stats or not stats["requests"]:
+                continue
+            value = stats[slo.metric]
+            breached = value < slo.limit if slo.metric in FLOORS else value > slo.limit
+            if breached:
+                relation = "<" if slo.metric in FLOORS else ">"
+                breaches.append(f"{name}.{slo.metric} = {value} {relation} {slo.limit:g}")
+    return breaches
+
+
+def print_report(report: Dict[str, Dict[str, Any]], breaches: List[str], out=sys.stdout) -> None:
+    columns = ("requests", "throughput", "error_rate", "p50_ms", "p90_ms", "p99_ms", "max_ms", "upstream_listing_calls")
+    out.write(f"{'endpoint':<22}" + "".join(f"{c.replace('upstream_listing_calls', 'upstream'):>12}" for c in columns) + "\n")
+    for name, stats in report.items():
+        out.write(f"{name:<22}" + "".join(f"{stats.get(c, ''):>12}" for c in columns) + "\n")
+    if "upstream_calls" in report.get("total", {}):
+        out.write(f"upstream calls: {report['total']['upstream_calls']} {report['total']['upstream_by_kind']}\n")
+    for breach in breaches:
+        out.write(f"SLO BREACHED: {breach}\n")
+    out.write("SLOs met\n" if not breaches else "")
+
+
+# Self-contained mode
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(client: Client, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if _json(client, "GET", "/api/metrics") is not None:
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def spawn(args: argparse.Namespace) -> Tuple[str, str, Callable[[], None]]:
+    """Start the stand-in upstream (in-process) and the app (uvicorn subprocess); returns their URLs and a stopper."""
+    upstream_args = upstream_parser().parse_args([
+        "--port", "0", "--latency-ms", str(args.upstream_latency_ms),
+        "--error-rate", str(args.upstream_error_rate),
+    ] + (["--fixtures", args.fixtures] if args.fixtures else []))
+    server, _ = start_upstream(upstream_args)
+    port = _free_port()
+    env = dict(os.environ, CARCALC_UPSTREAM_URL=server.url)
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+
+    def stop() -> None:
+        app.terminate()
+        try:
+            app.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            app.kill()
+        server.shutdown()
+
+    return f"http://127.0.0.1:{port}", server.url, stop
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Load-test the API and check SLOs.")
+    parser.add_argument("--target", default="http://127.0.0.1:8000", help="base URL of the running app")
+    parser.add_argument("--upstream", help="base URL of the stand-in upstream, for upstream call counts")
+    parser.add_argument("--spawn", action="store_true", help="start the stand-in upstream and the app")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --spawn")
+    parser.add_argument("--upstream-latency-ms", type=float, default=50.0, help="stand-in latency with --spawn")
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0, help="stand-in 503 rate with --spawn")
+    parser.add_argument("--fixtures", help="recorded upstream responses to replay with --spawn")
+    parser.add_argument("--rate", type=float, default=10.0, help="requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--arrival", choices=("poisson", "constant"), default="poisson")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("estimate=6,break_even=3,break_even_analysis=1"),
+                        help="endpoint weights, e.g. estimate=6,break_even=3,break_even_analysis=1")
+    parser.add_argument("--vehicles", type=int, default=8, help="distinct vehicles requested")
+    parser.add_argument("--years", type=int, default=6, help="number_of_years / max_years of each request")
+    parser.add_argument("--zip-code", default="10139-torino")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="concurrent requests")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--slo", type=Slo.parse, action="append", default=[],
+                        help="[endpoint.]metric=value, repeatable, e.g. p99_ms=2000 or estimate.error_rate=0.01")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    stop = None
+    if args.spawn:
+        args.target, args.upstream, stop = spawn(args)
+    try:
+        client = Client(args.target, args.timeout)
+        if not _wait_ready(client, 30.0 if args.spawn else 2.0):
+            print(f"target {args.target} is not reachable", file=sys.stderr)
+            return 2
+        upstream = Client(args.upstream, 5.0) if args.upstream else None
+        if upstream is not None and _json(upstream, "GET", "/__stats") is None:
+            print(f"upstream {args.upstream} does not expose /__stats; upstream calls not reported", file=sys.stderr)
+            upstream = None
+        if upstream is not None:
+            upstream.request("POST", "/__reset")
+
+        samples, elapsed = run_load(args, client)
+        report = summarize(samples, elapsed)
+        attribute_upstream(report, _json(upstream, "GET", "/__stats") if upstream else None)
+        breaches = evaluate_slos(report, args.slo)
+        print_report(report, breaches)
+        if args.json_path:
+            with open(args.json_path, "w", encoding="utf-8") as fh:
+                json.dump({"config": {k: v for k, v in vars(args).items() if k != "slo"},
+                           "slos": [slo._asdict() for slo in args.slo],
+                           "report": report, "breaches": breaches}, fh, indent=2)
+        return 1 if breaches else 0
+    finally:
+        if stop is not None:
+            stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
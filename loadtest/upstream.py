@@ -0,0 +1,295 @@
+"""
+Local stand-in for the listing site, so the API can be load-tested without touching
+(or being rate-limited by) the real upstream.
+
+Start the app with CARCALC_UPSTREAM_URL pointing here. Served paths:
+    GET /                                                   home page with the "make" <select>
+    GET /as24-home/api/taxonomy/cars/makes/<id>/models      model taxonomy (JSON)
+    GET /lst/<make>/<model>[/ve_<details>]?fregfrom=<year>  listing page with price nodes
+    GET /lst/<make>[/ve_<details>]?fregfrom=<y>&fregto=<y>&page=<n>
+                                                            every model of a make, paginated
+    GET /__stats                                            call counters (JSON)
+    POST /__reset                                           zero the counters
+
+Listing prices are synthetic but deterministic (seeded by the URL): a depreciating
+price per registration year with some spread, and no listings before `--first-year`.
+`--fixtures FILE` replays recorded responses instead: a JSON object mapping
+"/path?query" (or just "/path") to {"status": 200, "body": "...", "content_type": "text/html"};
+unmatched requests fall back to the synthetic pages.
+The make-wide pages list a synthetic stock of each model and registration year in the
+range (0 to `--listings` cars each), `--listings` per page and at most `--max-pages` pages
+like the real site; their articles carry data-model/data-first-registration/data-price.
+Listing fetches are also counted per `details` value, which the load generator uses to
+tag the vehicles of each endpoint.
+
+    python -m loadtest.upstream --port 8900 [--latency-ms 80] [--error-rate 0.01]
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+MAKES = {"Fiat": "28", "Volkswagen": "74", "Toyota": "70", "Renault": "60", "BMW": "13"}
+MODELS = {
+    "28": ["Panda", "500", "Tipo", "Punto"],
+    "74": ["Golf", "Polo", "T-Roc", "Tiguan"],
+    "70": ["Yaris", "Corolla", "C-HR", "RAV4"],
+    "60": ["Clio", "Captur", "Megane"],
+    "13": ["Serie 1", "Serie 3", "X1"],
+}
+CURRENT_YEAR = time.localtime().tm_year
+_LISTING_RE = re.compile(r"^/lst/([^/]+)/([^/]+)(?:/ve_([^/]+))?/?$")
+_MAKE_LISTING_RE = re.compile(r"^/lst/([^/]+)(?:/ve_([^/]+))?/?$")
+_TAXONOMY_RE = re.compile(r"^/as24-home/api/taxonomy/cars/makes/([^/]+)/models$")
+
+
+class UpstreamStats:
+    """Thread-safe call counters by kind of page and by listing tag."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.total = 0
+            self.by_kind: Dict[str, int] = {}
+            self.listings_by_tag: Dict[str, int] = {}
+            self.injected_errors = 0
+            self.replayed = 0
+
+    def record(self, kind: str, tag: Optional[str] = None, error: bool = False, replayed: bool = False) -> None:
+        with self._lock:
+            self.total += 1
+            self.by_kind[kind] = self.by_kind.get(kind, 0) + 1
+            if tag is not None:
+                self.listings_by_tag[tag] = self.listings_by_tag.get(tag, 0) + 1
+            self.injected_errors += error
+            self.replayed += replayed
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"total": self.total, "by_kind": dict(self.by_kind),
+                    "listings_by_tag": dict(self.listings_by_tag),
+                    "injected_errors": self.injected_errors, "replayed": self.replayed}
+
+
+def home_page() -> str:
+    options = "".join(f'<option value="{make_id}">{name}</option>' for name, make_id in MAKES.items())
+    return f'<html><body><select name="make"><option value="">Marca</option>{options}</select></body></html>'
+
+
+def taxonomy(make_id: str) -> Optional[Dict[str, Any]]:
+    models = MODELS.get(make_id)
+    if models is None:
+        return None
+    return {"models": {"model": {"values": [{"name": name} for name in models]}}}
+
+
+def _prices(path: str, rng: random.Random, year: int, count: int) -> List[int]:
+    """`count` prices of the vehicle listed at `path` (its /lst/<make>/<model> page) for `year`."""
+    new_price = 18000 + zlib.crc32(path.encode()) % 25000
+    median = new_price * 0.87 ** max(CURRENT_YEAR - year, 0)
+    return [max(500, int(rng.gauss(median, median * 0.08)) // 100 * 100) for _ in range(count)]
+
+
+def _format_price(price: int) -> str:
+    return "€ " + f"{price:,}".replace(",", ".")
+
+
+def _footer(size: int) -> str:
+    """About `size` bytes of navigation markup, as the real pages carry after the listings."""
+    links, n = [], 0
+    while sum(map(len, links)) < size:
+        links.append(f'<li><a href="/lst?page={n}" class="nav-link">Pagina {n}</a></li>')
+        n += 1
+    return f"<footer><ul>{''.join(links)}</ul></footer>" if links else ""
+
+
+def listing_page(path: str, query: str, listings: int, first_year: int, footer_bytes: int = 0) -> str:
+    """
+    Deterministic listing page: `listings` prices for the requested registration year,
+    followed by `footer_bytes` of footer.
+    """
+    params = parse_qs(query)
+    year = int((params.get("fregfrom") or [CURRENT_YEAR])[0])
+    rng = random.Random(zlib.crc32(f"{path}?{query}".encode()))
+    prices = _prices(path, rng, year, listings) if year >= first_year else []
+    nodes = "".join(f'<article><div class="Price_price">{_format_price(price)}</div></article>' for price in prices)
+    return f"<html><body><main>{nodes}</main>{_footer(footer_bytes)}</body></html>"
+
+
+def make_listing_page(make: str, details: Optional[str], query: str, listings: int, first_year: int,
+                      max_pages: int) -> Optional[str]:
+    """
+    Page `page` (from 1) of every listing of a make registered in [fregfrom, fregto]:
+    a deterministic stock of 0 to `listings` cars per model and year, `listings` per page.
+    None for an unknown make.
+    """
+    make_id = next((make_id for name, make_id in MAKES.items() if name.lower() == make.lower()), None)
+    if make_id is None:
+        return None
+    params = parse_qs(query)
+    newest = min(int((params.get("fregto") or [CURRENT_YEAR])[0]), CURRENT_YEAR)
+    oldest = max(int((params.get("fregfrom") or [first_year])[0]), first_year)
+    page = int((params.get("page") or ["1"])[0])
+    suffix = f"/ve_{details}" if details else ""
+    stock = []
+    for model in MODELS[make_id]:
+        path = f"/lst/{make.lower()}/{model.lower().replace(' ', '-')}{suffix}"
+        for year in range(newest, oldest - 1, -1):
+            rng = random.Random(zlib.crc32(f"{path}|{year}".encode()))
+            stock.extend((model, year, rng.randint(1, 12), price)
+                         for price in _prices(path, rng, year, rng.randint(0, listings)))
+    first = (page - 1) * listings
+    listed = stock[first:first + listings] if 1 <= page <= max_pages else []
+    nodes = "".join(
+        f'<article data-model="{model}" data-first-registration="{month:02d}-{year}" data-price="{price}">'
+        f'<div class="Price_price">{_format_price(price)}</div></article>'
+        for model, year, month, price in listed
+    )
+    return f"<html><body><main>{nodes}</main><footer>{len(stock)} offerte</footer></body></html>"
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real site
+    server: "UpstreamServer"
+
+    def log_message(self, format: str, *args: Any) -> None:  # quiet under load
+        pass
+
+    def _send(self, status: int, body: str, content_type: str = "text/html; charset=utf-8") -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self) -> None:
+        if self.path == "/__reset":
+            self.server.stats.reset()
+            self._send(204, "")
+        else:
+            self._send(404, "not found")
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/__stats":
+            self._send(200, json.dumps(self.server.stats.snapshot()), "application/json")
+            return
+
+        kind, tag, listing = "other", None, _LISTING_RE.match(url.path)
+        make_listing = _MAKE_LISTING_RE.match(url.path)
+        if url.path == "/":
+            kind = "home"
+        elif _TAXONOMY_RE.match(url.path):
+            kind = "taxonomy"
+        elif make_listing:  # before `listing`, which would read /lst/<make>/ve_<details> as a model
+            kind, tag = "make_listing", make_listing.group(2) or ""
+        elif listing:
+            kind, tag = "listing", listing.group(3) or ""
+
+        config = self.server.config
+        if config.latency_ms or config.jitter_ms:
+            time.sleep(max(0.0, config.latency_ms + random.uniform(-1, 1) * config.jitter_ms) / 1000.0)
+        if config.error_rate and random.random() < config.error_rate:
+            self.server.stats.record(kind, tag, error=True)
+            self._send(503, "injected failure")
+            return
+
+        fixture = self.server.fixture_for(url.path, url.query)
+        self.server.stats.record(kind, tag, replayed=fixture is not None)
+        if fixture is not None:
+            self._send(int(fixture.get("status", 200)), fixture.get("body", ""),
+                       fixture.get("content_type", "text/html; charset=utf-8"))
+        elif kind == "home":
+            self._send(200, home_page())
+        elif kind == "taxonomy":
+            data = taxonomy(_TAXONOMY_RE.match(url.path).group(1))
+            if data is None:
+                self._send(404, "unknown make")
+            else:
+                self._send(200, json.dumps(data), "application/json")
+        elif kind == "listing":
+            self._send(200, listing_page(url.path, url.query, config.listings, config.first_year,
+                                                config.footer_kb * 1024))
+        elif kind == "make_listing":
+            page = make_listing_page(make_listing.group(1), make_listing.group(2), url.query,
+                                     config.listings, config.first_year, config.max_pages)
+            if page is None:
+                self._send(404, "unknown make")
+            else:
+                self._send(200, page)
+        else:
+            self._send(404, "not found")
+
+
+class UpstreamServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], config: argparse.Namespace, fixtures: Optional[Dict] = None):
+        super().__init__(address, UpstreamHandler)
+        self.config = config
+        self.fixtures = fixtures or {}
+        self.stats = UpstreamStats()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def fixture_for(self, path: str, query: str) -> Optional[Dict[str, Any]]:
+        if not self.fixtures:
+            return None
+        return self.fixtures.get(f"{path}?{query}" if query else path) or self.fixtures.get(path)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Local stand-in for the listing upstream.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900, help="0 picks a free port")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- jitter on the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument("--listings", type=int, default=20, help="prices per listing page")
+    parser.add_argument("--footer-kb", type=int, default=0, help="footer markup after the listings of a model page")
+    parser.add_argument("--max-pages", type=int, default=20, help="result pages served per make-wide search")
+    parser.add_argument("--first-year", type=int, default=CURRENT_YEAR - 15,
+                        help="no listings for older registration years")
+    parser.add_argument("--fixtures", help="JSON file of recorded responses to replay")
+    return parser
+
+
+def start_upstream(config: Optional[argparse.Namespace] = None) -> Tuple[UpstreamServer, threading.Thread]:
+    """Start the stand-in in a background thread; `config` defaults to the CLI defaults with a free port."""
+    config = config or build_parser().parse_args(["--port", "0"])
+    fixtures = None
+    if config.fixtures:
+        with open(config.fixtures, encoding="utf-8") as fh:
+            fixtures = json.load(fh)
+    server = UpstreamServer((config.host, config.port), config, fixtures)
+    thread = threading.Thread(target=server.serve_forever, name="upstream", daemon=True)
+    thread.start()
+    return server, thread
+
+
+def main(argv=None) -> None:
+    config = build_parser().parse_args(argv)
+    server, thread = start_upstream(config)
+    print(f"stand-in upstream listening on {server.url} (CARCALC_UPSTREAM_URL={server.url})", flush=True)
+    try:
+        thread.join()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,28 @@
 # api/main.py
-import uvicorn
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
-from src.fetcher import Fetcher, FetchError
+from fastapi.responses import StreamingResponse
+import json
+from typing import Dict, Optional
+from src.admission import (
+    ANALYSIS,
+    CATALOG,
+    ESTIMATE,
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    AdmissionConfig,
+    AdmissionController,
+    AdmissionMiddleware,
+)
+from src.crawl import BrandCrawler, CrawlConfig
+from src.deadline import DEADLINE_HEADER, DeadlineConfig, deadline_scope, iterate_within, propagate
+from src.export import MEDIA_TYPES, build_filter, export_chunks, schema as export_schema
+from src.fetcher import (
+    CircuitOpenError, DeadlineExceeded, Fetcher, FetchError, close_transport, get_transport, parse_executor,
+    upstream_breaker, upstream_hedger,
+)
+from src.freshness import Freshness, freshness_scope
 from src.models import (
     BrandListResponse,
     ModelListResponse,
@@ -11,16 +30,156 @@ from src.models import (
     EstimateResponse,
     BreakEvenRequest,
     BreakEvenResponse,
+    CostScheduleRequest,
+    CostScheduleResponse,
     BreakEvenAnalysisRequest,
     BreakEvenAnalysisResponse,
-    PurchaseYearSeries,
-    DataPoint
+    CompareRequest,
+    CompareResponse,
+    CrawlRequest,
+    JobStatus,
+)
+from src.calculator import CarValueCalculator, CostScheduleCalculator, LoanCalculator
+from src.compare import (
+    DEFAULT_COMPARE_CONCURRENCY,
+    BudgetedFetcher,
+    ConcurrencyBudget,
+    Outcome,
+    build_comparison,
+    fan_out,
+    vehicle_requests,
+)
+from src.estimator import (
+    InsufficientDataError,
+    build_break_even_analysis,
+    estimate_costs,
+    estimate_from_points,
+)
+from src.jobs import (
+    FAILED as JOB_FAILED,
+    SUCCEEDED as JOB_SUCCEEDED,
+    Job,
+    JobConfig,
+    JobQueue,
+    QueueFullError,
+)
+from src.prewarm import PrewarmConfig, Prewarmer, RequestTracker
+from src.http_cache import REQUEST_HASH_HEADER, cached_json_response, request_hash
+from src.responses import FastJSONResponse, dumps
+from src.snapshot import SnapshotConfig, SnapshotRefresher
+from src.store import DATASETS
+from src.series import (
+    DEGRADED_WARNING,
+    PARTIAL_WARNING,
+    assemble_year_series,
+    degradation_warning,
+    iter_year_prices,
+    sampling_offsets,
+    year_prices_cached,
 )
-from src.calculator import CarValueCalculator, LoanCalculator
 import logging
 import datetime
+import math
+import time
 
-app = FastAPI(title="Car Cost Estimator API", version="1.0")
+prewarm_config = PrewarmConfig.from_env()
+# records nothing unless the prewarm scheduler is on (CARCALC_PREWARM_INTERVAL)
+request_tracker = RequestTracker(prewarm_config.max_keys, enabled=prewarm_config.enabled)
+job_queue = JobQueue(JobConfig.from_env())
+crawl_config = CrawlConfig.from_env()
+deadline_config = DeadlineConfig.from_env()
+admission = AdmissionController(AdmissionConfig.from_env())
+_fetcher: Optional[Fetcher] = None
+
+
+def get_fetcher() -> Fetcher:
+    """
+    The application's Fetcher (FastAPI dependency). Created on first use rather than at
+    import time; its HTTP session is opened lazily by the first upstream request.
+    """
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = Fetcher()
+    return _fetcher
+
+
+def __getattr__(name: str):
+    # `main.fetcher` stays available (e.g. for patching in tests) without an import-time instance
+    if name == "fetcher":
+        return get_fetcher()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    fetcher = get_fetcher()
+    prewarmer = Prewarmer(fetcher, request_tracker, prewarm_config)
+    # rebuilds the shared price snapshot from the store, when CARCALC_SNAPSHOT_REFRESH_INTERVAL is set
+    snapshot_refresher = SnapshotRefresher(fetcher.store, SnapshotConfig.from_env())
+    app.state.fetcher = fetcher
+    # sizes and health-checks the parse worker pool, when CARCALC_PARSE_WORKERS is set
+    parse_executor.start()
+    prewarmer.start()
+    snapshot_refresher.start()
+    yield
+    snapshot_refresher.stop()
+    prewarmer.stop()
+    job_queue.shutdown()
+    upstream_hedger.close()
+    parse_executor.close()
+    close_transport()
+    fetcher.cache.close()
+    if fetcher.store is not None:
+        fetcher.store.close()
+
+
+app = FastAPI(title="Car Cost Estimator API", version="1.0", lifespan=lifespan)
+
+# endpoint classes with their own concurrency limits and queues; other paths are not limited
+ADMISSION_CLASSES = {
+    "/api/brands": CATALOG,
+    "/api/models": CATALOG,
+    "/api/estimate": ESTIMATE,
+    "/api/estimate/stream": ESTIMATE,
+    "/api/break_even": ESTIMATE,
+    "/api/schedule": ESTIMATE,
+    "/api/compare": ESTIMATE,
+    "/api/break_even_analysis": ANALYSIS,
+}
+
+
+def _admission_priority(path: str, body: bytes) -> int:
+    """Requests that can be answered from cached prices are admitted before cold scrapes."""
+    current_year = datetime.datetime.now().year
+    try:
+        if path == "/api/break_even_analysis":
+            req = BreakEvenAnalysisRequest.model_validate_json(body)
+            vehicles = [(req, current_year, req.max_years + 1)]
+        elif path == "/api/break_even":
+            study = BreakEvenRequest.model_validate_json(body)
+            req = study.estimate
+            vehicles = [(req, req.registration_year or current_year, study.years + req.purchase_year_index + 1)]
+        elif path == "/api/schedule":
+            req = CostScheduleRequest.model_validate_json(body).estimate
+            vehicles = [(req, req.registration_year or current_year, req.number_of_years + req.purchase_year_index + 1)]
+        elif path == "/api/compare":
+            vehicles = [(req, req.registration_year or current_year, req.number_of_years + req.purchase_year_index + 1)
+                        for req in vehicle_requests(CompareRequest.model_validate_json(body))]
+        else:
+            req = EstimateRequest.model_validate_json(body)
+            vehicles = [(req, req.registration_year or current_year, req.number_of_years + req.purchase_year_index + 1)]
+        fetcher = get_fetcher()
+        cached = all(year_prices_cached(fetcher, req, newest_year, count, sampling_offsets(req, count))
+                     for req, newest_year, count in vehicles)
+    except Exception:
+        # invalid bodies are rejected by the endpoint itself
+        return PRIORITY_LOW
+    return PRIORITY_HIGH if cached else PRIORITY_LOW
+
+
+# added before CORS so that shed (503) responses still carry the CORS headers
+app.add_middleware(AdmissionMiddleware, controller=admission, classify=ADMISSION_CLASSES.get,
+                   priority=_admission_priority)
 
 # CORS for your frontend
 app.add_middleware(
@@ -28,112 +187,112 @@ app.add_middleware(
     allow_origins=["*"],  # tighten in production
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["ETag", REQUEST_HASH_HEADER],
 )
 
-fetcher = Fetcher()
-
 logger = logging.getLogger("uvicorn.error")
 
 
+@app.get("/api/metrics")
+def metrics(fetcher: Fetcher = Depends(get_fetcher)):
+    """
+    Operational counters: upstream transport, circuit breaker, request hedging, page parse
+    workers, cache, price snapshot, background jobs and admission control (queue depth and
+    shed requests per endpoint class).
+    """
+    return FastJSONResponse({
+        "upstream": get_transport().describe(),
+        "circuit": upstream_breaker.snapshot(),
+        "hedging": upstream_hedger.snapshot(),
+        "parsing": parse_executor.snapshot(),
+        "cache": fetcher.cache.describe(),
+        "snapshot": None if fetcher.snapshot is None else fetcher.snapshot.describe(),
+        "jobs": job_queue.snapshot(),
+        "admission": admission.snapshot(),
+    }, headers={"Cache-Control": "no-store"})
+
+
+def _unavailable(ex: CircuitOpenError) -> HTTPException:
+    """503 telling the client when the upstream will be tried again."""
+    return HTTPException(status_code=503, detail=str(ex),
+                         headers={"Retry-After": str(max(1, math.ceil(ex.retry_after)))})
+
+
+def _timed_out(ex: DeadlineExceeded) -> HTTPException:
+    return HTTPException(status_code=504, detail=f"No listing data could be fetched in time: {ex}")
+
+
+def _request_deadline(request: Request) -> Optional[float]:
+    """Deadline (time.monotonic() value) of a request: its X-Request-Timeout in seconds, else the server default."""
+    seconds = deadline_config.resolve(request.headers.get(DEADLINE_HEADER))
+    return None if seconds is None else time.monotonic() + seconds
+
+
+def _price_max_age(fetcher: Fetcher, warning: Optional[str], prices: Optional[Freshness] = None) -> int:
+    """
+    Degraded or partial answers (stale, skipped or timed-out years) must not be cached downstream;
+    others only until the first of the prices they were built from (`prices`) expires.
+    """
+    if warning and (DEGRADED_WARNING in warning or PARTIAL_WARNING in warning):
+        return 0
+    return prices.max_age(fetcher.PRICE_TTL) if prices is not None else int(fetcher.PRICE_TTL)
+
+
 @app.get("/api/brands", response_model=BrandListResponse)
-def list_brands():
+def list_brands(request: Request, fetcher: Fetcher = Depends(get_fetcher)):
     """Return brand list discovered on the listing home page."""
     try:
         dropdowns = fetcher.fetch_dropdown_options()
-        return BrandListResponse(brands=sorted(set(dropdowns.get("make", []))))
+        return cached_json_response(request, {"brands": sorted(set(dropdowns.get("make", [])))},
+                                    max_age=fetcher.CATALOG_TTL)
     except FetchError as ex:
         logger.exception("Failed to fetch brands")
         raise HTTPException(status_code=503, detail=str(ex))
 
 
 @app.get("/api/models", response_model=ModelListResponse)
-def list_models(brand: Optional[str] = None):
+def list_models(request: Request, brand: Optional[str] = None, fetcher: Fetcher = Depends(get_fetcher)):
     """Return models for a brand name (case-insensitive)."""
     # Explicit check so missing brand -> 400 (matches test expectation)
     if not brand:
         raise HTTPException(status_code=400, detail="brand parameter is required")
     try:
         models = fetcher.fetch_car_models(brand.strip().lower())
-        return ModelListResponse(brand=brand, models=sorted(models))
+        return cached_json_response(request, {"brand": brand, "models": sorted(models)},
+                                    max_age=fetcher.CATALOG_TTL)
     except FetchError as ex:
         logger.exception("Failed to fetch models")
         raise HTTPException(status_code=503, detail=str(ex))
 
 
 @app.post("/api/estimate", response_model=EstimateResponse)
-def estimate_monthly_costs(req: EstimateRequest):
+def estimate(req: EstimateRequest, request: Request, fetcher: Fetcher = Depends(get_fetcher)):
     """
     Accepts a request describing selection and financial parameters,
     returns monthly cost breakdown and the year-by-year values series used.
+    When the deadline (X-Request-Timeout header or server default) passes, the estimate is
+    built from the years fetched so far, with a warning and `adjusted_number_of_years`.
     """
-    # Build series of year values by querying different registration years
+    key = request_hash(request.url.path, req)
+    with deadline_scope(at=_request_deadline(request)), freshness_scope() as prices:
+        result = estimate_monthly_costs(req, fetcher)
+    return cached_json_response(request, result, max_age=_price_max_age(fetcher, result.warning, prices), key=key)
+
+
+def estimate_monthly_costs(req: EstimateRequest, fetcher: Optional[Fetcher] = None) -> EstimateResponse:
+    """Build the EstimateResponse for `req`; raises HTTPException on failure (also used by break_even)."""
+    fetcher = fetcher or get_fetcher()
     try:
-        years_to_query = req.number_of_years + req.purchase_year_index + 1
-        year_values = []
-        missing_years = []
-        std_devs = []
-        
-        current_year = req.registration_year or datetime.datetime.now().year
-        
-        for offset in range(years_to_query):
-            selected = {
-                "make": req.brand,
-                "model": req.model,
-                "details": req.details or "",
-                "zip": req.zip_code,
-                "firstRegistration": current_year - offset,
-                "shift_type": req.shift_types or []
-            }
-            price, std_dev = fetcher.fetch_car_costs(selected)
-            if price > 0:
-                year_values.append(float(price))
-                std_devs.append(float(std_dev))
-            else:
-                missing_years.append(current_year - offset)
-        
-        warning = None
-        adjusted_years = None
-
-        required_values = req.purchase_year_index + req.number_of_years + 1
-        if len(year_values) < required_values:
-            max_years = len(year_values) - req.purchase_year_index - 1
-            if max_years < 1:
-                raise HTTPException(status_code=400, detail="Not enough historical data to perform an estimate.")
-            
-            warning = (
-                f"Warning: Insufficient data for the requested {req.number_of_years}-year projection. "
-                f"Automatically adjusted to the maximum possible: {max_years} years."
-            )
-            adjusted_years = max_years
-            req.number_of_years = max_years
-            # Trim the lists to what's needed for the adjusted calculation
-            year_values = year_values[:req.purchase_year_index + max_years + 1]
-            std_devs = std_devs[:req.purchase_year_index + max_years + 1]
-
-
-        loan_calc = LoanCalculator(req.loan_value, req.bank_rate_percent, req.loan_years)
-        loan_monthly, loan_total_interest = loan_calc.calculate_loan_costs()
-
-        calc = CarValueCalculator(year_values, req.number_of_years, req.monthly_maintenance, req.purchase_year_index)
-        monthly_depr = calc.monthly_depreciation()
-        monthly_tot = calc.monthly_total_cost(loan_monthly)
-
-        purchase_price = year_values[req.purchase_year_index]
-        final_value = year_values[req.purchase_year_index + req.number_of_years]
-
-        return EstimateResponse(
-            purchase_price=purchase_price,
-            estimated_final_value=final_value,
-            monthly_depreciation=monthly_depr,
-            monthly_maintenance=req.monthly_maintenance,
-            loan_monthly_payment=loan_monthly,
-            loan_total_interest=loan_total_interest,
-            total_monthly_cost=monthly_tot,
-            year_values=year_values,
-            warning=warning,
-            price_stddev=std_devs,
-            adjusted_number_of_years=adjusted_years
-        )
+        request_tracker.record(req, req.number_of_years + req.purchase_year_index + 1)
+        return estimate_costs(req, fetcher)
+    except InsufficientDataError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+    except CircuitOpenError as ex:
+        logger.warning("Upstream circuit open during estimate: %s", ex)
+        raise _unavailable(ex)
+    except DeadlineExceeded as ex:
+        logger.warning("Deadline exceeded during estimate: %s", ex)
+        raise _timed_out(ex)
     except FetchError as ex:
         logger.exception("Fetch error during estimate")
         raise HTTPException(status_code=503, detail=str(ex))
@@ -142,17 +301,107 @@ def estimate_monthly_costs(req: EstimateRequest):
         raise HTTPException(status_code=500, detail=str(ex))
 
 
+def _ndjson(event: dict) -> bytes:
+    return dumps(event) + b"\n"
+
+
+def _estimate_events(req: EstimateRequest, fetcher: Fetcher, at: Optional[float] = None):
+    """
+    Generator behind /api/estimate/stream: one `year` event per fetched registration year,
+    then a single `estimate` event (same fields as EstimateResponse) or an `error` event.
+    `at` is the request deadline (time.monotonic() value); the body is produced step by step
+    in different contexts, so it is re-applied around each fetch.
+    """
+    try:
+        years_to_query = req.number_of_years + req.purchase_year_index + 1
+        current_year = req.registration_year or datetime.datetime.now().year
+        request_tracker.record(req, years_to_query)
+
+        points = []
+        offsets = sampling_offsets(req, years_to_query)
+        for point in iterate_within(at, iter_year_prices(fetcher, req, current_year, years_to_query, offsets)):
+            event = {"event": "year", "year": point.year, "median": point.median, "stddev": point.stddev,
+                     "p10": point.p10, "p90": point.p90, "trimmed_mean": point.trimmed_mean,
+                     "count": point.count, "outliers": point.outliers, "freshness": point.freshness}
+            if point.regions:
+                event["regions"] = [region._asdict() for region in point.regions]
+            yield _ndjson(event)
+            points.append(point)
+
+        estimate = estimate_from_points(req, points, current_year, years_to_query)
+        yield _ndjson({"event": "estimate", **estimate.model_dump()})
+    except InsufficientDataError as ex:
+        yield _ndjson({"event": "error", "status_code": 400, "detail": str(ex)})
+    except CircuitOpenError as ex:
+        logger.warning("Upstream circuit open during streamed estimate: %s", ex)
+        yield _ndjson({"event": "error", "status_code": 503, "detail": str(ex),
+                       "retry_after": max(1, math.ceil(ex.retry_after))})
+    except DeadlineExceeded as ex:
+        logger.warning("Deadline exceeded during streamed estimate: %s", ex)
+        yield _ndjson({"event": "error", "status_code": 504, "detail": _timed_out(ex).detail})
+    except FetchError as ex:
+        logger.exception("Fetch error during streamed estimate")
+        yield _ndjson({"event": "error", "status_code": 503, "detail": str(ex)})
+    except Exception as ex:
+        logger.exception("Unexpected error during streamed estimate")
+        yield _ndjson({"event": "error", "status_code": 500, "detail": str(ex)})
+
+
+@app.post("/api/estimate/stream")
+def estimate_monthly_costs_stream(req: EstimateRequest, request: Request,
+                                  fetcher: Fetcher = Depends(get_fetcher)):
+    """
+    Streaming variant of /api/estimate (NDJSON). Each registration year is emitted as soon as
+    it has been fetched, so the first line arrives after a single upstream round-trip.
+    """
+    return StreamingResponse(
+        _estimate_events(req, fetcher, _request_deadline(request)),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/compare", response_model=CompareResponse)
+def compare(req: CompareRequest, request: Request, fetcher: Fetcher = Depends(get_fetcher)):
+    """
+    Estimate several vehicles with shared financial parameters and rank them.
+    The vehicles are fetched concurrently, sharing a budget of upstream fetches in flight,
+    so the comparison takes about as long as the slowest vehicle. A vehicle that cannot be
+    estimated is reported with its error instead of failing the whole comparison.
+    """
+    key = request_hash(request.url.path, req)
+    budgeted = BudgetedFetcher(fetcher, ConcurrencyBudget(DEFAULT_COMPARE_CONCURRENCY))
+
+    def run(vehicle_req: EstimateRequest) -> Outcome:
+        try:
+            return Outcome(estimate_monthly_costs(vehicle_req, budgeted))
+        except HTTPException as ex:
+            return Outcome(None, ex.status_code, str(ex.detail))
+
+    with deadline_scope(at=_request_deadline(request)), freshness_scope() as prices:
+        outcomes = fan_out(propagate(run), vehicle_requests(req))
+    if all(outcome.status_code == 503 for outcome in outcomes):
+        raise HTTPException(status_code=503, detail=outcomes[0].error)
+    result = build_comparison(req, outcomes)
+    # failed vehicles (max-age 0) must not be cached for an hour with the others
+    max_age = min((_price_max_age(fetcher, o.estimate.warning, prices) if o.estimate is not None else 0)
+                  for o in outcomes)
+    return cached_json_response(request, result, max_age=max_age, key=key)
+
+
 @app.post("/api/break_even", response_model=BreakEvenResponse)
-def break_even(study: BreakEvenRequest):
+def break_even(study: BreakEvenRequest, request: Request, fetcher: Fetcher = Depends(get_fetcher)):
     """
     Given an EstimateRequest and a monthly rent cost, compute months to break-even
     comparing owning (including depreciation, maintenance, loan) vs renting (fixed cost).
     Returns monthly series for both and month index of break-even (if any).
     """
+    key = request_hash(request.url.path, study)
     try:
         # call estimate logic (we reuse code)
         study.estimate.number_of_years = study.years
-        estimate_resp = estimate_monthly_costs(study.estimate)
+        with deadline_scope(at=_request_deadline(request)), freshness_scope() as prices:
+            estimate_resp = estimate_monthly_costs(study.estimate, fetcher)
         months = study.years * 12
         buy_series = []
         rent_series = [float(study.rent_monthly_cost)] * months
@@ -183,82 +432,105 @@ def break_even(study: BreakEvenRequest):
         if months_to_breakeven is None:
             msg = "No break-even within provided horizon; renting is cheaper within the requested timeframe."
 
-        return BreakEvenResponse(
-            months_to_break_even=months_to_breakeven,
-            buy_monthly_series=buy_series,
-            rent_monthly_series=rent_series,
-            message=msg,
-        )
+        return cached_json_response(request, {
+            "months_to_break_even": months_to_breakeven,
+            "buy_monthly_series": buy_series,
+            "rent_monthly_series": rent_series,
+            "message": msg,
+        }, max_age=_price_max_age(fetcher, estimate_resp.warning, prices), key=key)
     except HTTPException:
         raise
     except Exception as ex:
         logger.exception("break_even unexpected")
         raise HTTPException(status_code=500, detail=str(ex))
 
+@app.post("/api/schedule", response_model=CostScheduleResponse)
+def cost_schedule(study: CostScheduleRequest, request: Request, fetcher: Fetcher = Depends(get_fetcher)):
+    """
+    Month-by-month cost of owning the estimated car: loan balance, interest paid to date,
+    resale value, equity and cumulative net cost (and rent paid to date when a rent is given),
+    downsampled to about `max_points` months for charting.
+    """
+    key = request_hash(request.url.path, study)
+    with deadline_scope(at=_request_deadline(request)), freshness_scope() as prices:
+        estimate = estimate_monthly_costs(study.estimate, fetcher)
+    # the estimate shortens number_of_years in place when the series is too short
+    req = study.estimate
+    # several extra payments may fall in the same month
+    extra_payments: Dict[int, float] = {}
+    for payment in study.extra_payments:
+        extra_payments[payment.month] = extra_payments.get(payment.month, 0.0) + payment.amount
+    calculator = CostScheduleCalculator(
+        estimate.year_values, req.purchase_year_index, req.number_of_years, req.monthly_maintenance,
+        req.loan_value, req.bank_rate_percent, req.loan_years, study.extra_monthly_payment,
+        extra_payments, study.payoff_month,
+    )
+    schedule = calculator.schedule()
+    result = schedule.downsample(study.max_points)
+    if study.rent_monthly_cost is not None:
+        result["cumulative_rent"] = [round(study.rent_monthly_cost * m, 2) for m in result["month"]]
+    result.update(
+        total_months=schedule.months,
+        payoff_month=schedule.payoff_month,
+        total_interest=round(schedule.interest_paid[-1], 2),
+        interest_saved=round(calculator.interest_saved(schedule), 2),
+        months_to_break_even=(None if study.rent_monthly_cost is None
+                              else schedule.months_to_break_even(study.rent_monthly_cost)),
+        warning=estimate.warning,
+    )
+    return cached_json_response(request, result, max_age=_price_max_age(fetcher, estimate.warning, prices), key=key)
+
+
 @app.post("/api/break_even_analysis", response_model=BreakEvenAnalysisResponse)
-def break_even_analysis(req: BreakEvenAnalysisRequest):
+def break_even_analysis(req: BreakEvenAnalysisRequest, request: Request,
+                        fetcher: Fetcher = Depends(get_fetcher)):
+    key = request_hash(request.url.path, req)
+    with deadline_scope(at=_request_deadline(request)), freshness_scope() as prices:
+        result = run_break_even_analysis(req, fetcher)
+    return cached_json_response(request, result, max_age=_price_max_age(fetcher, result["warning"], prices),
+                                key=key)
+
+
+def run_break_even_analysis(req: BreakEvenAnalysisRequest, fetcher: Fetcher, job: Optional[Job] = None) -> dict:
+    """
+    Build the break-even analysis for `req`; raises HTTPException on failure (also run as a
+    background job, in which case each fetched year and the final analysis advance `job`;
+    jobs have no deadline since nobody is waiting on the connection).
+    """
     try:
         current_year = datetime.datetime.now().year
-        year_values = []
-        for offset in range(req.max_years + 1):
-            selected = {
-                "make": req.brand,
-                "model": req.model,
-                "details": req.details or "",
-                "zip": req.zip_code,
-                "firstRegistration": current_year - offset,
-                "shift_type": req.shift_types or []
-            }
-            price, _ = fetcher.fetch_car_costs(selected)
-            year_values.append(float(price) if price > 0 else 0.0)
-
-        purchase_series = []
-        for purchase_offset in range(len(year_values)):
-            purchase_price = year_values[purchase_offset]
-            if purchase_price == 0:
-                continue
-
-            data_points = []
-            for sell_offset in range(purchase_offset + 1, len(year_values)):
-                sell_price = year_values[sell_offset]
-                if sell_price == 0:
-                    continue
-
-                years_owned = sell_offset - purchase_offset
-                maintenance_cost = req.monthly_maintenance * 12 * years_owned
-                overall_cost = purchase_price - sell_price + maintenance_cost
-                monthly_cost = overall_cost / (years_owned * 12)
-
-                data_points.append(DataPoint(
-                    years_owned=years_owned,
-                    overall_cost=overall_cost,
-                    monthly_cost=monthly_cost
-                ))
-            
-            if purchase_offset == 0:
-                description = "Buy brand new"
-            elif purchase_offset == 1:
-                description = "Buy 1 year old"
-            else:
-                description = f"Buy {purchase_offset} years old"
-
-            purchase_series.append(PurchaseYearSeries(
-                purchase_description=description,
-                data_points=data_points
-            ))
-
-        rental_series = []
-        for y in range(1, req.max_years + 1):
-            rental_series.append(DataPoint(
-                years_owned=y,
-                overall_cost=req.rent_monthly_cost * 12 * y,
-                monthly_cost=req.rent_monthly_cost
-            ))
-            
-        return BreakEvenAnalysisResponse(
-            rental_series=rental_series,
-            purchase_series=purchase_series
-        )
+        years_to_query = req.max_years + 1
+        request_tracker.record(req, years_to_query)
+        offsets = sampling_offsets(req, years_to_query)
+        if job is not None:
+            job.advance(0, total=(years_to_query if offsets is None else len(offsets)) + 1)
+        points = []
+        for point in iter_year_prices(fetcher, req, current_year, years_to_query, offsets):
+            points.append(point)
+            if job is not None:
+                job.advance()
+
+        year_sources = None
+        if req.fill_missing_years or req.sparse_anchor_years:
+            year_values, _, year_sources = assemble_year_series(req, points, current_year, years_to_query)
+        else:
+            # keep missing years as 0.0 placeholders so offsets still map to ages
+            year_values = [point.median for point in points]
+
+        result = build_break_even_analysis(req, year_values, year_sources, degradation_warning(points))
+        if fetcher.store is not None:
+            fetcher.store.record_analysis(req, result)
+        if job is not None:
+            job.advance()
+        return result
+    except InsufficientDataError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+    except CircuitOpenError as ex:
+        logger.warning("Upstream circuit open during break-even analysis: %s", ex)
+        raise _unavailable(ex)
+    except DeadlineExceeded as ex:
+        logger.warning("Deadline exceeded during break-even analysis: %s", ex)
+        raise _timed_out(ex)
     except FetchError as ex:
         logger.exception("Fetch error during break-even analysis")
         raise HTTPException(status_code=503, detail=str(ex))
@@ -266,5 +538,106 @@ def break_even_analysis(req: BreakEvenAnalysisRequest):
         logger.exception("Unexpected error during break-even analysis")
         raise HTTPException(status_code=500, detail=str(ex))
 
+
+@app.get("/api/export/{dataset}")
+def export(dataset: str, format: str = "csv", brand: Optional[str] = None, model: Optional[str] = None,
+           since: Optional[str] = None, until: Optional[str] = None, fetcher: Fetcher = Depends(get_fetcher)):
+    """
+    Stream the collected `observations` (one row per scraped selection and year) or `break_even`
+    matrices (one row per purchase age and years owned) as typed CSV, Parquet or Arrow.
+    `since`/`until` are ISO dates (inclusive) of when the rows were recorded; the column types
+    are returned in the X-Export-Schema header.
+    """
+    if dataset not in DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset, expected one of {', '.join(DATASETS)}")
+    if fetcher.store is None:
+        raise HTTPException(status_code=404, detail="No observation store configured (CARCALC_STORE_PATH)")
+    try:
+        chunks = export_chunks(fetcher.store, dataset, format, build_filter(brand, model, since, until))
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[format], headers={
+        "Content-Disposition": f'attachment; filename="{dataset}.{format}"',
+        "X-Export-Schema": json.dumps(export_schema(dataset), separators=(",", ":")),
+        "Cache-Control": "no-store",
+    })
+
+
+@app.post("/api/break_even_analysis/jobs", response_model=JobStatus, status_code=202)
+def submit_break_even_analysis(req: BreakEvenAnalysisRequest, fetcher: Fetcher = Depends(get_fetcher)):
+    """
+    Queue a break-even analysis and return its job at once (202). Poll `GET /api/jobs/{job_id}`
+    and fetch `GET /api/jobs/{job_id}/result` once it succeeded. An identical analysis that is
+    already queued or running is returned instead of being started again.
+    """
+    key = request_hash("/api/break_even_analysis", req)
+    try:
+        job, _ = job_queue.submit("break_even_analysis", key,
+                                  lambda job: run_break_even_analysis(req, fetcher, job))
+    except QueueFullError as ex:
+        raise HTTPException(status_code=503, detail=f"Too many pending analyses ({ex}), retry later",
+                            headers={"Retry-After": "5"})
+    return FastJSONResponse(job.describe(), status_code=202,
+                            headers={"Location": f"/api/jobs/{job.id}", "Cache-Control": "no-store"})
+
+
+def run_brand_crawl(req: CrawlRequest, fetcher: Fetcher, job: Optional[Job] = None) -> dict:
+    """Sweep every model of `req.brand` into the price cache; raises HTTPException on failure."""
+    newest_year = datetime.datetime.now().year
+    try:
+        report = BrandCrawler(fetcher, crawl_config).crawl(
+            req.brand, newest_year, newest_year - req.years + 1, req.details, req.zip_code, req.shift_types, job)
+    except CircuitOpenError as ex:
+        logger.warning("Upstream circuit open during brand crawl: %s", ex)
+        raise _unavailable(ex)
+    except FetchError as ex:
+        logger.exception("Fetch error during brand crawl")
+        raise HTTPException(status_code=503, detail=str(ex))
+    return report.describe()
+
+
+@app.post("/api/crawl/jobs", response_model=JobStatus, status_code=202)
+def submit_brand_crawl(req: CrawlRequest, fetcher: Fetcher = Depends(get_fetcher)):
+    """
+    Queue a crawl populating the prices of every model of a brand from one sweep of its
+    listing pages (see `src.crawl`); the job result lists the models and years found.
+    """
+    key = request_hash("/api/crawl", req)
+    try:
+        job, _ = job_queue.submit("crawl", key, lambda job: run_brand_crawl(req, fetcher, job))
+    except QueueFullError as ex:
+        raise HTTPException(status_code=503, detail=f"Too many pending jobs ({ex}), retry later",
+                            headers={"Retry-After": "5"})
+    return FastJSONResponse(job.describe(), status_code=202,
+                            headers={"Location": f"/api/jobs/{job.id}", "Cache-Control": "no-store"})
+
+
+def _get_job(job_id: str) -> Job:
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+def job_status(job_id: str):
+    """Status and progress of a background job."""
+    return FastJSONResponse(_get_job(job_id).describe(), headers={"Cache-Control": "no-store"})
+
+
+@app.get("/api/jobs/{job_id}/result")
+def job_result(job_id: str):
+    """
+    Result of a finished job: 200 with the result, the job's own error status when it failed,
+    409 while it is still queued or running.
+    """
+    job = _get_job(job_id)
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=job.status_code or 500, detail=job.error)
+    if job.status != JOB_SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return FastJSONResponse(job.result, headers={"Cache-Control": "no-store"})
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, port=8000)
\ No newline at end of file
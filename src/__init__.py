@@ -1,23 +1,36 @@
 """carparser package - scraping and car cost calculation utilities."""
-from .fetcher import (
-    Fetcher,
-    FetchError,
-)
-from .calculator import (
-    LoanCalculator,
-    CarValueCalculator,
-)
-from .models import (
-    BrandListResponse,
-    ModelListResponse,
-    EstimateRequest,
-    EstimateResponse,
-    BreakEvenRequest,
-    BreakEvenResponse,
-)
+from importlib import import_module
+
+# Re-exports are resolved on first access so that importing one submodule does not
+# pull in every dependency of the package.
+_EXPORTS = {
+    "Fetcher": ".fetcher",
+    "FetchError": ".fetcher",
+    "PriceStats": ".fetcher",
+    "LoanCalculator": ".calculator",
+    "CarValueCalculator": ".calculator",
+    "BrandListResponse": ".models",
+    "ModelListResponse": ".models",
+    "EstimateRequest": ".models",
+    "EstimateResponse": ".models",
+    "BreakEvenRequest": ".models",
+    "BreakEvenResponse": ".models",
+}
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
 __all__ = [
     "Fetcher",
     "FetchError",
+    "PriceStats",
     "LoanCalculator",
     "CarValueCalculator",
     "BrandListResponse",
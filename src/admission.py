@@ -0,0 +1,259 @@
+"""
+Admission control for the HTTP endpoints.
+
+Sync handlers all share Starlette's thread pool, so under a spike cheap catalog calls
+wait behind listing scrapes and latency grows without bound. Here each endpoint class
+(catalog, estimate, analysis) gets its own concurrency limit and a bounded waiting
+queue; within a class, requests whose listing prices are already cached are admitted
+before cold scrapes. A request that finds the queue full, or waits longer than the
+class's queue timeout, is answered 503 with Retry-After at once instead of timing out.
+
+The gates live on the event loop (ASGI middleware), so waiting requests hold no thread.
+Only requests that will actually wait are ranked: one admitted at once or shed because
+the queue is full is passed on (or answered 503) without its body being read.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+CATALOG = "catalog"
+ESTIMATE = "estimate"
+ANALYSIS = "analysis"
+
+# lower is admitted first
+PRIORITY_HIGH = 0
+PRIORITY_LOW = 1
+
+
+class ClassLimits(NamedTuple):
+    concurrency: int      # requests of the class running at once
+    queue: int            # requests of the class waiting for a slot
+    queue_timeout: float  # seconds a request may wait before it is shed
+
+
+class AdmissionConfig(NamedTuple):
+    enabled: bool = True
+    # the limits add up to less than Starlette's 40 worker threads, so every class can always run
+    catalog: ClassLimits = ClassLimits(8, 64, 2.0)
+    estimate: ClassLimits = ClassLimits(16, 32, 5.0)
+    analysis: ClassLimits = ClassLimits(4, 8, 10.0)
+    # bodies are read for ranking up to this size; larger requests are queued at low priority
+    max_body: int = 64 * 1024
+
+    @classmethod
+    def from_env(cls) -> "AdmissionConfig":
+        defaults = cls._field_defaults
+
+        def limits(name: str) -> ClassLimits:
+            default = defaults[name]
+            prefix = f"CARCALC_ADMISSION_{name.upper()}_"
+            return ClassLimits(
+                concurrency=int(os.getenv(prefix + "CONCURRENCY", default.concurrency)),
+                queue=int(os.getenv(prefix + "QUEUE", default.queue)),
+                queue_timeout=float(os.getenv(prefix + "QUEUE_TIMEOUT", default.queue_timeout)),
+            )
+
+        return cls(
+            enabled=os.getenv("CARCALC_ADMISSION", "1").strip().lower() not in ("0", "false", "no", "off"),
+            catalog=limits(CATALOG),
+            estimate=limits(ESTIMATE),
+            analysis=limits(ANALYSIS),
+            max_body=int(os.getenv("CARCALC_ADMISSION_MAX_BODY", defaults["max_body"])),
+        )
+
+    def classes(self) -> Dict[str, ClassLimits]:
+        return {CATALOG: self.catalog, ESTIMATE: self.estimate, ANALYSIS: self.analysis}
+
+
+class Overloaded(Exception):
+    """Raised by `Gate.acquire` when a request is shed; `reason` is "queue_full" or "queue_timeout"."""
+
+    def __init__(self, name: str, reason: str, retry_after: float):
+        super().__init__(f"{name} requests are over capacity ({reason.replace('_', ' ')}), retry later")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Gate:
+    """Concurrency limit with a bounded priority queue for one endpoint class (event-loop only)."""
+
+    def __init__(self, name: str, limits: ClassLimits, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.limits = limits
+        self._clock = clock
+        self._waiters: list = []      # heap of (priority, seq, future); cancelled futures are skipped
+        self._seq = itertools.count()
+        self.active = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.admitted = 0
+        self.queued_total = 0         # admitted after waiting
+        self.wait_seconds = 0.0
+        self.shed = {"queue_full": 0, "queue_timeout": 0}
+
+    def retry_after(self) -> float:
+        return max(1.0, self.limits.queue_timeout)
+
+    def admits_now(self) -> bool:
+        """True when `acquire` would admit a request without queueing it."""
+        return self.active < self.limits.concurrency and not self.queued
+
+    def would_shed(self) -> bool:
+        """True when `acquire` would shed a request at once (queue full)."""
+        return not self.admits_now() and self.queued >= self.limits.queue
+
+    def _shed(self, reason: str) -> Overloaded:
+        self.shed[reason] += 1
+        return Overloaded(self.name, reason, self.retry_after())
+
+    async def acquire(self, priority: int = PRIORITY_HIGH) -> None:
+        """Wait for a slot (lower `priority` first); raises Overloaded when the request is shed."""
+        if self.admits_now():
+            self.active += 1
+            self.admitted += 1
+            return
+        if self.would_shed():
+            raise self._shed("queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self.queued += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+        started = self._clock()
+        try:
+            done, _ = await asyncio.wait({future}, timeout=self.limits.queue_timeout)
+        except asyncio.CancelledError:
+            # the client went away while waiting; give back a slot handed over meanwhile
+            if future.done():
+                self.release()
+            else:
+                future.cancel()
+                self.queued -= 1
+            raise
+        if not done:
+            future.cancel()
+            self.queued -= 1
+            raise self._shed("queue_timeout")
+        self.queued_total += 1
+        self.wait_seconds += self._clock() - started
+
+    def release(self) -> None:
+        """Free a slot, handing it straight to the best waiting request if there is one."""
+        self.active -= 1
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.cancelled():
+                continue
+            self.queued -= 1
+            self.active += 1
+            self.admitted += 1
+            future.set_result(None)
+            return
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.limits.concurrency,
+            "queue_size": self.limits.queue,
+            "active": self.active,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "admitted": self.admitted,
+            "waited": self.queued_total,
+            "avg_wait": round(self.wait_seconds / self.queued_total, 4) if self.queued_total else 0.0,
+            "shed": dict(self.shed),
+        }
+
+
+class AdmissionController:
+    """One Gate per endpoint class."""
+
+    def __init__(self, config: AdmissionConfig = AdmissionConfig()):
+        self.config = config
+        self.gates = {name: Gate(name, limits) for name, limits in config.classes().items()}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"enabled": self.config.enabled, **{name: gate.snapshot() for name, gate in self.gates.items()}}
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware putting requests through the controller's gates.
+    `classify(path)` names the endpoint class of a path (None: not admission-controlled);
+    `priority(path, body)` ranks a POST request from its raw body, called in a worker thread
+    since it may look things up in the cache, and only for requests that are going to wait.
+    """
+
+    def __init__(self, app, controller: AdmissionController,
+                 classify: Callable[[str], Optional[str]],
+                 priority: Optional[Callable[[str, bytes], int]] = None):
+        self.app = app
+        self.controller = controller
+        self.classify = classify
+        self.priority = priority
+
+    async def __call__(self, scope, receive, send) -> None:
+        name = self.classify(scope["path"]) if scope["type"] == "http" and self.controller.config.enabled else None
+        gate = self.controller.gates.get(name) if name else None
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        priority = PRIORITY_HIGH
+        # admitted or shed at once: the rank does not matter, so the body is not read
+        waits = not (gate.admits_now() or gate.would_shed())
+        if waits and self.priority is not None and scope["method"] == "POST":
+            body, complete = await _read_body(receive, self.controller.config.max_body)
+            receive = _replay(body, complete, receive)
+            if complete:
+                priority = await run_in_threadpool(self.priority, scope["path"], body)
+            else:
+                priority = PRIORITY_LOW
+
+        try:
+            await gate.acquire(priority)
+        except Overloaded as ex:
+            response = JSONResponse({"detail": str(ex)}, status_code=503,
+                                    headers={"Retry-After": str(math.ceil(ex.retry_after))})
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+
+async def _read_body(receive, limit: int) -> Tuple[bytes, bool]:
+    """(body read so far, whether it is complete), reading no more than about `limit` bytes."""
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return b"".join(chunks), True
+        chunk = message.get("body", b"")
+        chunks.append(chunk)
+        size += len(chunk)
+        if not message.get("more_body", False):
+            return b"".join(chunks), True
+        if size > limit:
+            return b"".join(chunks), False
+
+
+def _replay(body: bytes, complete: bool, receive) -> Callable[[], Awaitable[dict]]:
+    """`receive` that hands the already-read body to the app, then defers to the original one."""
+    pending = True
+
+    async def replay() -> dict:
+        nonlocal pending
+        if pending:
+            pending = False
+            return {"type": "http.request", "body": body, "more_body": not complete}
+        return await receive()
+    return replay
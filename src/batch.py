@@ -0,0 +1,274 @@
+"""
+Offline fleet estimates: read `EstimateRequest`-shaped rows from a CSV, estimate them with
+a pool of workers sharing one Fetcher, and stream the results to CSV or JSONL as they
+complete.
+
+    python -m src.batch fleet.csv -o estimates.jsonl [--workers 8] [--rate 4] [--resume]
+
+Input: a header naming EstimateRequest fields (brand, model, zip_code, number_of_years, ...),
+one vehicle per row. List fields (shift_types, zip_codes) are separated by ";" and empty
+cells take the API defaults. An optional `id` column names the rows in the output (the row
+number otherwise).
+
+Fetches are shared: identical rows are estimated once, and rows differing only in their
+financial parameters hit the Fetcher cache (whose per-key lock makes concurrent workers
+scrape a listing page once). `--rate` caps the upstream requests per second.
+
+The output doubles as the checkpoint: with `--resume` the ids it already holds with a final
+result (200 or 4xx) are skipped, rows that failed transiently (503, 504) are run again, a
+line cut short by the interruption is dropped, and new results are appended.
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from pydantic import ValidationError
+
+from .estimator import estimate_costs
+from .fetcher import CircuitOpenError, DeadlineExceeded, Fetcher, FetchError, get_transport
+from .models import EstimateRequest, EstimateResponse
+from .responses import dumps
+from .series import InsufficientDataError
+from .utils import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+LIST_FIELDS = ("shift_types", "zip_codes")
+LIST_SEPARATOR = ";"
+# EstimateResponse fields written to CSV output; lists are joined with LIST_SEPARATOR
+CSV_FIELDS = (
+    "id", "status_code", "error",
+    "purchase_price", "estimated_final_value", "monthly_depreciation", "monthly_maintenance",
+    "loan_monthly_payment", "loan_total_interest", "total_monthly_cost", "adjusted_number_of_years",
+    "warning", "year_values",
+)
+
+
+class BatchResult(NamedTuple):
+    """Outcome of one input row: the estimate, or the HTTP-like status and message of its failure."""
+    id: str
+    status_code: int
+    estimate: Optional[EstimateResponse] = None
+    error: Optional[str] = None
+
+
+class RateLimitedFetcher:
+    """Fetcher proxy taking a rate-limiter token before each request that may reach the upstream."""
+
+    def __init__(self, fetcher, limiter: RateLimiter):
+        self._fetcher = fetcher
+        self.limiter = limiter
+
+    def fetch_price_stats(self, selected_values, *args, **kwargs):
+        if not self._fetcher.has_price_stats(selected_values):
+            self.limiter.acquire()
+        return self._fetcher.fetch_price_stats(selected_values, *args, **kwargs)
+
+    def find_year_span(self, *args, **kwargs):
+        # one probe sequence scrapes several years: each probe takes its own token
+        return self._fetcher.find_year_span(*args, fetch=self.fetch_price_stats, **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self._fetcher, name)
+
+
+def read_rows(fh: IO[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(id, fields) for each CSV row; empty cells are left out and list fields are split."""
+    for number, row in enumerate(csv.DictReader(fh), start=1):
+        fields = {name.strip(): value.strip() for name, value in row.items()
+                  if name and value is not None and value.strip()}
+        row_id = fields.pop("id", None) or str(number)
+        for name in LIST_FIELDS:
+            if name in fields:
+                fields[name] = [item.strip() for item in fields[name].split(LIST_SEPARATOR) if item.strip()]
+        yield row_id, fields
+
+
+def estimate_row(fetcher, row_id: str, req: EstimateRequest) -> BatchResult:
+    """Estimate one request, mapping failures to the status codes /api/estimate would answer."""
+    try:
+        return BatchResult(row_id, 200, estimate_costs(req, fetcher))
+    except InsufficientDataError as ex:
+        return BatchResult(row_id, 400, error=str(ex))
+    except DeadlineExceeded as ex:
+        return BatchResult(row_id, 504, error=str(ex))
+    except (CircuitOpenError, FetchError) as ex:
+        return BatchResult(row_id, 503, error=str(ex))
+    except Exception as ex:
+        logger.exception("unexpected error estimating row %s", row_id)
+        return BatchResult(row_id, 500, error=str(ex))
+
+
+def run_batch(
+    rows: Iterable[Tuple[str, Dict[str, Any]]],
+    fetcher,
+    on_result: Callable[[BatchResult], None],
+    workers: int = 4,
+    skip: Set[str] = frozenset(),
+) -> Dict[str, int]:
+    """
+    Estimate `rows` ((id, fields) pairs) on `workers` threads and pass every result to `on_result`
+    as soon as it is known (from the calling thread). Rows whose id is in `skip` are not run;
+    identical requests are estimated once and reported under each of their ids.
+    Returns counters: rows, skipped, unique (requests estimated), ok, failed.
+    """
+    counts = {"rows": 0, "skipped": 0, "unique": 0, "ok": 0, "failed": 0}
+
+    def report(result: BatchResult) -> None:
+        counts["ok" if result.status_code == 200 else "failed"] += 1
+        on_result(result)
+
+    groups: Dict[bytes, Tuple[EstimateRequest, List[str]]] = {}
+    for row_id, fields in rows:
+        counts["rows"] += 1
+        if row_id in skip:
+            counts["skipped"] += 1
+            continue
+        try:
+            req = EstimateRequest(**fields)
+        except ValidationError as ex:
+            report(BatchResult(row_id, 422, error=_validation_message(ex)))
+            continue
+        key = dumps(req)
+        if key in groups:
+            groups[key][1].append(row_id)
+        else:
+            groups[key] = (req, [row_id])
+    counts["unique"] = len(groups)
+
+    with ThreadPoolExecutor(max(1, workers), thread_name_prefix="batch") as pool:
+        futures = {pool.submit(estimate_row, fetcher, ids[0], req): ids
+                   for req, ids in groups.values()}
+        for future in as_completed(futures):
+            result = future.result()
+            for row_id in futures[future]:
+                report(result._replace(id=row_id))
+    return counts
+
+
+def _validation_message(ex: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in ex.errors())
+
+
+class JsonlWriter:
+    """One JSON object per result: {"id", "status_code", "estimate"} or {"id", "status_code", "error"}."""
+
+    def __init__(self, fh: IO[str]):
+        self.fh = fh
+
+    def write(self, result: BatchResult) -> None:
+        record: Dict[str, Any] = {"id": result.id, "status_code": result.status_code}
+        if result.estimate is not None:
+            record["estimate"] = result.estimate.model_dump()
+        else:
+            record["error"] = result.error
+        self.fh.write(dumps(record).decode("utf-8") + "\n")
+        self.fh.flush()
+
+
+class CsvWriter:
+    """CSV_FIELDS columns, the header only when starting a new file."""
+
+    def __init__(self, fh: IO[str], append: bool = False):
+        self.fh = fh
+        self.writer = csv.DictWriter(fh, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        if not append:
+            self.writer.writeheader()
+
+    def write(self, result: BatchResult) -> None:
+        row: Dict[str, Any] = {"id": result.id, "status_code": result.status_code, "error": result.error}
+        if result.estimate is not None:
+            for name, value in result.estimate.model_dump().items():
+                row[name] = LIST_SEPARATOR.join(str(v) for v in value) if isinstance(value, list) else value
+        self.writer.writerow(row)
+        self.fh.flush()
+
+
+WRITERS = {"jsonl": JsonlWriter, "csv": CsvWriter}
+
+
+def output_format(path: str, requested: Optional[str] = None) -> str:
+    if requested:
+        return requested
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def _is_final(status_code) -> bool:
+    """Succeeded, or failed in a way a retry would not fix (invalid row, no data): 200 or 4xx."""
+    status = int(status_code)
+    return status == 200 or 400 <= status < 500
+
+
+def completed_ids(path: str, fmt: str) -> Set[str]:
+    """
+    Ids already done in an output file, for resuming: those whose last result is final (see
+    `_is_final`). Rows that failed transiently (503, 504, ...) are run again and their new
+    result appended. A trailing line without its newline (the run was interrupted while
+    writing it) is cut off so appending continues cleanly.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, "rb+") as fh:
+        data = fh.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            fh.truncate(complete)
+    lines = data[:complete].decode("utf-8").splitlines()
+    if fmt == "csv":
+        records = [row for row in csv.DictReader(lines) if row.get("id")]
+    else:
+        records = [json.loads(line) for line in lines if line.strip()]
+    # later results supersede earlier ones for the same id
+    last = {record["id"]: record["status_code"] for record in records}
+    return {row_id for row_id, status_code in last.items() if _is_final(status_code)}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Estimate monthly costs for a fleet of vehicles from a CSV.")
+    parser.add_argument("input", help="CSV of EstimateRequest fields, one vehicle per row ('-' for stdin)")
+    parser.add_argument("-o", "--output", required=True, help="results file (.csv or .jsonl)")
+    parser.add_argument("--format", choices=sorted(WRITERS), help="output format (default: from the extension)")
+    parser.add_argument("--workers", type=int, default=4, help="vehicles estimated concurrently")
+    parser.add_argument("--rate", type=float, default=2.0, help="upstream requests per second, 0 for no limit")
+    parser.add_argument("--burst", type=int, default=4, help="upstream requests allowed back to back")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip the ids already done in the output and append, retrying transient failures")
+    return parser
+
+
+def main(argv=None, fetcher: Optional[Fetcher] = None) -> int:
+    args = build_parser().parse_args(argv)
+    fmt = output_format(args.output, args.format)
+    done = completed_ids(args.output, fmt) if args.resume else set()
+    fetcher = fetcher or Fetcher()
+    if args.rate > 0:
+        fetcher = RateLimitedFetcher(fetcher, RateLimiter(args.rate, args.burst))
+
+    started = time.monotonic()
+    append = args.resume and os.path.exists(args.output) and os.path.getsize(args.output) > 0
+    source = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8-sig")
+    try:
+        with open(args.output, "a" if append else "w", newline="", encoding="utf-8") as out:
+            writer = CsvWriter(out, append=append) if fmt == "csv" else JsonlWriter(out)
+            counts = run_batch(read_rows(source), fetcher, writer.write, workers=args.workers, skip=done)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    elapsed = time.monotonic() - started
+    upstream = get_transport().stats.snapshot()["requests"]
+    print(f"{counts['rows']} rows ({counts['skipped']} already done, {counts['unique']} distinct requests): "
+          f"{counts['ok']} estimated, {counts['failed']} failed in {elapsed:.1f}s, "
+          f"{upstream} upstream requests", file=sys.stderr)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Circuit breaker for upstream calls.
+
+After `failure_threshold` consecutive failures the circuit opens and calls are
+rejected immediately for `cooldown` seconds, instead of each one waiting for
+timeouts and retries. Then a limited number of probe calls go through (half-open):
+a success closes the circuit, a failure opens it for another cool-down.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreakerConfig(NamedTuple):
+    failure_threshold: int = 5   # consecutive failures that open the circuit
+    cooldown: float = 30.0       # seconds to fail fast before probing again
+    half_open_probes: int = 1    # concurrent probe calls allowed while half-open
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreakerConfig":
+        defaults = cls._field_defaults
+        return cls(
+            failure_threshold=int(os.getenv("CARCALC_BREAKER_THRESHOLD", defaults["failure_threshold"])),
+            cooldown=float(os.getenv("CARCALC_BREAKER_COOLDOWN", defaults["cooldown"])),
+            half_open_probes=int(os.getenv("CARCALC_BREAKER_HALF_OPEN_PROBES", defaults["half_open_probes"])),
+        )
+
+
+class CircuitBreaker:
+    """
+    Thread-safe closed/open/half-open state machine. Callers ask `allow()` before a call
+    and report the outcome with `record_success()` or `record_failure()`.
+    """
+
+    def __init__(self, config: CircuitBreakerConfig = CircuitBreakerConfig(),
+                 clock: Callable[[], float] = time.monotonic):
+        self.config = config
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._opened_at = 0.0
+            self._probes = 0
+            self.opened = 0      # number of times the circuit opened
+            self.rejected = 0    # calls failed fast
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.config.cooldown:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def allow(self) -> bool:
+        """True when a call may proceed; while half-open only `half_open_probes` calls pass."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes < self.config.half_open_probes:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("upstream circuit closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def release(self) -> None:
+        """The call ended without saying anything about the upstream (e.g. our own deadline ran out)."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= self.config.failure_threshold
+            ):
+                logger.warning("upstream circuit opened after %d consecutive failures", self._failures)
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._probes = 0
+                self.opened += 1
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit lets a probe through (0 when calls are allowed)."""
+        with self._lock:
+            if self._current_state() != OPEN:
+                return 0.0
+            return max(0.0, self.config.cooldown - (self._clock() - self._opened_at))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "failure_threshold": self.config.failure_threshold,
+                "cooldown": self.config.cooldown,
+            }
@@ -0,0 +1,637 @@
+"""
+Cache used by the Fetcher to remember listing results (including empty ones) and
+catalog data between requests.
+
+`CacheBackend` is the interface; three implementations exist:
+  - `TTLCache`: in-process dict, the default (each worker process has its own copy);
+  - `SQLiteCache`: a local SQLite file shared by the worker processes of one host;
+  - `RedisCache`: any server speaking the Redis protocol (RESP), shared across hosts,
+    through a minimal built-in client (no extra dependency).
+`create_cache()` picks one from `CARCALC_CACHE_URL` (memory://, sqlite:///path, redis://host:port/db).
+
+Shared backends store values in a compact tagged-JSON encoding (zlib-compressed when
+large), see `encode`/`decode`; NamedTuple values must be registered with `register_type`.
+`lock()` holds a lease on a key across threads and, for shared backends, across processes,
+so that only one worker scrapes a missing entry while the others wait for its result.
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class CacheConfig(NamedTuple):
+    url: str = "memory://"
+    max_entries: int = 10000
+    lease: float = 60.0      # seconds a lock is held at most (a crashed holder frees it after this)
+    lock_wait: float = 30.0  # seconds to wait for another holder before computing anyway
+
+    @classmethod
+    def from_env(cls) -> "CacheConfig":
+        defaults = cls._field_defaults
+        return cls(
+            url=os.getenv("CARCALC_CACHE_URL", defaults["url"]),
+            max_entries=int(os.getenv("CARCALC_CACHE_MAX_ENTRIES", defaults["max_entries"])),
+            lease=float(os.getenv("CARCALC_CACHE_LEASE", defaults["lease"])),
+            lock_wait=float(os.getenv("CARCALC_CACHE_LOCK_WAIT", defaults["lock_wait"])),
+        )
+
+
+# Serialization
+
+_TAG = "\x00"
+_TYPES_BY_TAG: Dict[str, type] = {}
+_TAGS_BY_TYPE: Dict[type, str] = {}
+_COMPRESS_ABOVE = 512
+
+
+def register_type(cls: type) -> type:
+    """Make a NamedTuple class storable in shared backends (usable as a class decorator)."""
+    _TYPES_BY_TAG[cls.__name__] = cls
+    _TAGS_BY_TYPE[cls] = cls.__name__
+    return cls
+
+
+def _to_plain(value: Any) -> Any:
+    tag = _TAGS_BY_TYPE.get(type(value))
+    if tag is not None:
+        return {_TAG + tag: [_to_plain(v) for v in value]}
+    if isinstance(value, tuple) and hasattr(value, "_fields"):
+        raise TypeError(f"{type(value).__name__} is not registered with cache.register_type")
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _to_plain(v) for k, v in value.items()}
+    return value
+
+
+def _from_plain(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_from_plain(v) for v in value]
+    if isinstance(value, dict):
+        if len(value) == 1:
+            (key, fields), = value.items()
+            if key.startswith(_TAG):
+                return _TYPES_BY_TAG[key[1:]](*(_from_plain(f) for f in fields))
+        return {k: _from_plain(v) for k, v in value.items()}
+    return value
+
+
+def encode(value: Any) -> bytes:
+    """
+    Compact bytes for `value`: JSON of plain data and registered NamedTuples (tuples come
+    back as lists), zlib-compressed above 512 bytes. The first byte tells which.
+    """
+    plain = _to_plain(value)
+    data = orjson.dumps(plain) if orjson is not None else json.dumps(plain, separators=(",", ":")).encode()
+    if len(data) > _COMPRESS_ABOVE:
+        return b"z" + zlib.compress(data, 6)
+    return b"j" + data
+
+
+def decode(data: bytes) -> Any:
+    data = bytes(data)
+    body = zlib.decompress(data[1:]) if data[:1] == b"z" else data[1:]
+    return _from_plain(orjson.loads(body) if orjson is not None else json.loads(body))
+
+
+# Interface
+
+class _KeyedLocks:
+    """One in-process lock per key, created on demand and dropped when unused."""
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks: Dict[Hashable, List] = {}  # key -> [lock, users]
+
+    @contextmanager
+    def hold(self, key: Hashable, timeout: float) -> Iterator[bool]:
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        acquired = entry[0].acquire(timeout=max(timeout, 0))
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                entry[0].release()
+            with self._guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+
+class CacheStats:
+    """Thread-safe hit/miss counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"hits": 0, "misses": 0, "stale_hits": 0, "lock_waits": 0, "lock_timeouts": 0, "errors": 0}
+
+    def incr(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+class CacheBackend:
+    """
+    Key/value store with a per-entry time-to-live. Expired entries are retained for
+    `stale_ttl` more seconds, readable only with `get(..., allow_stale=True)` (to degrade
+    gracefully when the source is down). Subclasses implement `_get_entry`/`set`/`delete`/`clear`
+    and, when shared between processes, `_try_lease`/`_release_lease`.
+    """
+
+    name = "abstract"
+    lease = CacheConfig._field_defaults["lease"]
+    lock_wait = CacheConfig._field_defaults["lock_wait"]
+
+    def __init__(self, default_ttl: float = 3600.0, stale_ttl: float = 0.0):
+        self.default_ttl = float(default_ttl)
+        self.stale_ttl = float(stale_ttl)
+        self.stats = CacheStats()
+        self._local_locks = _KeyedLocks()
+
+    def _get_entry(self, key: Hashable) -> Optional[Tuple[bool, Any, float]]:
+        """
+        (expired, value, seconds until it expires, negative once expired) of a retained entry,
+        None when missing (or past its stale period).
+        """
+        raise NotImplementedError
+
+    def get(self, key: Hashable, default: Any = None, allow_stale: bool = False) -> Any:
+        """Return the cached value, or `default` when missing or expired (unless stale reads are allowed)."""
+        entry = self._get_entry(key)
+        if entry is None or (entry[0] and not allow_stale):
+            self.stats.incr("misses")
+            return default
+        self.stats.incr("stale_hits" if entry[0] else "hits")
+        return entry[1]
+
+    def get_fresh(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """(value, seconds it stays fresh) of an unexpired entry, None when missing or expired."""
+        entry = self._get_entry(key)
+        if entry is None or entry[0]:
+            self.stats.incr("misses")
+            return None
+        self.stats.incr("hits")
+        return entry[1], entry[2]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store `value` for `ttl` seconds (the cache default when omitted)."""
+        raise NotImplementedError
+
+    def delete(self, key: Hashable) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._get_entry(key)
+        return entry is not None and not entry[0]
+
+    def _try_lease(self, key: str, owner: str, lease: float) -> bool:
+        return True
+
+    def _release_lease(self, key: str, owner: str) -> None:
+        pass
+
+    @contextmanager
+    def lock(self, key: Hashable, lease: Optional[float] = None, wait: Optional[float] = None) -> Iterator[bool]:
+        """
+        Hold `key` exclusively while computing its value. Waits up to `wait` seconds for the
+        current holder (thread or, for shared backends, process) and yields True when the lock
+        was obtained, False when waiting timed out (the caller then computes anyway).
+        A lease expires after `lease` seconds so a crashed holder does not block the key forever.
+        """
+        lease = self.lease if lease is None else lease
+        deadline = time.monotonic() + (self.lock_wait if wait is None else wait)
+        with self._local_locks.hold(key, deadline - time.monotonic()) as held:
+            owner = uuid.uuid4().hex
+            leased = False
+            if held:
+                delay = 0.01
+                while not (leased := self._try_lease(str(key), owner, lease)):
+                    if delay == 0.01:
+                        self.stats.incr("lock_waits")
+                    if time.monotonic() + delay > deadline:
+                        break
+                    time.sleep(delay)
+                    delay = min(delay * 2, 0.5)
+            if not leased:
+                self.stats.incr("lock_timeouts")
+            try:
+                yield leased
+            finally:
+                if leased:
+                    self._release_lease(str(key), owner)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.name, **self.stats.snapshot()}
+
+
+# Implementations
+
+class TTLCache(CacheBackend):
+    """
+    Thread-safe in-process dict with a per-entry time-to-live and a bounded number of entries.
+    Values are stored as-is (no serialization); `lock()` only coordinates threads of this process.
+    """
+
+    name = "memory"
+
+    def __init__(self, default_ttl: float = 3600.0, max_entries: int = 10000, stale_ttl: float = 0.0):
+        super().__init__(default_ttl, stale_ttl)
+        self.max_entries = int(max_entries)
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _get_entry(self, key: Hashable) -> Optional[Tuple[bool, Any, float]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            now = time.monotonic()
+            if expires_at < now and expires_at + self.stale_ttl < now:
+                del self._data[key]
+                return None
+            return expires_at < now, value, expires_at - now
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else float(ttl)
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.max_entries:
+                self._evict()
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def _evict(self) -> None:
+        """
+        Drop expired entries (stale ones included), then the oldest inserted ones until
+        there is room. Caller holds the lock.
+        """
+        now = time.monotonic()
+        for key in [k for k, (exp, _) in self._data.items() if exp < now]:
+            del self._data[key]
+        while len(self._data) >= self.max_entries:
+            del self._data[next(iter(self._data))]
+
+    def describe(self) -> Dict[str, Any]:
+        return {**super().describe(), "entries": len(self)}
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache in a local SQLite file (WAL mode), shared by every process that opens the same path.
+    Leases are rows of a `leases` table claimed with INSERT OR IGNORE.
+    """
+
+    name = "sqlite"
+    _PRUNE_EVERY = 256  # sets between two evictions of old entries
+
+    def __init__(self, path: str, default_ttl: float = 3600.0, max_entries: int = 10000,
+                 stale_ttl: float = 0.0):
+        super().__init__(default_ttl, stale_ttl)
+        self.path = path
+        self.max_entries = int(max_entries)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._sets = 0
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache "
+                         "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value BLOB NOT NULL) WITHOUT ROWID")
+            conn.execute("CREATE TABLE IF NOT EXISTS leases "
+                         "(key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID")
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not meant to be shared)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _get_entry(self, key: Hashable) -> Optional[Tuple[bool, Any, float]]:
+        try:
+            row = self._conn().execute("SELECT expires_at, value FROM cache WHERE key = ?", (str(key),)).fetchone()
+            if row is None:
+                return None
+            expires_at, value = row
+            now = time.time()
+            if expires_at + self.stale_ttl < now:
+                return None
+            return expires_at < now, decode(value), expires_at - now
+        except (sqlite3.Error, ValueError, KeyError) as ex:
+            logger.warning("sqlite cache read failed for %s: %s", key, ex)
+            self.stats.incr("errors")
+            return None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else float(ttl)
+        try:
+            self._conn().execute("INSERT OR REPLACE INTO cache (key, expires_at, value) VALUES (?, ?, ?)",
+                                 (str(key), time.time() + ttl, encode(value)))
+            self._sets += 1
+            if self._sets % self._PRUNE_EVERY == 0:
+                self._evict()
+        except sqlite3.Error as ex:
+            logger.warning("sqlite cache write failed for %s: %s", key, ex)
+            self.stats.incr("errors")
+
+    def _evict(self) -> None:
+        """Drop entries past their stale period, then the ones expiring first beyond `max_entries`."""
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time() - self.stale_ttl,))
+        conn.execute("DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at DESC "
+                     "LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def delete(self, key: Hashable) -> None:
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (str(key),))
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM cache")
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def _try_lease(self, key: str, owner: str, lease: float) -> bool:
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM leases WHERE key = ? AND expires_at < ?", (key, now))
+                claimed = conn.execute("INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                                       (key, owner, now + lease)).rowcount == 1
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return claimed
+        except sqlite3.Error as ex:
+            logger.warning("sqlite cache lease failed for %s: %s", key, ex)
+            self.stats.incr("errors")
+            return True  # proceed unlocked rather than stall
+
+    def _release_lease(self, key: str, owner: str) -> None:
+        try:
+            self._conn().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+        except sqlite3.Error as ex:
+            logger.warning("sqlite cache lease release failed for %s: %s", key, ex)
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def describe(self) -> Dict[str, Any]:
+        return {**super().describe(), "path": self.path}
+
+
+class RedisError(IOError):
+    """The server could not be reached or the connection broke."""
+
+
+class RedisReplyError(RedisError):
+    """Error reply from the server (the connection is still usable)."""
+
+
+class _RESPConnection:
+    """Blocking connection speaking RESP2: send a command, read one reply."""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+
+    def command(self, *args: Any) -> Any:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self.sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def _read_reply(self) -> Any:
+        line = self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise RedisError("connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisReplyError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(payload)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise RedisError(f"unexpected reply {line!r}")
+
+    def close(self) -> None:
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache in a Redis-protocol server. Each value is stored as 8 bytes of expiry time followed
+    by its encoding, with a server-side expiry covering the stale period. Leases use SET NX PX.
+    Server errors are logged and treated as cache misses so that requests still get answered.
+    """
+
+    name = "redis"
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, password: Optional[str] = None,
+                 default_ttl: float = 3600.0, stale_ttl: float = 0.0, prefix: str = "carcalc:",
+                 socket_timeout: float = 2.0):
+        super().__init__(default_ttl, stale_ttl)
+        self.host, self.port, self.db, self.password = host, int(port), int(db), password
+        self.prefix = prefix
+        self.socket_timeout = socket_timeout
+        self._local = threading.local()
+        self._connections: List[_RESPConnection] = []
+        self._connections_lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisCache":
+        parsed = urlparse(url)
+        db = parsed.path.strip("/")
+        return cls(host=parsed.hostname or "localhost", port=parsed.port or 6379, db=int(db or 0),
+                   password=unquote(parsed.password) if parsed.password else None, **kwargs)
+
+    def _connect(self) -> _RESPConnection:
+        conn = _RESPConnection(self.host, self.port, self.socket_timeout)
+        if self.password:
+            conn.command("AUTH", self.password)
+        if self.db:
+            conn.command("SELECT", self.db)
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    def _command(self, *args: Any) -> Any:
+        """Run one command on this thread's connection, reconnecting once if it was dropped."""
+        for attempt in (1, 2):
+            conn = getattr(self._local, "conn", None)
+            try:
+                if conn is None:
+                    conn = self._local.conn = self._connect()
+                return conn.command(*args)
+            except RedisReplyError:
+                raise
+            except OSError as ex:
+                if conn is not None:
+                    conn.close()
+                self._local.conn = None
+                if attempt == 2:
+                    raise RedisError(str(ex)) from ex
+
+    def _get_entry(self, key: Hashable) -> Optional[Tuple[bool, Any, float]]:
+        try:
+            data = self._command("GET", self.prefix + str(key))
+            if data is None:
+                return None
+            (expires_at,) = struct.unpack("!d", data[:8])
+            now = time.time()
+            if expires_at + self.stale_ttl < now:
+                return None
+            return expires_at < now, decode(data[8:]), expires_at - now
+        except (RedisError, ValueError, KeyError, struct.error) as ex:
+            logger.warning("redis cache read failed for %s: %s", key, ex)
+            self.stats.incr("errors")
+            return None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else float(ttl)
+        retain_ms = int((ttl + self.stale_ttl) * 1000)
+        try:
+            if retain_ms <= 0:
+                self._command("DEL", self.prefix + str(key))
+                return
+            data = struct.pack("!d", time.time() + ttl) + encode(value)
+            self._command("SET", self.prefix + str(key), data, "PX", retain_ms)
+        except RedisError as ex:
+            logger.warning("redis cache write failed for %s: %s", key, ex)
+            self.stats.incr("errors")
+
+    def delete(self, key: Hashable) -> None:
+        self._command("DEL", self.prefix + str(key))
+
+    def _keys(self) -> List[bytes]:
+        lease_prefix = (self.prefix + "lease:").encode()
+        return [k for k in self._command("KEYS", self.prefix + "*") or [] if not k.startswith(lease_prefix)]
+
+    def clear(self) -> None:
+        keys = self._keys()
+        for i in range(0, len(keys), 500):
+            self._command("DEL", *keys[i:i + 500])
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def _try_lease(self, key: str, owner: str, lease: float) -> bool:
+        try:
+            return self._command("SET", self.prefix + "lease:" + key, owner, "NX", "PX", int(lease * 1000)) == "OK"
+        except RedisError as ex:
+            logger.warning("redis cache lease failed for %s: %s", key, ex)
+            self.stats.incr("errors")
+            return True  # proceed unlocked rather than stall
+
+    def _release_lease(self, key: str, owner: str) -> None:
+        # not atomic: the lease can only be lost in between if it outlived `lease` seconds
+        lease_key = self.prefix + "lease:" + key
+        try:
+            if self._command("GET", lease_key) == owner.encode():
+                self._command("DEL", lease_key)
+        except RedisError as ex:
+            logger.warning("redis cache lease release failed for %s: %s", key, ex)
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def describe(self) -> Dict[str, Any]:
+        return {**super().describe(), "server": f"{self.host}:{self.port}/{self.db}"}
+
+
+def create_cache(config: Optional[CacheConfig] = None, default_ttl: float = 3600.0,
+                 stale_ttl: float = 0.0) -> CacheBackend:
+    """Backend selected by `config.url`: memory:// (default), sqlite:///path/to/file.db or redis://host:port/db."""
+    config = config or CacheConfig()
+    scheme = urlparse(config.url).scheme or "memory"
+    if scheme == "memory":
+        cache = TTLCache(default_ttl=default_ttl, max_entries=config.max_entries, stale_ttl=stale_ttl)
+    elif scheme == "sqlite":
+        # sqlite:///cache.db is relative to the working directory, sqlite:////var/cache.db absolute
+        path = config.url[len("sqlite://"):]
+        path = path[1:] if path.startswith("/") else path
+        if not path:
+            raise ValueError("sqlite cache URL needs a file path, e.g. sqlite:///carcalc-cache.db")
+        cache = SQLiteCache(path, default_ttl=default_ttl, max_entries=config.max_entries,
+                            stale_ttl=stale_ttl)
+    elif scheme in ("redis", "rediss"):
+        if scheme == "rediss":
+            raise ValueError("TLS (rediss://) is not supported by the built-in Redis client")
+        cache = RedisCache.from_url(config.url, default_ttl=default_ttl, stale_ttl=stale_ttl)
+    else:
+        raise ValueError(f"unsupported cache URL {config.url!r}")
+    cache.lease = config.lease
+    cache.lock_wait = config.lock_wait
+    return cache
+
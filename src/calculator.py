@@ -1,4 +1,6 @@
-from typing import List
+from typing import Dict, List, Mapping, NamedTuple, Optional
+from array import array
+from itertools import accumulate
 from math import isclose
 from .models import EstimateRequest
 import statistics
@@ -70,3 +72,173 @@ class CarValueCalculator:
     def monthly_total_cost(self, loan_monthly: float = 0.0) -> float:
         """Depreciation + maintenance + loan monthly payment"""
         return self.monthly_depreciation() + self.monthly_maintenance + loan_monthly
+
+
+# columns of a CostSchedule, in output order
+SCHEDULE_COLUMNS = (
+    "payment", "interest", "principal", "balance", "interest_paid", "car_value", "equity", "cumulative_cost",
+)
+# balances below this are rounding left-overs of a repaid loan
+_PAID_OFF = 0.005
+
+
+class CostSchedule(NamedTuple):
+    """
+    Month-by-month ownership schedule: entry 0 is the purchase, entry m the state after the
+    payments of month m. Every column is an array('d') with one value per month.
+    """
+    payment: array          # paid to the lender in the month: installment plus extra payments
+    interest: array
+    principal: array
+    balance: array          # loan balance left after the month's payments
+    interest_paid: array    # interest paid to date
+    car_value: array        # resale value, interpolated between the yearly prices
+    equity: array           # car value minus loan balance
+    cumulative_cost: array  # net cost of owning the car to date, if it were sold that month
+    payoff_month: Optional[int]  # month the loan was repaid, None when not within the horizon (or no loan)
+
+    @property
+    def months(self) -> int:
+        return len(self.balance) - 1
+
+    def months_to_break_even(self, rent_monthly_cost: float) -> Optional[int]:
+        """First month in which owning has cost no more than renting so far, None if never."""
+        rent = float(rent_monthly_cost)
+        return next((m for m in range(1, len(self.cumulative_cost)) if self.cumulative_cost[m] <= rent * m), None)
+
+    def downsample(self, max_points: int = 120) -> Dict[str, list]:
+        """
+        Evenly spaced months (first and last included, plus the payoff month) with every
+        column rounded to cents, for charting long horizons cheaply.
+        """
+        last = len(self.balance) - 1
+        if max_points >= last + 1:
+            months = list(range(last + 1))
+        else:
+            step = last / (max(2, max_points) - 1)
+            picked = {round(i * step) for i in range(max(2, max_points))}
+            if self.payoff_month is not None:
+                picked.add(self.payoff_month)
+            months = sorted(picked)
+        view: Dict[str, list] = {"month": months}
+        for name in SCHEDULE_COLUMNS:
+            column = getattr(self, name)
+            view[name] = [round(column[m], 2) for m in months]
+        return view
+
+
+class CostScheduleCalculator:
+    """
+    Monthly schedule of buying a car at `purchase_year_index` of `year_values` (newest first,
+    like CarValueCalculator), financing `loan_value` of it, and keeping it `number_of_years`.
+
+    Extra payments shorten the loan, the installment stays the same: `extra_monthly` is added
+    to every installment, `extra_payments` maps months to lump sums and `payoff_month` repays
+    the whole balance in that month.
+
+    The balances come from the annuity closed form
+        B(k) = B * (1 + r)^k - P * ((1 + r)^k - 1) / r
+    evaluated over each run of months between two extra payments, and every other column is
+    derived from them element-wise, so the schedule is built column by column in one pass.
+    """
+    def __init__(
+        self,
+        year_values: List[float],
+        purchase_year_index: int,
+        number_of_years: int,
+        monthly_maintenance: float = 0.0,
+        loan_value: float = 0.0,
+        bank_rate_percent: float = 0.0,
+        loan_years: int = 0,
+        extra_monthly: float = 0.0,
+        extra_payments: Optional[Mapping[int, float]] = None,
+        payoff_month: Optional[int] = None,
+    ):
+        if not year_values:
+            raise ValueError("year_values must be non-empty")
+        self.year_values = [float(x) for x in year_values]
+        self.purchase_year_index = int(purchase_year_index)
+        self.number_of_years = int(number_of_years)
+        self.monthly_maintenance = float(monthly_maintenance)
+        self.loan = LoanCalculator(loan_value, bank_rate_percent, loan_years)
+        self.extra_monthly = float(extra_monthly)
+        self.extra_payments = {int(m): float(a) for m, a in (extra_payments or {}).items() if a > 0}
+        self.payoff_month = payoff_month
+
+    def _balances(self, months: int) -> List[float]:
+        loan = self.loan
+        loan_months = min(months, loan.number_of_years * 12)
+        if loan.loan_value <= 0 or loan_months <= 0:
+            return [0.0] * (months + 1)
+
+        installment, _ = loan.calculate_loan_costs()
+        payment = installment + self.extra_monthly
+        rate = loan.bank_rate_percent / 100.0 / 12.0
+        events = {m: a for m, a in self.extra_payments.items() if 1 <= m <= loan_months}
+        if self.payoff_month is not None and 1 <= self.payoff_month <= loan_months:
+            events[self.payoff_month] = float("inf")
+
+        balances = [loan.loan_value]
+        start = 0
+        for stop in sorted(set(events) | {loan_months}):
+            balance, growth = balances[-1], 1.0 + rate
+            if isclose(rate, 0.0):
+                run = [balance - payment * k for k in range(1, stop - start + 1)]
+            else:
+                run = [balance * growth ** k - payment * (growth ** k - 1) / rate for k in range(1, stop - start + 1)]
+            balances.extend(b if b > _PAID_OFF else 0.0 for b in run)
+            if stop in events:
+                balances[-1] = max(0.0, balances[-1] - events[stop])
+            start = stop
+        # nothing is owed after the loan term
+        balances.extend([0.0] * (months - loan_months))
+        return balances
+
+    def _car_values(self, months: int) -> List[float]:
+        values, last = self.year_values, len(self.year_values) - 1
+        out = []
+        for m in range(months + 1):
+            index = self.purchase_year_index + m // 12
+            if index >= last:
+                out.append(values[last])
+            else:
+                out.append(values[index] + (values[index + 1] - values[index]) * (m % 12) / 12.0)
+        return out
+
+    def schedule(self) -> CostSchedule:
+        months = self.number_of_years * 12
+        rate = self.loan.bank_rate_percent / 100.0 / 12.0
+        balances = self._balances(months)
+        previous = balances[:1] + balances[:-1]
+        interest = [0.0] + [b * rate for b in previous[1:]]
+        # whatever left the balance beyond its interest was paid in the month
+        payment = [0.0] + [b + i - after for b, i, after in zip(previous[1:], interest[1:], balances[1:])]
+        principal = [p - i for p, i in zip(payment, interest)]
+        car_value = self._car_values(months)
+        equity = [v - b for v, b in zip(car_value, balances)]
+        down_payment = self.year_values[min(self.purchase_year_index, len(self.year_values) - 1)] - self.loan.loan_value
+        cumulative_cost = [down_payment + paid + self.monthly_maintenance * m - e
+                           for m, (paid, e) in enumerate(zip(accumulate(payment), equity))]
+        payoff = None
+        if self.loan.loan_value > 0:
+            payoff = next((m for m in range(1, months + 1) if balances[m] == 0.0), None)
+        return CostSchedule(
+            payment=array("d", payment),
+            interest=array("d", interest),
+            principal=array("d", principal),
+            balance=array("d", balances),
+            interest_paid=array("d", accumulate(interest)),
+            car_value=array("d", car_value),
+            equity=array("d", equity),
+            cumulative_cost=array("d", cumulative_cost),
+            payoff_month=payoff,
+        )
+
+    def interest_saved(self, schedule: Optional[CostSchedule] = None) -> float:
+        """Interest the extra payments save over the horizon, against the plain installments."""
+        schedule = schedule or self.schedule()
+        plain = CostScheduleCalculator(
+            self.year_values, self.purchase_year_index, self.number_of_years, self.monthly_maintenance,
+            self.loan.loan_value, self.loan.bank_rate_percent, self.loan.number_of_years,
+        ).schedule()
+        return plain.interest_paid[-1] - schedule.interest_paid[-1]
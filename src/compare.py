@@ -0,0 +1,148 @@
+"""
+Multi-vehicle comparison: estimate several selections concurrently under one
+upstream concurrency budget, then rank them on a shared metric.
+
+Every vehicle runs in its own thread so the comparison takes about as long as
+the slowest vehicle, while the budget caps how many upstream fetches (including
+the per-region fetches of each vehicle) are in flight at once.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Optional, Sequence, TypeVar
+
+from .models import CompareRequest, CompareResponse, EstimateRequest, EstimateResponse, VehicleComparison
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# upstream fetches in flight for one comparison
+DEFAULT_COMPARE_CONCURRENCY = int(os.getenv("CARCALC_COMPARE_CONCURRENCY", 8))
+
+
+class ConcurrencyBudget:
+    """Bounded number of concurrent slots (context manager); remembers the peak usage."""
+
+    def __init__(self, slots: int):
+        if slots < 1:
+            raise ValueError("slots must be at least 1")
+        self.slots = int(slots)
+        self._semaphore = threading.BoundedSemaphore(self.slots)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def __enter__(self) -> "ConcurrencyBudget":
+        self._semaphore.acquire()
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._semaphore.release()
+
+
+class BudgetedFetcher:
+    """Fetcher proxy holding a budget slot for each upstream-bound call; other attributes pass through."""
+
+    def __init__(self, fetcher, budget: ConcurrencyBudget):
+        self._fetcher = fetcher
+        self.budget = budget
+
+    def fetch_price_stats(self, *args, **kwargs):
+        with self.budget:
+            return self._fetcher.fetch_price_stats(*args, **kwargs)
+
+    def find_year_span(self, *args, **kwargs):
+        with self.budget:
+            return self._fetcher.find_year_span(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self._fetcher, name)
+
+
+class Outcome(NamedTuple):
+    """Result of one vehicle: the estimate, or the HTTP status and message of its failure."""
+    estimate: Optional[EstimateResponse]
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+
+def vehicle_requests(req: CompareRequest) -> List[EstimateRequest]:
+    """One EstimateRequest per vehicle, combining its selection with the shared parameters."""
+    shared = req.model_dump(exclude={"vehicles", "rank_by"})
+    return [
+        EstimateRequest(**shared, **vehicle.model_dump(exclude={"label"}))
+        for vehicle in req.vehicles
+    ]
+
+
+def fan_out(fn: Callable[[T], R], items: Sequence[T]) -> List[R]:
+    """Run `fn` over `items` with one thread each; results in input order."""
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(len(items), thread_name_prefix="compare") as pool:
+        return list(pool.map(fn, items))
+
+
+def _label(vehicle) -> str:
+    if vehicle.label:
+        return vehicle.label
+    return " ".join(part for part in (vehicle.brand, vehicle.model, vehicle.details) if part)
+
+
+def build_comparison(req: CompareRequest, outcomes: Sequence[Outcome]) -> CompareResponse:
+    """Rank the successful estimates on `req.rank_by` (ascending) and align them in one response."""
+    labels = [_label(vehicle) for vehicle in req.vehicles]
+    # duplicate labels would make the ranking ambiguous
+    seen = {}
+    for i, label in enumerate(labels):
+        seen[label] = seen.get(label, 0) + 1
+        if seen[label] > 1:
+            labels[i] = f"{label} ({seen[label]})"
+
+    ranked = sorted(
+        (i for i, outcome in enumerate(outcomes) if outcome.estimate is not None),
+        key=lambda i: getattr(outcomes[i].estimate, req.rank_by),
+    )
+    best = getattr(outcomes[ranked[0]].estimate, req.rank_by) if ranked else None
+    ranks = {i: position + 1 for position, i in enumerate(ranked)}
+
+    vehicles = []
+    for i, (vehicle, outcome) in enumerate(zip(req.vehicles, outcomes)):
+        metric = getattr(outcome.estimate, req.rank_by) if outcome.estimate is not None else None
+        vehicles.append(VehicleComparison(
+            label=labels[i],
+            brand=vehicle.brand,
+            model=vehicle.model,
+            details=vehicle.details,
+            rank=ranks.get(i),
+            difference_to_best=round(metric - best, 2) if metric is not None else None,
+            estimate=outcome.estimate,
+            status_code=outcome.status_code,
+            error=outcome.error,
+        ))
+
+    horizons = {
+        outcome.estimate.adjusted_number_of_years or req.number_of_years
+        for outcome in outcomes if outcome.estimate is not None
+    }
+    horizon = warning = None
+    if len(horizons) > 1:
+        horizon = min(horizons)
+        warning = (f"Not every vehicle has {req.number_of_years} years of listings; "
+                   f"horizons range from {min(horizons)} to {max(horizons)} years.")
+    if not ranked:
+        warning = "No vehicle could be estimated."
+
+    return CompareResponse(
+        rank_by=req.rank_by,
+        vehicles=vehicles,
+        ranking=[labels[i] for i in ranked],
+        horizon_years=horizon,
+        warning=warning,
+    )
@@ -0,0 +1,258 @@
+"""
+Brand-wide bulk crawl: populate the prices of every model of a make from one sweep of the
+make's listing pages, instead of one listing request per model and registration year.
+
+The sweep asks for the make alone (plus the usual details/zip/gear filters) over a range
+of registration years, page after page, and reads the model and registration year of
+each listing from its attributes; prices are summarised per (model, year) as the pages
+are parsed. Each summary is then stored in the Fetcher cache under the key a per-model
+scrape would use, and recorded in the observation store when one is configured, so later
+estimates for any of those models are served without touching the upstream. Models found
+in the sweep get an empty entry for the years they had no listings in.
+
+The site serves at most `max_pages` pages per search: a year range that still has full
+pages at the cap is split in two and each half is swept again (the truncated pages are
+discarded), so the cost stays proportional to the number of listings.
+
+    python -m src.crawl fiat [--years 15] [--zip 10139-torino] [--details ...] [--rate 2]
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import re
+import sys
+import time
+from html.parser import HTMLParser
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .fetcher import Fetcher, PriceStats, _safe_get, selection_key, summarize_prices
+from .parsing import extract_price
+from .series import build_selection
+from .stats import PriceAccumulator
+from .utils import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# "MM-YYYY" or "YYYY", as in the listings' data-first-registration attribute
+_REGISTRATION_RE = re.compile(r"(?:(\d{1,2})[-/.])?(\d{4})\s*$")
+
+
+class CrawlConfig(NamedTuple):
+    max_pages: int = 20     # result pages the upstream serves per search
+    rate: float = 2.0       # upstream requests per second, 0 for no limit
+    burst: int = 2
+
+    @classmethod
+    def from_env(cls) -> "CrawlConfig":
+        return cls(
+            max_pages=int(os.getenv("CARCALC_CRAWL_MAX_PAGES", cls._field_defaults["max_pages"])),
+            rate=float(os.getenv("CARCALC_CRAWL_RATE", cls._field_defaults["rate"])),
+            burst=int(os.getenv("CARCALC_CRAWL_BURST", cls._field_defaults["burst"])),
+        )
+
+
+class Listing(NamedTuple):
+    model: str
+    year: int
+    price: int
+
+
+class CrawlReport(NamedTuple):
+    """Outcome of a crawl: upstream cost and the PriceStats stored per model and year."""
+    make: str
+    pages: int                      # listing pages fetched, truncated ones included
+    listings: int                   # listings aggregated
+    skipped: int                    # listings without a readable model, year or price
+    models: Dict[str, Dict[int, PriceStats]]
+    truncated_years: List[int]      # single years with more listings than the page cap
+    elapsed: float
+
+    def describe(self) -> Dict[str, object]:
+        """JSON-friendly summary: the counters and each model's median price per year."""
+        return {
+            "make": self.make,
+            "pages": self.pages,
+            "listings": self.listings,
+            "skipped": self.skipped,
+            "truncated_years": self.truncated_years,
+            "elapsed": round(self.elapsed, 3),
+            "models": {model: {str(year): {"median": stats.median, "count": stats.count}
+                               for year, stats in sorted(years.items(), reverse=True)}
+                       for model, years in sorted(self.models.items())},
+        }
+
+
+class ListingParser(HTMLParser):
+    """
+    Collects the listings (`<article>` elements) of a result page: model and registration
+    from their data-model / data-first-registration attributes, the price from data-price
+    or else from the euro amount in their text. Unreadable listings are counted in `skipped`.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.listings: List[Listing] = []
+        self.skipped = 0
+        self._attrs: Optional[Dict[str, str]] = None
+        self._text: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if tag == "article":
+            self._attrs = {name: value or "" for name, value in attrs}
+            self._text = []
+
+    def handle_data(self, data: str) -> None:
+        if self._attrs is not None:
+            self._text.append(data)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "article" and self._attrs is not None:
+            listing = self._listing(self._attrs, " ".join(self._text))
+            if listing is None:
+                self.skipped += 1
+            else:
+                self.listings.append(listing)
+            self._attrs = None
+
+    @staticmethod
+    def _listing(attrs: Dict[str, str], text: str) -> Optional[Listing]:
+        model = attrs.get("data-model", "").strip()
+        registration = _REGISTRATION_RE.search(attrs.get("data-first-registration", ""))
+        price_attr = attrs.get("data-price", "").strip()
+        price = int(price_attr) if price_attr.isdigit() else extract_price(text)
+        if not model or registration is None or not price:
+            return None
+        return Listing(model, int(registration.group(2)), price)
+
+
+def parse_listings(content: bytes) -> Tuple[List[Listing], int]:
+    """(listings, skipped) of one result page."""
+    parser = ListingParser()
+    parser.feed(content.decode("utf-8", errors="replace"))
+    parser.close()
+    return parser.listings, parser.skipped
+
+
+class BrandCrawler:
+    """Sweeps a make's listing pages through `fetcher` (its breaker, transport and cache)."""
+
+    def __init__(self, fetcher: Fetcher, config: CrawlConfig = CrawlConfig()):
+        self.fetcher = fetcher
+        self.config = config
+        self.limiter = RateLimiter(config.rate, config.burst) if config.rate > 0 else None
+
+    def page_url(self, selection: Dict[str, object], newest_year: int, oldest_year: int, page: int) -> str:
+        url = self.fetcher.construct_search_url(selection)
+        return f"{url}&fregfrom={oldest_year}&fregto={newest_year}&page={page}"
+
+    def _fetch_page(self, url: str) -> Tuple[List[Listing], int]:
+        if self.limiter is not None:
+            self.limiter.acquire()
+        return parse_listings(_safe_get(url).content)
+
+    def _sweep(self, selection, newest_year: int, oldest_year: int, state: Dict[str, object], job=None):
+        """
+        Accumulators per (model, year) of the listings registered in [oldest_year, newest_year],
+        splitting the range while the page cap truncates it.
+        """
+        prices: Dict[Tuple[str, int], PriceAccumulator] = {}
+        skipped, page_size, truncated = 0, 0, False
+        for page in range(1, self.config.max_pages + 1):
+            listings, page_skipped = self._fetch_page(self.page_url(selection, newest_year, oldest_year, page))
+            state["pages"] += 1
+            found = len(listings) + page_skipped
+            # the first page is a full one unless the whole range fits in it
+            page_size = page_size or found
+            for listing in listings:
+                if oldest_year <= listing.year <= newest_year:
+                    prices.setdefault((listing.model, listing.year), PriceAccumulator()).add(listing.price)
+                else:
+                    page_skipped += 1
+            skipped += page_skipped
+            if found == 0 or found < page_size:
+                break
+        else:
+            truncated = True
+
+        if truncated and newest_year > oldest_year:
+            middle = (newest_year + oldest_year) // 2
+            logger.info("crawl of %s %d-%d hit the page cap, splitting", selection.get("make"), oldest_year, newest_year)
+            newer = self._sweep(selection, newest_year, middle + 1, state, job)
+            older = self._sweep(selection, middle, oldest_year, state, job)
+            return {**newer, **older}
+        if truncated:
+            state["truncated_years"].append(newest_year)
+        state["listings"] += sum(acc.count for acc in prices.values())
+        state["skipped"] += skipped
+        if job is not None:
+            job.advance(newest_year - oldest_year + 1)
+        return prices
+
+    def crawl(self, make: str, newest_year: int, oldest_year: int, details: Optional[str] = None,
+              zip_code: Optional[str] = None, shift_types: Optional[List[str]] = None, job=None) -> CrawlReport:
+        """
+        Sweep every listing of `make` registered in [oldest_year, newest_year] and store the
+        PriceStats of each (model, year) found; `job` (a jobs.Job) is advanced per year swept.
+        Raises FetchError (or CircuitOpenError) when the upstream fails mid-sweep; nothing
+        is stored in that case.
+        """
+        started = time.monotonic()
+        if job is not None:
+            job.advance(0, total=newest_year - oldest_year + 1)
+        selection = build_selection(make, "", details, zip_code, shift_types, None)
+        state = {"pages": 0, "listings": 0, "skipped": 0, "truncated_years": []}
+        prices = self._sweep(selection, newest_year, oldest_year, state, job)
+
+        models: Dict[str, Dict[int, PriceStats]] = {}
+        for (model, year), accumulator in prices.items():
+            models.setdefault(model, {})[year] = summarize_prices(accumulator)
+        for model, years in models.items():
+            for year in range(oldest_year, newest_year + 1):
+                stats = years.setdefault(year, PriceStats(0, 0.0, 0))
+                self._store(build_selection(make, model, details, zip_code, shift_types, year), stats)
+        return CrawlReport(make, state["pages"], state["listings"], state["skipped"], models,
+                           sorted(state["truncated_years"], reverse=True), time.monotonic() - started)
+
+    def _store(self, selection: Dict[str, object], stats: PriceStats) -> None:
+        fetcher = self.fetcher
+        ttl = fetcher.PRICE_TTL if stats.median > 0 else fetcher.EMPTY_TTL
+        fetcher.cache.set("price:" + selection_key(selection), stats, ttl)
+        if fetcher.store is not None:
+            fetcher.store.record_observation(selection, stats)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Populate the prices of every model of a make in one sweep.")
+    parser.add_argument("make")
+    parser.add_argument("--years", type=int, default=15, help="registration years, the current one included")
+    parser.add_argument("--zip", dest="zip_code", default="10139-torino")
+    parser.add_argument("--details", default="")
+    parser.add_argument("--shift-types", default="", help="gears separated by ',' (e.g. M,A)")
+    parser.add_argument("--rate", type=float, help="upstream requests per second (default: CARCALC_CRAWL_RATE)")
+    parser.add_argument("--max-pages", type=int, help="pages per search (default: CARCALC_CRAWL_MAX_PAGES)")
+    return parser
+
+
+def main(argv=None, fetcher: Optional[Fetcher] = None) -> int:
+    args = build_parser().parse_args(argv)
+    config = CrawlConfig.from_env()
+    if args.rate is not None:
+        config = config._replace(rate=args.rate)
+    if args.max_pages is not None:
+        config = config._replace(max_pages=args.max_pages)
+    newest_year = datetime.datetime.now().year
+    shift_types = [s.strip() for s in args.shift_types.split(",") if s.strip()]
+    report = BrandCrawler(fetcher or Fetcher(), config).crawl(
+        args.make, newest_year, newest_year - args.years + 1, args.details, args.zip_code, shift_types)
+    json.dump(report.describe(), sys.stdout, indent=2)
+    print(file=sys.stdout)
+    print(f"{len(report.models)} models, {report.listings} listings from {report.pages} pages "
+          f"in {report.elapsed:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Per-request deadlines. An endpoint opens a `deadline_scope`; everything below it reads the
+remaining budget from a context variable, so each upstream call (timeouts, retries, lock
+waits) only gets the time that is left instead of its own fixed allowance.
+
+Context variables do not follow work handed to other threads: wrap such work with
+`propagate` (the deadline, and any other context variable such as the `freshness` scope,
+is captured when it is called, in the submitting thread).
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, TypeVar
+
+T = TypeVar("T")
+
+# seconds the caller is willing to wait, e.g. "X-Request-Timeout: 8.5"
+DEADLINE_HEADER = "X-Request-Timeout"
+
+# absolute time.monotonic() value, None when the current work has no deadline
+_deadline: ContextVar[Optional[float]] = ContextVar("carcalc_deadline", default=None)
+
+
+class DeadlineConfig(NamedTuple):
+    default: float = 25.0     # seconds, used when the caller sets none; 0 disables
+    maximum: float = 120.0    # upper bound for caller-supplied deadlines
+
+    @classmethod
+    def from_env(cls) -> "DeadlineConfig":
+        defaults = cls._field_defaults
+        return cls(
+            default=float(os.getenv("CARCALC_DEADLINE_DEFAULT", defaults["default"])),
+            maximum=float(os.getenv("CARCALC_DEADLINE_MAX", defaults["maximum"])),
+        )
+
+    def resolve(self, requested: Optional[str]) -> Optional[float]:
+        """Budget in seconds for a request asking for `requested` (header value, may be None or invalid)."""
+        try:
+            seconds = float(requested) if requested else 0.0
+        except ValueError:
+            seconds = 0.0
+        if not seconds > 0:
+            seconds = self.default
+        if seconds <= 0:
+            return None
+        return min(seconds, self.maximum) if self.maximum > 0 else seconds
+
+
+def current() -> Optional[float]:
+    """The deadline of the current context as a time.monotonic() value, or None."""
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left (possibly negative), None without a deadline."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def clip(seconds: float) -> float:
+    """`seconds`, shortened to the remaining budget (never below zero)."""
+    left = remaining()
+    return seconds if left is None else max(0.0, min(seconds, left))
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float] = None, at: Optional[float] = None) -> Iterator[Optional[float]]:
+    """
+    Run the block with a deadline `seconds` from now (or at the monotonic time `at`).
+    A nested scope can only shorten the enclosing deadline; with neither argument the
+    enclosing deadline (if any) is kept. Yields the effective deadline.
+    """
+    if seconds is not None:
+        at = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None and (at is None or outer < at):
+        at = outer
+    token = _deadline.set(at)
+    try:
+        yield at
+    finally:
+        _deadline.reset(token)
+
+
+def propagate(fn: Callable[..., T]) -> Callable[..., T]:
+    """`fn` bound to the current context (deadline included), for running in another thread."""
+    context = copy_context()
+
+    def run(*args, **kwargs) -> T:
+        # a context cannot be entered by two threads at once: each call gets its own copy
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+def iterate_within(at: Optional[float], iterable: Iterable[T]) -> Iterator[T]:
+    """
+    Iterate `iterable` with the deadline `at` set around each step. For generators consumed
+    one item at a time from different contexts, e.g. a streamed response body.
+    """
+    iterator = iter(iterable)
+    while True:
+        with deadline_scope(at=at):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
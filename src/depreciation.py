@@ -0,0 +1,96 @@
+"""
+Depreciation curve fitted on the observed year series of a selection.
+
+Used to fill registration years without listings and to extrapolate long horizons
+from a few sampled anchor years instead of scraping every year.
+"""
+
+from math import exp, log
+from typing import List, NamedTuple, Sequence
+
+
+class AgeObservation(NamedTuple):
+    """One observed point: age in years (0 = newest), median price, stddev and sample count."""
+    age: float
+    price: float
+    stddev: float = 0.0
+    count: int = 1
+
+
+class DepreciationModel:
+    """
+    Exponential depreciation curve: price(age) = exp(intercept + slope * age).
+
+    Fitted by weighted least squares on log-prices. The variance of a log-median is roughly
+    (stddev / price)^2 / count, so each year is weighted by count / cv^2: years with many,
+    tightly clustered listings pull the curve more than years with a handful of outliers.
+    """
+
+    # Annual value retention assumed when a single year is observed (no slope to fit)
+    DEFAULT_ANNUAL_RETENTION = 0.85
+    # Floor on the coefficient of variation so a year with identical prices doesn't dominate
+    MIN_CV = 0.05
+
+    def __init__(self, intercept: float, slope: float, relative_stddev: float = 0.0):
+        self.intercept = float(intercept)
+        self.slope = float(slope)
+        self.relative_stddev = float(relative_stddev)
+
+    @classmethod
+    def fit(cls, observations: Sequence[AgeObservation]) -> "DepreciationModel":
+        """Fit the curve; raises ValueError when no observation has a positive price."""
+        points = [o for o in observations if o.price > 0]
+        if not points:
+            raise ValueError("at least one observation with a positive price is required")
+
+        weights = []
+        cvs = []
+        for o in points:
+            cv = max(o.stddev / o.price if o.stddev else 0.0, cls.MIN_CV)
+            cvs.append(cv)
+            weights.append(max(o.count, 1) / (cv * cv))
+        xs = [o.age for o in points]
+        ys = [log(o.price) for o in points]
+
+        total_w = sum(weights)
+        mean_x = sum(w * x for w, x in zip(weights, xs)) / total_w
+        mean_y = sum(w * y for w, y in zip(weights, ys)) / total_w
+        sxx = sum(w * (x - mean_x) ** 2 for w, x in zip(weights, xs))
+        sxy = sum(w * (x - mean_x) * (y - mean_y) for w, x, y in zip(weights, xs, ys))
+
+        if sxx > 0:
+            slope = sxy / sxx
+        else:
+            slope = log(cls.DEFAULT_ANNUAL_RETENTION)
+        # cars don't appreciate with age; treat a positive slope as noise
+        slope = min(slope, 0.0)
+        intercept = mean_y - slope * mean_x
+
+        relative_stddev = sum(w * cv for w, cv in zip(weights, cvs)) / total_w
+        return cls(intercept, slope, relative_stddev)
+
+    def predict(self, age: float) -> float:
+        """Predicted median price at `age`."""
+        return exp(self.intercept + self.slope * age)
+
+    def predict_stddev(self, age: float) -> float:
+        """Expected listing price spread at `age`, from the weighted average relative stddev."""
+        return self.predict(age) * self.relative_stddev
+
+    def annual_retention(self) -> float:
+        """Fraction of value kept from one year to the next."""
+        return exp(self.slope)
+
+
+def anchor_offsets(count: int, anchors: int) -> List[int]:
+    """
+    Pick `anchors` year offsets in [0, count) to scrape in sparse mode, always including the
+    newest and the oldest year and spacing the rest evenly in between.
+    """
+    if count <= 0:
+        return []
+    anchors = max(2, min(anchors, count))
+    if anchors >= count:
+        return list(range(count))
+    step = (count - 1) / (anchors - 1)
+    return sorted({round(i * step) for i in range(anchors)})
@@ -0,0 +1,176 @@
+"""
+Estimator: turn a fetched year series into the monthly cost breakdown returned
+by `/api/estimate` and the buy-vs-rent matrix returned by `/api/break_even_analysis`.
+"""
+
+import datetime
+from typing import Any, Dict, List, Optional
+from .calculator import CarValueCalculator, LoanCalculator
+from .models import BreakEvenAnalysisRequest, EstimateRequest, EstimateResponse, RegionSeries, YearStats
+from .regions import PER_REGION, region_series, region_zip_codes
+from .series import (
+    FITTED,
+    InsufficientDataError,
+    YearPrice,
+    assemble_year_series,
+    degradation_warning,
+    iter_year_prices,
+    sampling_offsets,
+    year_statistics,
+)
+
+
+def join_warnings(*warnings: Optional[str]) -> Optional[str]:
+    return " ".join(w for w in warnings if w) or None
+
+
+def estimate_costs(req: EstimateRequest, fetcher) -> EstimateResponse:
+    """
+    Fetch the registration years `req` needs and build its estimate: the whole pipeline behind
+    `/api/estimate`, also run by the batch CLI. Raises InsufficientDataError, or FetchError
+    (CircuitOpenError, DeadlineExceeded) when nothing could be fetched.
+    """
+    years_to_query = req.number_of_years + req.purchase_year_index + 1
+    current_year = req.registration_year or datetime.datetime.now().year
+    offsets = sampling_offsets(req, years_to_query)
+    points = list(iter_year_prices(fetcher, req, current_year, years_to_query, offsets))
+    return estimate_from_points(req, points, current_year, years_to_query)
+
+
+def estimate_from_points(
+    req: EstimateRequest, points: List[YearPrice], newest_year: int, count: int
+) -> EstimateResponse:
+    """The estimate for `req` from its fetched year points, with degradation warnings and statistics."""
+    year_values, std_devs, year_sources = assemble_year_series(req, points, newest_year, count)
+    estimate = build_estimate(req, year_values, std_devs, year_sources)
+    estimate.warning = join_warnings(estimate.warning, degradation_warning(points))
+    if req.combine_regions == PER_REGION and len(region_zip_codes(req)) >= 2:
+        estimate.regions = [RegionSeries(**series) for series in region_series(points)]
+    estimate.year_stats = [YearStats(**stats) for stats in year_statistics(points)]
+    return estimate
+
+
+def build_estimate(
+    req: EstimateRequest,
+    year_values: List[float],
+    std_devs: List[float],
+    year_sources: Optional[List[str]] = None,
+) -> EstimateResponse:
+    """
+    Compute the cost breakdown for `req` from the non-empty `year_values` (newest first).
+    When the series is shorter than requested the horizon is shortened, `req.number_of_years`
+    is updated in place and a warning is attached to the response.
+    `year_sources` flags each value as observed or fitted and is trimmed alongside.
+    """
+    warning = None
+    adjusted_years = None
+
+    required_values = req.purchase_year_index + req.number_of_years + 1
+    if len(year_values) < required_values:
+        max_years = len(year_values) - req.purchase_year_index - 1
+        if max_years < 1:
+            raise InsufficientDataError("Not enough historical data to perform an estimate.")
+
+        warning = (
+            f"Warning: Insufficient data for the requested {req.number_of_years}-year projection. "
+            f"Automatically adjusted to the maximum possible: {max_years} years."
+        )
+        adjusted_years = max_years
+        req.number_of_years = max_years
+        # Trim the lists to what's needed for the adjusted calculation
+        year_values = year_values[:req.purchase_year_index + max_years + 1]
+        std_devs = std_devs[:req.purchase_year_index + max_years + 1]
+        if year_sources is not None:
+            year_sources = year_sources[:req.purchase_year_index + max_years + 1]
+
+    loan_calc = LoanCalculator(req.loan_value, req.bank_rate_percent, req.loan_years)
+    loan_monthly, loan_total_interest = loan_calc.calculate_loan_costs()
+
+    calc = CarValueCalculator(year_values, req.number_of_years, req.monthly_maintenance, req.purchase_year_index)
+    monthly_depr = calc.monthly_depreciation()
+    monthly_tot = calc.monthly_total_cost(loan_monthly)
+
+    purchase_price = year_values[req.purchase_year_index]
+    final_value = year_values[req.purchase_year_index + req.number_of_years]
+
+    return EstimateResponse(
+        purchase_price=purchase_price,
+        estimated_final_value=final_value,
+        monthly_depreciation=monthly_depr,
+        monthly_maintenance=req.monthly_maintenance,
+        loan_monthly_payment=loan_monthly,
+        loan_total_interest=loan_total_interest,
+        total_monthly_cost=monthly_tot,
+        year_values=year_values,
+        warning=warning,
+        price_stddev=std_devs,
+        adjusted_number_of_years=adjusted_years,
+        year_sources=year_sources,
+    )
+
+
+def _purchase_description(purchase_offset: int) -> str:
+    if purchase_offset == 0:
+        return "Buy brand new"
+    if purchase_offset == 1:
+        return "Buy 1 year old"
+    return f"Buy {purchase_offset} years old"
+
+
+def build_break_even_analysis(
+    req: BreakEvenAnalysisRequest,
+    year_values: List[float],
+    year_sources: Optional[List[str]] = None,
+    warning: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Cost of buying at every age and reselling at every later age, against renting.
+    `year_values` is indexed by age (newest first) with 0.0 for years without a price.
+
+    The result is O(n^2) data points, so it is returned as plain JSON-ready data with the
+    shape of `BreakEvenAnalysisResponse` rather than as validated models; see
+    `responses.FastJSONResponse`.
+    """
+    n = len(year_values)
+    fitted = [s == FITTED for s in year_sources] if year_sources else [False] * n
+    maintenance_per_year = req.monthly_maintenance * 12
+
+    purchase_series = []
+    for purchase_offset in range(n):
+        purchase_price = year_values[purchase_offset]
+        if purchase_price == 0:
+            continue
+
+        data_points = []
+        for sell_offset in range(purchase_offset + 1, n):
+            sell_price = year_values[sell_offset]
+            if sell_price == 0:
+                continue
+
+            years_owned = sell_offset - purchase_offset
+            overall_cost = purchase_price - sell_price + maintenance_per_year * years_owned
+            data_points.append({
+                "years_owned": years_owned,
+                "overall_cost": overall_cost,
+                "monthly_cost": overall_cost / (years_owned * 12),
+                "fitted": fitted[purchase_offset] or fitted[sell_offset],
+            })
+
+        purchase_series.append({
+            "purchase_description": _purchase_description(purchase_offset),
+            "data_points": data_points,
+        })
+
+    rent = float(req.rent_monthly_cost)
+    rental_series = [
+        {"years_owned": y, "overall_cost": rent * 12 * y, "monthly_cost": rent, "fitted": False}
+        for y in range(1, req.max_years + 1)
+    ]
+
+    return {
+        "rental_series": rental_series,
+        "purchase_series": purchase_series,
+        "year_values": list(year_values),
+        "year_sources": year_sources,
+        "warning": warning,
+    }
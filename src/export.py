@@ -0,0 +1,207 @@
+"""
+Columnar export of the observation store (see `store`): the scraped year-series
+observations and the break-even matrices, filtered by brand, model and date range.
+
+Formats: typed CSV (always available; the column types are published alongside, see
+`schema`), and Parquet or an Arrow IPC stream when the optional `pyarrow` package is
+installed. Rows are read and encoded chunk by chunk, so an export never holds more than
+one chunk in memory.
+
+    python -m src.export observations -o prices.parquet [--brand fiat] [--model panda]
+                        [--since 2024-01-01] [--until 2024-06-30] [--format csv|parquet|arrow]
+"""
+
+import argparse
+import csv
+import datetime
+import importlib.util
+import io
+import json
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .store import DATASETS, ExportFilter, ObservationStore, StoreConfig, open_store, parse_date
+
+CSV = "csv"
+PARQUET = "parquet"
+ARROW = "arrow"
+FORMATS = (CSV, PARQUET, ARROW)
+MEDIA_TYPES = {
+    CSV: "text/csv; charset=utf-8",
+    PARQUET: "application/vnd.apache.parquet",
+    ARROW: "application/vnd.apache.arrow.stream",
+}
+EXTENSIONS = {".csv": CSV, ".parquet": PARQUET, ".arrow": ARROW, ".arrows": ARROW}
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def available_formats() -> List[str]:
+    """CSV, plus Parquet and Arrow when pyarrow is installed."""
+    if importlib.util.find_spec("pyarrow") is None:
+        return [CSV]
+    return list(FORMATS)
+
+
+def schema(dataset: str) -> Dict[str, str]:
+    """Column name -> type (string, int32, int64, float64, bool, timestamp) of a dataset."""
+    return dict(DATASETS[dataset])
+
+
+def _timestamp(value: float) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(value, tz=datetime.timezone.utc)
+
+
+def _csv_cell(value, column_type: str):
+    if value is None:
+        return ""
+    if column_type == "timestamp":
+        return _timestamp(value).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    if column_type == "bool":
+        return "true" if value else "false"
+    if column_type == "float64":
+        return repr(float(value))
+    return value
+
+
+def _csv_chunks(columns: Sequence[Tuple[str, str]], chunks: Iterable[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(name for name, _ in columns)
+    types = [column_type for _, column_type in columns]
+    for rows in chunks:
+        writer.writerows([_csv_cell(value, t) for value, t in zip(row, types)] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file collecting what pyarrow writes until it is drained; keeps the absolute position."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_chunks(columns: Sequence[Tuple[str, str]], chunks: Iterable[List[tuple]], fmt: str) -> Iterator[bytes]:
+    import pyarrow as pa
+
+    arrow_types = {"string": pa.string(), "int32": pa.int32(), "int64": pa.int64(), "float64": pa.float64(),
+                   "bool": pa.bool_(), "timestamp": pa.timestamp("ms", tz="UTC")}
+    converters = {"timestamp": _timestamp, "bool": bool}
+    arrow_schema = pa.schema([(name, arrow_types[column_type]) for name, column_type in columns])
+    sink = _ChunkSink()
+    if fmt == PARQUET:
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, arrow_schema)
+    else:
+        writer = pa.ipc.new_stream(sink, arrow_schema)
+    try:
+        for rows in chunks:
+            arrays = []
+            for index, (name, column_type) in enumerate(columns):
+                convert = converters.get(column_type)
+                values = [row[index] if convert is None or row[index] is None else convert(row[index])
+                          for row in rows]
+                arrays.append(pa.array(values, type=arrow_types[column_type]))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=arrow_schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def export_chunks(store: ObservationStore, dataset: str, fmt: str = CSV,
+                  filters: ExportFilter = ExportFilter(), chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Encoded export of `dataset`, one piece per chunk of rows. Raises ValueError for unknown datasets/formats."""
+    if dataset not in DATASETS:
+        raise ValueError(f"unknown dataset {dataset!r}, expected one of {', '.join(DATASETS)}")
+    if fmt not in available_formats():
+        raise ValueError(f"format {fmt!r} is not available, expected one of {', '.join(available_formats())}")
+    columns = DATASETS[dataset]
+    chunks = store.iter_rows(dataset, filters, chunk_size)
+    if fmt == CSV:
+        return _csv_chunks(columns, chunks)
+    return _arrow_chunks(columns, chunks, fmt)
+
+
+def build_filter(brand: Optional[str] = None, model: Optional[str] = None,
+                 since: Optional[str] = None, until: Optional[str] = None) -> ExportFilter:
+    """ExportFilter from user input; dates are ISO dates or datetimes, `until` inclusive. Raises ValueError."""
+    return ExportFilter(
+        brand=brand or None,
+        model=model or None,
+        since=parse_date(since) if since else None,
+        until=parse_date(until, end=True) if until else None,
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Export collected price observations or break-even matrices.")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("-o", "--output", required=True, help="output file, '-' for stdout")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the output extension, else csv")
+    parser.add_argument("--store", help="SQLite store (default: CARCALC_STORE_PATH)")
+    parser.add_argument("--brand")
+    parser.add_argument("--model")
+    parser.add_argument("--since", help="first day (ISO date or datetime, UTC)")
+    parser.add_argument("--until", help="last day, inclusive")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    store = open_store(StoreConfig(args.store) if args.store else StoreConfig.from_env())
+    if store is None:
+        print("no observation store: pass --store or set CARCALC_STORE_PATH", file=sys.stderr)
+        return 2
+    fmt = args.format or next((f for ext, f in EXTENSIONS.items() if args.output.lower().endswith(ext)), CSV)
+    try:
+        chunks = export_chunks(store, args.dataset, fmt,
+                               build_filter(args.brand, args.model, args.since, args.until), args.chunk_size)
+        out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+    except ValueError as ex:
+        print(str(ex), file=sys.stderr)
+        return 2
+    finally:
+        store.close()
+    if fmt == CSV and args.output != "-":
+        # the column types, for readers of the typed CSV
+        with open(args.output + ".schema.json", "w", encoding="utf-8") as fh:
+            json.dump(schema(args.dataset), fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,51 +5,233 @@ Fetcher: stable wrappers around the AutoScout24 scraping logic
 - returns normalized Python types
 """
 
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, NamedTuple, Optional
+import logging
+import os
+import threading
 import time
-from bs4 import BeautifulSoup
-import yaml
-import requests
-from .utils import create_retry_session
-import re
+from . import deadline, freshness
+from .breaker import CircuitBreaker, CircuitBreakerConfig
+from .cache import CacheBackend, CacheConfig, create_cache, register_type
+from .geo import coordinates_for_zip
+from .hedging import Hedger, HedgingConfig
+from .parse_pool import ParseConfig, ParseError, ParseExecutor
+from .parsing import (
+    StreamConfig, extract_price, parse_dropdowns, parse_listing_prices, parse_make_ids, read_listing_prices,
+)
+from .probing import YearSpan, probe_year_span
+from .stats import PriceAccumulator
+from .snapshot import SnapshotConfig, SnapshotReader, open_snapshot
+from .store import ObservationStore, StoreConfig, open_store
+from .transport import Transport, TransportConfig, TransportError, create_transport
 
-DEFAULT_BASE_URL = "https://www.autoscout24.it/"
+logger = logging.getLogger(__name__)
 
-# instantiate a session for reuse
-_SESSION = create_retry_session()
+# CARCALC_UPSTREAM_URL points the scraper elsewhere, e.g. at the load-test stand-in (loadtest/)
+DEFAULT_BASE_URL = os.getenv("CARCALC_UPSTREAM_URL", "https://www.autoscout24.it/")
+
+# HTTP statuses that mean the upstream is unhealthy or blocking us (others, e.g. 404, do not)
+_BREAKER_STATUSES = frozenset({403, 429})
+
+# shared by every Fetcher: all of them talk to the same upstream
+upstream_breaker = CircuitBreaker(CircuitBreakerConfig.from_env())
+
+# opt-in (CARCALC_HEDGE): duplicates slow listing-page requests within a global budget
+upstream_hedger = Hedger(HedgingConfig.from_env())
+
+# opt-in (CARCALC_PARSE_WORKERS): page parsing in worker processes, started by the app
+parse_executor = ParseExecutor(ParseConfig.from_env())
+
+# bs4, yaml and the HTTP client are imported on first use, and the transport (with its
+# connection pools) is only built by the first upstream request, so importing this
+# module (and the API) stays cheap.
+_transport: Optional[Transport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> Transport:
+    """Shared upstream transport, created on first use from the CARCALC_HTTP_* settings."""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = create_transport(TransportConfig.from_env())
+    return _transport
+
+
+def set_transport(transport: Optional[Transport]) -> None:
+    """Replace the shared transport (closing the previous one); None resets to the lazy default."""
+    global _transport
+    with _transport_lock:
+        previous, _transport = _transport, transport
+    if previous is not None and previous is not transport:
+        previous.close()
+
+
+def close_transport() -> None:
+    """Close the shared transport's pooled connections; the next request opens a new one."""
+    set_transport(None)
+
+
+def __getattr__(name: str):
+    # backwards compatible access to the former module-level requests session
+    if name == "_SESSION":
+        return getattr(get_transport(), "session", None)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class FetchError(RuntimeError):
     """Raised when fetching/parsing fails in a recoverable manner."""
 
 
-def _safe_get(url: str, timeout: float = 10.0) -> requests.Response:
-    """Perform HTTP GET with configured session, raise FetchError on failure."""
+class CircuitOpenError(FetchError):
+    """Raised without contacting the upstream while the circuit breaker is open."""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(FetchError):
+    """Raised when the request's time budget (see `deadline`) ran out before or during an upstream call."""
+
+
+def _parse(parse, content: bytes, url: str):
+    """
+    `parse(content)` through the parse executor; raise DeadlineExceeded when the wait for a
+    worker was cut short by the request deadline, FetchError when it timed out otherwise.
+    """
+    try:
+        return parse_executor.run(parse, content)
+    except ParseError as ex:
+        if deadline.expired():
+            raise DeadlineExceeded(f"time budget exhausted while parsing {url}") from ex
+        raise FetchError(f"parsing {url} failed: {ex}") from ex
+
+
+@register_type
+class PriceStats(NamedTuple):
+    """
+    Price statistics for one listing search: median, standard deviation and number of prices,
+    computed after dropping outliers (see `stats.PriceAccumulator`), plus the spread of the prices.
+    """
+    median: int
+    stddev: float
+    count: int = 0
+    # True when served from an expired cache entry because the upstream was unavailable
+    stale: bool = False
+    p10: float = 0.0
+    p90: float = 0.0
+    trimmed_mean: float = 0.0
+    outliers: int = 0        # prices rejected as mis-parsed
+
+
+def summarize_prices(prices: PriceAccumulator) -> PriceStats:
+    """PriceStats of the prices fed to `prices`; PriceStats(0, 0.0, 0) when there were none."""
+    summary = prices.summary()
+    if summary is None:
+        return PriceStats(0, 0.0, 0)
+    # robust central tendency: median of the prices left after outlier rejection
+    return PriceStats(int(summary.median), summary.stddev, summary.count,
+                      p10=summary.p10, p90=summary.p90, trimmed_mean=round(summary.trimmed_mean, 2),
+                      outliers=summary.outliers)
+
+
+def _safe_get(url: str, timeout: Optional[float] = None, hedge: bool = False, consume=None):
+    """
+    Perform HTTP GET through the shared transport, raise FetchError on failure.
+    With `consume`, the body is streamed to it and its result is returned instead of the
+    response (see `transport.Transport.stream`); a hedged request then hedges both.
+    `timeout` overrides the per-attempt read timeout; retries are budgeted separately.
+    With `hedge`, and hedging enabled, a slow request is duplicated once (see `hedging.Hedger`);
+    the breaker still counts one outcome per call.
+    Fails fast with CircuitOpenError while the upstream circuit breaker is open, and with
+    DeadlineExceeded once the request deadline has passed (timeouts are cut to the time left).
+    """
+    if deadline.expired():
+        raise DeadlineExceeded(f"time budget exhausted before requesting {url}")
+    if not upstream_breaker.allow():
+        retry_after = upstream_breaker.retry_after()
+        raise CircuitOpenError(f"upstream unavailable, retrying in {retry_after:.0f}s", retry_after)
     try:
-        resp = _SESSION.get(url, timeout=timeout)
-        resp.raise_for_status()
-        return resp
-    except requests.RequestException as ex:
+        if consume is not None:
+            def fetch():
+                return get_transport().stream(url, consume, timeout=timeout)
+        else:
+            def fetch():
+                return get_transport().get(url, timeout=timeout)
+        resp = upstream_hedger.call(fetch) if hedge and upstream_hedger.enabled else fetch()
+    except TransportError as ex:
+        if ex.status is None and deadline.expired():
+            # cut short by our own budget: says nothing about the upstream's health
+            upstream_breaker.release()
+            raise DeadlineExceeded(f"time budget exhausted while requesting {url}") from ex
+        if ex.status is None or ex.status >= 500 or ex.status in _BREAKER_STATUSES:
+            upstream_breaker.record_failure()
+        else:
+            upstream_breaker.record_success()
         raise FetchError(f"HTTP error for {url}: {ex}") from ex
+    upstream_breaker.record_success()
+    return resp
+
+
+def selection_key(selected_values: Dict[str, object], include_year: bool = True) -> str:
+    """Canonical cache key for a listing selection (case/spacing-insensitive, gear order ignored)."""
+    def norm(name: str) -> str:
+        return str(selected_values.get(name) or "").strip().lower().replace(" ", "-")
+
+    shift = selected_values.get("shift_type") or []
+    parts = [norm("make"), norm("model"), norm("details"), norm("zip"), ",".join(sorted(shift))]
+    if include_year:
+        parts.append(str(selected_values.get("firstRegistration") or ""))
+    return "|".join(parts)
 
 
 class Fetcher:
-    def __init__(self, base_url: str = DEFAULT_BASE_URL):
+    # Listing results are cached per selection; empty years are cached longer since a year
+    # without listings (e.g. before a model's launch) rarely becomes populated.
+    PRICE_TTL = 3600.0
+    EMPTY_TTL = 12 * 3600.0
+    # brand and model catalogs change rarely
+    CATALOG_TTL = 6 * 3600.0
+    # expired prices are kept this much longer, to answer while the upstream is down
+    STALE_TTL = 24 * 3600.0
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, cache: Optional[CacheBackend] = None,
+                 store: Optional[ObservationStore] = None, snapshot: Optional[SnapshotReader] = None):
         self.base_url = base_url.rstrip("/") + "/"
+        if cache is None:
+            cache = create_cache(CacheConfig.from_env(), default_ttl=self.PRICE_TTL, stale_ttl=self.STALE_TTL)
+        self.cache = cache
+        # with CARCALC_STREAM_LISTINGS=1, listing pages are streamed and parsed incrementally
+        self.stream_config = StreamConfig.from_env()
+        # every scrape is also appended here, when configured (CARCALC_STORE_PATH)
+        self.store = store if store is not None else open_store(StoreConfig.from_env())
+        # the shared read-only price table, consulted on cache misses (CARCALC_SNAPSHOT_PATH)
+        self.snapshot = snapshot if snapshot is not None else open_snapshot(SnapshotConfig.from_env())
 
     def fetch_dropdown_options(self, url: Optional[str] = None, selected_values: Optional[Dict[str, str]] = None) -> Dict[str, List[str]]:
         """
         Fetch HTML and parse all <select> dropdowns found on the page.
         If selected_values contains 'make', attempt to fetch models for that brand (via API endpoint).
+        The plain home-page catalog (no url, no selection) is cached for CATALOG_TTL.
         """
-        url = url or self.base_url
+        if url is None and not selected_values:
+            cached = self.cache.get("catalog:dropdowns")
+            if cached is not None:
+                return cached
+            with self.cache.lock("catalog:dropdowns"):
+                cached = self.cache.get("catalog:dropdowns")
+                if cached is not None:
+                    return cached
+                dropdowns = self._scrape_dropdown_options(self.base_url, None)
+                self.cache.set("catalog:dropdowns", dropdowns, self.CATALOG_TTL)
+                return dropdowns
+        return self._scrape_dropdown_options(url or self.base_url, selected_values)
+
+    def _scrape_dropdown_options(self, url: str, selected_values: Optional[Dict[str, str]]) -> Dict[str, List[str]]:
         resp = _safe_get(url)
-        soup = BeautifulSoup(resp.content, "html.parser")
-        dropdowns: Dict[str, List[str]] = {}
-        for select in soup.find_all("select"):
-            name = select.get("name") or "unnamed"
-            opts = [opt.text.strip() for opt in select.find_all("option") if opt.text and opt.text.strip()]
-            dropdowns[name] = opts
+        dropdowns = _parse(parse_dropdowns, resp.content, url)
 
         if selected_values:
             make = (selected_values.get("make") or "").strip().lower()
@@ -71,17 +253,22 @@ class Fetcher:
         Query AutoScout taxonomy endpoint for models given a brand name string (case-insensitive).
         Returns a list of model slugs (lowercase, hyphenated).
         """
+        key = "catalog:models:" + brand_name.strip().lower()
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        with self.cache.lock(key):
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            models = self._scrape_car_models(brand_name)
+            self.cache.set(key, models, self.CATALOG_TTL)
+            return models
+
+    def _scrape_car_models(self, brand_name: str) -> List[str]:
         # step 1: fetch home page to map brand names -> id values
         resp = _safe_get(self.base_url)
-        soup = BeautifulSoup(resp.content, "html.parser")
-        lookup: Dict[str, str] = {}
-        for select in soup.find_all("select"):
-            if select.get("name") == "make":
-                for opt in select.find_all("option"):
-                    text = (opt.text or "").strip().lower()
-                    value = opt.get("value") or ""
-                    if text:
-                        lookup[text] = value
+        lookup = _parse(parse_make_ids, resp.content, self.base_url)
 
         brand_id = lookup.get(brand_name.lower())
         if not brand_id:
@@ -93,7 +280,7 @@ class Fetcher:
         if not brand_id:
             raise FetchError(f"brand '{brand_name}' not found on {self.base_url}")
 
-        api_url = f"https://www.autoscout24.it/as24-home/api/taxonomy/cars/makes/{brand_id}/models"
+        api_url = f"{self.base_url}as24-home/api/taxonomy/cars/makes/{brand_id}/models"
         try:
             resp = _safe_get(api_url)
         except FetchError:
@@ -103,6 +290,7 @@ class Fetcher:
         try:
             data = resp.json()
         except ValueError:
+            import yaml
             data = yaml.safe_load(resp.content)
 
         models: List[str] = []
@@ -164,8 +352,9 @@ class Fetcher:
         q.append("cy=I")
         q.append("damaged_listing=exclude")
         q.append("desc=0")
-        q.append("lat=45.07086")
-        q.append("lon=7.643")
+        coordinates = coordinates_for_zip(zip_code)
+        q.append(f"lat={coordinates.lat}")
+        q.append(f"lon={coordinates.lon}")
         q.append("powertype=kw")
         q.append("sort=standard")
         return url + "?" + "&".join(q)
@@ -174,80 +363,123 @@ class Fetcher:
 
     @staticmethod
     def _extract_price_from_node(node_text: str) -> Optional[int]:
+        """The last euro amount in `node_text` (see `parsing.extract_price`)."""
+        return extract_price(node_text)
+
+    def fetch_car_costs(self, selected_values: Dict[str, object]) -> (int, float):
         """
-        Extract the last integer EUR value from a string that may contain one or more
-        euro amounts, e.g.:
-            '€ 55.900 Ottimo prezzo'       -> 55900
-            '€ 57.900,- € 49.900 1 ND'     -> 49900  (take the last euro amount only)
-            '€ 49.900 1'                   -> 49900  (ignore trailing '1')
-        Handles thousand separators ('.' or space/NBSP) and optional ',-' or decimal parts.
+        Fetch the listing page(s) and extract the representative price for a given selection.
+        Returns an integer EUR estimate (e.g. median of found listing prices) or 0 when none found.
+        This function is defensive: it will try to parse multiple listing price nodes and take the median.
         """
-        if not node_text:
-            return None
-
-        # Normalize non-breaking spaces to regular spaces (common on scraped sites)
-        s = node_text.replace("\xa0", " ")
-
-        # Regex notes:
-        # - '€\\s*'                : Euro symbol followed by optional whitespace
-        # - '((?:\\d{1,3}(?:[.\\s]\\d{3})+|\\d+))' : capture the integer-euro part
-        #        Either:           1..3 digits + one or more (separator + 3 digits) groups (e.g. 53.900, 1 234 567)
-        #        Or:               a plain integer (e.g. 49900)
-        # - '(?:,\\d{1,2})?'       : optional decimal part with comma (ignored, not captured)
-        pattern = re.compile(r"€\s*((?:\d{1,3}(?:[.\s]\d{3})+|\d+))(?:,\d{1,2})?")
+        stats = self.fetch_price_stats(selected_values)
+        return stats.median, stats.stddev
 
-        matches = [m.group(1) for m in pattern.finditer(s)]
-        if not matches:
+    def fetch_price_stats(self, selected_values: Dict[str, object], refresh: bool = False) -> PriceStats:
+        """
+        Same as `fetch_car_costs` but also reports how many listing prices were found,
+        so callers can weight years by sample size. Returns PriceStats(0, 0, 0) when none found.
+        Results are cached, empty ones included (negative caching); `refresh=True` skips the
+        cache lookup and re-scrapes, e.g. to pre-warm an entry before it expires.
+        When the upstream fails, an expired entry (up to STALE_TTL old) is returned flagged `stale`.
+        Misses are looked up in the price snapshot, when configured, before scraping.
+        Concurrent misses of the same selection (in any worker sharing the cache) scrape it once.
+        When the answer expires is noted in the current `freshness` scope.
+        """
+        key = "price:" + selection_key(selected_values)
+        cached = None if refresh else self._cached_stats(key) or self._snapshot_stats(selected_values)
+        if cached is not None:
+            return cached
+
+        with self.cache.lock(key, wait=deadline.clip(self.cache.lock_wait)):
+            # the previous holder of the lock has most likely just stored it
+            cached = None if refresh else self._cached_stats(key)
+            if cached is not None:
+                return cached
+            try:
+                stats = self._scrape_price_stats(selected_values)
+            except FetchError:
+                stale = (self.cache.get(key, allow_stale=True)
+                         or self._snapshot_stats(selected_values, extra_age=self.STALE_TTL))
+                if stale is None:
+                    raise
+                logger.warning("upstream unavailable, serving stale prices for %s", key)
+                return stale._replace(stale=True)
+            ttl = self.PRICE_TTL if stats.median > 0 else self.EMPTY_TTL
+            self.cache.set(key, stats, ttl)
+            freshness.note(time.time() + ttl)
+            if self.store is not None:
+                self.store.record_observation(selected_values, stats)
+            return stats
+
+    def has_price_stats(self, selected_values: Dict[str, object]) -> bool:
+        """True when `fetch_price_stats` would answer from the cache or snapshot, without scraping."""
+        return ("price:" + selection_key(selected_values) in self.cache
+                or self._snapshot_stats(selected_values) is not None)
+
+    def _cached_stats(self, key: str) -> Optional[PriceStats]:
+        entry = self.cache.get_fresh(key)
+        if entry is None:
             return None
+        stats, fresh_for = entry
+        freshness.note(time.time() + fresh_for)
+        return stats
 
-        # Take the last euro amount found (typical format shows current price last)
-        last = matches[-1]
-
-        # Normalize thousand separators (dot/space) and cast to int
-        last = last.replace(" ", "").replace(".", "")
-        try:
-            return int(last)
-        except ValueError:
+    def _snapshot_stats(self, selected_values: Dict[str, object], extra_age: float = 0.0) -> Optional[PriceStats]:
+        """
+        The snapshot's PriceStats for a selection while still fresh by the cache TTLs (plus
+        `extra_age`, past which they are flagged stale), None otherwise.
+        """
+        if self.snapshot is None:
             return None
+        entry = self.snapshot.get(selection_key(selected_values, include_year=False),
+                                  int(selected_values.get("firstRegistration") or 0))
+        if entry is None:
+            return None
+        ttl = self.PRICE_TTL if entry.median > 0 else self.EMPTY_TTL
+        age = time.time() - entry.observed_at
+        if age > ttl + extra_age:
+            return None
+        if age <= ttl:
+            freshness.note(entry.observed_at + ttl)
+        return PriceStats(int(entry.median), entry.stddev, entry.count, stale=age > ttl, p10=entry.p10,
+                          p90=entry.p90, trimmed_mean=entry.trimmed_mean, outliers=entry.outliers)
 
-
-    def fetch_car_costs(self, selected_values: Dict[str, object]) -> (int, float):
+    def find_year_span(self, selected_values: Dict[str, object], newest_year: int, oldest_year: int,
+                       fetch: Optional[Callable[[Dict[str, object]], PriceStats]] = None):
         """
-        Fetch the listing page(s) and extract the representative price for a given selection.
-        Returns an integer EUR estimate (e.g. median of found listing prices) or 0 when none found.
-        This function is defensive: it will try to parse multiple listing price nodes and take the median.
+        Return (span, probes) for the registration years in [oldest_year, newest_year] that have
+        listings, see `probing.probe_year_span`. `probes` maps probed years to their PriceStats.
+        The span is cached per selection so later requests skip the probing entirely.
+        Each year is probed with `fetch` (default: `fetch_price_stats`), which lets proxies
+        apply their limits per probe.
         """
-        url = self.construct_search_url(selected_values)
-        resp = _safe_get(url)
-        soup = BeautifulSoup(resp.content, "html.parser")
-
-        # heuristics: find price nodes by class or by euro symbol presence
-        price_texts = []
-        # primary: look for known class
-        for div in soup.find_all("div", class_=re.compile(r"Price|price", re.I)):
-            txt = (div.get_text(separator=" ", strip=True) or "")
-            if "€" in txt:
-                price_texts.append(txt)
-
-        # fallback: search for literal € in any element
-        if not price_texts:
-            for el in soup.find_all(text=re.compile(r"€\s*\d")):
-                price_texts.append(str(el))
-
-        # parse ints
-        prices = [self._extract_price_from_node(t) for t in price_texts]
-        prices = [p for p in prices if p is not None and p > 0]
-
-        if not prices:
-            return 0, 0
-
-        # choose robust central tendency: median
-        import statistics
-        try:
-            median_price = int(statistics.median(prices))
-            price_stddev = statistics.stdev(prices) if len(prices) > 1 else 0.0
-        except Exception:
-            median_price = int(prices[0])
-            price_stddev = 0.0
+        fetch = fetch or self.fetch_price_stats
+        key = f"span:{selection_key(selected_values, include_year=False)}:{newest_year}:{oldest_year}"
+        cached = self.cache.get(key)
+        if cached is not None:
+            return (cached if cached.newest >= cached.oldest else None), {}
 
-        return median_price, price_stddev
+        def fetch_year(year: int) -> PriceStats:
+            return fetch({**selected_values, "firstRegistration": year})
+
+        span, probes = probe_year_span(fetch_year, newest_year, oldest_year)
+        # an empty window is remembered as an inverted span so that nothing is fetched
+        self.cache.set(key, span or YearSpan(oldest_year - 1, oldest_year), self.EMPTY_TTL)
+        return span, probes
+
+    def _scrape_price_stats(self, selected_values: Dict[str, object]) -> PriceStats:
+        url = self.construct_search_url(selected_values)
+        if self.stream_config.enabled:
+            config = self.stream_config
+            scan = _safe_get(url, hedge=True, consume=lambda body: read_listing_prices(body, body.encoding, config))
+            logger.debug("listing page %s: %d bytes read%s", url, scan.bytes_read,
+                         " (stopped after the listings)" if scan.stopped_early else "")
+            return summarize_prices(scan.prices)
+
+        resp = _safe_get(url, hedge=True)
+        # the page is parsed in a worker process when the parse pool is up
+        prices = PriceAccumulator()
+        for price in _parse(parse_listing_prices, resp.content, url):
+            prices.add(price)
+        return summarize_prices(prices)
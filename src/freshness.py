@@ -0,0 +1,56 @@
+"""
+Freshness of the prices behind a response.
+
+Within a `freshness_scope`, `Fetcher.fetch_price_stats` notes when each price it returns
+stops being fresh (the expiry of its cache entry or snapshot record); the endpoint then
+caps its Cache-Control max-age to the time left before the first of them expires, so
+that a downstream cache never keeps a price longer than the Fetcher cache would. Like the deadline, the
+scope follows work handed to other threads through `deadline.propagate`.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+
+class Freshness:
+    """Earliest expiry (time.time() value) of the prices noted so far; thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.expires_at: Optional[float] = None
+
+    def note(self, expires_at: float) -> None:
+        with self._lock:
+            if self.expires_at is None or expires_at < self.expires_at:
+                self.expires_at = expires_at
+
+    def max_age(self, ttl: float, now: Optional[float] = None) -> int:
+        """Seconds a response built from the noted prices may be cached, at most `ttl`."""
+        if self.expires_at is None:
+            return int(ttl)
+        left = self.expires_at - (time.time() if now is None else now)
+        return max(0, min(int(ttl), int(left)))
+
+
+_scope: ContextVar[Optional[Freshness]] = ContextVar("carcalc_freshness", default=None)
+
+
+@contextmanager
+def freshness_scope() -> Iterator[Freshness]:
+    """Collect the expiry of the prices fetched in the block."""
+    freshness = Freshness()
+    token = _scope.set(freshness)
+    try:
+        yield freshness
+    finally:
+        _scope.reset(token)
+
+
+def note(expires_at: float) -> None:
+    """Record a price's expiry in the current scope, if any."""
+    freshness = _scope.get()
+    if freshness is not None:
+        freshness.note(expires_at)
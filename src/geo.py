@@ -0,0 +1,129 @@
+"""
+Approximate coordinates for Italian postal codes (CAP).
+
+The listing search centres its radius on `lat`/`lon`, so they have to follow the
+requested zip code. The first two digits of a CAP identify its province area;
+each prefix maps to the coordinates of the main town of that area, which is
+precise enough for a 200 km search radius.
+"""
+
+import re
+from typing import NamedTuple, Optional
+
+
+class Coordinates(NamedTuple):
+    lat: float
+    lon: float
+
+
+# Turin: the coordinates the search used before they followed the zip code
+DEFAULT_COORDINATES = Coordinates(45.07086, 7.643)
+
+_CAP_PREFIXES = {
+    "00": Coordinates(41.9028, 12.4964),   # Roma
+    "01": Coordinates(42.4207, 12.1077),   # Viterbo
+    "02": Coordinates(42.4040, 12.8568),   # Rieti
+    "03": Coordinates(41.6396, 13.3511),   # Frosinone
+    "04": Coordinates(41.4676, 12.9037),   # Latina
+    "05": Coordinates(42.5636, 12.6427),   # Terni
+    "06": Coordinates(43.1107, 12.3908),   # Perugia
+    "07": Coordinates(40.7259, 8.5557),    # Sassari
+    "08": Coordinates(40.3210, 9.3300),    # Nuoro
+    "09": Coordinates(39.2238, 9.1217),    # Cagliari
+    "10": DEFAULT_COORDINATES,             # Torino
+    "11": Coordinates(45.7376, 7.3172),    # Aosta
+    "12": Coordinates(44.3845, 7.5427),    # Cuneo
+    "13": Coordinates(45.3202, 8.4186),    # Vercelli / Biella
+    "14": Coordinates(44.9008, 8.2064),    # Asti
+    "15": Coordinates(44.9131, 8.6151),    # Alessandria
+    "16": Coordinates(44.4056, 8.9463),    # Genova
+    "17": Coordinates(44.3091, 8.4772),    # Savona
+    "18": Coordinates(43.8897, 8.0393),    # Imperia
+    "19": Coordinates(44.1025, 9.8241),    # La Spezia
+    "20": Coordinates(45.4642, 9.1900),    # Milano
+    "21": Coordinates(45.8206, 8.8251),    # Varese
+    "22": Coordinates(45.8081, 9.0852),    # Como
+    "23": Coordinates(46.1699, 9.8715),    # Sondrio / Lecco
+    "24": Coordinates(45.6983, 9.6773),    # Bergamo
+    "25": Coordinates(45.5416, 10.2118),   # Brescia
+    "26": Coordinates(45.1332, 10.0227),   # Cremona / Lodi
+    "27": Coordinates(45.1847, 9.1582),    # Pavia
+    "28": Coordinates(45.4469, 8.6220),    # Novara / Verbania
+    "29": Coordinates(45.0526, 9.6930),    # Piacenza
+    "30": Coordinates(45.4408, 12.3155),   # Venezia
+    "31": Coordinates(45.6669, 12.2430),   # Treviso
+    "32": Coordinates(46.1425, 12.2167),   # Belluno
+    "33": Coordinates(46.0711, 13.2346),   # Udine / Pordenone
+    "34": Coordinates(45.6495, 13.7768),   # Trieste / Gorizia
+    "35": Coordinates(45.4064, 11.8768),   # Padova
+    "36": Coordinates(45.5455, 11.5354),   # Vicenza
+    "37": Coordinates(45.4384, 10.9916),   # Verona
+    "38": Coordinates(46.0748, 11.1217),   # Trento
+    "39": Coordinates(46.4983, 11.3548),   # Bolzano
+    "40": Coordinates(44.4949, 11.3426),   # Bologna
+    "41": Coordinates(44.6471, 10.9252),   # Modena
+    "42": Coordinates(44.6983, 10.6312),   # Reggio Emilia
+    "43": Coordinates(44.8015, 10.3279),   # Parma
+    "44": Coordinates(44.8381, 11.6198),   # Ferrara
+    "45": Coordinates(45.0703, 11.7900),   # Rovigo
+    "46": Coordinates(45.1564, 10.7914),   # Mantova
+    "47": Coordinates(44.2227, 12.0407),   # Forlì-Cesena / Rimini
+    "48": Coordinates(44.4184, 12.2035),   # Ravenna
+    "50": Coordinates(43.7696, 11.2558),   # Firenze
+    "51": Coordinates(43.9330, 10.9177),   # Pistoia
+    "52": Coordinates(43.4633, 11.8797),   # Arezzo
+    "53": Coordinates(43.3188, 11.3308),   # Siena
+    "54": Coordinates(44.0354, 10.1398),   # Massa-Carrara
+    "55": Coordinates(43.8429, 10.5027),   # Lucca
+    "56": Coordinates(43.7228, 10.4017),   # Pisa
+    "57": Coordinates(43.5485, 10.3106),   # Livorno
+    "58": Coordinates(42.7635, 11.1124),   # Grosseto
+    "59": Coordinates(43.8777, 11.1022),   # Prato
+    "60": Coordinates(43.6158, 13.5189),   # Ancona
+    "61": Coordinates(43.9100, 12.9133),   # Pesaro-Urbino
+    "62": Coordinates(43.2984, 13.4535),   # Macerata
+    "63": Coordinates(42.8540, 13.5749),   # Ascoli Piceno / Fermo
+    "64": Coordinates(42.6589, 13.7044),   # Teramo
+    "65": Coordinates(42.4618, 14.2161),   # Pescara
+    "66": Coordinates(42.3512, 14.1675),   # Chieti
+    "67": Coordinates(42.3498, 13.3995),   # L'Aquila
+    "70": Coordinates(41.1171, 16.8719),   # Bari
+    "71": Coordinates(41.4622, 15.5446),   # Foggia
+    "72": Coordinates(40.6327, 17.9418),   # Brindisi
+    "73": Coordinates(40.3515, 18.1750),   # Lecce
+    "74": Coordinates(40.4644, 17.2470),   # Taranto
+    "75": Coordinates(40.6664, 16.6044),   # Matera
+    "76": Coordinates(41.3196, 16.2838),   # Barletta-Andria-Trani
+    "80": Coordinates(40.8518, 14.2681),   # Napoli
+    "81": Coordinates(41.0723, 14.3311),   # Caserta
+    "82": Coordinates(41.1298, 14.7826),   # Benevento
+    "83": Coordinates(40.9146, 14.7906),   # Avellino
+    "84": Coordinates(40.6824, 14.7681),   # Salerno
+    "85": Coordinates(40.6404, 15.8056),   # Potenza
+    "86": Coordinates(41.5603, 14.6627),   # Campobasso / Isernia
+    "87": Coordinates(39.2983, 16.2537),   # Cosenza
+    "88": Coordinates(38.9098, 16.5877),   # Catanzaro / Crotone / Vibo Valentia
+    "89": Coordinates(38.1113, 15.6473),   # Reggio Calabria
+    "90": Coordinates(38.1157, 13.3615),   # Palermo
+    "91": Coordinates(38.0176, 12.5365),   # Trapani
+    "92": Coordinates(37.3111, 13.5765),   # Agrigento
+    "93": Coordinates(37.4901, 14.0629),   # Caltanissetta
+    "94": Coordinates(37.5670, 14.2795),   # Enna
+    "95": Coordinates(37.5079, 15.0830),   # Catania
+    "96": Coordinates(37.0755, 15.2866),   # Siracusa
+    "97": Coordinates(36.9269, 14.7255),   # Ragusa
+    "98": Coordinates(38.1938, 15.5540),   # Messina
+}
+
+_CAP_RE = re.compile(r"\d{5}")
+
+
+def coordinates_for_zip(zip_code: Optional[str]) -> Coordinates:
+    """
+    Coordinates of the area of an Italian CAP such as "20121" or "10139-torino".
+    Unknown or missing codes fall back to DEFAULT_COORDINATES.
+    """
+    match = _CAP_RE.match((zip_code or "").strip())
+    if not match:
+        return DEFAULT_COORDINATES
+    return _CAP_PREFIXES.get(match.group()[:2], DEFAULT_COORDINATES)
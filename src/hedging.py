@@ -0,0 +1,190 @@
+"""
+Hedged requests: when an upstream call has not answered after a delay taken from a
+high percentile of recent latencies, send one duplicate and use whichever answers
+first. The slow tail of a page fetch is usually not the page itself but one unlucky
+connection or backend, so the duplicate often wins.
+
+Each primary call deposits `budget` tokens and each hedge spends one, so hedges stay
+below that fraction of the calls (plus a small burst allowance). Opt-in through
+CARCALC_HEDGE; counters are reported by `Hedger.snapshot()`.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, NamedTuple, Optional, TypeVar
+
+from .deadline import propagate
+
+T = TypeVar("T")
+
+
+class HedgingConfig(NamedTuple):
+    enabled: bool = False
+    percentile: float = 95.0     # hedge delay: this percentile of recent latencies
+    min_delay: float = 0.05      # seconds, bounds of the hedge delay
+    max_delay: float = 3.0
+    initial_delay: float = 1.0   # used until `min_samples` latencies were observed
+    min_samples: int = 20
+    window: int = 500            # recent latencies kept
+    budget: float = 0.05         # hedges per call, at most
+    burst: float = 10.0          # unspent hedge tokens kept
+    max_workers: int = 64        # threads running primary and hedge calls
+
+    @classmethod
+    def from_env(cls) -> "HedgingConfig":
+        defaults = cls._field_defaults
+        return cls(
+            enabled=os.getenv("CARCALC_HEDGE", "").strip().lower() in ("1", "true", "yes", "on"),
+            percentile=float(os.getenv("CARCALC_HEDGE_PERCENTILE", defaults["percentile"])),
+            min_delay=float(os.getenv("CARCALC_HEDGE_MIN_DELAY", defaults["min_delay"])),
+            max_delay=float(os.getenv("CARCALC_HEDGE_MAX_DELAY", defaults["max_delay"])),
+            initial_delay=float(os.getenv("CARCALC_HEDGE_INITIAL_DELAY", defaults["initial_delay"])),
+            min_samples=int(os.getenv("CARCALC_HEDGE_MIN_SAMPLES", defaults["min_samples"])),
+            window=int(os.getenv("CARCALC_HEDGE_WINDOW", defaults["window"])),
+            budget=float(os.getenv("CARCALC_HEDGE_BUDGET", defaults["budget"])),
+            burst=float(os.getenv("CARCALC_HEDGE_BURST", defaults["burst"])),
+            max_workers=int(os.getenv("CARCALC_HEDGE_WORKERS", defaults["max_workers"])),
+        )
+
+
+class LatencyWindow:
+    """The last `size` latencies (seconds) of successful calls."""
+
+    def __init__(self, size: int):
+        self._values = deque(maxlen=max(1, size))
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._values.append(seconds)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._values)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Nearest-rank percentile, None while empty."""
+        with self._lock:
+            values = sorted(self._values)
+        if not values:
+            return None
+        return values[max(1, math.ceil(q / 100.0 * len(values))) - 1]
+
+
+class Hedger:
+    """Runs calls with at most one hedge each, within the global hedge budget."""
+
+    def __init__(self, config: HedgingConfig = HedgingConfig()):
+        self.config = config
+        self.latencies = LatencyWindow(config.window)
+        self._lock = threading.Lock()
+        self._tokens = config.burst
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.calls = 0
+        self.hedged = 0           # duplicates sent
+        self.wins = 0             # calls answered by the duplicate
+        self.over_budget = 0      # hedges skipped because the budget was spent
+        self.backlogged = 0       # hedges skipped because calls were queued for a thread
+        self._queued = 0          # calls submitted and not started yet
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    def delay(self) -> float:
+        """Seconds to wait for the primary call before hedging."""
+        cfg = self.config
+        observed = self.latencies.percentile(cfg.percentile) if len(self.latencies) >= cfg.min_samples else None
+        return min(cfg.max_delay, max(cfg.min_delay, cfg.initial_delay if observed is None else observed))
+
+    def _spend_token(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self.hedged += 1
+                return True
+            self.over_budget += 1
+            return False
+
+    def _submit(self, fn: Callable[[], T], started: Optional[threading.Event] = None) -> Future:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.config.max_workers, thread_name_prefix="hedge")
+            executor = self._executor
+            self._queued += 1
+
+        def timed() -> T:
+            with self._lock:
+                self._queued -= 1
+            if started is not None:
+                started.set()
+            start = time.perf_counter()
+            result = fn()
+            self.latencies.add(time.perf_counter() - start)
+            return result
+
+        return executor.submit(propagate(timed))
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """
+        Return `fn()`, sending a second `fn()` if the first has not finished `delay()` after it
+        started. The first successful result wins; an exception is raised only when every attempt
+        failed (the primary's exception). The losing attempt runs to completion in the background.
+        No hedge is sent while calls are waiting for a thread: the slowness is then our own
+        backlog, which a duplicate would only join.
+        """
+        with self._lock:
+            self.calls += 1
+            self._tokens = min(self.config.burst, self._tokens + self.config.budget)
+        started = threading.Event()
+        primary = self._submit(fn, started)
+        primary.add_done_callback(lambda _: started.set())  # cancelled at shutdown
+        # the delay measures the upstream call, not the time spent queued for a thread
+        started.wait()
+        done, _ = wait([primary], timeout=self.delay())
+        if done:
+            return primary.result()
+        with self._lock:
+            backlogged = self._queued > 0
+            self.backlogged += backlogged
+        if backlogged or not self._spend_token():
+            return primary.result()
+
+        hedge = self._submit(fn)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.wins += 1
+                    return future.result()
+        return primary.result()
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            calls, hedged, wins, over_budget = self.calls, self.hedged, self.wins, self.over_budget
+            backlogged = self.backlogged
+        return {
+            "enabled": self.enabled,
+            "calls": calls,
+            "hedged": hedged,
+            "hedge_rate": round(hedged / calls, 4) if calls else 0.0,
+            "wins": wins,
+            "win_rate": round(wins / hedged, 4) if hedged else 0.0,
+            "over_budget": over_budget,
+            "backlogged": backlogged,
+            "delay": round(self.delay(), 4),
+            "budget": self.config.budget,
+        }
@@ -0,0 +1,75 @@
+"""
+HTTP caching semantics for the JSON endpoints: content-hash ETags, Cache-Control
+max-age tied to how long the underlying upstream data is considered fresh,
+`If-None-Match` -> 304 on GET/HEAD (412 on other methods, per RFC 9110 13.1.2), and a
+deterministic request hash for the POST endpoints so a CDN or reverse proxy can key its
+cache on the request body.
+"""
+
+import hashlib
+from typing import Any, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .responses import dumps
+
+REQUEST_HASH_HEADER = "X-Request-Hash"
+
+
+def etag_for(body: bytes) -> str:
+    """Strong ETag derived from the response body."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def request_hash(path: str, payload: Any) -> str:
+    """
+    Deterministic key for a POST request: the path plus the validated request model
+    serialized with every field (defaults included) in declaration order, so two bodies
+    that differ only in key order, whitespace or omitted defaults share the same key.
+    """
+    digest = hashlib.sha256(path.encode("utf-8") + b"\n" + dumps(payload))
+    return digest.hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 9110 weak comparison of an If-None-Match header against `etag`."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def cached_json_response(
+    request: Request,
+    content: Any,
+    max_age: int,
+    key: Optional[str] = None,
+    public: bool = True,
+) -> Response:
+    """
+    Render `content` as JSON with ETag/Cache-Control headers. When `If-None-Match` matches,
+    the answer is an empty 304 for GET/HEAD and 412 Precondition Failed for other methods
+    (RFC 9110 13.1.2). `key` is exposed as X-Request-Hash.
+    """
+    body = dumps(content)
+    etag = etag_for(body)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"{'public' if public else 'private'}, max-age={int(max_age)}",
+    }
+    if key:
+        headers[REQUEST_HASH_HEADER] = key
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        status_code = 304 if request.method in ("GET", "HEAD") else 412
+        return Response(status_code=status_code, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
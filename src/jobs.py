@@ -0,0 +1,191 @@
+"""
+Background jobs for analyses that take longer than a client (or proxy) wants to wait.
+
+`JobQueue.submit` returns at once with a job ID; a bounded pool of worker threads runs
+the job, which reports its progress through `Job.advance`. Clients poll `JobQueue.get`
+for the status and then fetch the result. Submitting the same key while an identical
+job is queued or running returns that job instead of starting another. Finished jobs
+are kept for `retention` seconds, then forgotten.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobConfig(NamedTuple):
+    workers: int = 2            # jobs running at once
+    max_pending: int = 100      # queued + running jobs accepted before submissions are refused
+    retention: float = 900.0    # seconds a finished job (and its result) is kept
+
+    @classmethod
+    def from_env(cls) -> "JobConfig":
+        defaults = cls._field_defaults
+        return cls(
+            workers=int(os.getenv("CARCALC_JOBS_WORKERS", defaults["workers"])),
+            max_pending=int(os.getenv("CARCALC_JOBS_MAX_PENDING", defaults["max_pending"])),
+            retention=float(os.getenv("CARCALC_JOBS_RETENTION", defaults["retention"])),
+        )
+
+
+class QueueFullError(RuntimeError):
+    """Raised by `submit` when `max_pending` jobs are already queued or running."""
+
+
+class Job:
+    """One submitted job. Attributes are written by the worker and read by pollers."""
+
+    def __init__(self, kind: str, key: str, total_steps: int = 0):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = QUEUED
+        self.completed_steps = 0
+        self.total_steps = int(total_steps)
+        self.result: Any = None
+        self.status_code: Optional[int] = None  # HTTP status of the failure
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def advance(self, steps: int = 1, total: Optional[int] = None) -> None:
+        """Record progress; `total` adjusts the expected number of steps."""
+        if total is not None:
+            self.total_steps = int(total)
+        self.completed_steps += steps
+
+    @property
+    def progress(self) -> float:
+        if self.status == SUCCEEDED:
+            return 1.0
+        if not self.total_steps:
+            return 0.0
+        return min(1.0, self.completed_steps / self.total_steps)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def describe(self) -> Dict[str, Any]:
+        """Status fields (shape of `models.JobStatus`), without the result."""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "completed_steps": self.completed_steps,
+            "total_steps": self.total_steps,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "status_code": self.status_code,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """Thread-safe job registry in front of a bounded worker pool (created on first use)."""
+
+    def __init__(self, config: JobConfig = JobConfig(), clock: Callable[[], float] = time.time):
+        self.config = config
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[str, Job] = {}  # key -> queued or running job
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.deduplicated = 0
+        self.rejected = 0
+
+    def submit(self, kind: str, key: str, fn: Callable[[Job], Any], total_steps: int = 0) -> Tuple[Job, bool]:
+        """
+        Queue `fn(job)` unless a job with the same `key` is queued or running.
+        Returns (job, created). Raises QueueFullError when `max_pending` jobs are pending.
+        `fn` returns the result; an exception with `status_code`/`detail` (e.g. HTTPException)
+        becomes the job's failure status, any other exception a 500.
+        """
+        with self._lock:
+            self._purge()
+            existing = self._active.get(key)
+            if existing is not None:
+                self.deduplicated += 1
+                return existing, False
+            if len(self._active) >= self.config.max_pending:
+                self.rejected += 1
+                raise QueueFullError(f"{len(self._active)} jobs already pending")
+            job = Job(kind, key, total_steps)
+            job.created_at = self._clock()
+            self._jobs[job.id] = job
+            self._active[key] = job
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max(1, self.config.workers), thread_name_prefix="job")
+            self._executor.submit(self._run, job, fn)
+        return job, True
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]) -> None:
+        job.status = RUNNING
+        job.started_at = self._clock()
+        try:
+            result = fn(job)
+        except Exception as ex:
+            job.status_code = int(getattr(ex, "status_code", 500))
+            job.error = str(getattr(ex, "detail", None) or ex)
+            if job.status_code >= 500:
+                logger.warning("job %s (%s) failed: %s", job.id, job.kind, job.error)
+            job.status = FAILED
+        else:
+            job.result = result
+            job.status = SUCCEEDED
+        finally:
+            job.finished_at = self._clock()
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """The job, or None when unknown or past its retention."""
+        with self._lock:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def _purge(self) -> None:
+        """Forget finished jobs older than the retention period. Caller holds the lock."""
+        horizon = self._clock() - self.config.retention
+        for job_id in [i for i, job in self._jobs.items() if job.finished and job.finished_at < horizon]:
+            del self._jobs[job_id]
+
+    def shutdown(self) -> None:
+        """Stop the workers after the running jobs; queued jobs that never started are dropped."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            dropped = [job for job in self._active.values() if job.status == QUEUED]
+            for job in dropped:
+                del self._active[job.key]
+                del self._jobs[job.id]
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            statuses: Dict[str, int] = {}
+            for job in self._jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+            return {
+                "workers": self.config.workers,
+                "max_pending": self.config.max_pending,
+                "retention": self.config.retention,
+                "jobs": statuses,
+                "deduplicated": self.deduplicated,
+                "rejected": self.rejected,
+            }
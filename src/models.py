@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import List, Literal, Optional, Dict
 
 
 class BrandListResponse(BaseModel):
@@ -24,6 +24,39 @@ class EstimateRequest(BaseModel):
     bank_rate_percent: float = 0.0
     loan_years: int = 0
     shift_types: Optional[List[str]] = []
+    # fill years without listings from a fitted depreciation curve instead of shortening the horizon
+    fill_missing_years: bool = False
+    # scrape only this many anchor years and fit the others (implies fill_missing_years)
+    sparse_anchor_years: Optional[int] = Field(default=None, ge=2)
+    # locate the years that have listings with a few probes and skip the empty ones
+    adaptive_probing: bool = False
+    # search several regions (fetched concurrently) instead of zip_code alone
+    zip_codes: Optional[List[str]] = Field(default=None, min_length=1, max_length=10)
+    # "pooled": one sample-weighted series; "per_region": also return each region's series
+    combine_regions: Literal["pooled", "per_region"] = "pooled"
+
+
+class RegionSeries(BaseModel):
+    zip_code: str
+    latitude: float
+    longitude: float
+    years: List[int]
+    year_values: List[float]
+    price_stddev: List[float]
+    listing_counts: List[int]
+
+
+class YearStats(BaseModel):
+    """Listing price distribution of one fetched registration year (outliers excluded)."""
+    year: int
+    median: float
+    stddev: float
+    p10: float
+    p90: float
+    trimmed_mean: float
+    count: int
+    outliers: int = 0
+    freshness: str = "fresh"
 
 
 class EstimateResponse(BaseModel):
@@ -38,6 +71,12 @@ class EstimateResponse(BaseModel):
     warning: Optional[str] = None
     price_stddev: Optional[List[float]] = None
     adjusted_number_of_years: Optional[int] = None
+    # "observed" or "fitted" for each entry of year_values (only set when curve fitting is used)
+    year_sources: Optional[List[str]] = None
+    # per-region series when several zip codes were requested with combine_regions="per_region"
+    regions: Optional[List[RegionSeries]] = None
+    # price distribution of every fetched year that had listings, newest first
+    year_stats: Optional[List[YearStats]] = None
 
 
 class BreakEvenRequest(BaseModel):
@@ -52,6 +91,99 @@ class BreakEvenResponse(BaseModel):
     rent_monthly_series: List[float]
     message: Optional[str]
 
+
+# Month-by-month ownership schedule (loan balance, interest, equity, cumulative cost)
+class ExtraPayment(BaseModel):
+    month: int = Field(ge=1)
+    amount: float = Field(gt=0)
+
+
+class CostScheduleRequest(BaseModel):
+    estimate: EstimateRequest
+    # added to every loan installment
+    extra_monthly_payment: float = Field(default=0.0, ge=0)
+    # one-off payments towards the loan
+    extra_payments: List[ExtraPayment] = Field(default_factory=list)
+    # repay the whole remaining balance in this month
+    payoff_month: Optional[int] = Field(default=None, ge=1)
+    rent_monthly_cost: Optional[float] = None
+    # the schedule is downsampled to about this many months
+    max_points: int = Field(default=120, ge=2, le=2000)
+
+
+class CostScheduleResponse(BaseModel):
+    month: List[int]
+    payment: List[float]
+    interest: List[float]
+    principal: List[float]
+    balance: List[float]
+    interest_paid: List[float]
+    car_value: List[float]
+    equity: List[float]
+    cumulative_cost: List[float]
+    # rent paid to date, when rent_monthly_cost was given
+    cumulative_rent: Optional[List[float]] = None
+    total_months: int
+    payoff_month: Optional[int] = None
+    total_interest: float
+    interest_saved: float
+    months_to_break_even: Optional[int] = None
+    warning: Optional[str] = None
+
+# Multi-vehicle comparison
+class VehicleSelection(BaseModel):
+    brand: str
+    model: str
+    details: Optional[str] = ""
+    shift_types: Optional[List[str]] = []
+    # display name, defaults to "brand model details"
+    label: Optional[str] = None
+
+
+class CompareRequest(BaseModel):
+    vehicles: List[VehicleSelection] = Field(min_length=2, max_length=8)
+    # shared by every vehicle, same meaning as in EstimateRequest
+    zip_code: Optional[str] = "10139-torino"
+    zip_codes: Optional[List[str]] = Field(default=None, min_length=1, max_length=10)
+    registration_year: Optional[int] = None
+    number_of_years: int = 10
+    purchase_year_index: int = 3
+    monthly_maintenance: float = 100.0
+    loan_value: float = 0.0
+    bank_rate_percent: float = 0.0
+    loan_years: int = 0
+    fill_missing_years: bool = False
+    sparse_anchor_years: Optional[int] = Field(default=None, ge=2)
+    adaptive_probing: bool = False
+    # lower is better for every metric
+    rank_by: Literal["total_monthly_cost", "monthly_depreciation", "purchase_price"] = "total_monthly_cost"
+
+
+class VehicleComparison(BaseModel):
+    label: str
+    brand: str
+    model: str
+    details: Optional[str] = ""
+    # 1 = best by rank_by; None when the estimate failed
+    rank: Optional[int] = None
+    # rank_by metric minus the best vehicle's
+    difference_to_best: Optional[float] = None
+    estimate: Optional[EstimateResponse] = None
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+
+class CompareResponse(BaseModel):
+    rank_by: str
+    # in request order
+    vehicles: List[VehicleComparison]
+    # labels, best first
+    ranking: List[str]
+    # shortest horizon among the estimates, when some had to be shortened
+    horizon_years: Optional[int] = None
+    warning: Optional[str] = None
+
+
 # New models for break even analysis
 class BreakEvenAnalysisRequest(BaseModel):
     brand: str
@@ -62,11 +194,18 @@ class BreakEvenAnalysisRequest(BaseModel):
     rent_monthly_cost: float = 500.0
     max_years: int = 10
     shift_types: Optional[List[str]] = []
+    fill_missing_years: bool = False
+    sparse_anchor_years: Optional[int] = Field(default=None, ge=2)
+    adaptive_probing: bool = False
+    # regions pooled into one sample-weighted series
+    zip_codes: Optional[List[str]] = Field(default=None, min_length=1, max_length=10)
 
 class DataPoint(BaseModel):
     years_owned: int
     overall_cost: float
     monthly_cost: float
+    # True when the purchase or resale price comes from the fitted curve
+    fitted: bool = False
 
 class PurchaseYearSeries(BaseModel):
     purchase_description: str
@@ -75,3 +214,34 @@ class PurchaseYearSeries(BaseModel):
 class BreakEvenAnalysisResponse(BaseModel):
     rental_series: List[DataPoint]
     purchase_series: List[PurchaseYearSeries]
+    year_values: Optional[List[float]] = None
+    year_sources: Optional[List[str]] = None
+    # set when some years were served from stale cache or skipped (upstream unavailable)
+    warning: Optional[str] = None
+
+
+# Brand-wide crawl: every model of a brand from one sweep of its listing pages
+class CrawlRequest(BaseModel):
+    brand: str
+    details: Optional[str] = ""
+    zip_code: Optional[str] = "10139-torino"
+    shift_types: Optional[List[str]] = []
+    # registration years swept, the current one included
+    years: int = Field(default=15, ge=1, le=40)
+
+
+# Background jobs
+class JobStatus(BaseModel):
+    job_id: str
+    kind: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    # 0..1, from completed_steps / total_steps
+    progress: float
+    completed_steps: int
+    total_steps: int
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # HTTP status and message of a failed job
+    status_code: Optional[int] = None
+    error: Optional[str] = None
@@ -0,0 +1,179 @@
+"""
+Page parsing in worker processes, so that it is not serialized by the GIL.
+
+BeautifulSoup parsing is pure-Python CPU work: with the sync endpoints running on
+threads, every page parsed by the API process competes for one interpreter lock, and a
+pod uses one core however many estimates are in flight. With CARCALC_PARSE_WORKERS set
+(a number, or "auto" for one per core) `ParseExecutor.run` ships the raw response bytes
+to a pool of worker processes and gets back only the extracted data (prices, option
+lists) from the picklable parsers in `parsing`.
+
+At most `max_queue` pages are queued or being parsed at once: past that, the calling
+thread parses the page itself, which bounds memory and slows the callers down instead
+of growing a backlog. The pool is started and health-checked by `start()` (at app
+startup); until it is healthy, or when it cannot be started, pages are parsed in the
+calling thread. A pool broken by a dead worker is replaced. Counters are reported by
+`ParseExecutor.snapshot()`.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, TypeVar
+
+from . import deadline
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ParseError(RuntimeError):
+    """Raised when a worker did not return a page's parse in time (or before the request deadline)."""
+
+
+class ParseConfig(NamedTuple):
+    workers: int = 0             # worker processes, 0 to parse in the calling thread
+    max_queue: int = 0           # pages queued or being parsed at once, 0 for two per worker
+    timeout: float = 10.0        # seconds to wait for a worker's result
+    start_timeout: float = 30.0  # seconds for the workers to start and answer the health check
+
+    @classmethod
+    def from_env(cls) -> "ParseConfig":
+        defaults = cls._field_defaults
+        workers = os.getenv("CARCALC_PARSE_WORKERS", "").strip().lower()
+        return cls(
+            workers=(os.cpu_count() or 1) if workers == "auto" else int(workers or defaults["workers"]),
+            max_queue=int(os.getenv("CARCALC_PARSE_QUEUE", defaults["max_queue"])),
+            timeout=float(os.getenv("CARCALC_PARSE_TIMEOUT", defaults["timeout"])),
+            start_timeout=float(os.getenv("CARCALC_PARSE_START_TIMEOUT", defaults["start_timeout"])),
+        )
+
+
+def _ping() -> int:
+    # imports the parser in the worker, so that the first page does not pay for it
+    import bs4  # noqa: F401
+    return os.getpid()
+
+
+class ParseExecutor:
+    """Runs parsers in a process pool when enabled and started, else in the calling thread."""
+
+    def __init__(self, config: ParseConfig = ParseConfig()):
+        self.config = config
+        self.max_queue = config.max_queue or 2 * max(config.workers, 1)
+        self._slots = threading.BoundedSemaphore(self.max_queue)
+        self._lock = threading.Lock()
+        self._pool = None
+        self.healthy = False
+        self.submitted = 0      # pages parsed by the workers
+        self.inline = 0         # ... by the calling thread, the pool being disabled or down
+        self.overflow = 0       # ... by the calling thread, the queue being full
+        self.timeouts = 0
+        self.restarts = 0       # pools replaced after a worker died
+        self.worker_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.workers > 0
+
+    def _new_pool(self):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # spawned workers do not inherit the API process's threads and locks
+        return ProcessPoolExecutor(self.config.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def start(self) -> bool:
+        """Start the workers and check that each answers; True when the pool is in use."""
+        if not self.enabled:
+            return False
+        started = time.monotonic()
+        pool = self._new_pool()
+        try:
+            pids = {future.result(timeout=self.config.start_timeout)
+                    for future in [pool.submit(_ping) for _ in range(self.config.workers)]}
+        except Exception as ex:
+            logger.warning("parse workers failed to start (%s); parsing in the request threads", ex)
+            pool.shutdown(wait=False, cancel_futures=True)
+            return False
+        with self._lock:
+            self._pool, self.healthy = pool, True
+        logger.info("%d parse workers ready (%d answered) in %.2fs", self.config.workers, len(pids),
+                    time.monotonic() - started)
+        return True
+
+    def run(self, parse: Callable[[bytes], T], content: bytes) -> T:
+        """`parse(content)`, in a worker when the pool is up and has room."""
+        pool = self._pool
+        if pool is None or not self.healthy:
+            with self._lock:
+                self.inline += 1
+            return parse(content)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.overflow += 1
+            return parse(content)
+        started = time.perf_counter()
+        try:
+            future = pool.submit(parse, content)
+        except RuntimeError as ex:  # BrokenProcessPool, or shut down meanwhile
+            self._slots.release()
+            self._replace(pool, ex)
+            with self._lock:
+                self.inline += 1
+            return parse(content)
+        # the slot is freed when the worker is done, even if we stop waiting for it
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            result = future.result(timeout=deadline.clip(self.config.timeout))
+        except TimeoutError as ex:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise ParseError(f"no parse result within {self.config.timeout:.1f}s") from ex
+        except RuntimeError as ex:
+            from concurrent.futures.process import BrokenProcessPool
+            if not isinstance(ex, BrokenProcessPool):
+                raise
+            self._replace(pool, ex)
+            with self._lock:
+                self.inline += 1
+            return parse(content)
+        with self._lock:
+            self.submitted += 1
+            self.worker_seconds += time.perf_counter() - started
+        return result
+
+    def _replace(self, broken, ex: Exception) -> None:
+        with self._lock:
+            if self._pool is not broken:
+                return  # already replaced by another thread
+            logger.warning("parse worker pool broken (%s); restarting it", ex)
+            self.restarts += 1
+            try:
+                self._pool = self._new_pool()
+            except Exception:
+                logger.exception("parse worker pool could not be restarted; parsing in the request threads")
+                self._pool, self.healthy = None, False
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.config.workers if self._pool is not None else 0,
+                "healthy": self.healthy,
+                "max_queue": self.max_queue,
+                "submitted": self.submitted,
+                "inline": self.inline,
+                "overflow": self.overflow,
+                "timeouts": self.timeouts,
+                "restarts": self.restarts,
+                "avg_ms": round(1000.0 * self.worker_seconds / self.submitted, 2) if self.submitted else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool, self.healthy = self._pool, None, False
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
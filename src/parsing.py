@@ -0,0 +1,234 @@
+"""
+Listing-page parsing without building the document.
+
+`ListingPriceParser` is an incremental tokenizer (html.parser) that pulls the prices out
+of a listing page as its bytes arrive: the text of every `<div>` whose class mentions
+"price" and holds a euro amount or, on pages without such divs, every text holding one
+(the same heuristics the BeautifulSoup scraper applies to a whole page). Prices go
+straight into a PriceAccumulator, so memory does not grow with the page.
+
+`read_listing_prices` feeds it a streamed response body (see `transport.Transport.stream`)
+and stops reading once the listing section is closed, or after `max_bytes`: navigation
+past the listings, ads and footer markup are never downloaded.
+
+The BeautifulSoup parsers of whole pages (`parse_listing_prices`, `parse_dropdowns`,
+`parse_make_ids`) take the raw bytes and return plain data, so that they can run in a
+worker process (see `parse_pool`).
+"""
+
+import codecs
+import os
+import re
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from .stats import PriceAccumulator
+
+_PRICE_RE = re.compile(r"€\s*((?:\d{1,3}(?:[.\s]\d{3})+|\d+))(?:,\d{1,2})?")
+_PRICE_CLASS_RE = re.compile(r"price", re.I)
+_PRICE_TEXT_RE = re.compile(r"€\s*\d")
+
+
+class StreamConfig(NamedTuple):
+    enabled: bool = False            # stream listing pages instead of loading and parsing them whole
+    max_bytes: int = 4 * 1024 * 1024 # stop reading a page after this many (decompressed) bytes
+    section: str = "main"            # element holding the listings: reading stops when it closes
+
+    @classmethod
+    def from_env(cls) -> "StreamConfig":
+        return cls(
+            enabled=os.getenv("CARCALC_STREAM_LISTINGS", "0").strip().lower() in ("1", "true", "yes", "on"),
+            max_bytes=int(os.getenv("CARCALC_STREAM_MAX_BYTES", cls._field_defaults["max_bytes"])),
+            section=os.getenv("CARCALC_STREAM_SECTION", cls._field_defaults["section"]).strip().lower(),
+        )
+
+
+def extract_price(node_text: Optional[str]) -> Optional[int]:
+    """
+    Extract the last integer EUR value from a string that may contain one or more
+    euro amounts, e.g.:
+        '€ 55.900 Ottimo prezzo'       -> 55900
+        '€ 57.900,- € 49.900 1 ND'     -> 49900  (take the last euro amount only)
+        '€ 49.900 1'                   -> 49900  (ignore trailing '1')
+    Handles thousand separators ('.' or space/NBSP) and optional ',-' or decimal parts.
+    """
+    if not node_text:
+        return None
+
+    # Normalize non-breaking spaces to regular spaces (common on scraped sites)
+    s = node_text.replace("\xa0", " ")
+
+    # Regex notes:
+    # - '€\\s*'                : Euro symbol followed by optional whitespace
+    # - '((?:\\d{1,3}(?:[.\\s]\\d{3})+|\\d+))' : capture the integer-euro part
+    #        Either:           1..3 digits + one or more (separator + 3 digits) groups (e.g. 53.900, 1 234 567)
+    #        Or:               a plain integer (e.g. 49900)
+    # - '(?:,\\d{1,2})?'       : optional decimal part with comma (ignored, not captured)
+    matches = [m.group(1) for m in _PRICE_RE.finditer(s)]
+    if not matches:
+        return None
+
+    # Take the last euro amount found (typical format shows current price last)
+    last = matches[-1]
+
+    # Normalize thousand separators (dot/space) and cast to int
+    last = last.replace(" ", "").replace(".", "")
+    try:
+        return int(last)
+    except ValueError:
+        return None
+
+
+class ListingPriceParser(HTMLParser):
+    """
+    Incremental price extractor: `feed()` it text as it arrives, then read `prices`.
+    `done` turns True when the `section` element closes.
+    """
+
+    def __init__(self, section: Optional[str] = "main"):
+        super().__init__(convert_charrefs=True)
+        self.section = section
+        self.done = False
+        self.price_divs = PriceAccumulator()   # prices of the price divs
+        self.price_texts = PriceAccumulator()  # prices found in any text, used when there are no price divs
+        self._found_div = False
+        self._div_depth = 0
+        self._price_depth: Optional[int] = None
+        self._price_text: List[str] = []
+        self._text: List[str] = []  # text between two tags, which may arrive in pieces
+
+    @property
+    def prices(self) -> PriceAccumulator:
+        return self.price_divs if self._found_div else self.price_texts
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        self._flush_text()
+        if tag != "div":
+            return
+        self._div_depth += 1
+        if self._price_depth is None:
+            classes = next((value or "" for name, value in attrs if name == "class"), "")
+            if _PRICE_CLASS_RE.search(classes):
+                self._price_depth = self._div_depth
+                self._price_text = []
+
+    def handle_endtag(self, tag: str) -> None:
+        self._flush_text()
+        if tag == "div" and self._div_depth:
+            if self._price_depth == self._div_depth:
+                text = " ".join(part.strip() for part in self._price_text if part.strip())
+                if "€" in text:
+                    self._found_div = True
+                    _add(self.price_divs, text)
+                self._price_depth = None
+                self._price_text = []
+            self._div_depth -= 1
+        elif tag == self.section:
+            self.done = True
+
+    def handle_data(self, data: str) -> None:
+        self._text.append(data)
+
+    def close(self) -> None:
+        super().close()
+        self._flush_text()
+
+    def _flush_text(self) -> None:
+        if not self._text:
+            return
+        data = "".join(self._text)
+        self._text = []
+        if self._price_depth is not None:
+            self._price_text.append(data)
+        if _PRICE_TEXT_RE.search(data):
+            _add(self.price_texts, data)
+
+
+def _add(prices: PriceAccumulator, text: str) -> None:
+    price = extract_price(text)
+    if price is not None and price > 0:
+        prices.add(price)
+
+
+class ListingScan(NamedTuple):
+    """Prices read from one listing page, and how much of it was read."""
+    prices: PriceAccumulator
+    bytes_read: int
+    stopped_early: bool  # reading stopped before the end of the page
+
+
+def read_listing_prices(body: Iterable[bytes], encoding: Optional[str] = None,
+                        config: StreamConfig = StreamConfig()) -> ListingScan:
+    """
+    Parse a listing page from its chunks, stopping after the listing section or `max_bytes`.
+    Holds one chunk and the parser's unparsed tail at a time.
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parser = ListingPriceParser(config.section or None)
+    read, stopped_early = 0, False
+    for chunk in body:
+        read += len(chunk)
+        parser.feed(decoder.decode(chunk))
+        if parser.done or read >= config.max_bytes:
+            stopped_early = True
+            break
+    else:
+        parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return ListingScan(parser.prices, read, stopped_early)
+
+
+def _soup(content: bytes):
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(content, "html.parser")
+
+
+def parse_listing_prices(content: bytes) -> List[int]:
+    """Prices of a whole listing page: its price divs or, without any, every euro text."""
+    soup = _soup(content)
+    prices: List[int] = []
+
+    def add(text: str) -> None:
+        price = extract_price(text)
+        if price is not None and price > 0:
+            prices.append(price)
+
+    # heuristics: find price nodes by class or by euro symbol presence
+    found = False
+    # primary: look for known class
+    for div in soup.find_all("div", class_=re.compile(r"Price|price", re.I)):
+        txt = (div.get_text(separator=" ", strip=True) or "")
+        if "€" in txt:
+            found = True
+            add(txt)
+
+    # fallback: search for literal € in any element
+    if not found:
+        for el in soup.find_all(string=_PRICE_TEXT_RE):
+            add(str(el))
+    return prices
+
+
+def parse_dropdowns(content: bytes) -> Dict[str, List[str]]:
+    """The option texts of every <select> of a page, by select name."""
+    dropdowns: Dict[str, List[str]] = {}
+    for select in _soup(content).find_all("select"):
+        name = select.get("name") or "unnamed"
+        dropdowns[name] = [opt.text.strip() for opt in select.find_all("option") if opt.text and opt.text.strip()]
+    return dropdowns
+
+
+def parse_make_ids(content: bytes) -> Dict[str, str]:
+    """Lowercased make name -> id, from the "make" <select> of the home page."""
+    lookup: Dict[str, str] = {}
+    for select in _soup(content).find_all("select"):
+        if select.get("name") == "make":
+            for opt in select.find_all("option"):
+                text = (opt.text or "").strip().lower()
+                value = opt.get("value") or ""
+                if text:
+                    lookup[text] = value
+    return lookup
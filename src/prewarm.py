@@ -0,0 +1,181 @@
+"""
+Cache pre-warming: remember which selections users ask for and periodically
+re-fetch the year series of the most popular ones, so their requests are served
+from the Fetcher cache instead of paying the cold scrape.
+"""
+
+import datetime
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .regions import region_zip_codes
+from .series import build_selection
+from .utils import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class SelectionKey(NamedTuple):
+    brand: str
+    model: str
+    details: str
+    zip_code: str
+    shift_types: Tuple[str, ...]
+
+
+class YearWindow(NamedTuple):
+    """Registration years asked for: `newest_year` and the `years` before it (included)."""
+    newest_year: int
+    years: int
+
+    @property
+    def oldest_year(self) -> int:
+        return self.newest_year - self.years + 1
+
+    def union(self, other: "YearWindow") -> "YearWindow":
+        newest = max(self.newest_year, other.newest_year)
+        return YearWindow(newest, newest - min(self.oldest_year, other.oldest_year) + 1)
+
+
+class PrewarmConfig(NamedTuple):
+    interval: float = 0.0        # seconds between runs, 0 disables the scheduler
+    top_k: int = 20              # number of most requested selections to warm
+    max_requests: int = 300      # upstream requests per run
+    rate: float = 1.0            # upstream requests per second
+    decay: float = 0.5           # counts are multiplied by this after each run
+    max_keys: int = 1000         # selections tracked at once, the least requested are evicted
+
+    @classmethod
+    def from_env(cls) -> "PrewarmConfig":
+        return cls(
+            interval=float(os.getenv("CARCALC_PREWARM_INTERVAL", cls._field_defaults["interval"])),
+            top_k=int(os.getenv("CARCALC_PREWARM_TOP_K", cls._field_defaults["top_k"])),
+            max_requests=int(os.getenv("CARCALC_PREWARM_MAX_REQUESTS", cls._field_defaults["max_requests"])),
+            rate=float(os.getenv("CARCALC_PREWARM_RATE", cls._field_defaults["rate"])),
+            decay=float(os.getenv("CARCALC_PREWARM_DECAY", cls._field_defaults["decay"])),
+            max_keys=int(os.getenv("CARCALC_PREWARM_MAX_KEYS", cls._field_defaults["max_keys"])),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+
+class RequestTracker:
+    """
+    Thread-safe request counter per selection, plus the registration years asked for.
+    Keys come from client input, so at most `max_keys` are kept: a new key evicts the least
+    requested one. A disabled tracker records nothing.
+    """
+
+    def __init__(self, max_keys: int = PrewarmConfig._field_defaults["max_keys"], enabled: bool = True):
+        self.max_keys = max_keys
+        self.enabled = enabled
+        self._counts: Counter = Counter()
+        self._years: Dict[SelectionKey, YearWindow] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(req, zip_code: Optional[str] = None) -> SelectionKey:
+        return SelectionKey(
+            (req.brand or "").strip().lower(),
+            (req.model or "").strip().lower(),
+            (req.details or "").strip().lower(),
+            ((req.zip_code if zip_code is None else zip_code) or "").strip().lower(),
+            tuple(sorted(req.shift_types or [])),
+        )
+
+    def record(self, req, years: int) -> None:
+        """
+        Count one request for `years` registration years, from `req.registration_year` (the
+        current year when unset) back; a multi-region request counts once for each of its zip codes.
+        """
+        if not self.enabled:
+            return
+        newest_year = getattr(req, "registration_year", None) or datetime.datetime.now().year
+        window = YearWindow(int(newest_year), int(years))
+        keys = [self.key_for(req, zip_code) for zip_code in region_zip_codes(req)]
+        with self._lock:
+            for key in keys:
+                if key not in self._counts and len(self._counts) >= self.max_keys:
+                    least = min(self._counts, key=self._counts.__getitem__)
+                    del self._counts[least]
+                    del self._years[least]
+                self._counts[key] += 1
+                self._years[key] = window.union(self._years[key]) if key in self._years else window
+
+    def top(self, k: int) -> List[Tuple[SelectionKey, int]]:
+        """The `k` most requested selections as (key, years) pairs."""
+        return [(key, window.years) for key, window in self.top_windows(k)]
+
+    def top_windows(self, k: int) -> List[Tuple[SelectionKey, YearWindow]]:
+        """The `k` most requested selections with every registration year asked for them."""
+        with self._lock:
+            return [(key, self._years[key]) for key, _ in self._counts.most_common(k)]
+
+    def decay(self, factor: float) -> None:
+        """Age the counts so the ranking follows recent traffic; drops keys that reach zero."""
+        with self._lock:
+            for key in list(self._counts):
+                self._counts[key] *= factor
+                if self._counts[key] < 0.1:
+                    del self._counts[key]
+                    del self._years[key]
+
+
+class Prewarmer:
+    """Background scheduler re-fetching the year series of the top-K selections."""
+
+    def __init__(self, fetcher, tracker: RequestTracker, config: Optional[PrewarmConfig] = None):
+        self.fetcher = fetcher
+        self.tracker = tracker
+        self.config = config or PrewarmConfig()
+        self._limiter = RateLimiter(self.config.rate)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> int:
+        """Warm the current top-K within the request budget; returns the number of upstream requests."""
+        budget = self.config.max_requests
+        done = 0
+        for key, (newest_year, years) in self.tracker.top_windows(self.config.top_k):
+            for offset in range(years):
+                if done >= budget or self._stop.is_set():
+                    logger.info("prewarm run stopped after %d of %d requests", done, budget)
+                    self.tracker.decay(self.config.decay)
+                    return done
+                selected = build_selection(key.brand, key.model, key.details, key.zip_code,
+                                           list(key.shift_types), newest_year - offset)
+                self._limiter.acquire()
+                done += 1
+                try:
+                    self.fetcher.fetch_price_stats(selected, refresh=True)
+                except Exception:
+                    logger.warning("prewarm fetch failed for %s/%s %d", key.brand, key.model,
+                                   newest_year - offset, exc_info=True)
+        self.tracker.decay(self.config.decay)
+        return done
+
+    def start(self) -> None:
+        if self._thread is not None or self.config.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="prewarm", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.config.interval):
+            try:
+                count = self.run_once()
+                logger.info("prewarm run issued %d upstream requests", count)
+            except Exception:
+                logger.exception("prewarm run failed")
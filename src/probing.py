@@ -0,0 +1,73 @@
+"""
+Adaptive year probing: find the range of registration years that actually have
+listings for a selection with a handful of requests, instead of downloading every
+year of the window only to discover that most of them are empty.
+
+Assumes availability is contiguous (a model is sold from its launch year until it
+is discontinued); gaps inside the span are still fetched normally by the caller.
+"""
+
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from .cache import register_type
+
+
+@register_type
+class YearSpan(NamedTuple):
+    """Newest and oldest registration years with at least one listing (newest >= oldest)."""
+    newest: int
+    oldest: int
+
+    def __contains__(self, year: object) -> bool:
+        return isinstance(year, int) and self.oldest <= year <= self.newest
+
+
+def probe_year_span(
+    fetch_year: Callable[[int], object], newest_year: int, oldest_year: int
+) -> Tuple[Optional[YearSpan], Dict[int, object]]:
+    """
+    Locate the span of years with listings inside [oldest_year, newest_year].
+
+    `fetch_year(year)` returns a PriceStats-like object whose `median` is 0 for empty years.
+    The newest year is found by walking back from `newest_year`; the oldest one with
+    exponential steps followed by a bisection. Returns (span or None when the whole window
+    is empty, {year: result} for every probed year) so callers can reuse the probes
+    instead of fetching those years again.
+    """
+    probes: Dict[int, object] = {}
+
+    def has_listings(year: int) -> bool:
+        if year not in probes:
+            probes[year] = fetch_year(year)
+        return probes[year].median > 0
+
+    # 1. newest year with listings (discontinued models). Scanned linearly: jumping ahead could
+    #    skip over a short production run, and the empty years are negatively cached anyway.
+    newest = next((year for year in range(newest_year, oldest_year - 1, -1) if has_listings(year)), None)
+    if newest is None:
+        return None, probes
+
+    # 2. oldest year with listings (handles recently launched models)
+    known_good = newest
+    step = 1
+    while True:
+        year = max(newest - step, oldest_year)
+        if year == known_good:
+            return YearSpan(newest, known_good), probes
+        if has_listings(year):
+            known_good = year
+            step *= 2
+            continue
+        oldest = _bisect_boundary(has_listings, known_good, year)
+        return YearSpan(newest, oldest), probes
+
+
+def _bisect_boundary(has_listings: Callable[[int], bool], good: int, empty: int) -> int:
+    """Return the year next to the empty side that still has listings, between `good` and `empty`."""
+    while abs(good - empty) > 1:
+        mid = (good + empty) // 2
+        if has_listings(mid):
+            good = mid
+        else:
+            empty = mid
+    return good
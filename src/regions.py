@@ -0,0 +1,104 @@
+"""
+Multi-region searches: the zip codes a request covers, how per-region listing
+statistics are pooled into one figure per year, and the per-region series
+returned alongside the pooled estimate.
+"""
+
+import math
+from typing import Any, Dict, Iterable, List, NamedTuple, Sequence
+
+from .fetcher import PriceStats
+from .geo import coordinates_for_zip
+
+# upper bound on concurrent upstream fetches for the regions of one request
+MAX_REGION_WORKERS = 8
+
+POOLED = "pooled"
+PER_REGION = "per_region"
+
+
+class RegionPrice(NamedTuple):
+    """Listing statistics of one registration year in one region."""
+    zip_code: str
+    median: float
+    stddev: float
+    count: int = 0
+
+
+def region_zip_codes(req) -> List[str]:
+    """Zip codes searched for `req`: `zip_codes` when given (deduplicated, in order), else `zip_code`."""
+    zip_codes = getattr(req, "zip_codes", None)
+    if not zip_codes:
+        return [req.zip_code]
+    return list(dict.fromkeys(z.strip() for z in zip_codes if z and z.strip())) or [req.zip_code]
+
+
+def _weighted_median(values: Sequence[float], weights: Sequence[float]) -> float:
+    pairs = sorted(zip(values, weights))
+    half = sum(weights) / 2.0
+    cumulative = 0.0
+    for i, (value, weight) in enumerate(pairs):
+        cumulative += weight
+        if cumulative > half:
+            return value
+        if cumulative == half:
+            return (value + pairs[i + 1][0]) / 2.0
+    return pairs[-1][0]
+
+
+def pool_price_stats(stats: Iterable[PriceStats]) -> PriceStats:
+    """
+    Combine per-region statistics of the same year into one PriceStats: the
+    listing-count-weighted median of the regional medians, and the pooled standard
+    deviation (within-region variance plus the spread of the regional medians).
+    p10/p90 and the trimmed mean are count-weighted means of the regional ones (an
+    approximation: the regional price distributions themselves are not kept).
+    Regions without listings are ignored; the result is stale if any input was.
+    """
+    stats = list(stats)
+    stale = any(s.stale for s in stats)
+    observed = [s for s in stats if s.median > 0]
+    if not observed:
+        return PriceStats(0, 0.0, 0, stale)
+    if len(observed) == 1:
+        return observed[0]._replace(stale=stale)
+
+    weights = [max(int(s.count), 1) for s in observed]
+    total = sum(weights)
+    median = _weighted_median([s.median for s in observed], weights)
+    mean = sum(w * s.median for w, s in zip(weights, observed)) / total
+    spread = sum((w - 1) * s.stddev ** 2 + w * (s.median - mean) ** 2 for w, s in zip(weights, observed))
+    stddev = math.sqrt(spread / (total - 1)) if total > 1 else 0.0
+
+    def weighted_mean(field: str) -> float:
+        return round(sum(w * getattr(s, field) for w, s in zip(weights, observed)) / total, 2)
+
+    return PriceStats(int(round(median)), stddev, sum(int(s.count) for s in observed), stale,
+                      p10=weighted_mean("p10"), p90=weighted_mean("p90"),
+                      trimmed_mean=weighted_mean("trimmed_mean"),
+                      outliers=sum(int(s.outliers) for s in observed))
+
+
+def region_series(points: Iterable[Any]) -> List[Dict[str, Any]]:
+    """
+    Per-region series (shape of `models.RegionSeries`) from YearPrice points carrying
+    `regions`; years a region has no listings for are reported with a median of 0.
+    """
+    by_zip: Dict[str, Dict[str, Any]] = {}
+    for point in points:
+        for region in point.regions or ():
+            coordinates = coordinates_for_zip(region.zip_code)
+            series = by_zip.setdefault(region.zip_code, {
+                "zip_code": region.zip_code,
+                "latitude": coordinates.lat,
+                "longitude": coordinates.lon,
+                "years": [],
+                "year_values": [],
+                "price_stddev": [],
+                "listing_counts": [],
+            })
+            series["years"].append(point.year)
+            series["year_values"].append(float(region.median))
+            series["price_stddev"].append(float(region.stddev))
+            series["listing_counts"].append(int(region.count))
+    return list(by_zip.values())
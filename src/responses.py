@@ -0,0 +1,38 @@
+"""
+Fast JSON responses.
+
+FastAPI validates a returned model against `response_model` a second time and then
+runs it through `jsonable_encoder` + `json.dumps`, which dominates CPU time on large
+payloads such as the break-even matrix. Endpoints whose results are built internally
+(and therefore already trusted) return a `FastJSONResponse` instead, which skips both.
+"""
+
+from typing import Any
+
+import pydantic_core
+from pydantic import BaseModel
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize a pydantic model or plain JSON-compatible data to compact UTF-8 JSON.
+    Models go through pydantic's own serializer; plain containers through orjson when
+    installed (pydantic_core otherwise, both far faster than the stdlib encoder).
+    """
+    if isinstance(content, BaseModel) or orjson is None:
+        return pydantic_core.to_json(content)
+    return orjson.dumps(content)
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with `dumps`, without response-model validation."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,240 @@
+"""
+Year series helpers: build the per-registration-year selections used by the
+estimate endpoints and walk the fetcher over them, newest year first.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from .deadline import propagate
+from .depreciation import AgeObservation, DepreciationModel, anchor_offsets
+from .fetcher import CircuitOpenError, DeadlineExceeded
+from .probing import YearSpan
+from .regions import MAX_REGION_WORKERS, RegionPrice, pool_price_stats, region_zip_codes
+
+OBSERVED = "observed"
+FITTED = "fitted"
+
+# where a year's price came from when the upstream is degraded
+FRESH = "fresh"
+STALE = "stale"              # expired cache entry served because the upstream failed
+UNAVAILABLE = "unavailable"  # not cached and the upstream circuit is open
+TIMED_OUT = "timed_out"      # not cached and the request deadline had passed
+DEGRADED_WARNING = "Listing source temporarily unavailable"
+PARTIAL_WARNING = "Partial result"
+
+
+class InsufficientDataError(ValueError):
+    """Raised when too few years have listings to project the requested horizon."""
+
+
+class YearPrice(NamedTuple):
+    """Median listing price, standard deviation and listing count observed for one registration year."""
+    year: int
+    median: float
+    stddev: float
+    count: int = 0
+    freshness: str = FRESH
+    # per-region figures when several zip codes were pooled into this point
+    regions: Optional[Tuple[RegionPrice, ...]] = None
+    p10: float = 0.0
+    p90: float = 0.0
+    trimmed_mean: float = 0.0
+    outliers: int = 0
+
+
+def build_selection(
+    brand: str,
+    model: str,
+    details: Optional[str],
+    zip_code: Optional[str],
+    shift_types: Optional[List[str]],
+    year: Optional[int],
+) -> Dict[str, object]:
+    """Return the `selected_values` dict understood by `Fetcher.fetch_car_costs`."""
+    return {
+        "make": brand,
+        "model": model,
+        "details": details or "",
+        "zip": zip_code,
+        "firstRegistration": year,
+        "shift_type": shift_types or [],
+    }
+
+
+def iter_year_prices(
+    fetcher, req, newest_year: int, count: int, offsets: Optional[Iterable[int]] = None
+) -> Iterator[YearPrice]:
+    """
+    Fetch `count` registration years starting at `newest_year` and going backwards,
+    yielding each year's price as soon as it is available.
+    `req` is any request model carrying brand/model/details/zip_code/shift_types.
+    `offsets` restricts the walk to those year offsets (sparse sampling).
+    With `req.adaptive_probing` the span of years that have listings is located first and
+    years outside it are not requested at all.
+    With several `req.zip_codes` the regions of a year are fetched concurrently and pooled
+    (see `regions.pool_price_stats`); the per-region figures are kept in `YearPrice.regions`.
+    Years without listings are yielded with a median of 0.
+    While the upstream circuit is open, uncached years are yielded as UNAVAILABLE (median 0)
+    instead of failing the walk, and once the request deadline has passed as TIMED_OUT; the
+    CircuitOpenError or DeadlineExceeded is raised at the end if nothing was observed.
+    """
+    zip_codes = region_zip_codes(req)
+    multi_region = len(zip_codes) > 1
+
+    def selection(zip_code: Optional[str], year: Optional[int]) -> Dict[str, object]:
+        return build_selection(req.brand, req.model, req.details, zip_code, req.shift_types, year)
+
+    with ThreadPoolExecutor(min(len(zip_codes), MAX_REGION_WORKERS)) if multi_region else nullcontext() as pool:
+        def each_region(fn) -> list:
+            return list(pool.map(propagate(fn), zip_codes) if pool is not None else map(fn, zip_codes))
+
+        adaptive = getattr(req, "adaptive_probing", False)
+        span, probes = None, {}
+        if adaptive:
+            oldest_year = newest_year - count + 1
+            try:
+                found = each_region(lambda z: fetcher.find_year_span(selection(z, None), newest_year, oldest_year))
+            except (CircuitOpenError, DeadlineExceeded):
+                adaptive = False  # fall back to whatever is cached year by year
+            else:
+                spans = [region_span for region_span, _ in found if region_span is not None]
+                if spans:
+                    span = YearSpan(max(sp.newest for sp in spans), min(sp.oldest for sp in spans))
+                probes = {(z, year): stats for z, (_, found_probes) in zip(zip_codes, found)
+                          for year, stats in found_probes.items()}
+
+        unavailable_error = None
+        observed = False
+        for offset in (range(count) if offsets is None else offsets):
+            year = newest_year - offset
+            if adaptive and (span is None or year not in span):
+                yield YearPrice(year, 0.0, 0.0, 0)
+                continue
+
+            def fetch(zip_code):
+                stats = probes.get((zip_code, year))
+                if stats is not None:
+                    return stats
+                try:
+                    return fetcher.fetch_price_stats(selection(zip_code, year))
+                except (CircuitOpenError, DeadlineExceeded) as ex:
+                    return ex
+
+            results = each_region(fetch)
+            available = [(z, r) for z, r in zip(zip_codes, results)
+                         if not isinstance(r, (CircuitOpenError, DeadlineExceeded))]
+            if not available:
+                # fail fast for this year and keep going: later years may still be cached
+                unavailable_error = results[0]
+                yield YearPrice(year, 0.0, 0.0, 0,
+                                TIMED_OUT if isinstance(unavailable_error, DeadlineExceeded) else UNAVAILABLE)
+                continue
+
+            regions = None
+            stats = available[0][1]
+            if multi_region:
+                stats = pool_price_stats(r for _, r in available)
+                regions = tuple(RegionPrice(z, float(r.median or 0), float(r.stddev or 0), int(r.count or 0))
+                                for z, r in available)
+            observed = observed or bool(stats.median)
+            yield YearPrice(year, float(stats.median or 0), float(stats.stddev or 0), int(stats.count or 0),
+                            STALE if getattr(stats, "stale", False) else FRESH, regions,
+                            float(getattr(stats, "p10", 0) or 0), float(getattr(stats, "p90", 0) or 0),
+                            float(getattr(stats, "trimmed_mean", 0) or 0), int(getattr(stats, "outliers", 0) or 0))
+
+    if unavailable_error is not None and not observed:
+        raise unavailable_error
+
+
+def year_prices_cached(fetcher, req, newest_year: int, count: int, offsets: Optional[Iterable[int]] = None) -> bool:
+    """True when every price `iter_year_prices` would fetch for `req` is already cached (checked newest first)."""
+    zip_codes = region_zip_codes(req)
+    return all(
+        fetcher.has_price_stats(build_selection(req.brand, req.model, req.details, zip_code, req.shift_types,
+                                                newest_year - offset))
+        for offset in (range(count) if offsets is None else offsets)
+        for zip_code in zip_codes
+    )
+
+
+def degradation_warning(points: Iterable[YearPrice]) -> Optional[str]:
+    """
+    Warning describing stale or skipped years when the upstream was unavailable, and years
+    left out because the request deadline passed; None otherwise.
+    """
+    points = list(points)
+    stale = [str(p.year) for p in points if p.freshness == STALE]
+    skipped = [str(p.year) for p in points if p.freshness == UNAVAILABLE]
+    timed_out = [str(p.year) for p in points if p.freshness == TIMED_OUT]
+    sentences = []
+    if stale or skipped:
+        parts = []
+        if stale:
+            parts.append(f"cached prices that may be outdated were used for {', '.join(stale)}")
+        if skipped:
+            parts.append(f"{', '.join(skipped)} could not be fetched")
+        sentences.append(f"{DEGRADED_WARNING}: " + "; ".join(parts) + ".")
+    if timed_out:
+        sentences.append(f"{PARTIAL_WARNING}: the time budget ran out before {', '.join(timed_out)} could be fetched.")
+    return " ".join(sentences) or None
+
+
+def year_statistics(points: Iterable[YearPrice]) -> List[Dict[str, object]]:
+    """Listing statistics (shape of `models.YearStats`) of the fetched years that have listings, newest first."""
+    return [
+        {"year": p.year, "median": p.median, "stddev": round(p.stddev, 2), "p10": p.p10, "p90": p.p90,
+         "trimmed_mean": p.trimmed_mean, "count": p.count, "outliers": p.outliers, "freshness": p.freshness}
+        for p in points if p.median > 0
+    ]
+
+
+def complete_year_series(
+    points: Iterable[YearPrice], newest_year: int, count: int
+) -> Tuple[List[float], List[float], List[str]]:
+    """
+    Return (values, stddevs, sources) for every offset in [0, count): observed years keep
+    their fetched median, the others are filled from a depreciation curve fitted on the
+    observed ones. Raises ValueError when nothing was observed.
+    """
+    observed = {newest_year - p.year: p for p in points if p.median > 0}
+    model = DepreciationModel.fit([
+        AgeObservation(offset, p.median, p.stddev, p.count) for offset, p in observed.items()
+    ])
+
+    values, stddevs, sources = [], [], []
+    for offset in range(count):
+        point = observed.get(offset)
+        if point is not None:
+            values.append(point.median)
+            stddevs.append(point.stddev)
+            sources.append(OBSERVED)
+        else:
+            values.append(round(model.predict(offset), 2))
+            stddevs.append(round(model.predict_stddev(offset), 2))
+            sources.append(FITTED)
+    return values, stddevs, sources
+
+
+def sampling_offsets(req, count: int) -> Optional[List[int]]:
+    """Year offsets to fetch for `req`: the sparse anchors when requested, otherwise all of them (None)."""
+    if req.sparse_anchor_years:
+        return anchor_offsets(count, req.sparse_anchor_years)
+    return None
+
+
+def assemble_year_series(
+    req, points: List[YearPrice], newest_year: int, count: int
+) -> Tuple[List[float], List[float], Optional[List[str]]]:
+    """
+    Turn fetched points into the (values, stddevs, sources) series used by the calculators.
+    Without curve fitting, years lacking listings are dropped and `sources` is None; with
+    `fill_missing_years` or sparse sampling every offset is present and flagged.
+    """
+    if req.fill_missing_years or req.sparse_anchor_years:
+        if not any(p.median > 0 for p in points):
+            raise InsufficientDataError("Not enough historical data to perform an estimate.")
+        return complete_year_series(points, newest_year, count)
+
+    observed = [p for p in points if p.median > 0]
+    return [p.median for p in observed], [p.stddev for p in observed], None
@@ -0,0 +1,382 @@
+"""
+Read-only price snapshot: the current price table (the newest PriceStats of every
+selection and registration year) in a compact binary file that every worker process maps
+into memory. Lookups are binary searches over the shared pages: nothing is copied or
+deserialized when a worker starts, and a cold worker answers from the snapshot instead
+of re-scraping what another worker already fetched.
+
+A refresher (`SnapshotRefresher`, or `python -m src.snapshot` from cron) rebuilds the file
+from the observation store (see `store`) and swaps it in atomically; readers notice the
+new file (checked at most every `check_interval` seconds) and map it without a restart.
+
+Layout (little-endian; offsets of the sections follow from the counts):
+
+    header      magic "CCPRICE1", keys, records, key bytes (uint32), created_at (float64),
+                padded to 32 bytes
+    key index   uint32[keys + 1]  offset of each key in the key bytes, sorted by key
+                uint32[keys + 1]  first record of each key (its series ends at the next one's)
+    key bytes   the keys (`fetcher.selection_key` without the year), UTF-8, padded to 8
+    columns     int32[records] year, count, outliers (padded to 8), then float64[records]
+                median, stddev, p10, p90, trimmed_mean, observed_at (unix time)
+
+Records are sorted by key then year.
+
+    python -m src.snapshot -o prices.snap [--store observations.db]
+
+Enabled by CARCALC_SNAPSHOT_PATH; CARCALC_SNAPSHOT_REFRESH_INTERVAL (seconds) makes the
+app rebuild it from its store, which one process per host is enough to do.
+"""
+
+import argparse
+import bisect
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .store import StoreConfig, open_store
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CCPRICE1"
+_HEADER = struct.Struct("<8sIIId")
+_HEADER_SIZE = 32
+INT_COLUMNS = ("year", "count", "outliers")
+FLOAT_COLUMNS = ("median", "stddev", "p10", "p90", "trimmed_mean", "observed_at")
+
+
+class SnapshotError(ValueError):
+    """The file is not a (complete) price snapshot."""
+
+
+class SnapshotConfig(NamedTuple):
+    path: str = ""                  # snapshot file; empty disables it
+    check_interval: float = 1.0     # seconds between checks for a new file
+    refresh_interval: float = 0.0   # seconds between rebuilds from the store, 0: never
+
+    @classmethod
+    def from_env(cls) -> "SnapshotConfig":
+        return cls(
+            path=os.getenv("CARCALC_SNAPSHOT_PATH", cls._field_defaults["path"]),
+            check_interval=float(os.getenv("CARCALC_SNAPSHOT_CHECK_INTERVAL",
+                                           cls._field_defaults["check_interval"])),
+            refresh_interval=float(os.getenv("CARCALC_SNAPSHOT_REFRESH_INTERVAL",
+                                             cls._field_defaults["refresh_interval"])),
+        )
+
+
+class SnapshotEntry(NamedTuple):
+    """One record: the price statistics of a selection key and registration year."""
+    key: str
+    year: int
+    median: float
+    stddev: float
+    count: int
+    observed_at: float
+    p10: float = 0.0
+    p90: float = 0.0
+    trimmed_mean: float = 0.0
+    outliers: int = 0
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def write_snapshot(path: str, entries: Iterable[SnapshotEntry], created_at: Optional[float] = None) -> int:
+    """
+    Write `entries` as a snapshot at `path`, atomically: the file is written next to it and
+    renamed over it, so readers see either the old or the new snapshot. A later entry for
+    the same key and year replaces an earlier one. Returns the number of records.
+    """
+    latest: Dict[Tuple[bytes, int], SnapshotEntry] = {}
+    for entry in entries:
+        latest[(entry.key.encode("utf-8"), int(entry.year))] = entry
+    records = sorted(latest.items())
+
+    key_offsets, key_first, key_bytes = array("I"), array("I"), bytearray()
+    ints = {name: array("i") for name in INT_COLUMNS}
+    floats = {name: array("d") for name in FLOAT_COLUMNS}
+    previous = None
+    for index, ((key, _), entry) in enumerate(records):
+        if key != previous:
+            key_offsets.append(len(key_bytes))
+            key_first.append(index)
+            key_bytes += key
+            previous = key
+        for name in INT_COLUMNS:
+            ints[name].append(int(getattr(entry, name)))
+        for name in FLOAT_COLUMNS:
+            floats[name].append(float(getattr(entry, name)))
+    key_offsets.append(len(key_bytes))
+    key_first.append(len(records))
+
+    arrays: List[array] = [key_offsets, key_first, *ints.values(), *floats.values()]
+    if sys.byteorder != "little":
+        for values in arrays:
+            values.byteswap()
+    header = _HEADER.pack(MAGIC, len(key_first) - 1, len(records), len(key_bytes),
+                          time.time() if created_at is None else created_at)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    temporary = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temporary, "wb") as fh:
+            fh.write(header.ljust(_HEADER_SIZE, b"\0"))
+            fh.write(key_offsets.tobytes())
+            fh.write(key_first.tobytes())
+            fh.write(bytes(key_bytes))
+            fh.write(b"\0" * (_align(fh.tell()) - fh.tell()))
+            for name in INT_COLUMNS:
+                fh.write(ints[name].tobytes())
+            fh.write(b"\0" * (_align(fh.tell()) - fh.tell()))
+            for name in FLOAT_COLUMNS:
+                fh.write(floats[name].tobytes())
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+    return len(records)
+
+
+class PriceSnapshot:
+    """One mapped snapshot file. The columns are views over the mapping, never copies."""
+
+    def __init__(self, path: str):
+        if sys.byteorder != "little":
+            raise SnapshotError("price snapshots can only be mapped on little-endian hosts")
+        with open(path, "rb") as fh:
+            stat = os.fstat(fh.fileno())
+            if stat.st_size < _HEADER_SIZE:
+                raise SnapshotError(f"{path} is too short for a price snapshot")
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        # the file is replaced, never modified in place, so this identifies its content
+        self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        self.path = path
+
+        view = memoryview(self._map)
+        magic, self.keys, self.records, key_size, self.created_at = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path} is not a price snapshot")
+        index_size = 4 * (self.keys + 1)
+        key_start = _HEADER_SIZE + 2 * index_size
+        ints_start = _align(key_start + key_size)
+        floats_start = _align(ints_start + 4 * self.records * len(INT_COLUMNS))
+        if stat.st_size < floats_start + 8 * self.records * len(FLOAT_COLUMNS):
+            raise SnapshotError(f"{path} is truncated")
+
+        self._key_offsets = view[_HEADER_SIZE:_HEADER_SIZE + index_size].cast("I")
+        self._key_first = view[_HEADER_SIZE + index_size:key_start].cast("I")
+        self._key_bytes = view[key_start:key_start + key_size]
+        self._columns: Dict[str, memoryview] = {}
+        for number, name in enumerate(INT_COLUMNS):
+            start = ints_start + 4 * self.records * number
+            self._columns[name] = view[start:start + 4 * self.records].cast("i")
+        for number, name in enumerate(FLOAT_COLUMNS):
+            start = floats_start + 8 * self.records * number
+            self._columns[name] = view[start:start + 8 * self.records].cast("d")
+
+    def _key(self, index: int) -> bytes:
+        return bytes(self._key_bytes[self._key_offsets[index]:self._key_offsets[index + 1]])
+
+    def find(self, key: str) -> Optional[range]:
+        """Records of `key` (in year order), None when it is not in the snapshot."""
+        target = key.encode("utf-8")
+        low, high = 0, self.keys
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.keys or self._key(low) != target:
+            return None
+        return range(self._key_first[low], self._key_first[low + 1])
+
+    def entry(self, key: str, index: int) -> SnapshotEntry:
+        columns = self._columns
+        return SnapshotEntry(key, columns["year"][index], columns["median"][index], columns["stddev"][index],
+                             columns["count"][index], columns["observed_at"][index], columns["p10"][index],
+                             columns["p90"][index], columns["trimmed_mean"][index], columns["outliers"][index])
+
+    def get(self, key: str, year: int) -> Optional[SnapshotEntry]:
+        """The record of `key` for registration `year`, None when there is none."""
+        rows = self.find(key)
+        if rows is None:
+            return None
+        years = self._columns["year"]
+        index = bisect.bisect_left(years, year, rows.start, rows.stop)
+        if index == rows.stop or years[index] != year:
+            return None
+        return self.entry(key, index)
+
+    def series(self, key: str) -> List[SnapshotEntry]:
+        """Every record of `key`, oldest registration year first."""
+        rows = self.find(key)
+        return [] if rows is None else [self.entry(key, index) for index in rows]
+
+    def entries(self) -> Iterable[SnapshotEntry]:
+        for index in range(self.keys):
+            key = self._key(index).decode("utf-8")
+            for row in range(self._key_first[index], self._key_first[index + 1]):
+                yield self.entry(key, row)
+
+    def close(self) -> None:
+        for column in self._columns.values():
+            column.release()
+        for view in (self._key_offsets, self._key_first, self._key_bytes):
+            view.release()
+        self._map.close()
+
+
+class SnapshotReader:
+    """
+    The current snapshot at a path, re-opened when the file is replaced. Missing or invalid
+    files are skipped (the previous snapshot, if any, stays in use).
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._current: Optional[PriceSnapshot] = None
+        self._checked: Optional[float] = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.hits = 0
+        self.misses = 0
+
+    def current(self) -> Optional[PriceSnapshot]:
+        now = time.monotonic()
+        if self._checked is None or now - self._checked >= self.check_interval:
+            self._check(now)
+        return self._current
+
+    def _check(self, now: float) -> None:
+        with self._lock:
+            if self._checked is not None and now - self._checked < self.check_interval:
+                return
+            self._checked = now
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                return
+            current = self._current
+            if current is not None and current.identity == (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+                return
+            try:
+                snapshot = PriceSnapshot(self.path)
+            except (OSError, ValueError) as ex:
+                logger.warning("cannot open price snapshot %s: %s", self.path, ex)
+                return
+            # the previous mapping goes away with the last lookup still using it
+            self._current = snapshot
+            self.reloads += 1
+            logger.info("price snapshot %s loaded: %d records", self.path, snapshot.records)
+
+    def get(self, key: str, year: int) -> Optional[SnapshotEntry]:
+        snapshot = self.current()
+        entry = None if snapshot is None else snapshot.get(key, year)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def describe(self) -> Dict[str, object]:
+        snapshot = self._current
+        return {
+            "path": self.path,
+            "loaded": snapshot is not None,
+            "created_at": None if snapshot is None else snapshot.created_at,
+            "keys": 0 if snapshot is None else snapshot.keys,
+            "records": 0 if snapshot is None else snapshot.records,
+            "reloads": self.reloads,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def open_snapshot(config: SnapshotConfig) -> Optional[SnapshotReader]:
+    """The configured snapshot reader, None when disabled."""
+    if not config.path:
+        return None
+    return SnapshotReader(config.path, config.check_interval)
+
+
+def store_entries(store) -> List[SnapshotEntry]:
+    """The newest observation of every selection and year in an `ObservationStore`."""
+    entries = []
+    for (observed_at, brand, model, details, zip_code, shift_types, year,
+         median, stddev, count, p10, p90, trimmed_mean, outliers) in store.latest_observations():
+        # same layout as fetcher.selection_key(..., include_year=False)
+        key = "|".join((brand, model, details, zip_code, shift_types))
+        entries.append(SnapshotEntry(key, year, median, stddev, count, observed_at, p10, p90, trimmed_mean, outliers))
+    return entries
+
+
+class SnapshotRefresher:
+    """Background thread rebuilding the snapshot from the observation store."""
+
+    def __init__(self, store, config: SnapshotConfig):
+        self.store = store
+        self.config = config
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> int:
+        """Rewrite the snapshot; returns the number of records."""
+        return write_snapshot(self.config.path, store_entries(self.store))
+
+    def start(self) -> None:
+        if self._thread is not None or self.store is None or not self.config.path \
+                or self.config.refresh_interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                count = self.run_once()
+                logger.info("price snapshot rewritten: %d records", count)
+            except Exception:
+                logger.exception("price snapshot refresh failed")
+            if self._stop.wait(self.config.refresh_interval):
+                return
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build the price snapshot from the observation store.")
+    parser.add_argument("-o", "--output", help="snapshot file (default: CARCALC_SNAPSHOT_PATH)")
+    parser.add_argument("--store", help="SQLite store (default: CARCALC_STORE_PATH)")
+    args = parser.parse_args(argv)
+    output = args.output or SnapshotConfig.from_env().path
+    store = open_store(StoreConfig(args.store) if args.store else StoreConfig.from_env())
+    if store is None or not output:
+        print("pass --store and -o, or set CARCALC_STORE_PATH and CARCALC_SNAPSHOT_PATH", file=sys.stderr)
+        return 2
+    try:
+        count = write_snapshot(output, store_entries(store))
+    finally:
+        store.close()
+    print(f"{count} records written to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
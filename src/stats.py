@@ -0,0 +1,221 @@
+"""
+Streaming price statistics in bounded memory.
+
+`RunningStats` keeps count/mean/variance with Welford's update, `QuantileSketch` is a
+KLL-style quantile sketch (exact until `k` values have been added, approximate with
+bounded rank error afterwards), and `PriceAccumulator` combines them to summarise
+listing prices fed one at a time: IQR outlier rejection of mis-parsed prices, then
+median, p10/p90, trimmed mean and standard deviation of the remaining ones.
+All three can be merged, e.g. to pool several result pages.
+"""
+
+import bisect
+import math
+import random
+from typing import List, NamedTuple, Optional, Tuple
+
+
+class RunningStats:
+    """Welford's online mean/variance, mergeable (Chan et al.)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "RunningStats") -> None:
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0 with fewer than two values)."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """
+    KLL-style sketch: a stack of compactors where level h holds items of weight 2**h.
+    A full level is sorted and every other item (random offset) is promoted, so memory
+    stays around 3k items regardless of how many values are added.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        if k < 8:
+            raise ValueError("k must be at least 8")
+        self.k = int(k)
+        self.count = 0
+        self._levels: List[List[float]] = [[]]
+        self._rng = random.Random(seed)
+
+    def add(self, value: float) -> None:
+        self._levels[0].append(value)
+        self.count += 1
+        if len(self._levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        while len(self._levels) < len(other._levels):
+            self._levels.append([])
+        for level, items in enumerate(other._levels):
+            self._levels[level].extend(items)
+        self.count += other.count
+        self._compress()
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self._levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self._levels):
+            if len(self._levels[level]) >= self._capacity(level):
+                if level + 1 == len(self._levels):
+                    self._levels.append([])
+                items = sorted(self._levels[level])
+                leftover = [items.pop()] if len(items) % 2 else []
+                self._levels[level + 1].extend(items[self._rng.randint(0, 1)::2])
+                self._levels[level] = leftover
+            level += 1
+
+    @property
+    def retained(self) -> int:
+        """Number of items held in memory."""
+        return sum(len(items) for items in self._levels)
+
+    def weighted_items(self) -> List[Tuple[float, int]]:
+        """(value, weight) pairs sorted by value; the weights add up to `count`."""
+        return sorted((value, 1 << level) for level, items in enumerate(self._levels) for value in items)
+
+    def quantile(self, q: float) -> float:
+        return weighted_quantile(self.weighted_items(), q)
+
+
+def _cumulative(items: List[Tuple[float, int]]) -> List[int]:
+    total, out = 0, []
+    for _, weight in items:
+        total += weight
+        out.append(total)
+    return out
+
+
+def weighted_quantile(items: List[Tuple[float, int]], q: float) -> float:
+    """
+    Quantile of sorted (value, weight) pairs, each standing for `weight` equal values,
+    with linear interpolation between closest ranks (same as numpy's default and, for
+    q=0.5, `statistics.median`).
+    """
+    if not items:
+        raise ValueError("no values")
+    cumulative = _cumulative(items)
+    position = min(max(q, 0.0), 1.0) * (cumulative[-1] - 1)
+    lower = math.floor(position)
+
+    def value_at(rank: int) -> float:
+        return items[bisect.bisect_right(cumulative, rank)][0]
+
+    low = value_at(lower)
+    if position == lower:
+        return low
+    return low + (value_at(lower + 1) - low) * (position - lower)
+
+
+def _trimmed_mean(items: List[Tuple[float, int]], trim: float) -> float:
+    total = sum(weight for _, weight in items)
+    cut = int(total * trim)
+    start, end = cut, total - cut
+    acc = weight_sum = 0.0
+    position = 0
+    for value, weight in items:
+        overlap = min(end, position + weight) - max(start, position)
+        if overlap > 0:
+            acc += value * overlap
+            weight_sum += overlap
+        position += weight
+    return acc / weight_sum
+
+
+class PriceSummary(NamedTuple):
+    count: int              # prices kept after outlier rejection
+    median: float
+    stddev: float
+    p10: float
+    p90: float
+    trimmed_mean: float
+    outliers: int           # prices rejected by the IQR fences
+    mean: float             # of every price, outliers included
+    raw_stddev: float       # of every price, outliers included
+
+
+class PriceAccumulator:
+    """
+    Summarise prices added one at a time, in bounded memory.
+    Prices outside [Q1 - iqr_factor*IQR, Q3 + iqr_factor*IQR] are treated as mis-parsed
+    (instalments, accessories, typos) once at least `min_count_for_outliers` prices exist.
+    """
+
+    def __init__(self, k: int = 200, trim: float = 0.1, iqr_factor: float = 1.5,
+                 min_count_for_outliers: int = 4, seed: Optional[int] = None):
+        self.trim = trim
+        self.iqr_factor = iqr_factor
+        self.min_count_for_outliers = min_count_for_outliers
+        self.running = RunningStats()
+        self.sketch = QuantileSketch(k, seed)
+
+    @property
+    def count(self) -> int:
+        return self.running.count
+
+    def add(self, price: float) -> None:
+        self.running.add(price)
+        self.sketch.add(price)
+
+    def merge(self, other: "PriceAccumulator") -> None:
+        self.running.merge(other.running)
+        self.sketch.merge(other.sketch)
+
+    def summary(self) -> Optional[PriceSummary]:
+        """Robust statistics of the prices added so far, None when there are none."""
+        items = self.sketch.weighted_items()
+        if not items:
+            return None
+        total = self.sketch.count
+        if total >= self.min_count_for_outliers:
+            q1, q3 = weighted_quantile(items, 0.25), weighted_quantile(items, 0.75)
+            fence = self.iqr_factor * (q3 - q1)
+            items = [(value, weight) for value, weight in items if q1 - fence <= value <= q3 + fence]
+        kept = sum(weight for _, weight in items)
+        mean = sum(value * weight for value, weight in items) / kept
+        spread = sum(weight * (value - mean) ** 2 for value, weight in items)
+        return PriceSummary(
+            count=kept,
+            median=weighted_quantile(items, 0.5),
+            stddev=math.sqrt(spread / (kept - 1)) if kept > 1 else 0.0,
+            p10=weighted_quantile(items, 0.1),
+            p90=weighted_quantile(items, 0.9),
+            trimmed_mean=_trimmed_mean(items, self.trim),
+            outliers=total - kept,
+            mean=self.running.mean,
+            raw_stddev=self.running.stddev,
+        )
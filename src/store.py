@@ -0,0 +1,266 @@
+"""
+Observation store: an append-only SQLite record of every listing scrape (one row per
+selection and registration year) and of every break-even analysis computed, kept for
+offline analysis (see `export`). The cache only holds the latest figures; this keeps
+their history.
+
+Enabled by CARCALC_STORE_PATH (a SQLite file, shared by every worker process that opens
+it); without it nothing is recorded.
+"""
+
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (column, type) of each exported dataset: string, int32, int64, float64, bool or timestamp
+OBSERVATION_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("observed_at", "timestamp"),
+    ("brand", "string"),
+    ("model", "string"),
+    ("details", "string"),
+    ("zip_code", "string"),
+    ("shift_types", "string"),
+    ("year", "int32"),
+    ("median", "float64"),
+    ("stddev", "float64"),
+    ("count", "int32"),
+    ("p10", "float64"),
+    ("p90", "float64"),
+    ("trimmed_mean", "float64"),
+    ("outliers", "int32"),
+)
+BREAK_EVEN_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("analysis_id", "int64"),
+    ("created_at", "timestamp"),
+    ("brand", "string"),
+    ("model", "string"),
+    ("details", "string"),
+    ("zip_code", "string"),
+    ("rent_monthly_cost", "float64"),
+    ("purchase_age", "int32"),
+    ("purchase_price", "float64"),
+    ("years_owned", "int32"),
+    ("overall_cost", "float64"),
+    ("monthly_cost", "float64"),
+    ("fitted", "bool"),
+)
+DATASETS = {"observations": OBSERVATION_COLUMNS, "break_even": BREAK_EVEN_COLUMNS}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY,
+    observed_at REAL NOT NULL,
+    brand TEXT NOT NULL, model TEXT NOT NULL, details TEXT NOT NULL,
+    zip_code TEXT NOT NULL, shift_types TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    median REAL NOT NULL, stddev REAL NOT NULL, count INTEGER NOT NULL,
+    p10 REAL NOT NULL, p90 REAL NOT NULL, trimmed_mean REAL NOT NULL, outliers INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS observations_by_vehicle ON observations (brand, model, observed_at);
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    brand TEXT NOT NULL, model TEXT NOT NULL, details TEXT NOT NULL, zip_code TEXT NOT NULL,
+    rent_monthly_cost REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_by_vehicle ON analyses (brand, model, created_at);
+CREATE TABLE IF NOT EXISTS break_even_points (
+    analysis_id INTEGER NOT NULL REFERENCES analyses (id),
+    purchase_age INTEGER NOT NULL, purchase_price REAL NOT NULL,
+    years_owned INTEGER NOT NULL, overall_cost REAL NOT NULL, monthly_cost REAL NOT NULL,
+    fitted INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS break_even_points_by_analysis ON break_even_points (analysis_id);
+"""
+
+
+class StoreConfig(NamedTuple):
+    path: str = ""   # SQLite file; empty disables the store
+
+    @classmethod
+    def from_env(cls) -> "StoreConfig":
+        return cls(path=os.getenv("CARCALC_STORE_PATH", cls._field_defaults["path"]))
+
+
+class ExportFilter(NamedTuple):
+    """Rows of one vehicle (brand/model, case-insensitive) recorded in [since, until)."""
+    brand: Optional[str] = None
+    model: Optional[str] = None
+    since: Optional[float] = None   # unix timestamps
+    until: Optional[float] = None
+
+
+def normalize(value: Optional[object]) -> str:
+    """Same spelling rules as the cache keys (`fetcher.selection_key`)."""
+    return str(value or "").strip().lower().replace(" ", "-")
+
+
+def parse_date(text: str, end: bool = False) -> float:
+    """
+    Unix timestamp of an ISO date or datetime (UTC unless it carries an offset). With `end`,
+    a plain date means the end of that day, so `until=2024-05-31` includes the 31st.
+    """
+    value = datetime.datetime.fromisoformat(text.strip())
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    if end and len(text.strip()) == 10:
+        value += datetime.timedelta(days=1)
+    return value.timestamp()
+
+
+class ObservationStore:
+    """The SQLite store (WAL mode, one connection per thread)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._conn().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def record_observation(self, selected_values: Dict[str, object], stats, observed_at: Optional[float] = None) -> None:
+        """Append the PriceStats scraped for a selection (errors are logged, never raised)."""
+        try:
+            self._conn().execute(
+                "INSERT INTO observations (observed_at, brand, model, details, zip_code, shift_types, year, "
+                "median, stddev, count, p10, p90, trimmed_mean, outliers) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time() if observed_at is None else observed_at,
+                 normalize(selected_values.get("make")), normalize(selected_values.get("model")),
+                 normalize(selected_values.get("details")), normalize(selected_values.get("zip")),
+                 ",".join(sorted(selected_values.get("shift_type") or [])),
+                 int(selected_values.get("firstRegistration") or 0),
+                 float(stats.median or 0), float(stats.stddev or 0), int(stats.count or 0),
+                 float(stats.p10), float(stats.p90), float(stats.trimmed_mean), int(stats.outliers)),
+            )
+        except sqlite3.Error as ex:
+            logger.warning("observation store write failed: %s", ex)
+
+    def record_analysis(self, req, result: Dict[str, Any], created_at: Optional[float] = None) -> Optional[int]:
+        """
+        Append a break-even analysis (`build_break_even_analysis` result for `req`) as one row
+        per (purchase age, years owned) pair. Returns its id, None when the write failed.
+        """
+        year_values = result["year_values"]
+        # purchase series exist for the ages that have a price, in age order
+        ages = [age for age, value in enumerate(year_values) if value != 0]
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN")
+            analysis_id = conn.execute(
+                "INSERT INTO analyses (created_at, brand, model, details, zip_code, rent_monthly_cost) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (time.time() if created_at is None else created_at, normalize(req.brand), normalize(req.model),
+                 normalize(req.details), normalize(req.zip_code), float(req.rent_monthly_cost)),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO break_even_points (analysis_id, purchase_age, purchase_price, years_owned, "
+                "overall_cost, monthly_cost, fitted) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(analysis_id, age, float(year_values[age]), point["years_owned"], point["overall_cost"],
+                  point["monthly_cost"], int(point["fitted"]))
+                 for age, series in zip(ages, result["purchase_series"]) for point in series["data_points"]],
+            )
+            conn.execute("COMMIT")
+            return analysis_id
+        except sqlite3.Error as ex:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.warning("observation store write failed: %s", ex)
+            return None
+
+    def iter_rows(self, dataset: str, filters: ExportFilter = ExportFilter(),
+                  chunk_size: int = 5000) -> Iterator[List[Tuple]]:
+        """
+        Rows of `dataset` ("observations" or "break_even") matching `filters`, in insertion
+        order, as lists of at most `chunk_size` tuples (columns of DATASETS[dataset]).
+        Reads through its own connection, so the chunks may be consumed from any thread.
+        """
+        if dataset not in DATASETS:
+            raise ValueError(f"unknown dataset {dataset!r}")
+        if dataset == "observations":
+            columns = ", ".join(name for name, _ in OBSERVATION_COLUMNS)
+            sql, time_column, order = f"SELECT {columns} FROM observations", "observed_at", "id"
+        else:
+            sql = ("SELECT a.id, a.created_at, a.brand, a.model, a.details, a.zip_code, a.rent_monthly_cost, "
+                   "p.purchase_age, p.purchase_price, p.years_owned, p.overall_cost, p.monthly_cost, p.fitted "
+                   "FROM analyses a JOIN break_even_points p ON p.analysis_id = a.id")
+            time_column, order = "a.created_at", "a.id, p.rowid"
+        prefix = "a." if dataset == "break_even" else ""
+        where, params = [], []
+        if filters.brand:
+            where.append(f"{prefix}brand = ?")
+            params.append(normalize(filters.brand))
+        if filters.model:
+            where.append(f"{prefix}model = ?")
+            params.append(normalize(filters.model))
+        if filters.since is not None:
+            where.append(f"{time_column} >= ?")
+            params.append(filters.since)
+        if filters.until is not None:
+            where.append(f"{time_column} < ?")
+            params.append(filters.until)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order}"
+
+        conn = self._connect()
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            conn.close()
+
+    def latest_observations(self) -> List[Tuple]:
+        """
+        The newest observation of every selection and registration year (OBSERVATION_COLUMNS),
+        e.g. to publish the current price table (see `snapshot`).
+        """
+        columns = ", ".join(name for name, _ in OBSERVATION_COLUMNS)
+        conn = self._connect()
+        try:
+            # SQLite takes the bare columns from the row holding MAX(id)
+            rows = conn.execute(
+                f"SELECT {columns}, MAX(id) FROM observations "
+                "GROUP BY brand, model, details, zip_code, shift_types, year"
+            ).fetchall()
+        finally:
+            conn.close()
+        return [row[:-1] for row in rows]
+
+    def close(self) -> None:
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+def open_store(config: StoreConfig) -> Optional[ObservationStore]:
+    """The configured store, None when disabled."""
+    if not config.path:
+        return None
+    return ObservationStore(config.path)
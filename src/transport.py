@@ -0,0 +1,445 @@
+"""
+Upstream HTTP transport used by the Fetcher.
+
+A `Transport` performs GETs with keep-alive connection pools sized for the fetch
+fan-out, negotiated compression, per-attempt connect/read timeouts that are separate
+from the retry budget, and counters telling how often connections are reused.
+Within a request deadline (see `deadline`) the timeouts are shortened to the time left
+and no retry is started that could not complete before it.
+
+`Transport.stream` hands the body to a consumer chunk by chunk instead of loading it;
+when the consumer stops early the rest is not downloaded (the connection is closed,
+unless little enough is left to drain it and keep it alive).
+
+Two implementations exist: `RequestsTransport` (requests/urllib3, the default) and
+`HTTPXTransport` (httpx, used when HTTP/2 is requested and the `h2` package is installed,
+so that concurrent requests to the same host are multiplexed on one connection).
+HTTP libraries are imported when a transport is created, not at module import.
+"""
+
+import importlib.util
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional, Tuple, TypeVar
+
+from . import deadline
+from .utils import create_retry_session
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+STREAM_CHUNK_SIZE = 16 * 1024
+# a stream stopped with at most this much left is read to the end to keep its connection
+DRAIN_LIMIT = 64 * 1024
+
+T = TypeVar("T")
+
+
+class TransportError(IOError):
+    """
+    Raised when a GET fails after the retry budget is spent (or with a non-retryable status).
+    `status` is the HTTP status of the final response, None for connection errors and timeouts.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class TransportConfig(NamedTuple):
+    pool_connections: int = 10     # hosts with a cached connection pool
+    pool_maxsize: int = 32         # keep-alive connections per host (>= concurrent fetches)
+    pool_block: bool = False       # wait for a free connection instead of opening throwaway ones
+    keepalive_expiry: float = 60.0 # seconds an idle connection is kept (httpx only)
+    connect_timeout: float = 3.05  # per attempt
+    read_timeout: float = 10.0     # per attempt
+    retries: int = 3               # retry budget, independent of the timeouts
+    backoff_factor: float = 0.5
+    http2: bool = False            # requires the optional `h2` package
+
+    @classmethod
+    def from_env(cls) -> "TransportConfig":
+        defaults = cls._field_defaults
+        return cls(
+            pool_connections=int(os.getenv("CARCALC_HTTP_POOL_CONNECTIONS", defaults["pool_connections"])),
+            pool_maxsize=int(os.getenv("CARCALC_HTTP_POOL_MAXSIZE", defaults["pool_maxsize"])),
+            pool_block=_env_flag("CARCALC_HTTP_POOL_BLOCK", defaults["pool_block"]),
+            keepalive_expiry=float(os.getenv("CARCALC_HTTP_KEEPALIVE", defaults["keepalive_expiry"])),
+            connect_timeout=float(os.getenv("CARCALC_HTTP_CONNECT_TIMEOUT", defaults["connect_timeout"])),
+            read_timeout=float(os.getenv("CARCALC_HTTP_READ_TIMEOUT", defaults["read_timeout"])),
+            retries=int(os.getenv("CARCALC_HTTP_RETRIES", defaults["retries"])),
+            backoff_factor=float(os.getenv("CARCALC_HTTP_BACKOFF", defaults["backoff_factor"])),
+            http2=_env_flag("CARCALC_HTTP2", defaults["http2"]),
+        )
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _charset(content_type: Optional[str]) -> Optional[str]:
+    for param in (content_type or "").split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset" and value.strip():
+            return value.strip().strip('"')
+    return None
+
+
+class ResponseBody:
+    """
+    Body of a streamed response, as passed to the consumer of `Transport.stream`: iterating
+    it yields the (decompressed) body in chunks, and stopping early leaves the rest unread.
+    """
+
+    def __init__(self, chunks: Iterator[bytes], encoding: Optional[str] = None, length: Optional[int] = None):
+        self._chunks = chunks
+        self.encoding = encoding    # charset of the Content-Type, None when not given
+        self.length = length        # Content-Length (as sent, possibly compressed), None when unknown
+        self.bytes_read = 0
+        self.exhausted = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._chunks:
+            self.bytes_read += len(chunk)
+            yield chunk
+        self.exhausted = True
+
+    def drain(self) -> None:
+        for _ in self:
+            pass
+
+
+def _content_length(headers) -> Optional[int]:
+    value = (headers.get("Content-Length") or "").strip()
+    return int(value) if value.isdigit() else None
+
+
+def accepted_encodings() -> str:
+    """Accept-Encoding value listing only the codings the installed decoders can handle."""
+    codings = ["gzip", "deflate"]
+    if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi"):
+        codings.append("br")
+    if importlib.util.find_spec("zstandard"):
+        codings.append("zstd")
+    return ", ".join(codings)
+
+
+class TransportStats:
+    """Thread-safe counters of upstream attempts and connection reuse."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0          # logical GETs
+        self.attempts = 0          # wire attempts, retries included
+        self.errors = 0            # GETs that failed after retries
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.connections_discarded = 0  # pool full: connection closed after use
+        self.http_versions: Dict[str, int] = {}
+        self.streamed = 0          # bodies read through `stream`
+        self.stopped_early = 0     # ... whose consumer did not need the whole body
+        self.body_bytes = 0        # decompressed bytes read from streamed bodies
+        self.wire_bytes = 0        # bytes received for them
+
+    def record_request(self, http_version: Optional[str] = None, failed: bool = False) -> None:
+        with self._lock:
+            self.requests += 1
+            if failed:
+                self.errors += 1
+            if http_version:
+                self.http_versions[http_version] = self.http_versions.get(http_version, 0) + 1
+
+    def record_attempt(self, new_connection: bool) -> None:
+        with self._lock:
+            self.attempts += 1
+            if new_connection:
+                self.connections_opened += 1
+            else:
+                self.connections_reused += 1
+
+    def record_discard(self) -> None:
+        with self._lock:
+            self.connections_discarded += 1
+
+    def record_body(self, body_bytes: int, wire_bytes: int, stopped_early: bool) -> None:
+        with self._lock:
+            self.streamed += 1
+            self.stopped_early += stopped_early
+            self.body_bytes += body_bytes
+            self.wire_bytes += wire_bytes
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            used = self.connections_opened + self.connections_reused
+            return {
+                "requests": self.requests,
+                "attempts": self.attempts,
+                "errors": self.errors,
+                "connections_opened": self.connections_opened,
+                "connections_reused": self.connections_reused,
+                "connections_discarded": self.connections_discarded,
+                "reuse_ratio": round(self.connections_reused / used, 4) if used else 0.0,
+                "http_versions": dict(self.http_versions),
+                "streamed": self.streamed,
+                "stopped_early": self.stopped_early,
+                "body_bytes": self.body_bytes,
+                "wire_bytes": self.wire_bytes,
+                "avg_body_bytes": round(self.body_bytes / self.streamed) if self.streamed else 0,
+            }
+
+
+class Transport:
+    """GET-only upstream client. `get` returns a response exposing `.content`, `.text`, `.json()`."""
+    name = "base"
+
+    def __init__(self, config: Optional[TransportConfig] = None):
+        self.config = config or TransportConfig()
+        self.stats = TransportStats()
+        self.headers = {"Accept-Encoding": accepted_encodings(), "Connection": "keep-alive"}
+
+    def timeouts(self, read_timeout: Optional[float] = None) -> Tuple[float, float]:
+        read = self.config.read_timeout if read_timeout is None else float(read_timeout)
+        # never 0: that would mean "no wait at all" rather than "no time left"
+        return (max(0.01, deadline.clip(self.config.connect_timeout)), max(0.01, deadline.clip(read)))
+
+    def get(self, url: str, timeout: Optional[float] = None):
+        raise NotImplementedError
+
+    def stream(self, url: str, consume: Callable[[ResponseBody], T], timeout: Optional[float] = None) -> T:
+        """
+        GET `url` and return `consume(body)`, the body being read as the consumer iterates it.
+        Failures before or while reading raise TransportError; the consumer's own exceptions
+        propagate. The response is closed when it returns.
+        """
+        content = self.get(url, timeout=timeout).content
+        return consume(ResponseBody(iter([content]), length=len(content)))
+
+    def close(self) -> None:
+        pass
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "transport": self.name,
+            "http2": False,
+            "pool_maxsize": self.config.pool_maxsize,
+            "connect_timeout": self.config.connect_timeout,
+            "read_timeout": self.config.read_timeout,
+            "retries": self.config.retries,
+            "accept_encoding": self.headers["Accept-Encoding"],
+            **self.stats.snapshot(),
+        }
+
+
+class RequestsTransport(Transport):
+    """requests.Session with sized urllib3 pools and urllib3 retries; pools count connection reuse."""
+    name = "requests"
+
+    def __init__(self, config: Optional[TransportConfig] = None):
+        super().__init__(config)
+        cfg = self.config
+        self.session = create_retry_session(
+            total_retries=cfg.retries,
+            backoff_factor=cfg.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            pool_connections=cfg.pool_connections,
+            pool_maxsize=cfg.pool_maxsize,
+            pool_block=cfg.pool_block,
+            retry_class=_deadline_retry_class(),
+        )
+        self.session.headers.update(self.headers)
+        for adapter in set(self.session.adapters.values()):
+            manager = adapter.poolmanager
+            manager.pool_classes_by_scheme = {
+                scheme: _counting_pool(pool_cls, self.stats)
+                for scheme, pool_cls in manager.pool_classes_by_scheme.items()
+            }
+
+    def get(self, url: str, timeout: Optional[float] = None):
+        import requests
+        try:
+            resp = self.session.get(url, timeout=self.timeouts(timeout))
+            resp.raise_for_status()
+        except requests.RequestException as ex:
+            self.stats.record_request(failed=True)
+            status = ex.response.status_code if ex.response is not None else None
+            raise TransportError(str(ex), status) from ex
+        version = {10: "HTTP/1.0", 11: "HTTP/1.1", 20: "HTTP/2"}.get(getattr(resp.raw, "version", 0))
+        self.stats.record_request(version)
+        return resp
+
+    def stream(self, url: str, consume: Callable[[ResponseBody], T], timeout: Optional[float] = None) -> T:
+        import requests
+        try:
+            resp = self.session.get(url, timeout=self.timeouts(timeout), stream=True)
+        except requests.RequestException as ex:
+            self.stats.record_request(failed=True)
+            status = ex.response.status_code if ex.response is not None else None
+            raise TransportError(str(ex), status) from ex
+        try:
+            try:
+                resp.raise_for_status()
+            except requests.HTTPError as ex:
+                self.stats.record_request(failed=True)
+                raise TransportError(str(ex), resp.status_code) from ex
+            version = {10: "HTTP/1.0", 11: "HTTP/1.1", 20: "HTTP/2"}.get(getattr(resp.raw, "version", 0))
+            self.stats.record_request(version)
+            length = _content_length(resp.headers)
+            body = ResponseBody(resp.iter_content(STREAM_CHUNK_SIZE), _charset(resp.headers.get("Content-Type")),
+                                length)
+            try:
+                result = consume(body)
+                read = body.bytes_read
+                if not body.exhausted and length is not None and length - resp.raw.tell() <= DRAIN_LIMIT:
+                    body.drain()
+                stopped_early = not body.exhausted or body.bytes_read > read
+            except requests.RequestException as ex:
+                raise TransportError(f"reading {url} failed: {ex}") from ex
+            self.stats.record_body(body.bytes_read, resp.raw.tell(), stopped_early)
+            return result
+        finally:
+            # an unread rest closes the connection instead of returning it to the pool
+            resp.close()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def _deadline_retry_class():
+    """urllib3 Retry that also gives up when the next attempt, after its backoff, would start past the deadline."""
+    from urllib3.util.retry import Retry
+
+    class DeadlineRetry(Retry):
+        def is_exhausted(self) -> bool:
+            left = deadline.remaining()
+            return super().is_exhausted() or (left is not None and left <= self.get_backoff_time())
+
+    return DeadlineRetry
+
+
+def _counting_pool(pool_cls, stats: TransportStats):
+    """Subclass of a urllib3 connection pool class that reports attempts, new and discarded connections."""
+
+    class CountingPool(pool_cls):
+        def _make_request(self, conn, *args, **kwargs):
+            # a pooled keep-alive connection still holds its socket; a fresh one connects lazily
+            stats.record_attempt(new_connection=getattr(conn, "sock", None) is None)
+            return super()._make_request(conn, *args, **kwargs)
+
+        def _put_conn(self, conn):
+            if conn is not None and self.pool is not None and self.pool.full():
+                stats.record_discard()
+            super()._put_conn(conn)
+
+    CountingPool.__name__ = CountingPool.__qualname__ = "Counting" + pool_cls.__name__
+    return CountingPool
+
+
+class HTTPXTransport(Transport):
+    """httpx.Client with HTTP/2 multiplexing; retries with exponential backoff are done here."""
+    name = "httpx"
+
+    def __init__(self, config: Optional[TransportConfig] = None):
+        super().__init__(config)
+        import httpx
+        cfg = self.config
+        self._httpx = httpx
+        self.http2 = bool(cfg.http2 and importlib.util.find_spec("h2"))
+        self.client = httpx.Client(
+            http2=self.http2,
+            headers=self.headers,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=cfg.pool_maxsize,
+                max_keepalive_connections=cfg.pool_maxsize,
+                keepalive_expiry=cfg.keepalive_expiry,
+            ),
+        )
+
+    def get(self, url: str, timeout: Optional[float] = None):
+        return self._send(url, timeout, stream=False)
+
+    def stream(self, url: str, consume: Callable[[ResponseBody], T], timeout: Optional[float] = None) -> T:
+        httpx = self._httpx
+        resp = self._send(url, timeout, stream=True)
+        try:
+            length = _content_length(resp.headers)
+            body = ResponseBody(resp.iter_bytes(STREAM_CHUNK_SIZE), _charset(resp.headers.get("Content-Type")),
+                                length)
+            try:
+                result = consume(body)
+                read = body.bytes_read
+                if not body.exhausted and length is not None and length - resp.num_bytes_downloaded <= DRAIN_LIMIT:
+                    body.drain()
+                stopped_early = not body.exhausted or body.bytes_read > read
+            except (httpx.TransportError, httpx.StreamError) as ex:
+                raise TransportError(f"reading {url} failed: {ex}") from ex
+            self.stats.record_body(body.bytes_read, resp.num_bytes_downloaded, stopped_early)
+            return result
+        finally:
+            resp.close()
+
+    def _send(self, url: str, timeout: Optional[float], stream: bool):
+        httpx = self._httpx
+        connect, read = self.timeouts(timeout)
+        attempt = 0
+        while True:
+            new_connection = False
+
+            def trace(event_name, info):
+                nonlocal new_connection
+                if event_name == "connection.connect_tcp.complete":
+                    new_connection = True
+
+            try:
+                request = self.client.build_request("GET", url, timeout=httpx.Timeout(read, connect=connect),
+                                                    extensions={"trace": trace})
+                resp = self.client.send(request, stream=stream)
+                self.stats.record_attempt(new_connection)
+                delay = self._backoff(attempt) if resp.status_code in RETRY_STATUSES else None
+                if delay is None:
+                    resp.raise_for_status()
+                    self.stats.record_request(resp.http_version)
+                    return resp
+                resp.close()
+            except httpx.HTTPStatusError as ex:
+                ex.response.close()
+                self.stats.record_request(ex.response.http_version, failed=True)
+                raise TransportError(str(ex), ex.response.status_code) from ex
+            except httpx.TransportError as ex:
+                self.stats.record_attempt(new_connection)
+                delay = self._backoff(attempt)
+                if delay is None:
+                    self.stats.record_request(failed=True)
+                    raise TransportError(str(ex)) from ex
+            attempt += 1
+            time.sleep(delay)
+
+    def _backoff(self, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying attempt number `attempt`, None when the retries or the deadline are spent."""
+        if attempt >= self.config.retries:
+            return None
+        delay = self.config.backoff_factor * (2 ** attempt) * (0.5 + random.random() / 2)
+        left = deadline.remaining()
+        return None if left is not None and left <= delay else delay
+
+    def close(self) -> None:
+        self.client.close()
+
+    def describe(self) -> Dict[str, Any]:
+        return {**super().describe(), "http2": self.http2}
+
+
+def create_transport(config: Optional[TransportConfig] = None) -> Transport:
+    """HTTPXTransport when HTTP/2 is requested and available, RequestsTransport otherwise."""
+    config = config or TransportConfig()
+    if config.http2:
+        if importlib.util.find_spec("h2") and importlib.util.find_spec("httpx"):
+            return HTTPXTransport(config)
+        logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1 keep-alive")
+    return RequestsTransport(config)
@@ -1,7 +1,9 @@
-from typing import Optional
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from typing import TYPE_CHECKING, Optional
+import threading
+import time
+
+if TYPE_CHECKING:
+    import requests
 
 
 def create_retry_session(
@@ -9,7 +11,11 @@ def create_retry_session(
     backoff_factor: float = 0.5,
     status_forcelist: Optional[tuple] = (429, 500, 502, 503, 504),
     timeout: float = 10.0,
-) -> requests.Session:
+    pool_connections: int = 10,
+    pool_maxsize: int = 10,
+    pool_block: bool = False,
+    retry_class: Optional[type] = None,
+) -> "requests.Session":
     """
     Create a requests.Session with a Retry policy mounted.
 
@@ -17,16 +23,57 @@ def create_retry_session(
     :param backoff_factor: backoff multiplier
     :param status_forcelist: HTTP status codes to retry on
     :param timeout: default timeout (not applied inside session — use per-call)
+    :param pool_connections: number of per-host connection pools to keep
+    :param pool_maxsize: keep-alive connections kept per host
+    :param pool_block: wait for a free connection instead of opening (and later discarding) extra ones
+    :param retry_class: urllib3 Retry subclass to use (default: Retry)
     :return: configured Session
     """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
     session = requests.Session()
-    retries = Retry(
+    retries = (retry_class or Retry)(
         total=total_retries,
         backoff_factor=backoff_factor,
         status_forcelist=status_forcelist,
         allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE", "HEAD", "OPTIONS"])
     )
-    adapter = HTTPAdapter(max_retries=retries)
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+        max_retries=retries,
+    )
     session.mount("https://", adapter)
     session.mount("http://", adapter)
     return session
+
+
+class RateLimiter:
+    """
+    Token bucket shared between threads: `acquire()` blocks until a token is available.
+    `rate` tokens are added per second, up to `burst` tokens.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
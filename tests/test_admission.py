@@ -0,0 +1,157 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main as api_main
+from src import admission as admission_module
+from src.admission import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    AdmissionConfig,
+    AdmissionController,
+    AdmissionMiddleware,
+    ClassLimits,
+    Gate,
+    Overloaded,
+)
+from src.cache import TTLCache
+from src.fetcher import Fetcher, PriceStats, selection_key
+from src.series import build_selection
+
+
+def test_gate_admits_by_priority_and_sheds_when_full():
+    async def scenario():
+        gate = Gate("estimate", ClassLimits(concurrency=1, queue=2, queue_timeout=5.0))
+        await gate.acquire()
+        order = []
+
+        async def waiter(label, priority):
+            await gate.acquire(priority)
+            order.append(label)
+            gate.release()
+
+        cold = asyncio.ensure_future(waiter("cold", PRIORITY_LOW))
+        await asyncio.sleep(0)
+        warm = asyncio.ensure_future(waiter("warm", PRIORITY_HIGH))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as shed:
+            await gate.acquire()
+        assert shed.value.reason == "queue_full" and gate.snapshot()["queued"] == 2
+
+        gate.release()
+        await asyncio.gather(cold, warm)
+        return gate, order
+
+    gate, order = asyncio.run(scenario())
+    assert order == ["warm", "cold"]
+    snap = gate.snapshot()
+    assert (snap["active"], snap["queued"], snap["peak_queued"], snap["admitted"]) == (0, 0, 2, 3)
+    assert snap["shed"] == {"queue_full": 1, "queue_timeout": 0}
+
+
+def test_gate_sheds_after_queue_timeout():
+    async def scenario():
+        gate = Gate("analysis", ClassLimits(concurrency=1, queue=4, queue_timeout=0.05))
+        await gate.acquire()
+        with pytest.raises(Overloaded) as shed:
+            await gate.acquire()
+        gate.release()
+        await gate.acquire()  # the timed-out waiter did not keep a slot
+        return gate, shed.value
+
+    gate, shed = asyncio.run(scenario())
+    assert shed.reason == "queue_timeout" and gate.snapshot()["shed"]["queue_timeout"] == 1
+    assert gate.snapshot()["active"] == 1 and gate.snapshot()["queued"] == 0
+
+
+def test_middleware_answers_503_with_retry_after():
+    app = FastAPI()
+
+    @app.get("/busy")
+    def busy():
+        return {"ok": True}
+
+    @app.get("/free")
+    def free():
+        return {"ok": True}
+
+    controller = AdmissionController(AdmissionConfig(catalog=ClassLimits(0, 0, 3.0)))
+    app.add_middleware(AdmissionMiddleware, controller=controller, classify={"/busy": "catalog"}.get)
+    client = TestClient(app)
+    r = client.get("/busy")
+    assert r.status_code == 503 and r.headers["Retry-After"] == "3"
+    assert client.get("/free").status_code == 200
+    assert controller.snapshot()["catalog"]["shed"]["queue_full"] == 1
+
+
+def test_cached_requests_get_priority():
+    payload = {"brand": "fiat", "model": "panda", "registration_year": 2025, "number_of_years": 1,
+               "purchase_year_index": 0, "zip_code": "10139"}
+    fetcher = Fetcher(cache=TTLCache())
+    with patch.object(api_main, "get_fetcher", return_value=fetcher):
+        body = api_main.dumps(payload)
+        assert api_main._admission_priority("/api/estimate", body) == PRIORITY_LOW
+        for year in (2025, 2024):
+            selection = build_selection("fiat", "panda", "", "10139", [], year)
+            fetcher.cache.set("price:" + selection_key(selection), PriceStats(10000, 1.0, 3))
+        assert api_main._admission_priority("/api/estimate", body) == PRIORITY_HIGH
+        assert api_main._admission_priority("/api/estimate", b"{not json") == PRIORITY_LOW
+
+    r = TestClient(api_main.app).get("/api/metrics")
+    assert set(r.json()["admission"]) == {"enabled", "catalog", "estimate", "analysis"}
+
+
+
+def test_only_waiting_requests_are_ranked():
+    app = FastAPI()
+
+    @app.post("/estimate")
+    def estimate(payload: dict):
+        return payload
+
+    ranked = []
+
+    def priority(path, body):
+        ranked.append(body)
+        return PRIORITY_LOW
+
+    controller = AdmissionController(AdmissionConfig(estimate=ClassLimits(1, 1, 0.05)))
+    app.add_middleware(AdmissionMiddleware, controller=controller, classify={"/estimate": "estimate"}.get,
+                       priority=priority)
+    client = TestClient(app)
+    gate = controller.gates["estimate"]
+    # a free slot: admitted without being ranked
+    assert client.post("/estimate", json={"n": 1}).json() == {"n": 1}
+    assert ranked == []
+
+    gate.active = 1  # the only slot is taken: the request waits (ranked), then times out
+    assert client.post("/estimate", json={"n": 2}).status_code == 503
+    assert ranked == [b'{"n":2}']
+    gate.queued = 1  # queue full: shed without reading the body
+    assert client.post("/estimate", json={"n": 3}).status_code == 503
+    assert len(ranked) == 1 and gate.snapshot()["shed"] == {"queue_full": 1, "queue_timeout": 1}
+
+
+def test_bodies_are_buffered_up_to_max_body():
+    messages = [{"type": "http.request", "body": b"x" * 100, "more_body": True} for _ in range(5)]
+    messages[-1]["more_body"] = False
+
+    async def scenario():
+        source = iter(messages)
+
+        async def receive():
+            return next(source)
+
+        body, complete = await admission_module._read_body(receive, 150)
+        replay = admission_module._replay(body, complete, receive)
+        received = [await replay()]
+        while received[-1]["more_body"]:
+            received.append(await replay())
+        return body, complete, b"".join(m["body"] for m in received)
+
+    body, complete, whole = asyncio.run(scenario())
+    assert (len(body), complete) == (200, False)
+    assert whole == b"x" * 500
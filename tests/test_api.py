@@ -1,6 +1,7 @@
 from fastapi.testclient import TestClient
 from main import app
 from unittest.mock import patch
+from src.fetcher import PriceStats
 
 client = TestClient(app)
 
@@ -10,10 +11,10 @@ def fake_fetch_car_costs(selected_values):
     year = int(selected_values.get("firstRegistration") or 2025)
     # price decays with age:
     age = 2025 - year
-    return max(1000, 30000 - age * 2000)
+    return PriceStats(max(1000, 30000 - age * 2000), 0.0, 5)
 
 
-@patch("src.fetcher.Fetcher.fetch_car_costs", side_effect=fake_fetch_car_costs)
+@patch("src.fetcher.Fetcher.fetch_price_stats", side_effect=fake_fetch_car_costs)
 def test_estimate_endpoint(mock_fetch):
     payload = {
         "brand": "testbrand",
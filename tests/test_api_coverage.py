@@ -5,6 +5,7 @@ from unittest.mock import patch
 from main import app
 import main as api_main
 from fastapi import HTTPException
+from src.fetcher import PriceStats
 
 client = TestClient(app)
 
@@ -53,10 +54,10 @@ def fake_fetch_car_costs(selected_values):
     year = int(selected_values.get("firstRegistration") or 2025)
     age = 2025 - year
     # ensure positive price
-    return max(1000, 30000 - age * 2000)
+    return PriceStats(max(1000, 30000 - age * 2000), 0.0, 5)
 
 
-@patch.object(api_main.fetcher, "fetch_car_costs", side_effect=fake_fetch_car_costs)
+@patch.object(api_main.fetcher, "fetch_price_stats", side_effect=fake_fetch_car_costs)
 def test_estimate_success(mock_fetch):
     payload = {
         "brand": "testbrand",
@@ -83,7 +84,7 @@ def test_estimate_success(mock_fetch):
 
 def test_estimate_fetcherror():
     # simulate fetcher failing -> returns 503
-    with patch.object(api_main.fetcher, "fetch_car_costs", side_effect=api_main.FetchError("fail")):
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=api_main.FetchError("fail")):
         payload = {
             "brand": "testbrand",
             "model": "testmodel",
@@ -103,7 +104,7 @@ def test_estimate_fetcherror():
 
 def test_estimate_internal_exception():
     # patch fetch_car_costs OK then force LoanCalculator.calculate_loan_costs to raise -> 500
-    with patch.object(api_main.fetcher, "fetch_car_costs", side_effect=fake_fetch_car_costs):
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=fake_fetch_car_costs):
         with patch.object(api_main.LoanCalculator, "calculate_loan_costs", side_effect=RuntimeError("boom")):
             payload = {
                 "brand": "testbrand",
@@ -250,9 +251,10 @@ def test_estimate_backfill_zero_price():
     seq = [30000, 0, 25000]
 
     def side_effect(selected):
-        return seq.pop(0)
+        price = seq.pop(0)
+        return PriceStats(price, 0.0, 5 if price else 0)
 
-    with patch.object(api_main.fetcher, "fetch_car_costs", side_effect=side_effect):
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=side_effect):
         payload = {
             "brand": "tb",
             "model": "tm",
@@ -307,3 +309,41 @@ def test_break_even_propagates_http_exception():
         r = client.post("/api/break_even", json=payload)
         assert r.status_code == 503
         assert r.json().get("detail") == "upstream"
+
+
+def test_cost_schedule_endpoint():
+    est = api_main.EstimateResponse(
+        purchase_price=26000.0,
+        estimated_final_value=16000.0,
+        monthly_depreciation=200.0,
+        monthly_maintenance=100.0,
+        loan_monthly_payment=0.0,
+        loan_total_interest=0.0,
+        total_monthly_cost=300.0,
+        year_values=[30000, 26000, 23000, 20000, 18000, 16000]
+    )
+    with patch.object(api_main, "estimate_monthly_costs", return_value=est):
+        payload = {
+            "estimate": {"brand": "testbrand", "model": "testmodel", "number_of_years": 4,
+                         "purchase_year_index": 1, "monthly_maintenance": 100.0,
+                         "loan_value": 15000.0, "bank_rate_percent": 5.0, "loan_years": 3},
+            "extra_payments": [{"month": 12, "amount": 2000.0}],
+            "rent_monthly_cost": 500.0,
+            "max_points": 13
+        }
+        r = client.post("/api/schedule", json=payload)
+        assert r.status_code == 200
+        data = r.json()
+        assert data["total_months"] == 48 and data["month"][0] == 0 and data["month"][-1] == 48
+        assert data["payoff_month"] < 36 and data["interest_saved"] > 0
+        assert data["balance"][0] == 15000.0 and data["cumulative_rent"][-1] == 500.0 * 48
+        assert len(data["equity"]) == len(data["month"])
+
+        payload["payoff_month"] = 0
+        assert client.post("/api/schedule", json=payload).status_code == 422
+
+        # payments in the same month add up
+        del payload["payoff_month"]
+        payload["extra_payments"] = [{"month": 12, "amount": 1500.0}, {"month": 12, "amount": 500.0}]
+        split = client.post("/api/schedule", json=payload).json()
+        assert (split["balance"], split["interest_saved"]) == (data["balance"], data["interest_saved"])
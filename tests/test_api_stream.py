@@ -0,0 +1,67 @@
+import json
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from main import app
+import main as api_main
+from src.fetcher import PriceStats
+
+client = TestClient(app)
+
+
+def fake_fetch_price_stats(selected_values):
+    year = int(selected_values.get("firstRegistration") or 2025)
+    age = 2025 - year
+    return PriceStats(max(1000, 30000 - age * 2000), 500.0, 12)
+
+
+def _payload(**overrides):
+    payload = {
+        "brand": "testbrand",
+        "model": "testmodel",
+        "registration_year": 2025,
+        "number_of_years": 3,
+        "purchase_year_index": 1,
+        "monthly_maintenance": 100.0,
+        "shift_types": []
+    }
+    payload.update(overrides)
+    return payload
+
+
+def _events(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_stream_emits_years_then_estimate():
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=fake_fetch_price_stats):
+        r = client.post("/api/estimate/stream", json=_payload())
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    events = _events(r)
+    years = [e for e in events if e["event"] == "year"]
+    assert [e["year"] for e in years] == [2025, 2024, 2023, 2022, 2021]
+    assert years[0]["median"] == 30000.0 and years[0]["stddev"] == 500.0
+    final = events[-1]
+    assert final["event"] == "estimate"
+    # final event mirrors the blocking endpoint
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=fake_fetch_price_stats):
+        blocking = client.post("/api/estimate", json=_payload()).json()
+    assert {k: v for k, v in final.items() if k != "event"} == blocking
+
+
+def test_stream_reports_insufficient_data_as_error_event():
+    with patch.object(api_main.fetcher, "fetch_price_stats", return_value=PriceStats(0, 0.0, 0)):
+        r = client.post("/api/estimate/stream", json=_payload())
+    events = _events(r)
+    assert len([e for e in events if e["event"] == "year"]) == 5
+    assert events[-1] == {"event": "error", "status_code": 400,
+                          "detail": "Not enough historical data to perform an estimate."}
+
+
+def test_stream_reports_fetch_error_after_partial_years():
+    calls = [PriceStats(30000, 0.0, 3), api_main.FetchError("upstream down")]
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=calls):
+        r = client.post("/api/estimate/stream", json=_payload())
+    events = _events(r)
+    assert events[0]["event"] == "year"
+    assert events[-1]["event"] == "error" and events[-1]["status_code"] == 503
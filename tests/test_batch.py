@@ -0,0 +1,106 @@
+import csv
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from loadtest.upstream import CURRENT_YEAR, start_upstream
+from src import batch
+from src.cache import TTLCache
+from src.fetcher import Fetcher, FetchError, PriceStats
+
+FLEET = f"""id,brand,model,registration_year,number_of_years,purchase_year_index,monthly_maintenance,shift_types
+van-1,fiat,panda,{CURRENT_YEAR},3,0,80,
+van-2,fiat,panda,{CURRENT_YEAR},3,0,80,
+car-1,volkswagen,golf,{CURRENT_YEAR},2,1,120,M;A
+bad-1,fiat,,{CURRENT_YEAR},oops,0,80,
+"""
+
+
+@pytest.fixture
+def upstream():
+    server, _ = start_upstream()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_read_rows_splits_lists_and_defaults_ids():
+    rows = list(batch.read_rows(["brand,model,zip_codes,details", "fiat,panda,10139;20121,", ",,,"]))
+    assert rows[0] == ("1", {"brand": "fiat", "model": "panda", "zip_codes": ["10139", "20121"]})
+    assert rows[1] == ("2", {})
+
+
+def test_batch_dedupes_streams_and_resumes(tmp_path, upstream):
+    source = tmp_path / "fleet.csv"
+    source.write_text(FLEET)
+    output = tmp_path / "out.jsonl"
+    fetcher = Fetcher(base_url=upstream.url, cache=TTLCache())
+
+    assert batch.main([str(source), "-o", str(output), "--rate", "0"], fetcher=fetcher) == 1
+    records = {r["id"]: r for r in map(json.loads, output.read_text().splitlines())}
+    assert set(records) == {"van-1", "van-2", "car-1", "bad-1"}
+    assert records["van-1"]["estimate"] == records["van-2"]["estimate"]
+    assert records["car-1"]["status_code"] == 200 and len(records["car-1"]["estimate"]["year_values"]) == 4
+    assert records["bad-1"]["status_code"] == 422 and "number_of_years" in records["bad-1"]["error"]
+    # identical rows scraped once: panda 4 years + golf 4 years
+    assert upstream.stats.snapshot()["by_kind"]["listing"] == 8
+
+    # an interrupted run: one complete line and half of the next one
+    lines = output.read_text().splitlines(keepends=True)
+    output.write_text(lines[0] + lines[1][:10])
+    upstream.stats.reset()
+    batch.main([str(source), "-o", str(output), "--resume"], fetcher=fetcher)
+    resumed = [json.loads(line)["id"] for line in output.read_text().splitlines()]
+    assert sorted(resumed) == ["bad-1", "car-1", "van-1", "van-2"]
+    assert upstream.stats.snapshot()["total"] == 0  # the rest came from the cache
+
+
+def test_csv_output(tmp_path, upstream):
+    source = tmp_path / "fleet.csv"
+    source.write_text(FLEET)
+    output = tmp_path / "out.csv"
+    batch.main([str(source), "-o", str(output), "--workers", "2", "--rate", "20"],
+               fetcher=Fetcher(base_url=upstream.url, cache=TTLCache()))
+    with open(output, newline="") as fh:
+        rows = {row["id"]: row for row in csv.DictReader(fh)}
+    assert rows["van-1"]["status_code"] == "200" and len(rows["van-1"]["year_values"].split(";")) == 4
+    assert float(rows["car-1"]["total_monthly_cost"]) > 120
+    assert batch.completed_ids(str(output), "csv") == set(rows)
+
+
+def test_rate_limited_fetcher_takes_a_token_per_probe():
+    fetcher = Fetcher(cache=TTLCache())
+    limited = batch.RateLimitedFetcher(fetcher, MagicMock())
+    scrape = MagicMock(side_effect=lambda sel: PriceStats(20000 if sel["firstRegistration"] >= 2020 else 0, 0.0, 5))
+    with patch.object(fetcher, "_scrape_price_stats", scrape):
+        span, probes = limited.find_year_span({"make": "fiat", "model": "panda"}, 2025, 2012)
+        assert (span.newest, span.oldest) == (2025, 2020)
+        assert limited.limiter.acquire.call_count == scrape.call_count == len(probes) > 1
+        # the span is cached: no more upstream requests, no more tokens
+        limited.find_year_span({"make": "fiat", "model": "panda"}, 2025, 2012)
+        assert limited.limiter.acquire.call_count == scrape.call_count
+
+
+def test_resume_retries_transient_failures(tmp_path, upstream):
+    source = tmp_path / "fleet.csv"
+    source.write_text(FLEET)
+    output = tmp_path / "out.jsonl"
+    fetcher = Fetcher(base_url=upstream.url, cache=TTLCache())
+    fetch = fetcher.fetch_price_stats
+
+    def golf_down(selected, *args, **kwargs):
+        if selected["make"] == "volkswagen":
+            raise FetchError("upstream unavailable")
+        return fetch(selected, *args, **kwargs)
+
+    with patch.object(fetcher, "fetch_price_stats", side_effect=golf_down):
+        batch.main([str(source), "-o", str(output), "--rate", "0"], fetcher=fetcher)
+    first = {r["id"]: r["status_code"] for r in map(json.loads, output.read_text().splitlines())}
+    assert first == {"van-1": 200, "van-2": 200, "car-1": 503, "bad-1": 422}
+    assert batch.completed_ids(str(output), "jsonl") == {"van-1", "van-2", "bad-1"}
+
+    assert batch.main([str(source), "-o", str(output), "--resume", "--rate", "0"], fetcher=fetcher) == 0
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [(r["id"], r["status_code"]) for r in records[4:]] == [("car-1", 200)]
+    assert batch.completed_ids(str(output), "jsonl") == set(first)
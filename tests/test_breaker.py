@@ -0,0 +1,138 @@
+import time
+from unittest.mock import MagicMock, patch
+import pytest
+from fastapi.testclient import TestClient
+import main as api_main
+import src.fetcher as fetcher_module
+from src.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerConfig
+from src.cache import TTLCache
+from src.fetcher import CircuitOpenError, Fetcher, FetchError, PriceStats, _safe_get, upstream_breaker
+from src.transport import TransportError
+
+client = TestClient(api_main.app)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def reset_breaker():
+    upstream_breaker.reset()
+    yield
+    upstream_breaker.reset()
+
+
+def test_breaker_opens_fails_fast_and_probes_half_open():
+    clock = FakeClock()
+    breaker = CircuitBreaker(CircuitBreakerConfig(failure_threshold=3, cooldown=10.0), clock)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    breaker.record_success()  # a success resets the consecutive count
+    for _ in range(3):
+        breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+    clock.now = 4.0
+    assert breaker.retry_after() == 6.0
+
+    clock.now = 10.0
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() and not breaker.allow()  # a single probe at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.retry_after() == 10.0
+
+    clock.now = 20.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+    assert breaker.snapshot()["opened"] == 2 and breaker.snapshot()["rejected"] == 2
+
+
+def test_safe_get_feeds_breaker_and_fails_fast():
+    transport = MagicMock()
+    transport.get.side_effect = TransportError("timed out")
+    with patch.object(fetcher_module, "get_transport", return_value=transport):
+        for _ in range(upstream_breaker.config.failure_threshold):
+            with pytest.raises(FetchError):
+                _safe_get("https://upstream/")
+        calls = transport.get.call_count
+        start = time.perf_counter()
+        with pytest.raises(CircuitOpenError) as info:
+            _safe_get("https://upstream/")
+    assert time.perf_counter() - start < 0.1
+    assert transport.get.call_count == calls
+    assert info.value.retry_after > 0
+
+
+def test_client_errors_do_not_open_the_circuit():
+    transport = MagicMock()
+    transport.get.side_effect = TransportError("not found", 404)
+    with patch.object(fetcher_module, "get_transport", return_value=transport):
+        for _ in range(upstream_breaker.config.failure_threshold + 2):
+            with pytest.raises(FetchError):
+                _safe_get("https://upstream/missing")
+    assert upstream_breaker.state == CLOSED
+
+
+def test_cache_keeps_expired_entries_for_stale_reads():
+    cache = TTLCache(default_ttl=0.01, stale_ttl=60)
+    cache.set("k", 1)
+    time.sleep(0.02)
+    assert cache.get("k") is None and "k" not in cache
+    assert cache.get("k", allow_stale=True) == 1
+    no_stale = TTLCache(default_ttl=0.01)
+    no_stale.set("k", 1)
+    time.sleep(0.02)
+    assert no_stale.get("k", allow_stale=True) is None
+
+
+def test_fetcher_serves_stale_prices_when_upstream_fails():
+    f = Fetcher(cache=TTLCache(default_ttl=1, stale_ttl=60))
+    selected = {"make": "b", "model": "m", "firstRegistration": 2020}
+    with patch.object(f, "_scrape_price_stats", return_value=PriceStats(20000, 100.0, 5)):
+        f.fetch_price_stats(selected)
+    with patch.object(f, "_scrape_price_stats", side_effect=CircuitOpenError("open", 5)):
+        assert f.fetch_price_stats(selected, refresh=True) == PriceStats(20000, 100.0, 5, stale=True)
+        with pytest.raises(CircuitOpenError):
+            f.fetch_price_stats({**selected, "firstRegistration": 2019})
+
+
+PAYLOAD = {"brand": "b", "model": "m", "registration_year": 2025, "number_of_years": 2,
+           "purchase_year_index": 0, "fill_missing_years": True}
+
+
+def test_estimate_answers_from_cache_with_warning_while_circuit_is_open():
+    def partial(selected):
+        if selected["firstRegistration"] == 2025:
+            return PriceStats(30000, 0.0, 4, stale=True)
+        raise CircuitOpenError("upstream unavailable", 12.0)
+
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=partial):
+        r = client.post("/api/estimate", json=PAYLOAD)
+    assert r.status_code == 200
+    data = r.json()
+    assert "temporarily unavailable" in data["warning"]
+    assert "2025" in data["warning"] and "2024, 2023 could not be fetched" in data["warning"]
+    assert data["year_sources"] == ["observed", "fitted", "fitted"]
+    assert r.headers["cache-control"] == "public, max-age=0"
+
+
+def test_estimate_returns_503_with_retry_after_when_nothing_is_cached():
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=CircuitOpenError("open", 12.3)):
+        r = client.post("/api/estimate", json=PAYLOAD)
+        stream = client.post("/api/estimate/stream", json=PAYLOAD)
+    assert r.status_code == 503 and r.headers["retry-after"] == "13"
+    last = stream.text.strip().splitlines()[-1]
+    assert '"status_code":503' in last and '"retry_after":13' in last
+
+
+def test_metrics_report_circuit_state():
+    upstream_breaker.record_failure()
+    body = client.get("/api/metrics").json()
+    assert body["circuit"]["state"] == CLOSED and body["circuit"]["consecutive_failures"] == 1
@@ -0,0 +1,210 @@
+import fnmatch
+import socketserver
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.cache import (
+    CacheConfig,
+    RedisCache,
+    SQLiteCache,
+    TTLCache,
+    create_cache,
+    decode,
+    encode,
+)
+from src.fetcher import Fetcher, PriceStats
+from src.probing import YearSpan
+
+
+class _FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Just enough of the Redis protocol for RedisCache: GET, SET [NX] [PX], DEL, KEYS, PING."""
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _bulk(self, value):
+        return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def handle(self):
+        data, lock = self.server.data, self.server.lock
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+
+            name = args[0].upper()
+            with lock:
+                now = time.monotonic()
+                for key in [k for k, (_, exp) in data.items() if exp is not None and exp <= now]:
+                    del data[key]
+                if name == b"PING":
+                    reply = b"+PONG\r\n"
+                elif name == b"GET":
+                    reply = self._bulk(data.get(args[1], (None, None))[0])
+                elif name == b"SET":
+                    options = [a.upper() for a in args[3:]]
+                    expires = None
+                    if b"PX" in options:
+                        expires = now + int(args[3 + options.index(b"PX") + 1]) / 1000.0
+                    if b"NX" in options and args[1] in data:
+                        reply = b"$-1\r\n"
+                    else:
+                        data[args[1]] = (args[2], expires)
+                        reply = b"+OK\r\n"
+                elif name == b"DEL":
+                    reply = b":%d\r\n" % sum(data.pop(k, None) is not None for k in args[1:])
+                elif name == b"KEYS":
+                    keys = [k for k in data if fnmatch.fnmatchcase(k.decode(), args[1].decode())]
+                    reply = b"*%d\r\n" % len(keys) + b"".join(self._bulk(k) for k in keys)
+                else:
+                    reply = b"-ERR unknown command\r\n"
+            self.wfile.write(reply)
+
+
+@pytest.fixture
+def redis_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _FakeRedisHandler)
+    server.daemon_threads = True
+    server.data, server.lock = {}, threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        cache = TTLCache(default_ttl=60, stale_ttl=60)
+    elif request.param == "sqlite":
+        cache = SQLiteCache(str(tmp_path / "cache.db"), default_ttl=60, stale_ttl=60)
+    else:
+        server = request.getfixturevalue("redis_server")
+        cache = RedisCache("127.0.0.1", server.server_address[1], default_ttl=60, stale_ttl=60)
+    yield cache
+    cache.close()
+
+
+def test_encode_round_trips_registered_types_compactly():
+    value = {"stats": PriceStats(20000, 1500.5, 12, p10=18000.0, p90=23000.0), "span": YearSpan(2024, 2015),
+             "models": ["panda", "500"]}
+    assert decode(encode(value)) == value
+    assert isinstance(decode(encode(PriceStats(1, 0.0))), PriceStats)
+    assert encode(["x" * 40] * 100)[:1] == b"z"
+    assert len(encode(PriceStats(20000, 1500.5, 12))) < 60
+
+
+def test_backends_share_the_cache_interface(backend):
+    stats = PriceStats(20000, 100.0, 5)
+    backend.set("price:a", stats)
+    backend.set("catalog:models:fiat", ["panda", "500"])
+    assert backend.get("price:a") == stats
+    assert backend.get("catalog:models:fiat") == ["panda", "500"]
+    assert "price:a" in backend and "missing" not in backend
+
+    backend.set("old", stats, ttl=-1)
+    assert backend.get("old") is None
+    assert backend.get("old", allow_stale=True) == stats
+
+    backend.delete("price:a")
+    assert backend.get("price:a", "default") == "default"
+    backend.clear()
+    assert backend.get("catalog:models:fiat") is None
+    counts = backend.describe()
+    assert (counts["hits"], counts["stale_hits"]) == (2, 1)
+
+
+def test_lock_serializes_holders(backend):
+    backend.lock_wait = 5
+    events = []
+
+    def worker(name):
+        with backend.lock("price:x") as acquired:
+            events.append((name, "in", acquired))
+            time.sleep(0.05)
+            events.append((name, "out", acquired))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(acquired for _, _, acquired in events)
+    # no two holders overlap: every "in" is directly followed by its own "out"
+    assert [events[i][0] for i in range(0, 6, 2)] == [events[i][0] for i in range(1, 6, 2)]
+
+
+def test_sqlite_lease_is_shared_between_processes_and_expires(tmp_path):
+    path = str(tmp_path / "shared.db")
+    worker_a, worker_b = SQLiteCache(path), SQLiteCache(path)
+    with worker_a.lock("price:y", lease=0.2) as acquired:
+        assert acquired
+        with worker_b.lock("price:y", wait=0.05) as other:
+            assert not other
+        # a holder that outlives its lease no longer blocks the others
+        time.sleep(0.25)
+        with worker_b.lock("price:y", wait=0.05) as other:
+            assert other
+    worker_a.set("k", [1, 2])
+    assert worker_b.get("k") == [1, 2]
+    assert worker_b.describe()["lock_timeouts"] == 1
+
+
+def test_redis_lease_blocks_second_client(redis_server):
+    port = redis_server.server_address[1]
+    worker_a, worker_b = RedisCache("127.0.0.1", port), RedisCache("127.0.0.1", port)
+    with worker_a.lock("price:z"):
+        with worker_b.lock("price:z", wait=0.05) as other:
+            assert not other
+    with worker_b.lock("price:z", wait=0.05) as other:
+        assert other
+    assert b"carcalc:lease:price:z" not in redis_server.data
+
+
+def test_redis_unreachable_degrades_to_misses():
+    cache = RedisCache("127.0.0.1", 1, socket_timeout=0.2)
+    cache.set("k", 1)
+    assert cache.get("k") is None
+    assert cache.describe()["errors"] == 2
+
+
+def test_create_cache_from_url(tmp_path, redis_server):
+    assert isinstance(create_cache(), TTLCache)
+    sqlite = create_cache(CacheConfig(url=f"sqlite:///{tmp_path}/c.db", lease=5))
+    assert isinstance(sqlite, SQLiteCache) and sqlite.path == f"{tmp_path}/c.db" and sqlite.lease == 5
+    redis = create_cache(CacheConfig(url=f"redis://:secret@127.0.0.1:{redis_server.server_address[1]}/0"))
+    assert isinstance(redis, RedisCache) and redis.password == "secret"
+    with pytest.raises(ValueError):
+        create_cache(CacheConfig(url="memcached://localhost"))
+
+
+def test_concurrent_misses_scrape_once(tmp_path):
+    calls = []
+
+    def scrape(selected):
+        calls.append(selected)
+        time.sleep(0.05)
+        return PriceStats(20000, 0.0, 3)
+
+    # two "workers" sharing one cache file
+    workers = [Fetcher(cache=SQLiteCache(str(tmp_path / "w.db"))) for _ in range(2)]
+    selection = {"make": "fiat", "model": "panda", "firstRegistration": 2020}
+    with patch.object(Fetcher, "_scrape_price_stats", side_effect=scrape):
+        threads = [threading.Thread(target=workers[i % 2].fetch_price_stats, args=(selection,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert len(calls) == 1
+    assert workers[1].fetch_price_stats(selection) == PriceStats(20000, 0.0, 3)
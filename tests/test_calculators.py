@@ -1,5 +1,5 @@
 import pytest
-from src.calculator import LoanCalculator, CarValueCalculator
+from src.calculator import LoanCalculator, CarValueCalculator, CostScheduleCalculator
 
 def test_loan_zero_rate():
     loan = LoanCalculator(12000, 0.0, 2)
@@ -20,3 +20,40 @@ def test_car_value_calculator_depreciation():
     # start value = series[1] = 28000; end index = 1+3 = 4 => end value 20000 => total depr = 8000 => monthly = 8000/(36) = 222.22...
     assert pytest.approx(calc.monthly_depreciation(), rel=1e-3) == 8000 / 36.0
     assert pytest.approx(calc.monthly_total_cost(loan_monthly=200.0), rel=1e-3) == (8000 / 36.0) + 100.0 + 200.0
+
+
+SERIES = [30000.0, 26000.0, 23000.0, 20000.0, 18000.0, 16000.0]
+
+def test_schedule_matches_the_loan_and_depreciation_totals():
+    monthly, total_interest = LoanCalculator(20000, 6.0, 4).calculate_loan_costs()
+    schedule = CostScheduleCalculator(SERIES, 0, 5, 100.0, 20000, 6.0, 4).schedule()
+    assert schedule.months == 60 and schedule.payoff_month == 48
+    assert pytest.approx(schedule.payment[1]) == monthly and schedule.payment[49] == 0.0
+    assert pytest.approx(schedule.interest_paid[-1]) == total_interest
+    assert schedule.balance[0] == 20000 and schedule.balance[48] == 0.0
+    assert schedule.car_value[6] == 28000.0 and schedule.equity[-1] == 16000.0
+    # buy, pay the loan and maintenance, sell at the last price
+    assert pytest.approx(schedule.cumulative_cost[-1]) == 30000 - 16000 + 100.0 * 60 + total_interest
+
+def test_schedule_without_loan_matches_the_straight_line_estimate():
+    calc = CarValueCalculator(SERIES, number_of_years=3, monthly_maintenance=100.0, purchase_year_index=1)
+    schedule = CostScheduleCalculator(SERIES, 1, 3, 100.0).schedule()
+    assert schedule.payoff_month is None and max(schedule.balance) == 0.0
+    assert pytest.approx(schedule.cumulative_cost[36]) == calc.monthly_total_cost() * 36
+
+def test_extra_payments_shorten_the_loan():
+    calc = CostScheduleCalculator(SERIES, 0, 5, 100.0, 20000, 6.0, 4,
+                                  extra_monthly=100.0, extra_payments={12: 3000.0})
+    schedule = calc.schedule()
+    assert schedule.payoff_month < 48 and calc.interest_saved(schedule) > 0
+    assert pytest.approx(schedule.payment[12] - schedule.payment[11]) == 3000.0
+    early = CostScheduleCalculator(SERIES, 0, 5, 0.0, 20000, 6.0, 4, payoff_month=24).schedule()
+    assert early.payoff_month == 24 and early.payment[25] == 0.0
+    assert pytest.approx(early.payment[24]) == early.balance[23] * (1 + 0.06 / 12)
+
+def test_schedule_downsampling_keeps_the_ends_and_the_payoff():
+    schedule = CostScheduleCalculator(SERIES * 5, 0, 25, 100.0, 20000, 6.0, 7).schedule()
+    view = schedule.downsample(20)
+    assert view["month"][0] == 0 and view["month"][-1] == 300 and 84 in view["month"]
+    assert len(view["month"]) <= 21 and len(view["equity"]) == len(view["month"])
+    assert len(schedule.downsample(1000)["month"]) == 301
@@ -0,0 +1,95 @@
+import threading
+import time
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+import main as api_main
+from src.compare import ConcurrencyBudget, vehicle_requests
+from src.fetcher import PriceStats
+from src.models import CompareRequest
+
+client = TestClient(api_main.app)
+
+PRICES = {"fiat": 15000, "bmw": 40000, "audi": 35000}
+SHARED = {"registration_year": 2025, "number_of_years": 2, "purchase_year_index": 0, "monthly_maintenance": 80.0}
+
+
+def _vehicles(*brands):
+    return [{"brand": brand, "model": "m"} for brand in brands]
+
+
+def _price(selected):
+    new_price = PRICES.get(selected["make"], 0)
+    return PriceStats(int(new_price * 0.85 ** (2025 - selected["firstRegistration"])), 100.0, 5)
+
+
+def test_vehicle_requests_share_financial_parameters():
+    req = CompareRequest(vehicles=[{"brand": "fiat", "model": "panda", "label": "city"},
+                                   {"brand": "bmw", "model": "x1", "shift_types": ["A"]}], loan_value=5000.0)
+    first, second = vehicle_requests(req)
+    assert (first.brand, first.model, first.loan_value) == ("fiat", "panda", 5000.0)
+    assert second.shift_types == ["A"] and second.zip_code == req.zip_code
+
+
+def test_vehicles_are_estimated_concurrently_and_ranked():
+    all_vehicles = threading.Barrier(3, timeout=5)
+
+    def fetch(selected):
+        if selected["firstRegistration"] == 2025:
+            all_vehicles.wait()  # passes only when the three vehicles are in flight together
+        return _price(selected)
+
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=fetch):
+        r = client.post("/api/compare", json={"vehicles": _vehicles("bmw", "fiat", "audi"), **SHARED})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["ranking"] == ["fiat m", "audi m", "bmw m"]
+    assert [v["rank"] for v in data["vehicles"]] == [3, 1, 2]
+    fiat, bmw = data["vehicles"][1], data["vehicles"][0]
+    assert fiat["difference_to_best"] == 0.0
+    assert bmw["difference_to_best"] == round(
+        bmw["estimate"]["total_monthly_cost"] - fiat["estimate"]["total_monthly_cost"], 2)
+    assert r.headers["x-request-hash"]
+
+
+def test_concurrency_budget_caps_upstream_fetches():
+    lock = threading.Lock()
+    state = {"in_flight": 0, "peak": 0}
+
+    def fetch(selected):
+        with lock:
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+        time.sleep(0.02)
+        with lock:
+            state["in_flight"] -= 1
+        return _price(selected)
+
+    with patch.object(api_main, "DEFAULT_COMPARE_CONCURRENCY", 2), \
+            patch.object(api_main.fetcher, "fetch_price_stats", side_effect=fetch):
+        r = client.post("/api/compare", json={"vehicles": _vehicles("bmw", "fiat", "audi", "bmw"), **SHARED})
+    assert r.status_code == 200
+    assert state["peak"] == 2
+    assert [v["label"] for v in r.json()["vehicles"]] == ["bmw m", "fiat m", "audi m", "bmw m (2)"]
+
+
+def test_failed_vehicle_is_reported_not_fatal():
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=_price):
+        r = client.post("/api/compare", json={"vehicles": _vehicles("fiat", "unknown"), **SHARED})
+    assert r.status_code == 200
+    failed = r.json()["vehicles"][1]
+    assert failed["rank"] is None and failed["status_code"] == 400 and failed["estimate"] is None
+    assert r.json()["ranking"] == ["fiat m"]
+    assert r.headers["cache-control"].endswith("max-age=0")
+
+
+def test_comparison_needs_two_to_eight_vehicles():
+    assert client.post("/api/compare", json={"vehicles": _vehicles("fiat")}).status_code == 422
+    assert client.post("/api/compare", json={"vehicles": _vehicles(*["fiat"] * 9)}).status_code == 422
+
+
+def test_budget_tracks_peak():
+    budget = ConcurrencyBudget(3)
+    with budget:
+        with budget:
+            assert budget.in_flight == 2
+    assert budget.in_flight == 0 and budget.peak == 2
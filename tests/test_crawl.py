@@ -0,0 +1,83 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main as api_main
+from loadtest.upstream import CURRENT_YEAR, MODELS, start_upstream
+from src.cache import TTLCache
+from src.crawl import BrandCrawler, CrawlConfig, parse_listings
+from src.estimator import estimate_costs
+from src.fetcher import Fetcher
+from src.models import EstimateRequest
+from src.store import ObservationStore
+
+client = TestClient(api_main.app)
+YEARS = 16  # the stand-in lists cars up to 15 years old
+
+
+@pytest.fixture
+def upstream():
+    server, _ = start_upstream()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_parse_listings_reads_attributes_and_falls_back_to_the_text():
+    page = (b'<main><article data-model="Panda" data-first-registration="03-2019" data-price="9500"></article>'
+            b'<article data-model="Tipo" data-first-registration="2020"><div>\xe2\x82\xac 14.900,-</div></article>'
+            b'<article data-model="500"><div>\xe2\x82\xac 7.000</div></article></main>')
+    listings, skipped = parse_listings(page)
+    assert [tuple(listing) for listing in listings] == [("Panda", 2019, 9500), ("Tipo", 2020, 14900)]
+    assert skipped == 1  # no registration
+
+
+def test_crawl_populates_every_model_from_one_sweep(upstream, tmp_path):
+    store = ObservationStore(str(tmp_path / "store.db"))
+    fetcher = Fetcher(base_url=upstream.url, cache=TTLCache(), store=store)
+    report = BrandCrawler(fetcher, CrawlConfig(rate=0)).crawl("fiat", CURRENT_YEAR, CURRENT_YEAR - YEARS + 1,
+                                                              zip_code="10139")
+    assert sorted(report.models) == sorted(MODELS["28"])
+    assert upstream.stats.snapshot()["by_kind"] == {"make_listing": report.pages}
+    # fewer requests than one listing page per model and year
+    assert report.pages < len(MODELS["28"]) * YEARS
+    assert report.listings == sum(s.count + s.outliers for years in report.models.values() for s in years.values())
+    assert len(list(store.iter_rows("observations"))[0]) == len(MODELS["28"]) * YEARS
+    store.close()
+
+    upstream.stats.reset()
+    req = EstimateRequest(brand="fiat", model="panda", zip_code="10139", number_of_years=YEARS - 1,
+                          purchase_year_index=0)
+    estimate = estimate_costs(req, fetcher)
+    assert upstream.stats.snapshot()["total"] == 0
+    assert estimate.year_values[0] == report.models["Panda"][CURRENT_YEAR].median
+
+
+def test_ranges_truncated_by_the_page_cap_are_split(upstream):
+    uncapped = BrandCrawler(Fetcher(base_url=upstream.url, cache=TTLCache(), store=None),
+                            CrawlConfig(max_pages=1000, rate=0)).crawl("volkswagen", CURRENT_YEAR, CURRENT_YEAR - 9)
+    capped = BrandCrawler(Fetcher(base_url=upstream.url, cache=TTLCache(), store=None),
+                          CrawlConfig(max_pages=4, rate=0)).crawl("volkswagen", CURRENT_YEAR, CURRENT_YEAR - 9)
+    assert capped.pages > uncapped.pages
+    assert capped.listings == uncapped.listings
+    assert capped.models == uncapped.models
+
+
+def test_crawl_job(upstream):
+    fetcher = Fetcher(base_url=upstream.url, cache=TTLCache(), store=None)
+    api_main.app.dependency_overrides[api_main.get_fetcher] = lambda: fetcher
+    try:
+        r = client.post("/api/crawl/jobs", json={"brand": "bmw", "years": 3, "zip_code": "10139"})
+        assert r.status_code == 202 and r.json()["kind"] == "crawl"
+        job_id = r.json()["job_id"]
+        deadline = time.monotonic() + 10
+        while client.get(f"/api/jobs/{job_id}").json()["status"] not in ("succeeded", "failed"):
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+        result = client.get(f"/api/jobs/{job_id}/result").json()
+        assert sorted(result["models"]) == sorted(MODELS["13"])
+        assert set(result["models"]["X1"]) == {str(CURRENT_YEAR - offset) for offset in range(3)}
+        assert client.post("/api/crawl/jobs", json={"brand": "bmw", "years": 0}).status_code == 422
+    finally:
+        api_main.app.dependency_overrides.clear()
@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main as api_main
+import src.fetcher as fetcher_module
+from src import deadline
+from src.deadline import DeadlineConfig, deadline_scope, iterate_within, propagate
+from src.fetcher import DeadlineExceeded, PriceStats, _safe_get, upstream_breaker
+from src.transport import Transport
+
+client = TestClient(api_main.app)
+
+
+def test_config_resolves_header_default_and_cap():
+    config = DeadlineConfig(default=25.0, maximum=60.0)
+    assert config.resolve(None) == 25.0 and config.resolve("nonsense") == 25.0 and config.resolve("-1") == 25.0
+    assert config.resolve("2.5") == 2.5 and config.resolve("600") == 60.0
+    assert DeadlineConfig(default=0.0).resolve(None) is None
+
+
+def test_nested_scopes_only_shorten_and_follow_threads():
+    assert deadline.remaining() is None
+    with deadline_scope(10.0) as outer:
+        with deadline_scope(100.0) as inner:
+            assert inner == outer
+        with deadline_scope(1.0) as inner:
+            assert inner < outer
+            seen = []
+            thread = threading.Thread(target=propagate(lambda: seen.append(deadline.current())))
+            thread.start()
+            thread.join()
+            assert seen == [inner]
+        assert 0 < deadline.clip(30.0) <= 10.0 and deadline.clip(1.0) == 1.0
+    assert deadline.current() is None and deadline.clip(30.0) == 30.0
+
+    def steps():
+        for _ in range(2):
+            yield deadline.current()
+    assert list(iterate_within(42.0, steps())) == [42.0, 42.0]
+
+
+def test_transport_timeouts_are_cut_to_the_time_left():
+    transport = Transport()
+    assert transport.timeouts() == (3.05, 10.0)
+    with deadline_scope(0.5):
+        connect, read = transport.timeouts()
+    assert connect <= 0.5 and read <= 0.5
+    with deadline_scope(-1.0):
+        assert transport.timeouts() == (0.01, 0.01)
+
+
+def test_safe_get_fails_fast_after_the_deadline():
+    upstream_breaker.reset()
+    transport = MagicMock()
+    with patch.object(fetcher_module, "get_transport", return_value=transport), deadline_scope(-1.0):
+        with pytest.raises(DeadlineExceeded):
+            _safe_get("http://x/lst")
+    transport.get.assert_not_called()
+    assert upstream_breaker.snapshot()["consecutive_failures"] == 0
+
+
+def slow_old_years(selected_values):
+    """The three newest years answer at once; older ones take longer than the test's budget."""
+    if deadline.expired():
+        raise DeadlineExceeded("time budget exhausted")
+    year = int(selected_values["firstRegistration"])
+    if year < 2023:
+        time.sleep(0.3)
+    return PriceStats(30000 - (2025 - year) * 2000, 500.0, 12)
+
+
+def _payload(**overrides):
+    payload = {"brand": "testbrand", "model": "testmodel", "registration_year": 2025,
+               "number_of_years": 5, "purchase_year_index": 0, "monthly_maintenance": 100.0}
+    payload.update(overrides)
+    return payload
+
+
+def test_estimate_returns_partial_result_when_the_deadline_passes():
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=slow_old_years):
+        r = client.post("/api/estimate", json=_payload(), headers={"X-Request-Timeout": "0.2"})
+    assert r.status_code == 200
+    body = r.json()
+    # 2025-2022 were fetched (2022 started before the deadline), 2021 and 2020 were not
+    assert body["year_values"] == [30000.0, 28000.0, 26000.0, 24000.0]
+    assert body["adjusted_number_of_years"] == 3
+    assert "Partial result" in body["warning"] and "2021, 2020" in body["warning"]
+    assert r.headers["Cache-Control"].endswith("max-age=0")
+
+
+def test_stream_applies_the_deadline_and_nothing_fetched_is_504():
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=slow_old_years):
+        r = client.post("/api/estimate/stream", json=_payload(), headers={"X-Request-Timeout": "0.2"})
+    events = [json.loads(line) for line in r.text.splitlines()]
+    assert [e["freshness"] for e in events if e["event"] == "year"][-2:] == ["timed_out", "timed_out"]
+    assert events[-1]["event"] == "estimate" and events[-1]["adjusted_number_of_years"] == 3
+
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=DeadlineExceeded("late")):
+        r = client.post("/api/estimate", json=_payload())
+    assert r.status_code == 504
+
+
+def test_compare_applies_the_request_deadline():
+    payload = {"vehicles": [{"brand": "fiat", "model": "panda"}, {"brand": "bmw", "model": "x1"}],
+               "registration_year": 2025, "number_of_years": 5, "purchase_year_index": 0}
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=slow_old_years):
+        started = time.monotonic()
+        r = client.post("/api/compare", json=payload, headers={"X-Request-Timeout": "0.2"})
+    assert r.status_code == 200 and time.monotonic() - started < 2.0
+    for vehicle in r.json()["vehicles"]:
+        assert vehicle["estimate"]["adjusted_number_of_years"] == 3
+        assert "Partial result" in vehicle["estimate"]["warning"]
@@ -0,0 +1,96 @@
+import math
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from main import app
+import main as api_main
+from src.depreciation import AgeObservation, DepreciationModel, anchor_offsets
+from src.fetcher import PriceStats
+
+client = TestClient(app)
+
+
+def test_fit_recovers_exponential_curve():
+    obs = [AgeObservation(age, 30000 * 0.8 ** age, 1000.0, 10) for age in range(6)]
+    model = DepreciationModel.fit(obs)
+    assert model.annual_retention() == pytest.approx(0.8, rel=1e-6)
+    assert model.predict(8) == pytest.approx(30000 * 0.8 ** 8, rel=1e-6)
+
+
+def test_fit_weights_by_count_and_stddev():
+    # a noisy single-listing outlier at age 2 should barely move the curve
+    obs = [AgeObservation(age, 30000 * 0.8 ** age, 300.0, 40) for age in (0, 1, 3, 4)]
+    obs.append(AgeObservation(2, 5000.0, 4000.0, 1))
+    model = DepreciationModel.fit(obs)
+    assert model.predict(2) == pytest.approx(30000 * 0.8 ** 2, rel=0.05)
+
+
+def test_fit_single_point_uses_default_retention_and_never_appreciates():
+    model = DepreciationModel.fit([AgeObservation(2, 20000.0)])
+    assert model.predict(2) == pytest.approx(20000.0)
+    assert model.annual_retention() == pytest.approx(DepreciationModel.DEFAULT_ANNUAL_RETENTION)
+
+    rising = DepreciationModel.fit([AgeObservation(0, 10000.0), AgeObservation(1, 12000.0)])
+    assert rising.slope == 0.0
+
+    with pytest.raises(ValueError):
+        DepreciationModel.fit([AgeObservation(0, 0.0)])
+
+
+def test_anchor_offsets_include_both_ends():
+    assert anchor_offsets(14, 4) == [0, 4, 9, 13]
+    assert anchor_offsets(3, 5) == [0, 1, 2]
+    assert anchor_offsets(1, 2) == [0]
+    assert anchor_offsets(0, 3) == []
+
+
+def _price_by_year(selected):
+    age = 2025 - int(selected["firstRegistration"])
+    return PriceStats(int(30000 * 0.85 ** age), 1500.0, 8)
+
+
+def _estimate_payload(**overrides):
+    payload = {
+        "brand": "b", "model": "m", "registration_year": 2025,
+        "number_of_years": 10, "purchase_year_index": 3, "monthly_maintenance": 100.0,
+    }
+    payload.update(overrides)
+    return payload
+
+
+def test_estimate_fills_missing_years_instead_of_shortening():
+    def sparse_market(selected):
+        year = int(selected["firstRegistration"])
+        return PriceStats(0, 0.0, 0) if year in (2021, 2017, 2016) else _price_by_year(selected)
+
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=sparse_market):
+        shortened = client.post("/api/estimate", json=_estimate_payload()).json()
+        filled = client.post("/api/estimate", json=_estimate_payload(fill_missing_years=True)).json()
+
+    assert shortened["adjusted_number_of_years"] == 7
+    assert filled["warning"] is None and len(filled["year_values"]) == 14
+    assert [i for i, s in enumerate(filled["year_sources"]) if s == "fitted"] == [4, 8, 9]
+    assert filled["year_values"][4] == pytest.approx(30000 * 0.85 ** 4, rel=0.01)
+
+
+def test_sparse_sampling_scrapes_only_anchor_years():
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=_price_by_year) as mock_fetch:
+        r = client.post("/api/estimate", json=_estimate_payload(sparse_anchor_years=4))
+    assert r.status_code == 200
+    assert mock_fetch.call_count == 4
+    data = r.json()
+    assert data["year_sources"].count("observed") == 4
+    assert math.isclose(data["purchase_price"], 30000 * 0.85 ** 3, rel_tol=0.01)
+
+
+def test_break_even_analysis_flags_fitted_points():
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=_price_by_year) as mock_fetch:
+        r = client.post("/api/break_even_analysis", json={
+            "brand": "b", "model": "m", "max_years": 6, "sparse_anchor_years": 2,
+        })
+    assert r.status_code == 200
+    assert mock_fetch.call_count == 2
+    data = r.json()
+    assert data["year_sources"] == ["observed"] + ["fitted"] * 5 + ["observed"]
+    new_car = data["purchase_series"][0]["data_points"]
+    assert [p["fitted"] for p in new_car] == [True] * 5 + [False]
@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main as api_main
+from loadtest.upstream import start_upstream
+from src import export
+from src.cache import TTLCache
+from src.fetcher import Fetcher, PriceStats
+from src.store import ExportFilter, ObservationStore, parse_date
+
+client = TestClient(api_main.app)
+MAY_1 = parse_date("2024-05-01")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ObservationStore(str(tmp_path / "store.db"))
+    yield store
+    store.close()
+
+
+def observe(store, make, model, year, median, at):
+    selection = {"make": make, "model": model, "zip": "10139", "firstRegistration": year, "shift_type": ["M"]}
+    store.record_observation(selection, PriceStats(median, 100.0, 5, p10=median - 1000, p90=median + 1000,
+                                                   trimmed_mean=median, outliers=1), observed_at=at)
+
+
+def test_store_filters_and_chunks(store):
+    for day in range(3):
+        observe(store, "Fiat", "Panda", 2020, 9000 + day, MAY_1 + day * 86400)
+    observe(store, "Fiat", "Tipo", 2020, 15000, MAY_1)
+
+    chunks = list(store.iter_rows("observations", ExportFilter(brand="fiat", model="PANDA"), chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert chunks[0][0][1:8] == ("fiat", "panda", "", "10139", "M", 2020, 9000.0)
+
+    until_2nd = ExportFilter(since=parse_date("2024-05-02"), until=parse_date("2024-05-02", end=True))
+    assert [row[7] for chunk in store.iter_rows("observations", until_2nd) for row in chunk] == [9001.0]
+
+
+def test_typed_csv_export(store):
+    observe(store, "fiat", "panda", 2020, 9000, MAY_1)
+    body = b"".join(export.export_chunks(store, "observations", export.CSV)).decode()
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert rows[0]["observed_at"] == "2024-05-01T00:00:00.000Z"
+    assert rows[0]["median"] == "9000.0" and rows[0]["count"] == "5" and rows[0]["outliers"] == "1"
+    assert export.schema("observations")["observed_at"] == "timestamp"
+    if export.PARQUET not in export.available_formats():
+        with pytest.raises(ValueError):
+            export.export_chunks(store, "observations", export.PARQUET)
+
+
+def test_scrapes_and_analyses_are_recorded_and_exported(store, tmp_path):
+    server, _ = start_upstream()
+    fetcher = Fetcher(base_url=server.url, cache=TTLCache(), store=store)
+    api_main.app.dependency_overrides[api_main.get_fetcher] = lambda: fetcher
+    try:
+        r = client.post("/api/break_even_analysis", json={"brand": "fiat", "model": "panda", "max_years": 3,
+                                                          "zip_code": "10139", "rent_monthly_cost": 400})
+        assert r.status_code == 200
+        r = client.get("/api/export/break_even", params={"brand": "fiat", "since": "2000-01-01"})
+        assert r.status_code == 200 and r.headers["content-type"].startswith("text/csv")
+        assert json.loads(r.headers["X-Export-Schema"])["fitted"] == "bool"
+        points = list(csv.DictReader(io.StringIO(r.text)))
+        # 4 ages: 3 + 2 + 1 (purchase, sale) pairs
+        assert len(points) == 6 and {p["fitted"] for p in points} == {"false"}
+
+        observations = client.get("/api/export/observations", params={"model": "panda"}).text
+        assert len(observations.splitlines()) == 1 + 4
+        assert client.get("/api/export/observations", params={"model": "tipo"}).text.count("\n") == 1
+        assert client.get("/api/export/nothing").status_code == 404
+        assert client.get("/api/export/observations", params={"since": "yesterday"}).status_code == 400
+    finally:
+        api_main.app.dependency_overrides.clear()
+        server.shutdown()
+        server.server_close()
+
+    output = tmp_path / "obs.csv"
+    assert export.main(["observations", "-o", str(output), "--store", store.path, "--brand", "fiat"]) == 0
+    assert len(output.read_text().splitlines()) == 5
+    assert json.loads((tmp_path / "obs.csv.schema.json").read_text())["year"] == "int32"
+
+
+def test_parquet_export(store):
+    pq = pytest.importorskip("pyarrow.parquet")
+    for year in range(2015, 2020):
+        observe(store, "fiat", "panda", year, 9000, MAY_1)
+    data = b"".join(export.export_chunks(store, "observations", export.PARQUET, chunk_size=2))
+    table = pq.read_table(io.BytesIO(data))
+    assert table.num_rows == 5 and table.column("year").to_pylist() == list(range(2015, 2020))
@@ -0,0 +1,131 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import src.fetcher as fetcher_module
+from src.fetcher import _safe_get, upstream_breaker
+from src.hedging import Hedger, HedgingConfig, LatencyWindow
+
+
+def config(**overrides):
+    return HedgingConfig(**{**dict(enabled=True, min_delay=0.01, initial_delay=0.05, min_samples=1), **overrides})
+
+
+def slow_first(release: threading.Event):
+    """First call blocks until `release`, later calls answer at once."""
+    calls = []
+
+    def fn():
+        calls.append(None)
+        if len(calls) == 1:
+            release.wait(5)
+            return "primary"
+        return "hedge"
+    return fn, calls
+
+
+def test_fast_calls_are_not_hedged():
+    hedger = Hedger(config())
+    assert [hedger.call(lambda: 42) for _ in range(3)] == [42, 42, 42]
+    snap = hedger.snapshot()
+    assert (snap["calls"], snap["hedged"], snap["wins"]) == (3, 0, 0)
+    hedger.close()
+
+
+def test_slow_call_is_hedged_and_the_duplicate_wins():
+    hedger, release = Hedger(config()), threading.Event()
+    fn, calls = slow_first(release)
+    assert hedger.call(fn) == "hedge"
+    release.set()
+    snap = hedger.snapshot()
+    assert len(calls) == 2 and (snap["hedged"], snap["wins"], snap["hedge_rate"]) == (1, 1, 1.0)
+    hedger.close()
+
+
+def test_budget_limits_hedges():
+    hedger = Hedger(config(budget=0.0, burst=1.0))
+    for expected_calls in (2, 1):
+        release = threading.Event()
+        fn, calls = slow_first(release)
+        threading.Timer(0.2, release.set).start()
+        hedger.call(fn)
+        assert len(calls) == expected_calls
+    snap = hedger.snapshot()
+    assert (snap["hedged"], snap["over_budget"]) == (1, 1)
+    hedger.close()
+
+
+def test_failures_fall_back_to_the_other_attempt():
+    hedger, attempts = Hedger(config()), []
+
+    def flaky():
+        attempts.append(None)
+        if len(attempts) == 1:
+            time.sleep(0.1)
+            raise IOError("primary")
+        return "ok"
+    assert hedger.call(flaky) == "ok"
+
+    def broken():
+        raise IOError("down")
+    with pytest.raises(IOError):
+        hedger.call(broken)
+    hedger.close()
+
+
+def test_delay_follows_recent_latencies():
+    window = LatencyWindow(4)
+    for ms in (10, 20, 30, 40, 50):
+        window.add(ms / 1000)
+    assert len(window) == 4 and window.percentile(50) == 0.03 and window.percentile(100) == 0.05
+
+    hedger = Hedger(HedgingConfig(enabled=True, min_samples=3, initial_delay=0.5, min_delay=0.01, max_delay=0.2))
+    assert hedger.delay() == 0.2  # initial_delay, capped by max_delay, until enough samples
+    for seconds in (0.02, 0.03, 0.04):
+        hedger.latencies.add(seconds)
+    assert hedger.delay() == 0.04
+
+
+def test_safe_get_hedges_only_when_asked():
+    upstream_breaker.reset()
+    transport, hedger = MagicMock(), Hedger(config())
+    transport.get.return_value = "page"
+    with patch.object(fetcher_module, "get_transport", return_value=transport), \
+            patch.object(fetcher_module, "upstream_hedger", hedger):
+        assert _safe_get("http://x/lst", hedge=True) == "page"
+        assert _safe_get("http://x/") == "page"
+    assert hedger.snapshot()["calls"] == 1
+    hedger.close()
+
+
+def test_a_saturated_pool_does_not_trigger_hedges():
+    hedger, release = Hedger(config(max_workers=2)), threading.Event()
+    blockers = [hedger._submit(lambda: release.wait(5)) for _ in range(2)]
+    threading.Timer(0.3, release.set).start()
+    # queued behind the blockers for longer than the hedge delay, then quick
+    assert hedger.call(lambda: 42) == 42
+    assert hedger.snapshot()["hedged"] == 0
+
+    # a slow primary while another call waits for a thread: no hedge either
+    hedger.close()
+    hedger = Hedger(config(max_workers=2, min_delay=0.2, initial_delay=0.2, min_samples=100, budget=1.0))
+    release = threading.Event()
+    blocker = hedger._submit(lambda: release.wait(5))
+    fn, calls = slow_first(release)
+    caller = threading.Thread(target=hedger.call, args=(fn,))
+    caller.start()
+    time.sleep(0.05)
+    queued = hedger._submit(lambda: None)
+    time.sleep(0.3)
+    release.set()
+    caller.join(5)
+    queued.result(5)
+    blocker.result(5)
+    assert len(calls) == 1
+    snap = hedger.snapshot()
+    assert (snap["hedged"], snap["backlogged"]) == (0, 1)
+    for future in blockers:
+        future.result(5)
+    hedger.close()
@@ -0,0 +1,77 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+import main as api_main
+from src.cache import TTLCache
+from src.fetcher import Fetcher, PriceStats, selection_key
+from src.http_cache import etag_matches, request_hash
+from src.models import EstimateRequest
+from src.series import build_selection
+
+client = TestClient(api_main.app)
+
+
+def test_brands_etag_and_conditional_get():
+    with patch.object(api_main.fetcher, "fetch_dropdown_options", return_value={"make": ["bmw", "audi"]}):
+        first = client.get("/api/brands")
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"] == f"public, max-age={int(Fetcher.CATALOG_TTL)}"
+        not_modified = client.get("/api/brands", headers={"If-None-Match": etag})
+        changed = client.get("/api/brands", headers={"If-None-Match": '"stale"'})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    assert changed.status_code == 200 and changed.json() == {"brands": ["audi", "bmw"]}
+
+
+def test_etag_matching_rules():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"x"')
+    assert not etag_matches(None, '"x"')
+    assert not etag_matches('"a"', '"b"')
+
+
+def test_request_hash_ignores_key_order_and_defaults():
+    a = EstimateRequest.model_validate({"brand": "b", "model": "m", "number_of_years": 4})
+    b = EstimateRequest.model_validate({"number_of_years": 4, "model": "m", "brand": "b", "details": ""})
+    c = EstimateRequest.model_validate({"brand": "b", "model": "m", "number_of_years": 5})
+    assert request_hash("/api/estimate", a) == request_hash("/api/estimate", b)
+    assert request_hash("/api/estimate", a) != request_hash("/api/estimate", c)
+    assert request_hash("/api/estimate", a) != request_hash("/api/break_even_analysis", a)
+
+
+def test_estimate_post_exposes_request_hash_and_fails_a_matching_if_none_match():
+    payload = {"brand": "b", "model": "m", "registration_year": 2025, "number_of_years": 2, "purchase_year_index": 0}
+    with patch.object(api_main.fetcher, "fetch_price_stats", return_value=PriceStats(20000, 0.0, 3)):
+        first = client.post("/api/estimate", json=payload)
+        reordered = client.post("/api/estimate", json=dict(reversed(list(payload.items()))))
+        again = client.post("/api/estimate", json=payload, headers={"If-None-Match": first.headers["etag"]})
+    assert first.status_code == 200
+    assert first.headers["x-request-hash"] == reordered.headers["x-request-hash"]
+    assert first.headers["etag"] == reordered.headers["etag"]
+    # 304 is only for GET/HEAD: a POST whose If-None-Match matches fails the precondition
+    assert again.status_code == 412 and again.content == b""
+    assert again.headers["etag"] == first.headers["etag"]
+
+
+def test_catalog_is_cached_by_fetcher():
+    f = Fetcher()
+    with patch.object(f, "_scrape_car_models", return_value=["a3"]) as scrape:
+        assert f.fetch_car_models("Audi") == ["a3"]
+        assert f.fetch_car_models("audi ") == ["a3"]
+    assert scrape.call_count == 1
+
+
+def test_max_age_is_capped_by_the_oldest_price_used():
+    payload = {"brand": "fiat", "model": "panda", "registration_year": 2025, "number_of_years": 1,
+               "purchase_year_index": 0, "zip_code": "10139"}
+    fetcher = Fetcher(cache=TTLCache(), store=None)
+    for year, ttl in ((2025, Fetcher.PRICE_TTL), (2024, 600)):
+        selection = build_selection("fiat", "panda", "", "10139", [], year)
+        fetcher.cache.set("price:" + selection_key(selection), PriceStats(20000 - year, 1.0, 3), ttl)
+    api_main.app.dependency_overrides[api_main.get_fetcher] = lambda: fetcher
+    try:
+        r = client.post("/api/estimate", json=payload)
+    finally:
+        api_main.app.dependency_overrides.clear()
+    assert r.status_code == 200
+    max_age = int(r.headers["cache-control"].rsplit("=", 1)[1])
+    assert 590 <= max_age <= 600
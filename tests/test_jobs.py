@@ -0,0 +1,132 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main as api_main
+from src.fetcher import PriceStats
+from src.jobs import FAILED, QUEUED, SUCCEEDED, JobConfig, JobQueue, QueueFullError
+from src.models import BreakEvenAnalysisResponse
+
+client = TestClient(api_main.app)
+
+
+def _wait(queue, job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return queue.get(job.id)
+
+
+def test_identical_pending_jobs_are_deduplicated():
+    queue = JobQueue(JobConfig(workers=1))
+    release = threading.Event()
+
+    def slow(job):
+        job.advance(1, total=2)
+        release.wait(5)
+        job.advance()
+        return 42
+
+    first, created = queue.submit("test", "same", slow)
+    second, created_again = queue.submit("test", "same", slow)
+    assert created and not created_again and second is first
+    release.set()
+    assert _wait(queue, first).result == 42 and first.progress == 1.0
+
+    # once finished, the same key starts a new job
+    third, created = queue.submit("test", "same", lambda job: 43)
+    assert created and third is not first
+    assert queue.snapshot()["deduplicated"] == 1
+    queue.shutdown()
+
+
+def test_failures_keep_their_http_status():
+    queue = JobQueue()
+
+    def bad_request(job):
+        raise HTTPException(status_code=400, detail="Not enough historical data")
+
+    job, _ = queue.submit("test", "a", bad_request)
+    job = _wait(queue, job)
+    assert (job.status, job.status_code, job.error) == (FAILED, 400, "Not enough historical data")
+    crashed, _ = queue.submit("test", "b", lambda job: 1 / 0)
+    assert _wait(queue, crashed).status_code == 500
+    queue.shutdown()
+
+
+def test_pending_limit_and_retention():
+    now = [1000.0]
+    queue = JobQueue(JobConfig(workers=1, max_pending=1, retention=60), clock=lambda: now[0])
+    release = threading.Event()
+    job, _ = queue.submit("test", "a", lambda job: release.wait(5))
+    with pytest.raises(QueueFullError):
+        queue.submit("test", "b", lambda job: None)
+    release.set()
+    assert _wait(queue, job).status == SUCCEEDED
+    now[0] += 61
+    assert queue.get(job.id) is None
+    queue.shutdown()
+
+
+def test_shutdown_drops_queued_jobs():
+    queue = JobQueue(JobConfig(workers=1))
+    release = threading.Event()
+    running, _ = queue.submit("test", "a", lambda job: release.wait(5))
+    queued, _ = queue.submit("test", "b", lambda job: None)
+    assert queued.status == QUEUED
+    release.set()
+    queue.shutdown()
+    assert queue.get(queued.id) is None or queued.finished
+
+
+def _prices(selected):
+    return PriceStats(40000 - 3000 * (2025 - selected["firstRegistration"]), 0.0, 4)
+
+
+def test_break_even_analysis_job_endpoints():
+    payload = {"brand": "b", "model": "m", "max_years": 3}
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=_prices):
+        r = client.post("/api/break_even_analysis/jobs", json=payload)
+        assert r.status_code == 202
+        job_id = r.json()["job_id"]
+        assert r.headers["location"] == f"/api/jobs/{job_id}"
+
+        deadline = time.monotonic() + 5
+        while True:
+            status = client.get(f"/api/jobs/{job_id}").json()
+            if status["status"] in ("succeeded", "failed") or time.monotonic() > deadline:
+                break
+            time.sleep(0.01)
+    assert status["status"] == "succeeded"
+    assert status["progress"] == 1.0 and status["completed_steps"] == status["total_steps"] == 5
+
+    result = client.get(f"/api/jobs/{job_id}/result")
+    assert result.status_code == 200
+    data = BreakEvenAnalysisResponse.model_validate(result.json())
+    assert len(data.purchase_series) == 4
+    assert client.get("/api/jobs/unknown").status_code == 404
+
+
+def test_job_result_reports_running_and_failed_jobs():
+    release = threading.Event()
+    payload = {"brand": "x", "model": "y", "max_years": 2, "fill_missing_years": True}
+
+    def blocked(selected):
+        release.wait(5)
+        return PriceStats(0, 0.0, 0)
+
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=blocked):
+        job_id = client.post("/api/break_even_analysis/jobs", json=payload).json()["job_id"]
+        again = client.post("/api/break_even_analysis/jobs", json=dict(reversed(payload.items())))
+        assert again.json()["job_id"] == job_id
+        assert client.get(f"/api/jobs/{job_id}/result").status_code == 409
+        release.set()
+        job = api_main.job_queue.get(job_id)
+        _wait(api_main.job_queue, job)
+    # no listings at all for that vehicle
+    assert client.get(f"/api/jobs/{job_id}").json()["status_code"] == 400
+    assert client.get(f"/api/jobs/{job_id}/result").status_code == 400
@@ -0,0 +1,60 @@
+import argparse
+
+import pytest
+
+from loadtest.run import Sample, Slo, attribute_upstream, build_payload, evaluate_slos, parse_mix, summarize
+from loadtest.upstream import CURRENT_YEAR, start_upstream
+from src.cache import TTLCache
+from src.fetcher import Fetcher
+
+
+@pytest.fixture
+def upstream():
+    server, _ = start_upstream()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetcher_scrapes_the_stand_in_upstream(upstream):
+    fetcher = Fetcher(base_url=upstream.url, cache=TTLCache())
+    # the taxonomy request follows base_url instead of the hard-coded production host
+    assert "panda" in fetcher.fetch_car_models("fiat")
+    stats = fetcher.fetch_price_stats({"make": "fiat", "model": "panda", "details": "lt-estimate",
+                                       "zip": "10139", "firstRegistration": CURRENT_YEAR - 2})
+    assert stats.count + stats.outliers == 20 and stats.median > 0
+    empty = fetcher.fetch_price_stats({"make": "fiat", "model": "panda", "firstRegistration": CURRENT_YEAR - 40})
+    assert empty.median == 0
+
+    counts = upstream.stats.snapshot()
+    assert counts["by_kind"] == {"home": 1, "taxonomy": 1, "listing": 2}
+    assert counts["listings_by_tag"] == {"lt-estimate": 1, "": 1}
+
+
+def test_summary_and_slo_evaluation():
+    samples = [Sample("estimate", float(ms), 200) for ms in range(1, 101)]
+    samples += [Sample("break_even", 3000.0, 503), Sample("break_even", 100.0, 200)]
+    report = summarize(samples, elapsed=10.0)
+    assert report["estimate"]["p99_ms"] == 99.0 and report["estimate"]["p50_ms"] == 50.0
+    assert report["estimate"]["throughput"] == 10.0
+    assert report["break_even"]["error_rate"] == 0.5 and report["break_even"]["statuses"] == {"503": 1, "200": 1}
+    assert report["total"]["requests"] == 102
+
+    attribute_upstream(report, {"total": 7, "by_kind": {"listing": 7}, "listings_by_tag": {"lt-estimate": 5}})
+    assert report["estimate"]["upstream_listing_calls"] == 5 and report["break_even"]["upstream_listing_calls"] == 0
+
+    assert evaluate_slos(report, [Slo.parse("estimate.p99_ms=2000"), Slo.parse("estimate.throughput=5")]) == []
+    breaches = evaluate_slos(report, [Slo.parse("p99_ms=2000"), Slo.parse("estimate.throughput=20")])
+    assert breaches == ["break_even.p99_ms = 3000.0 > 2000",
+                        "estimate.throughput = 10.0 < 20"]
+
+
+def test_cli_parsing():
+    assert parse_mix("estimate=2,break_even_analysis=1") == {"estimate": 2.0, "break_even_analysis": 1.0}
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_mix("compare=1")
+    with pytest.raises(argparse.ArgumentTypeError):
+        Slo.parse("estimate.p42=1")
+    args = argparse.Namespace(zip_code="20121", years=4)
+    payload = build_payload("break_even", ("fiat", "panda"), args)
+    assert payload["estimate"]["details"] == "lt-break-even" and payload["estimate"]["number_of_years"] == 4
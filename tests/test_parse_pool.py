@@ -0,0 +1,99 @@
+import os
+import signal
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main as api_main
+from loadtest.upstream import CURRENT_YEAR, home_page, start_upstream
+from src import fetcher as fetcher_module
+from src.cache import TTLCache
+from src.deadline import deadline_scope
+from src.fetcher import DeadlineExceeded, Fetcher, FetchError, _parse
+from src.parse_pool import ParseConfig, ParseError, ParseExecutor
+from src.parsing import parse_dropdowns, parse_listing_prices, parse_make_ids
+from src.series import build_selection
+
+
+@pytest.fixture
+def executor():
+    executor = ParseExecutor(ParseConfig(workers=2, max_queue=1, timeout=5.0))
+    assert executor.start()
+    yield executor
+    executor.close()
+
+
+def test_whole_page_parsers():
+    page = ('<div class="Price_price"><span>€ 12.500</span></div><div class="price">Su richiesta</div>'
+            '<p>€ 99 al mese</p>').encode("utf-8")
+    assert parse_listing_prices(page) == [12500]
+    assert parse_listing_prices("<p>Golf € 14.900</p><span>€ 9.800,-</span>".encode("utf-8")) == [14900, 9800]
+    home = home_page().encode("utf-8")
+    assert parse_dropdowns(home)["make"][:2] == ["Marca", "Fiat"]
+    assert parse_make_ids(home)["volkswagen"] == "74"
+
+
+def test_disabled_executor_parses_in_the_calling_thread():
+    executor = ParseExecutor()
+    assert not executor.start()
+    assert executor.run(parse_make_ids, home_page().encode("utf-8"))["bmw"] == "13"
+    assert executor.snapshot()["inline"] == 1 and executor.snapshot()["workers"] == 0
+
+
+def test_pages_are_parsed_by_the_workers(executor):
+    assert executor.run(parse_make_ids, home_page().encode("utf-8"))["fiat"] == "28"
+    stats = executor.snapshot()
+    assert (stats["workers"], stats["healthy"], stats["submitted"], stats["inline"]) == (2, True, 1, 0)
+
+
+def test_a_full_queue_parses_in_the_calling_thread(executor):
+    busy = threading.Thread(target=executor.run, args=(time.sleep, 0.5))
+    busy.start()
+    time.sleep(0.1)
+    assert executor.run(len, b"abc") == 3
+    busy.join()
+    assert executor.snapshot()["overflow"] == 1
+
+
+def test_slow_parses_time_out(executor):
+    executor.config = executor.config._replace(timeout=0.1)
+    with pytest.raises(ParseError):
+        executor.run(time.sleep, 1.0)
+    assert executor.snapshot()["timeouts"] == 1
+
+
+def test_parses_cut_short_by_the_deadline_raise_deadline_exceeded(executor, monkeypatch):
+    monkeypatch.setattr(fetcher_module, "parse_executor", executor)
+    with deadline_scope(0.1), pytest.raises(DeadlineExceeded):
+        _parse(time.sleep, 0.5, "/lst/fiat/panda")
+    time.sleep(0.6)  # the worker is free again
+    executor.config = executor.config._replace(timeout=0.1)
+    with deadline_scope(30.0), pytest.raises(FetchError) as ex:
+        _parse(time.sleep, 0.5, "/lst/fiat/panda")
+    assert not isinstance(ex.value, DeadlineExceeded)
+
+
+def test_a_broken_pool_is_replaced(executor):
+    for pid in list(executor._pool._processes):
+        os.kill(pid, signal.SIGKILL)
+    time.sleep(0.2)
+    assert executor.run(len, b"abcd") == 4
+    assert executor.snapshot()["restarts"] == 1
+    assert executor.run(len, b"ab") == 2 and executor.snapshot()["submitted"] == 1
+
+
+def test_fetcher_parses_listing_pages_in_the_pool(executor, monkeypatch):
+    server, _ = start_upstream()
+    monkeypatch.setattr(fetcher_module, "parse_executor", executor)
+    selection = build_selection("Fiat", "Panda", "", "10139", ["M"], CURRENT_YEAR)
+    try:
+        stats = Fetcher(base_url=server.url, cache=TTLCache(), store=None).fetch_price_stats(selection)
+        assert stats.count + stats.outliers == 20
+        assert executor.snapshot()["submitted"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert TestClient(api_main.app).get("/api/metrics").json()["parsing"]["healthy"] is False
@@ -0,0 +1,76 @@
+from unittest.mock import patch
+
+import pytest
+
+from loadtest.upstream import CURRENT_YEAR, build_parser, start_upstream
+from src import fetcher as fetcher_module
+from src.cache import TTLCache
+from src.fetcher import Fetcher
+from src.parsing import ListingPriceParser, StreamConfig, extract_price, read_listing_prices
+from src.series import build_selection
+from src.transport import RequestsTransport
+
+PAGE = ('<html><body><main>'
+        '<article><div class="Price_price"><div><span>€ 12.500</span></div> <span>,-</span></div></article>'
+        '<article><div class="PriceInfo"><span>€ 57.900,-</span> <span>€ 49.900</span> 1</div></article>'
+        '<article><div class="price-rating">Ottimo prezzo</div><p>€ 1.000 di sconto</p></article>'
+        '</main><footer>€ 99 al mese</footer></body></html>').encode("utf-8")
+
+
+def chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def prices(accumulator):
+    return sorted(value for value, _ in accumulator.sketch.weighted_items())
+
+
+def test_extract_price():
+    assert extract_price("€ 55.900 Ottimo prezzo") == 55900
+    assert extract_price("€ 57.900,- € 49.900 1 ND") == 49900
+    assert extract_price("€\xa01 234 567") == 1234567
+    assert extract_price("prezzo su richiesta") is None and extract_price(None) is None
+
+
+@pytest.mark.parametrize("size", [1, 7, 64, len(PAGE)])
+def test_price_divs_are_read_whatever_the_chunking(size):
+    scan = read_listing_prices(chunks(PAGE, size), "utf-8")
+    # outer price divs only; the footer is never parsed
+    assert prices(scan.prices) == [12500, 49900]
+    assert scan.stopped_early and scan.bytes_read < PAGE.index(b"</main>") + len(b"</main>") + size
+
+
+def test_pages_without_price_divs_fall_back_to_any_euro_text():
+    page = "<main><p>Golf € 14.900</p><p>Polo</p><span>€ 9.800,-</span></main>".encode("utf-8")
+    assert prices(read_listing_prices(chunks(page, 5)).prices) == [9800, 14900]
+    parser = ListingPriceParser(section=None)
+    parser.feed("<div><p>€ 1.000</p></div>")
+    parser.close()
+    assert (prices(parser.prices), parser.done) == ([1000], False)
+
+
+def test_reading_stops_at_max_bytes():
+    page = ("<main>" + "".join(f'<div class="price">€ {n}.000</div>' for n in range(1, 100)) + "</main>").encode()
+    scan = read_listing_prices(chunks(page, 100), config=StreamConfig(max_bytes=300))
+    assert scan.stopped_early and scan.bytes_read == 300
+    assert 0 < scan.prices.count < 99
+
+
+def test_listing_pages_are_streamed_up_to_the_listings():
+    server, _ = start_upstream(build_parser().parse_args(["--port", "0", "--footer-kb", "256"]))
+    transport = RequestsTransport()
+    selection = build_selection("Fiat", "Panda", "", "10139", ["M"], CURRENT_YEAR)
+    try:
+        with patch.object(fetcher_module, "get_transport", return_value=transport):
+            streamed = Fetcher(base_url=server.url, cache=TTLCache(), store=None)
+            streamed.stream_config = StreamConfig(enabled=True)
+            loaded = Fetcher(base_url=server.url, cache=TTLCache(), store=None)
+            assert streamed.fetch_price_stats(selection) == loaded.fetch_price_stats(selection)
+        stats = transport.stats.snapshot()
+        assert (stats["streamed"], stats["stopped_early"]) == (1, 1)
+        # the footer (most of the page) was left on the wire
+        assert stats["wire_bytes"] < 64 * 1024 and stats["body_bytes"] <= stats["wire_bytes"]
+    finally:
+        transport.close()
+        server.shutdown()
+        server.server_close()
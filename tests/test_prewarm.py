@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+import main as api_main
+from src.fetcher import PriceStats
+from src.prewarm import PrewarmConfig, Prewarmer, RequestTracker
+
+
+def _req(brand, model, zip_code="10139-torino", shift_types=None):
+    return SimpleNamespace(brand=brand, model=model, details="", zip_code=zip_code, shift_types=shift_types or [])
+
+
+def test_tracker_ranks_by_frequency_and_keeps_longest_window():
+    tracker = RequestTracker()
+    for _ in range(3):
+        tracker.record(_req("BMW", "X1", shift_types=["A", "M"]), 5)
+    tracker.record(_req("bmw", "x1", shift_types=["M", "A"]), 9)
+    tracker.record(_req("fiat", "panda"), 4)
+    top = tracker.top(1)
+    assert len(top) == 1
+    key, years = top[0]
+    assert (key.brand, key.model, key.shift_types, years) == ("bmw", "x1", ("A", "M"), 9)
+
+
+def test_tracker_decay_drops_stale_keys():
+    tracker = RequestTracker()
+    tracker.record(_req("fiat", "panda"), 4)
+    for _ in range(8):
+        tracker.record(_req("bmw", "x1"), 4)
+    tracker.decay(0.05)
+    assert [k.model for k, _ in tracker.top(5)] == ["x1"]
+
+
+def test_run_once_refreshes_top_k_within_budget():
+    tracker = RequestTracker()
+    tracker.record(_req("bmw", "x1"), 3)
+    tracker.record(_req("bmw", "x1"), 3)
+    tracker.record(_req("fiat", "panda"), 3)
+    fetcher = MagicMock()
+    warm = Prewarmer(fetcher, tracker, PrewarmConfig(top_k=2, max_requests=4, rate=1000))
+    assert warm.run_once() == 4
+    models = [c.args[0]["model"] for c in fetcher.fetch_price_stats.call_args_list]
+    assert models == ["x1", "x1", "x1", "panda"]
+    assert all(c.kwargs == {"refresh": True} for c in fetcher.fetch_price_stats.call_args_list)
+
+
+def test_run_once_survives_fetch_errors():
+    tracker = RequestTracker()
+    tracker.record(_req("bmw", "x1"), 2)
+    fetcher = MagicMock()
+    fetcher.fetch_price_stats.side_effect = RuntimeError("boom")
+    assert Prewarmer(fetcher, tracker, PrewarmConfig(rate=1000)).run_once() == 2
+
+
+def test_config_from_env(monkeypatch):
+    monkeypatch.setenv("CARCALC_PREWARM_INTERVAL", "900")
+    monkeypatch.setenv("CARCALC_PREWARM_TOP_K", "5")
+    config = PrewarmConfig.from_env()
+    assert config.interval == 900.0 and config.top_k == 5 and config.max_requests == 300
+
+
+def test_estimate_requests_are_tracked():
+    tracker = RequestTracker()
+    with patch.object(api_main, "request_tracker", tracker), \
+            patch.object(api_main.fetcher, "fetch_price_stats", return_value=PriceStats(20000, 0.0, 3)):
+        TestClient(api_main.app).post("/api/estimate", json={
+            "brand": "Audi", "model": "A3", "number_of_years": 2, "purchase_year_index": 1,
+        })
+    key, years = tracker.top(1)[0]
+    assert (key.brand, key.model, years) == ("audi", "a3", 4)
+
+
+def test_run_once_warms_the_registration_years_asked_for():
+    tracker = RequestTracker()
+    older = _req("fiat", "panda")
+    older.registration_year = 2018
+    tracker.record(older, 2)
+    older.registration_year = 2015
+    tracker.record(older, 2)
+    key, window = tracker.top_windows(1)[0]
+    assert (window.newest_year, window.years, window.oldest_year) == (2018, 5, 2014)
+    fetcher = MagicMock()
+    assert Prewarmer(fetcher, tracker, PrewarmConfig(rate=1000)).run_once() == 5
+    years = [c.args[0]["firstRegistration"] for c in fetcher.fetch_price_stats.call_args_list]
+    assert years == [2018, 2017, 2016, 2015, 2014]
+
+
+def test_tracker_is_bounded_and_off_without_the_scheduler():
+    tracker = RequestTracker(max_keys=3)
+    for _ in range(3):
+        tracker.record(_req("bmw", "x1"), 2)
+    tracker.record(_req("fiat", "panda"), 2)
+    tracker.record(_req("fiat", "panda"), 2)
+    for n in range(50):
+        tracker.record(_req("spam", f"model-{n}"), 2)
+    assert len(tracker._counts) == len(tracker._years) == 3
+    assert [key.model for key, _ in tracker.top(2)] == ["x1", "panda"]
+
+    assert not PrewarmConfig().enabled and not api_main.request_tracker.enabled
+    disabled = RequestTracker(enabled=False)
+    disabled.record(_req("bmw", "x1"), 2)
+    assert disabled.top(1) == []
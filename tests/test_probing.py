@@ -0,0 +1,88 @@
+import pytest
+from unittest.mock import patch
+from src.cache import TTLCache
+from src.fetcher import Fetcher, PriceStats
+from src.probing import YearSpan, probe_year_span
+
+
+def _market(first, last):
+    """fetch_year stub with listings only for years in [first, last]; records the probed years."""
+    calls = []
+
+    def fetch_year(year):
+        calls.append(year)
+        return PriceStats(20000 if first <= year <= last else 0, 0.0, 5 if first <= year <= last else 0)
+    return fetch_year, calls
+
+
+@pytest.mark.parametrize("first,last", [(2021, 2025), (2012, 2025), (2015, 2019), (2025, 2025), (2012, 2012), (2018, 2018)])
+def test_probe_finds_span(first, last):
+    fetch_year, calls = _market(first, last)
+    span, probes = probe_year_span(fetch_year, 2025, 2012)
+    assert span == YearSpan(last, first)
+    assert set(probes) == set(calls)
+    assert len(calls) == len(set(calls))
+
+
+def test_probe_recent_model_uses_few_requests():
+    fetch_year, calls = _market(2021, 2025)
+    probe_year_span(fetch_year, 2025, 2012)
+    assert len(calls) <= 7
+
+
+def test_probe_empty_window():
+    fetch_year, calls = _market(1990, 1995)
+    span, _ = probe_year_span(fetch_year, 2025, 2012)
+    assert span is None
+    assert calls[-1] == 2012
+
+
+def test_year_span_contains():
+    span = YearSpan(2025, 2021)
+    assert 2023 in span and 2020 not in span and 2026 not in span
+
+
+def test_ttl_cache_expiry_and_bound():
+    cache = TTLCache(default_ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=-1)
+    assert cache.get("a") == 1 and cache.get("b") is None
+    cache.set("c", 3)
+    cache.set("d", 4)
+    assert len(cache) == 2 and "d" in cache
+
+
+def test_fetcher_negative_caches_empty_years():
+    f = Fetcher()
+    with patch.object(f, "_scrape_price_stats", return_value=PriceStats(0, 0.0, 0)) as scrape:
+        sel = {"make": "bmw", "model": "x1", "firstRegistration": 2010}
+        assert f.fetch_price_stats(sel).median == 0
+        assert f.fetch_price_stats(dict(sel, make="BMW")).median == 0
+    assert scrape.call_count == 1
+
+
+def test_fetcher_span_is_cached_and_probes_reused():
+    f = Fetcher()
+    fetch_year, calls = _market(2021, 2025)
+    with patch.object(f, "_scrape_price_stats", side_effect=lambda sel: fetch_year(sel["firstRegistration"])):
+        span, probes = f.find_year_span({"make": "b", "model": "m"}, 2025, 2012)
+        assert span == YearSpan(2025, 2021) and probes
+        probed = len(calls)
+        assert f.find_year_span({"make": "b", "model": "m"}, 2025, 2012) == (span, {})
+    assert len(calls) == probed
+
+
+def test_estimate_with_adaptive_probing_skips_years_outside_span():
+    from fastapi.testclient import TestClient
+    import main as api_main
+
+    fetch_year, calls = _market(2019, 2025)
+    with patch.object(api_main.fetcher, "fetch_price_stats",
+                      side_effect=lambda sel: fetch_year(sel["firstRegistration"])):
+        r = TestClient(api_main.app).post("/api/estimate", json={
+            "brand": "b", "model": "m", "registration_year": 2025, "number_of_years": 10,
+            "purchase_year_index": 2, "adaptive_probing": True,
+        })
+    assert r.status_code == 200
+    assert r.json()["adjusted_number_of_years"] == 4
+    assert min(calls) >= 2012 and len(calls) == len(set(calls)) and len(calls) < 13
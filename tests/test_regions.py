@@ -0,0 +1,81 @@
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+import pytest
+from fastapi.testclient import TestClient
+import main as api_main
+from src.fetcher import Fetcher, PriceStats
+from src.geo import DEFAULT_COORDINATES, coordinates_for_zip
+from src.prewarm import RequestTracker
+from src.regions import pool_price_stats, region_zip_codes
+
+client = TestClient(api_main.app)
+
+
+def test_coordinates_follow_the_cap_prefix():
+    assert coordinates_for_zip("20121") == (45.4642, 9.19)
+    assert coordinates_for_zip("00184-roma") == (41.9028, 12.4964)
+    assert coordinates_for_zip("10139-torino") == DEFAULT_COORDINATES
+    assert coordinates_for_zip("torino") == DEFAULT_COORDINATES
+    assert coordinates_for_zip(None) == DEFAULT_COORDINATES
+
+
+def test_search_url_uses_zip_coordinates():
+    url = Fetcher().construct_search_url({"make": "fiat", "model": "panda", "zip": "80121-napoli"})
+    assert "lat=40.8518" in url and "lon=14.2681" in url
+    assert "lat=45.07086" in Fetcher().construct_search_url({"make": "fiat", "model": "panda"})
+
+
+def test_pooling_weights_regions_by_listing_count():
+    pooled = pool_price_stats([PriceStats(20000, 1000.0, 30), PriceStats(24000, 1000.0, 10), PriceStats(0, 0.0, 0)])
+    assert pooled.median == 20000 and pooled.count == 40
+    # within-region spread plus the distance between the regional medians
+    assert 1000.0 < pooled.stddev < 2500.0
+    assert pool_price_stats([PriceStats(20000, 500.0, 10), PriceStats(22000, 500.0, 10)]).median == 21000
+    assert pool_price_stats([PriceStats(0, 0.0, 0)]) == PriceStats(0, 0.0, 0)
+    assert pool_price_stats([PriceStats(20000, 1.0, 3, stale=True), PriceStats(0, 0.0, 0)]).stale
+
+
+def test_region_zip_codes_and_tracker():
+    req = SimpleNamespace(brand="b", model="m", details="", zip_code="10139", shift_types=[],
+                          zip_codes=["20121", " 20121", "00184"])
+    assert region_zip_codes(req) == ["20121", "00184"]
+    assert region_zip_codes(SimpleNamespace(zip_code="10139", zip_codes=None)) == ["10139"]
+    tracker = RequestTracker()
+    tracker.record(req, 4)
+    assert sorted(key.zip_code for key, _ in tracker.top(5)) == ["00184", "20121"]
+
+
+PAYLOAD = {"brand": "b", "model": "m", "registration_year": 2025, "number_of_years": 1,
+           "purchase_year_index": 0, "zip_codes": ["20121", "00184"]}
+
+
+def test_regions_are_fetched_concurrently_and_pooled():
+    both_regions = threading.Barrier(2, timeout=5)
+
+    def fetch(selected):
+        both_regions.wait()  # only returns when the two regions of a year are in flight together
+        base = 30000 if selected["zip"] == "20121" else 26000
+        return PriceStats(base - 2000 * (2025 - selected["firstRegistration"]), 500.0, 10)
+
+    with patch.object(api_main.fetcher, "fetch_price_stats", side_effect=fetch):
+        r = client.post("/api/estimate", json={**PAYLOAD, "combine_regions": "per_region"})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["year_values"] == [28000.0, 26000.0]
+    regions = {region["zip_code"]: region for region in data["regions"]}
+    assert regions["20121"]["year_values"] == [30000.0, 28000.0]
+    assert regions["00184"]["year_values"] == [26000.0, 24000.0]
+    assert regions["00184"]["latitude"] == 41.9028 and regions["20121"]["years"] == [2025, 2024]
+
+
+def test_pooled_mode_omits_region_series():
+    with patch.object(api_main.fetcher, "fetch_price_stats", return_value=PriceStats(20000, 0.0, 3)) as fetch:
+        r = client.post("/api/estimate", json=PAYLOAD)
+    assert r.status_code == 200 and r.json()["regions"] is None
+    assert sorted({call.args[0]["zip"] for call in fetch.call_args_list}) == ["00184", "20121"]
+
+
+@pytest.mark.parametrize("zip_codes", [[], ["1"] * 11])
+def test_zip_codes_are_bounded(zip_codes):
+    assert client.post("/api/estimate", json={**PAYLOAD, "zip_codes": zip_codes}).status_code == 422
@@ -0,0 +1,37 @@
+import json
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+import main as api_main
+from src.estimator import build_break_even_analysis
+from src.fetcher import PriceStats
+from src.models import BreakEvenAnalysisRequest, BreakEvenAnalysisResponse
+from src.responses import FastJSONResponse, dumps
+
+client = TestClient(api_main.app)
+
+
+def test_dumps_handles_models_and_plain_data():
+    req = BreakEvenAnalysisRequest(brand="b", model="m")
+    assert json.loads(dumps(req)) == req.model_dump()
+    assert dumps({"a": [1, 2.5, None], "b": "é"}) == '{"a":[1,2.5,null],"b":"é"}'.encode("utf-8")
+    assert FastJSONResponse({"x": 1}).body == b'{"x":1}'
+
+
+def test_break_even_analysis_matches_response_model():
+    req = BreakEvenAnalysisRequest(brand="b", model="m", max_years=4, monthly_maintenance=50.0)
+    result = build_break_even_analysis(req, [30000.0, 0.0, 22000.0, 19000.0, 16000.0])
+    validated = BreakEvenAnalysisResponse.model_validate(result)
+    assert validated.model_dump() == result
+    assert [s["purchase_description"] for s in result["purchase_series"]] == [
+        "Buy brand new", "Buy 2 years old", "Buy 3 years old", "Buy 4 years old"]
+    first = result["purchase_series"][0]["data_points"][0]
+    assert first["years_owned"] == 2 and first["overall_cost"] == 30000.0 - 22000.0 + 50.0 * 12 * 2
+
+
+def test_analysis_endpoint_serves_fast_json():
+    with patch.object(api_main.fetcher, "fetch_price_stats",
+                      side_effect=lambda sel: PriceStats(40000 - 3000 * (2025 - sel["firstRegistration"]), 0.0, 4)):
+        r = client.post("/api/break_even_analysis", json={"brand": "b", "model": "m", "max_years": 3})
+    assert r.status_code == 200 and r.headers["content-type"] == "application/json"
+    data = BreakEvenAnalysisResponse.model_validate(r.json())
+    assert len(data.rental_series) == 3 and len(data.purchase_series) == 4
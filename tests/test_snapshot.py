@@ -0,0 +1,102 @@
+import os
+import time
+
+import pytest
+
+from loadtest.upstream import CURRENT_YEAR, start_upstream
+from src.cache import TTLCache
+from src.fetcher import Fetcher, FetchError, PriceStats, selection_key
+from src.series import build_selection
+from src.snapshot import (
+    PriceSnapshot, SnapshotConfig, SnapshotEntry, SnapshotError, SnapshotReader, SnapshotRefresher, write_snapshot,
+)
+from src.store import ObservationStore
+
+PANDA = build_selection("Fiat", "Panda", "", "10139", ["M"], None)
+PANDA_KEY = selection_key(PANDA, include_year=False)
+
+
+def entry(key, year, median, observed_at=None):
+    return SnapshotEntry(key, year, median, 500.0, 12, time.time() if observed_at is None else observed_at,
+                         p10=median - 1000, p90=median + 1000, trimmed_mean=median, outliers=1)
+
+
+def test_lookups_are_binary_searches_over_the_mapping(tmp_path):
+    path = str(tmp_path / "prices.snap")
+    keys = [f"fiat|model-{n:03d}||10139|M" for n in range(200)]
+    assert write_snapshot(path, [entry(key, year, 10000 + year) for key in reversed(keys)
+                                 for year in (2019, 2015, 2021)]) == 600
+
+    snapshot = PriceSnapshot(path)
+    assert (snapshot.keys, snapshot.records) == (200, 600)
+    assert snapshot.get(keys[137], 2021).median == 12021 and snapshot.get(keys[137], 2021).outliers == 1
+    assert snapshot.get(keys[137], 2020) is None and snapshot.get("fiat|tipo||10139|M", 2021) is None
+    assert [e.year for e in snapshot.series(keys[0])] == [2015, 2019, 2021]
+    assert len(list(snapshot.entries())) == 600
+    snapshot.close()
+
+    empty = str(tmp_path / "empty.snap")
+    write_snapshot(empty, [])
+    assert PriceSnapshot(empty).get(keys[0], 2021) is None
+    (tmp_path / "bogus.snap").write_bytes(b"x" * 64)
+    with pytest.raises(SnapshotError):
+        PriceSnapshot(str(tmp_path / "bogus.snap"))
+
+
+def test_reader_picks_up_a_replaced_snapshot(tmp_path):
+    path = str(tmp_path / "prices.snap")
+    reader = SnapshotReader(path, check_interval=0)
+    assert reader.get(PANDA_KEY, 2020) is None  # no file yet
+
+    write_snapshot(path, [entry(PANDA_KEY, 2020, 9000)])
+    assert reader.get(PANDA_KEY, 2020).median == 9000
+    write_snapshot(path, [entry(PANDA_KEY, 2020, 9500)])
+    assert reader.get(PANDA_KEY, 2020).median == 9500
+    # a broken file is ignored: the last good snapshot keeps serving
+    (tmp_path / "broken").write_bytes(b"nope")
+    os.replace(tmp_path / "broken", path)
+    assert reader.get(PANDA_KEY, 2020).median == 9500
+    assert reader.describe()["reloads"] == 2 and reader.describe()["hits"] == 3
+
+
+def test_fetcher_serves_fresh_snapshot_entries_without_scraping(tmp_path):
+    server, _ = start_upstream()
+    path = str(tmp_path / "prices.snap")
+    old = time.time() - 2 * Fetcher.PRICE_TTL
+    write_snapshot(path, [entry(PANDA_KEY, CURRENT_YEAR, 9000), entry(PANDA_KEY, CURRENT_YEAR - 1, 8000, old)])
+    fetcher = Fetcher(base_url=server.url, cache=TTLCache(), store=None,
+                      snapshot=SnapshotReader(path, check_interval=0))
+    try:
+        stats = fetcher.fetch_price_stats({**PANDA, "firstRegistration": CURRENT_YEAR})
+        assert (stats.median, stats.count, stats.stale) == (9000, 12, False)
+        assert fetcher.has_price_stats({**PANDA, "firstRegistration": CURRENT_YEAR})
+        assert server.stats.snapshot()["total"] == 0
+        # expired in the snapshot: scraped again
+        assert not fetcher.has_price_stats({**PANDA, "firstRegistration": CURRENT_YEAR - 1})
+        assert fetcher.fetch_price_stats({**PANDA, "firstRegistration": CURRENT_YEAR - 1}).median != 8000
+        assert server.stats.snapshot()["total"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # the upstream is gone: the expired entry is served, flagged stale
+    fetcher.cache = TTLCache()
+    fetcher._scrape_price_stats = lambda selected: (_ for _ in ()).throw(FetchError("down"))
+    stale = fetcher.fetch_price_stats({**PANDA, "firstRegistration": CURRENT_YEAR - 1})
+    assert (stale.median, stale.stale) == (8000, True)
+
+
+def test_refresher_publishes_the_newest_observations(tmp_path):
+    store = ObservationStore(str(tmp_path / "store.db"))
+    selection = {**PANDA, "firstRegistration": 2020}
+    store.record_observation(selection, PriceStats(9000, 100.0, 5), observed_at=1000.0)
+    store.record_observation(selection, PriceStats(9400, 100.0, 6), observed_at=2000.0)
+    store.record_observation({**selection, "firstRegistration": 2019}, PriceStats(0, 0.0, 0), observed_at=1500.0)
+    config = SnapshotConfig(path=str(tmp_path / "prices.snap"))
+    assert SnapshotRefresher(store, config).run_once() == 2
+    store.close()
+
+    snapshot = PriceSnapshot(config.path)
+    latest = snapshot.get(PANDA_KEY, 2020)
+    assert (latest.median, latest.count, latest.observed_at) == (9400, 6, 2000.0)
+    assert snapshot.get(PANDA_KEY, 2019).median == 0
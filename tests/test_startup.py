@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+import main as api_main
+import src.fetcher as fetcher_module
+from src.fetcher import PriceStats
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# generous so that slow CI machines pass; benchmarks/bench_startup.py enforces the real budget
+STARTUP_BUDGET_MS = float(os.getenv("CARCALC_STARTUP_BUDGET_MS", 5000))
+
+
+def test_import_is_lazy_and_within_budget():
+    probe = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import main, src.fetcher\n"
+        "ms = (time.perf_counter() - start) * 1000\n"
+        "print(json.dumps({'ms': ms, 'loaded': [m for m in ('bs4', 'yaml', 'requests', 'uvicorn') if m in sys.modules],"
+        " 'transport': src.fetcher._transport is not None, 'fetcher': main._fetcher is not None}))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, check=True, capture_output=True, text=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    assert result["loaded"] == []
+    assert result["transport"] is False and result["fetcher"] is False
+    assert result["ms"] < STARTUP_BUDGET_MS
+
+
+def test_transport_is_created_once_and_legacy_session_name_still_works():
+    fetcher_module.close_transport()
+    transport = fetcher_module.get_transport()
+    assert fetcher_module.get_transport() is transport
+    assert fetcher_module._SESSION is transport.session
+    fetcher_module.close_transport()
+    assert fetcher_module._transport is None
+
+
+def test_fetcher_dependency_can_be_overridden():
+    fake = MagicMock()
+    fake.PRICE_TTL = api_main.Fetcher.PRICE_TTL
+    fake.fetch_price_stats.return_value = PriceStats(20000, 0.0, 3)
+    api_main.app.dependency_overrides[api_main.get_fetcher] = lambda: fake
+    try:
+        resp = TestClient(api_main.app).post("/api/estimate", json={
+            "brand": "b", "model": "m", "registration_year": 2025, "number_of_years": 2, "purchase_year_index": 0})
+    finally:
+        api_main.app.dependency_overrides.clear()
+    assert resp.status_code == 200
+    assert fake.fetch_price_stats.call_count == 3
+
+
+def test_lifespan_publishes_fetcher_and_closes_transport():
+    with patch.object(api_main, "close_transport") as close:
+        with TestClient(api_main.app) as client:
+            assert client.app.state.fetcher is api_main.get_fetcher()
+        close.assert_called_once()
@@ -0,0 +1,88 @@
+import random
+import statistics
+from unittest.mock import patch
+
+import pytest
+
+from src.fetcher import Fetcher
+from src.stats import PriceAccumulator, QuantileSketch, RunningStats, weighted_quantile
+
+
+class MockResp:
+    def __init__(self, html: str):
+        self.content = html.encode("utf-8")
+
+
+def test_running_stats_matches_statistics_and_merges():
+    values = [12000, 15500, 9900, 21000, 18750, 13200]
+    stats = RunningStats()
+    for v in values:
+        stats.add(v)
+    assert stats.mean == pytest.approx(statistics.mean(values))
+    assert stats.stddev == pytest.approx(statistics.stdev(values))
+    assert (stats.min, stats.max) == (9900, 21000)
+
+    left, right = RunningStats(), RunningStats()
+    for v in values[:2]:
+        left.add(v)
+    for v in values[2:]:
+        right.add(v)
+    left.merge(right)
+    assert left.count == len(values)
+    assert left.variance == pytest.approx(statistics.variance(values))
+
+
+def test_sketch_is_exact_below_capacity():
+    values = [5, 1, 4, 2, 3, 6]
+    sketch = QuantileSketch(k=16)
+    for v in values:
+        sketch.add(v)
+    assert sketch.quantile(0.5) == statistics.median(values)
+    assert sketch.quantile(0.0) == 1 and sketch.quantile(1.0) == 6
+    assert weighted_quantile([(10, 1), (20, 3)], 0.5) == 20
+
+
+def test_sketch_memory_is_bounded_and_rank_error_small():
+    rng = random.Random(7)
+    values = [rng.uniform(0, 100000) for _ in range(50000)]
+    sketch = QuantileSketch(k=200, seed=1)
+    for v in values:
+        sketch.add(v)
+    assert sketch.count == len(values)
+    assert sketch.retained < 700
+    ordered = sorted(values)
+    for q in (0.1, 0.5, 0.9):
+        estimate = sketch.quantile(q)
+        rank = sum(1 for v in ordered if v <= estimate) / len(values)
+        assert abs(rank - q) < 0.02
+
+
+def test_accumulator_rejects_outliers():
+    acc = PriceAccumulator()
+    for price in [19000, 20000, 20500, 21000, 22000, 199, 250000]:
+        acc.add(price)
+    summary = acc.summary()
+    assert summary.outliers == 2
+    assert summary.count == 5
+    assert summary.median == 20500
+    assert 19000 <= summary.p10 <= summary.p90 <= 22000
+    assert summary.stddev == pytest.approx(statistics.stdev([19000, 20000, 20500, 21000, 22000]))
+    assert summary.mean == pytest.approx(statistics.mean([19000, 20000, 20500, 21000, 22000, 199, 250000]))
+    assert PriceAccumulator().summary() is None
+
+
+def test_trimmed_mean_drops_tails():
+    acc = PriceAccumulator(trim=0.1, iqr_factor=100)
+    for price in [1000] + [10000] * 8 + [50000]:
+        acc.add(price)
+    assert acc.summary().trimmed_mean == 10000
+
+
+def test_scrape_price_stats_streams_prices_into_accumulator():
+    html = "".join(f'<div class="Price">€ {p}</div>' for p in ("20.000", "21.000", "22.000", "23.000", "1"))
+    with patch("src.fetcher._safe_get", return_value=MockResp(html)):
+        stats = Fetcher()._scrape_price_stats({"make": "fiat", "model": "panda"})
+    assert stats.median == 21500
+    assert stats.count == 4 and stats.outliers == 1
+    assert stats.p10 == pytest.approx(20300)
+    assert stats.p90 == pytest.approx(22700)
@@ -0,0 +1,145 @@
+import gzip
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from fastapi.testclient import TestClient
+import main as api_main
+import src.fetcher as fetcher_module
+from src.fetcher import FetchError, _safe_get
+from src.transport import (
+    HTTPXTransport,
+    RequestsTransport,
+    TransportConfig,
+    TransportError,
+    create_transport,
+)
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    flaky = {}
+    seen_encodings = []
+
+    def do_GET(self):
+        self.seen_encodings.append(self.headers.get("Accept-Encoding"))
+        if self.path.startswith("/flaky"):
+            remaining = self.flaky.get(self.path, 0)
+            if remaining:
+                self.flaky[self.path] = remaining - 1
+                return self._send(503, b"busy")
+        if self.path == "/missing":
+            return self._send(404, b"no")
+        if self.path == "/slow":
+            threading.Event().wait(0.5)
+        body = gzip.compress(b"<html>ok</html>")
+        self.send_response(200)
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def upstream():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+CONFIG = TransportConfig(retries=2, backoff_factor=0.0, read_timeout=2.0)
+
+
+@pytest.mark.parametrize("transport_cls", [RequestsTransport, HTTPXTransport])
+def test_keep_alive_connections_are_reused_and_gzip_is_negotiated(upstream, transport_cls):
+    transport = transport_cls(CONFIG)
+    try:
+        for _ in range(5):
+            assert transport.get(upstream + "/page").content == b"<html>ok</html>"
+        stats = transport.describe()
+    finally:
+        transport.close()
+    assert "gzip" in _Upstream.seen_encodings[-1]
+    assert (stats["requests"], stats["connections_opened"], stats["connections_reused"]) == (5, 1, 4)
+    assert stats["reuse_ratio"] == 0.8
+    assert stats["http_versions"] == {"HTTP/1.1": 5}
+
+
+@pytest.mark.parametrize("transport_cls", [RequestsTransport, HTTPXTransport])
+def test_retry_budget_and_errors(upstream, transport_cls):
+    transport = transport_cls(CONFIG)
+    _Upstream.flaky[f"/flaky-{transport_cls.name}"] = 2
+    try:
+        assert transport.get(f"{upstream}/flaky-{transport_cls.name}").status_code == 200
+        with pytest.raises(TransportError):
+            transport.get(upstream + "/missing")
+        stats = transport.stats.snapshot()
+    finally:
+        transport.close()
+    assert (stats["requests"], stats["errors"], stats["attempts"]) == (2, 1, 4)
+
+
+def test_read_timeout_is_per_attempt(upstream):
+    transport = RequestsTransport(CONFIG._replace(retries=0))
+    try:
+        with pytest.raises(TransportError):
+            transport.get(upstream + "/slow", timeout=0.1)
+        assert transport.get(upstream + "/slow").status_code == 200
+    finally:
+        transport.close()
+
+
+def test_fan_out_beyond_pool_size_discards_connections(upstream):
+    small = RequestsTransport(CONFIG._replace(pool_maxsize=1))
+    sized = RequestsTransport(CONFIG._replace(pool_maxsize=8))
+    try:
+        for transport in (small, sized):
+            with ThreadPoolExecutor(8) as pool:
+                list(pool.map(lambda _: transport.get(upstream + "/slow"), range(8)))
+    finally:
+        small.close()
+        sized.close()
+    assert small.stats.connections_discarded > 0
+    assert sized.stats.connections_discarded == 0
+
+
+def test_http2_falls_back_without_h2(monkeypatch):
+    import importlib.util
+    real = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name, *a: None if name == "h2" else real(name, *a))
+    transport = create_transport(TransportConfig(http2=True))
+    transport.close()
+    assert isinstance(transport, RequestsTransport)
+
+
+def test_config_from_env(monkeypatch):
+    monkeypatch.setenv("CARCALC_HTTP_POOL_MAXSIZE", "64")
+    monkeypatch.setenv("CARCALC_HTTP_CONNECT_TIMEOUT", "1.5")
+    monkeypatch.setenv("CARCALC_HTTP2", "yes")
+    config = TransportConfig.from_env()
+    assert (config.pool_maxsize, config.connect_timeout, config.http2, config.retries) == (64, 1.5, True, 3)
+
+
+def test_safe_get_maps_errors_and_metrics_endpoint(upstream):
+    fetcher_module.upstream_breaker.reset()
+    fetcher_module.set_transport(RequestsTransport(CONFIG))
+    try:
+        _safe_get(upstream + "/page")
+        with pytest.raises(FetchError):
+            _safe_get(upstream + "/missing")
+        body = TestClient(api_main.app).get("/api/metrics").json()
+    finally:
+        fetcher_module.close_transport()
+    assert body["upstream"]["transport"] == "requests"
+    assert body["upstream"]["requests"] == 2 and body["upstream"]["errors"] == 1